@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify, current_app
 from utils.auth_utils import AuthUtils
-from utils.db_utils import get_db_session
+from utils.db_utils import get_request_session
 from utils.response_utils import success_response, error_response
 from models import User, Admin, Client, Staff
 import hashlib
@@ -20,7 +20,7 @@ def register():
             if field not in data:
                 return error_response(f"缺少必填字段: {field}", 400)
 
-        db = get_db_session()
+        db = get_request_session()
 
         # 检查用户名是否已存在
         if AuthUtils.check_username_exists(db, data["username"]):
@@ -101,10 +101,7 @@ def register():
         )
 
     except Exception as e:
-        db.rollback()
         return error_response(f"注册失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @auth_bp.route("/login", methods=["POST"])
@@ -116,7 +113,7 @@ def login():
         if "username" not in data or "password" not in data:
             return error_response("用户名和密码不能为空", 400)
 
-        db = get_db_session()
+        db = get_request_session()
 
         # 验证用户
         user = AuthUtils.authenticate_user(db, data["username"], data["password"])
@@ -139,8 +136,6 @@ def login():
 
     except Exception as e:
         return error_response(f"登录失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @auth_bp.route("/logout", methods=["POST"])
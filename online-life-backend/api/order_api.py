@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
 from utils.auth_utils import AuthUtils
-from utils.db_utils import get_db_session
+from utils.db_utils import get_request_session
 from utils.response_utils import success_response, error_response
-from utils.order_utils import OrderUtils
+from utils.order_utils import OrderUtils, OrderValidationError
+from utils.pagination_utils import InvalidCursorError
 from utils.map_utils import MapUtils
-from models import Orders, Task, User, Reputation
+from utils.dispatch_utils import DispatchUtils
+from utils.eta_utils import EtaUtils
+from models import Task, User, Reputation
 from decimal import Decimal
 from sqlalchemy import and_, desc
 import traceback
@@ -15,7 +18,6 @@ order_bp = Blueprint("order", __name__)
 @order_bp.route("/create", methods=["POST"])
 def create_order():
     """创建订单"""
-    db = None
     try:
         # 验证token
         token = request.headers.get("Authorization", "").replace("Bearer ", "")
@@ -32,58 +34,21 @@ def create_order():
                 print(f"字段校验失败: {field} -> {data.get(field)}")
                 return error_response(f"缺少或无效的必填字段: {field}", 400)
 
-        # 校验商家地址和收货地址地理编码
-        shop_address = data.get('shop_address', '').strip()
-        orderlocation = data.get('orderlocation', '').strip()
-        shop_coords = MapUtils.geocode(shop_address)
-        user_coords = MapUtils.geocode(orderlocation)
-        if not shop_coords or not user_coords:
-            print(f"地理编码失败: shop_coords={shop_coords}, user_coords={user_coords}")
-            return error_response('商家地址或收货地址无法识别，请检查输入', 400)
-        # 预计时间校验
-        time_estimate = MapUtils.estimate_delivery_time(shop_address=shop_address, delivery_address=orderlocation)
-        print('[DEBUG] 预计时间返回:', time_estimate)
-        total_seconds = time_estimate.get('total') or time_estimate.get('total_time')
-        if not time_estimate or not total_seconds or time_estimate.get('status') not in ('ok', 'calculated'):
-            print(f"预计时间校验失败: {time_estimate}")
-            return error_response('无法计算预计时间，请检查地址', 400)
-
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
-        # 创建订单
-        order_id = OrderUtils.create_order(db, user_id, data, estimated_time=total_seconds)
-
-        # 计算配送费
-        order = db.query(Orders).filter(Orders.OrderID == order_id).first()
-        if not order:
-            return error_response("订单创建失败", 500)
+        # 地理编码、估算时间、计价全部通过后一次写入订单
+        try:
+            result = OrderUtils.place_order(db, user_id, data)
+        except OrderValidationError as e:
+            print(f"下单校验失败: {str(e)}")
+            return error_response(str(e), 400)
 
-        # 获取预计时间（分钟）
-        estimated_time_min = int(order.EstimatedTime) // 60 if order.EstimatedTime else 45  # 默认45分钟
-        
-        # 计算配送费：预计时间 * 0.15
-        delivery_fee = round(estimated_time_min * 0.15, 2)
-        
-        # 更新订单的配送费
-        order.Amount = str(delivery_fee)
-        db.commit()
-
-        return success_response(
-            {
-                "order_id": str(order_id),
-                "delivery_fee": delivery_fee,
-                "estimated_time": estimated_time_min
-            }, 
-            "订单创建成功"
-        )
+        return success_response(result, "订单创建成功")
 
     except Exception as e:
         traceback.print_exc()
         return error_response(f"创建订单失败: {str(e)}", 500)
-    finally:
-        if db:
-            db.close()
 
 
 @order_bp.route("/list", methods=["GET"])
@@ -96,7 +61,7 @@ def get_orders():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         # 获取查询参数
@@ -104,19 +69,21 @@ def get_orders():
         per_page = int(request.args.get("per_page", 10))
         status = request.args.get("status", "")
         order_type = request.args.get("order_type", "")
+        cursor = request.args.get("cursor")
+        count = request.args.get("count")
 
         orders_data = OrderUtils.get_user_orders(
-            db, user_id, page, per_page, status, order_type
+            db, user_id, page, per_page, status, order_type, cursor, count
         )
         # print(orders_data)
 
         return success_response(orders_data, "获取订单列表成功")
 
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         traceback.print_exc()
         return error_response(f"获取订单列表失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 # 高德路径规划api： https://lbs.amap.com/api/webservice/guide/api/newroute
@@ -128,6 +95,28 @@ def get_orders():
 # 可以将高德的api请求代码写入utils.map_utils.py然后导入引用
 
 
+@order_bp.route("/statistics", methods=["GET"])
+def get_order_statistics():
+    """获取当前用户的订单统计（代办人员返回接单统计）"""
+    try:
+        token = request.headers.get("Authorization", "").replace("Bearer ", "")
+        payload = AuthUtils.verify_token(token)
+        if not payload:
+            return error_response("认证失败", 401)
+
+        db = get_request_session()
+        user_id = Decimal(payload["user_id"])
+        if payload["role"] == "staff":
+            statistics = OrderUtils.get_staff_order_statistics(db, user_id)
+        else:
+            statistics = OrderUtils.get_order_statistics(db, user_id)
+
+        return success_response(statistics, "获取订单统计成功")
+
+    except Exception as e:
+        return error_response(f"获取订单统计失败: {str(e)}", 500)
+
+
 @order_bp.route("/<order_id>", methods=["GET"])
 def get_order_detail(order_id):
     """获取订单详情"""
@@ -138,7 +127,7 @@ def get_order_detail(order_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         order_id_decimal = Decimal(order_id)
 
@@ -155,8 +144,6 @@ def get_order_detail(order_id):
 
     except Exception as e:
         return error_response(f"获取订单详情失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @order_bp.route("/estimate-time", methods=["POST"])
@@ -174,16 +161,13 @@ def estimate_order_time():
             return error_response("缺少必填字段: orderlocation", 400)
 
         # 获取数据库连接
-        db = get_db_session()
+        db = get_request_session()
 
-        try:
-            # 计算预计时间
-            time_estimate = MapUtils.calculate_order_estimated_time(
-                db, data["orderlocation"], payload["user_id"]
-            )
-            return success_response(time_estimate, "获取预计时间成功")
-        finally:
-            db.close()
+        # 计算预计时间
+        time_estimate = MapUtils.calculate_order_estimated_time(
+            db, data["orderlocation"], payload["user_id"]
+        )
+        return success_response(time_estimate, "获取预计时间成功")
 
     except Exception as e:
         return error_response(f"估算订单时间失败: {str(e)}", 500)
@@ -199,7 +183,7 @@ def cancel_order(order_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         order_id_decimal = Decimal(order_id)
 
@@ -211,8 +195,6 @@ def cancel_order(order_id):
 
     except Exception as e:
         return error_response(f"取消订单失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @order_bp.route("/<order_id>/complete", methods=["POST"])
@@ -224,7 +206,7 @@ def complete_order(order_id):
         if not payload or payload["role"] != "staff":
             return error_response("权限不足", 403)
         staff_id = Decimal(payload["user_id"])
-        db = get_db_session()
+        db = get_request_session()
         order_id_decimal = Decimal(order_id)
         result = OrderUtils.complete_order(db, order_id_decimal, staff_id)
         if not result:
@@ -232,9 +214,6 @@ def complete_order(order_id):
         return success_response({}, "订单已完成")
     except Exception as e:
         return error_response(f"完成订单失败: {str(e)}", 500)
-    finally:
-        if "db" in locals():
-            db.close()
 
 
 @order_bp.route("/payment/<order_id>/points-info", methods=["GET"])
@@ -247,7 +226,7 @@ def get_order_points_info(order_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         order_id_decimal = Decimal(order_id)
 
@@ -257,8 +236,6 @@ def get_order_points_info(order_id):
 
     except Exception as e:
         return error_response(f"查询失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 from contextlib import contextmanager
@@ -266,7 +243,6 @@ from contextlib import contextmanager
 @order_bp.route("/payment/<order_id>", methods=["POST"])
 def process_payment(order_id):
     """处理支付"""
-    db = None
     try:
         # 验证token
         token = request.headers.get("Authorization", "").replace("Bearer ", "")
@@ -285,7 +261,7 @@ def process_payment(order_id):
         order_id_decimal = Decimal(order_id)
 
         # 获取数据库连接
-        db = get_db_session()
+        db = get_request_session()
 
         # 处理支付逻辑
         payment_result = OrderUtils.process_payment(db, order_id_decimal, user_id, data)
@@ -295,9 +271,6 @@ def process_payment(order_id):
     except Exception as e:
         traceback.print_exc()
         return error_response(f"支付失败: {str(e)}", 500)
-    finally:
-        if db:
-            db.close()
 
 @order_bp.route("/available", methods=["GET"])
 def get_available_orders():
@@ -311,24 +284,25 @@ def get_available_orders():
 
         # 从token中获取user_id作为staff_id（修正点）
         staff_id = Decimal(payload["user_id"])  # 使用user_id作为staff_id
-        db = get_db_session()
+        db = get_request_session()
 
         # 获取查询参数
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 10))
         task_type = request.args.get("task_type", None)
+        cursor = request.args.get("cursor")
+        count = request.args.get("count")
 
         result = OrderUtils.get_available_orders(
-            db, page, per_page, task_type
+            db, page, per_page, task_type, cursor=cursor, count=count
         )
 
         return success_response(result, "获取可接单列表成功")
 
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(f"获取可接单列表失败: {str(e)}", 500)
-    finally:
-        if "db" in locals():
-            db.close()
 
 
 @order_bp.route("/completed", methods=["GET"])
@@ -341,24 +315,26 @@ def get_completed_orders():
         if not payload or payload["role"] != "staff":
             return error_response("权限不足", 403)
 
-        db = get_db_session()
+        db = get_request_session()
         staff_id = Decimal(payload["user_id"])
 
         # 获取查询参数
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 10))
+        cursor = request.args.get("cursor")
+        count = request.args.get("count")
 
         # 使用工具类方法获取已完成订单
         orders_data = OrderUtils.get_staff_orders(
-            db, staff_id, page, per_page, status="completed"
+            db, staff_id, page, per_page, status="completed", cursor=cursor, count=count
         )
 
         return success_response(orders_data, "获取已完成订单列表成功")
 
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(f"获取已完成订单列表失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @order_bp.route("/in-progress", methods=["GET"])
@@ -371,24 +347,26 @@ def get_in_progress_orders():
         if not payload or payload["role"] != "staff":
             return error_response("权限不足", 403)
 
-        db = get_db_session()
+        db = get_request_session()
         staff_id = Decimal(payload["user_id"])
 
         # 获取查询参数
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 10))
+        cursor = request.args.get("cursor")
+        count = request.args.get("count")
 
         # 使用工具类方法获取进行中订单
         orders_data = OrderUtils.get_staff_orders(
-            db, staff_id, page, per_page, status="in_progress"
+            db, staff_id, page, per_page, status="in_progress", cursor=cursor, count=count
         )
 
         return success_response(orders_data, "获取进行中订单列表成功")
 
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(f"获取进行中订单列表失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @order_bp.route("/assigned", methods=["GET"])
@@ -401,24 +379,26 @@ def get_assigned_orders():
         if not payload or payload["role"] != "staff":
             return error_response("权限不足", 403)
 
-        db = get_db_session()
+        db = get_request_session()
         staff_id = Decimal(payload["user_id"])
 
         # 获取查询参数
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 10))
+        cursor = request.args.get("cursor")
+        count = request.args.get("count")
 
         # 使用工具类方法获取已分配订单
         orders_data = OrderUtils.get_staff_orders(
-            db, staff_id, page, per_page, status="assigned"
+            db, staff_id, page, per_page, status="assigned", cursor=cursor, count=count
         )
 
         return success_response(orders_data, "获取已分配订单列表成功")
 
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(f"获取已分配订单列表失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @order_bp.route("/staff/all", methods=["GET"])
@@ -434,20 +414,21 @@ def get_staff_all_orders():
         per_page = int(request.args.get("per_page", 10))
         status = request.args.get("status", "")
         order_type = request.args.get("order_type", "")
+        cursor = request.args.get("cursor")
+        count = request.args.get("count")
         
         print(f"[DEBUG] 获取staff订单列表: staff_id={staff_id}, status={status}")
         
-        db = get_db_session()
-        result = OrderUtils.get_staff_orders(db, staff_id, page, per_page, status, order_type)
+        db = get_request_session()
+        result = OrderUtils.get_staff_orders(db, staff_id, page, per_page, status, order_type, cursor, count)
         print(f"[DEBUG] 查询结果: {result}")
         
         return success_response(result, "获取我的订单成功")
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         print(f"[ERROR] 获取staff订单失败: {str(e)}")
         return error_response(f"获取我的订单失败: {str(e)}", 500)
-    finally:
-        if "db" in locals():
-            db.close()
 
 
 @order_bp.route("/available-map", methods=["GET"])
@@ -459,17 +440,36 @@ def get_available_orders_map():
         if not payload or payload["role"] != "staff":
             return error_response("权限不足", 403)
         staff_id = Decimal(payload["user_id"])
-        db = get_db_session()
+        db = get_request_session()
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 10))
         task_type = request.args.get("task_type", None)
-        result = OrderUtils.get_available_orders_map(db, page, per_page, task_type, staff_id)
+
+        # 传入骑手位置时返回附近的可接订单（按距离排序），否则按创建时间分页
+        raw_lng, raw_lat = request.args.get("lng"), request.args.get("lat")
+        if raw_lng is not None or raw_lat is not None:
+            try:
+                lng = float(raw_lng)
+                lat = float(raw_lat)
+            except (TypeError, ValueError):
+                return error_response("无效的经纬度", 400)
+            if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+                return error_response("无效的经纬度", 400)
+            radius = request.args.get("radius", type=float)
+            limit = request.args.get("limit", type=int)
+            if (radius is not None and radius <= 0) or (limit is not None and limit <= 0):
+                return error_response("无效的半径或数量", 400)
+            result = OrderUtils.get_nearby_available_orders(db, lng, lat, radius, limit, task_type)
+            return success_response(result, "获取附近可接订单成功")
+
+        cursor = request.args.get("cursor")
+        count = request.args.get("count")
+        result = OrderUtils.get_available_orders_map(db, page, per_page, task_type, staff_id, cursor, count)
         return success_response(result, "获取可接单地图列表成功")
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(f"获取可接单地图列表失败: {str(e)}", 500)
-    finally:
-        if "db" in locals():
-            db.close()
 
 
 @order_bp.route("/accept/<order_id>", methods=["POST"])
@@ -481,15 +481,62 @@ def accept_order(order_id):
         if not payload or payload["role"] != "staff":
             return error_response("权限不足", 403)
         staff_id = Decimal(payload["user_id"])
-        db = get_db_session()
+        db = get_request_session()
         order_id_decimal = Decimal(order_id)
         result = OrderUtils.accept_order(db, order_id_decimal, staff_id)
         return success_response(result, "接单成功")
     except Exception as e:
         return error_response(f"接单失败: {str(e)}", 500)
-    finally:
-        if "db" in locals():
-            db.close()
+
+
+@order_bp.route("/staff/location", methods=["POST"])
+def update_staff_location():
+    """代办人员上报当前位置（批量派单按该位置计算取货时间）"""
+    try:
+        token = request.headers.get("Authorization", "").replace("Bearer ", "")
+        payload = AuthUtils.verify_token(token)
+        if not payload or payload["role"] != "staff":
+            return error_response("权限不足", 403)
+        data = request.get_json() or {}
+        try:
+            longitude = float(data.get("longitude"))
+            latitude = float(data.get("latitude"))
+        except (TypeError, ValueError):
+            return error_response("经纬度格式错误", 400)
+        if not (-180 <= longitude <= 180 and -90 <= latitude <= 90):
+            return error_response("经纬度超出范围", 400)
+        db = get_request_session()
+        if not DispatchUtils.update_staff_location(db, Decimal(payload["user_id"]), longitude, latitude):
+            return error_response("代办人员不存在", 404)
+        return success_response({"longitude": longitude, "latitude": latitude}, "位置更新成功")
+    except Exception as e:
+        return error_response(f"位置更新失败: {str(e)}", 500)
+
+
+@order_bp.route("/staff/eta", methods=["GET"])
+def get_staff_queue_eta():
+    """估算代办人员所有已接订单的配送顺序和预计送达时间"""
+    try:
+        token = request.headers.get("Authorization", "").replace("Bearer ", "")
+        payload = AuthUtils.verify_token(token)
+        if not payload or payload["role"] != "staff":
+            return error_response("权限不足", 403)
+        # 未传经纬度时使用上报的位置；传入时必须同时提供且为有效数值
+        longitude = latitude = None
+        raw_lng, raw_lat = request.args.get("lng"), request.args.get("lat")
+        if raw_lng is not None or raw_lat is not None:
+            try:
+                longitude = float(raw_lng)
+                latitude = float(raw_lat)
+            except (TypeError, ValueError):
+                return error_response("经纬度格式错误", 400)
+            if not (-180 <= longitude <= 180 and -90 <= latitude <= 90):
+                return error_response("经纬度超出范围", 400)
+        db = get_request_session()
+        result = EtaUtils.estimate_staff_queue(db, Decimal(payload["user_id"]), longitude, latitude)
+        return success_response(result, "估算配送时间成功")
+    except Exception as e:
+        return error_response(f"估算配送时间失败: {str(e)}", 500)
 
 
 @order_bp.route("/staff/assigned", methods=["GET"])
@@ -501,14 +548,17 @@ def get_staff_assigned_orders():
         if not payload or payload["role"] != "staff":
             return error_response("权限不足", 403)
         staff_id = Decimal(payload["user_id"])
-        db = get_db_session()
+        db = get_request_session()
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 10))
         order_type = request.args.get("order_type", "")
-        orders_data = OrderUtils.get_staff_orders(db, staff_id, page, per_page, status="assigned", order_type=order_type)
+        cursor = request.args.get("cursor")
+        count = request.args.get("count")
+        orders_data = OrderUtils.get_staff_orders(
+            db, staff_id, page, per_page, status="assigned", order_type=order_type, cursor=cursor, count=count
+        )
         return success_response(orders_data, "获取已分配订单列表成功")
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(f"获取已分配订单失败: {str(e)}", 500)
-    finally:
-        if "db" in locals():
-            db.close()
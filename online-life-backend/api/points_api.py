@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
 from utils.auth_utils import AuthUtils
-from utils.db_utils import get_db_session
+from utils.db_utils import get_request_session
 from utils.response_utils import success_response, error_response
 from utils.points_utils import PointsUtils
+from utils.pagination_utils import InvalidCursorError
 from models import Points
 from decimal import Decimal
 
@@ -19,7 +20,7 @@ def get_points_balance():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         balance = PointsUtils.get_user_points_balance(db, user_id)
@@ -30,8 +31,6 @@ def get_points_balance():
 
     except Exception as e:
         return error_response(f"获取积分余额失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @points_bp.route("/add", methods=["POST"])
@@ -48,7 +47,7 @@ def add_points():
         if "points" not in data or "reason" not in data:
             return error_response("缺少必填字段", 400)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         points_to_add = int(data["points"])
         reason = data["reason"]
@@ -64,8 +63,6 @@ def add_points():
 
     except Exception as e:
         return error_response(f"积分添加失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @points_bp.route("/deduct", methods=["POST"])
@@ -82,7 +79,7 @@ def deduct_points():
         if "points" not in data or "reason" not in data:
             return error_response("缺少必填字段", 400)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         points_to_deduct = int(data["points"])
         reason = data["reason"]
@@ -103,8 +100,6 @@ def deduct_points():
 
     except Exception as e:
         return error_response(f"积分扣除失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @points_bp.route("/history", methods=["GET"])
@@ -117,21 +112,22 @@ def get_points_history():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         # 获取查询参数
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 20))
+        cursor = request.args.get("cursor") or None
 
-        history = PointsUtils.get_points_history(db, user_id, page, per_page)
+        history = PointsUtils.get_points_history(db, user_id, page, per_page, cursor)
 
         return success_response(history, "获取积分历史成功")
 
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(f"获取积分历史失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @points_bp.route("/transfer", methods=["POST"])
@@ -151,7 +147,7 @@ def transfer_points():
             if field not in data:
                 return error_response(f"缺少必填字段: {field}", 400)
 
-        db = get_db_session()
+        db = get_request_session()
         from_user_id = Decimal(payload["user_id"])
         to_user_id = Decimal(data["target_user_id"])
         points_amount = int(data["points"])
@@ -178,15 +174,13 @@ def transfer_points():
 
     except Exception as e:
         return error_response(f"积分转账失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @points_bp.route("/ranking", methods=["GET"])
 def get_points_ranking():
     """获取积分排行榜"""
     try:
-        db = get_db_session()
+        db = get_request_session()
 
         # 获取查询参数
         limit = int(request.args.get("limit", 50))
@@ -197,5 +191,3 @@ def get_points_ranking():
 
     except Exception as e:
         return error_response(f"获取积分排行榜失败: {str(e)}", 500)
-    finally:
-        db.close()
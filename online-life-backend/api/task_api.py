@@ -1,14 +1,19 @@
 from flask import Blueprint, request, jsonify
 from utils.auth_utils import AuthUtils
-from utils.db_utils import get_db_session
+from utils.db_utils import get_request_session
 from utils.response_utils import success_response, error_response
 from utils.task_utils import TaskUtils
+from utils.deadline_utils import DeadlineUtils
 from utils.user_utils import UserUtils
+from utils.id_utils import IdUtils
+from utils.typed_column_utils import TypedColumnUtils
+from utils.pagination_utils import InvalidCursorError
 from models import Task, GroupTask, GroupTaskUser, BidRecord, User, TaskParticipant
 from decimal import Decimal
 import traceback
+import config
 from datetime import datetime
-from sqlalchemy import or_, func
+from sqlalchemy import or_
 
 task_bp = Blueprint("task", __name__)
 
@@ -23,7 +28,7 @@ def get_group_tasks():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
 
         # 获取查询参数
         page = int(request.args.get("page", 1))
@@ -37,8 +42,6 @@ def get_group_tasks():
 
     except Exception as e:
         return error_response(f"获取团办任务列表失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/group/<group_task_id>", methods=["GET"])
@@ -51,7 +54,7 @@ def get_group_task_detail(group_task_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         group_task_id_decimal = Decimal(group_task_id)
 
         task_detail = TaskUtils.get_group_task_detail(db, group_task_id_decimal)
@@ -62,8 +65,6 @@ def get_group_task_detail(group_task_id):
 
     except Exception as e:
         return error_response(f"获取团办任务详情失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 # @task_bp.route("/group/<group_task_id>/join", methods=["POST"])
@@ -76,7 +77,7 @@ def get_group_task_detail(group_task_id):
 #         if not payload:
 #             return error_response("认证失败", 401)
 
-#         db = get_db_session()
+#         db = get_request_session()
 #         user_id = Decimal(payload["user_id"])
 #         group_task_id_decimal = Decimal(group_task_id)
 
@@ -116,7 +117,7 @@ def leave_group_task(group_task_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         group_task_id_decimal = Decimal(group_task_id)
 
@@ -130,8 +131,6 @@ def leave_group_task(group_task_id):
 
     except Exception as e:
         return error_response(f"退出团办任务失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/task/<task_id>/leave", methods=["POST"])
@@ -144,7 +143,7 @@ def leave_specific_task(task_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         task_id_decimal = Decimal(task_id)
 
@@ -156,8 +155,6 @@ def leave_specific_task(task_id):
 
     except Exception as e:
         return error_response(f"退出任务失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/group/my", methods=["GET"])
@@ -170,7 +167,7 @@ def get_my_group_tasks():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         # 获取查询参数
@@ -183,8 +180,6 @@ def get_my_group_tasks():
 
     except Exception as e:
         return error_response(f"获取我的团办任务失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/group/create", methods=["POST"])
@@ -207,7 +202,7 @@ def create_group_task():
             if not data.get(field):
                 return error_response(f"缺少必需字段: {field}", 400)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         # 创建团办任务
@@ -219,8 +214,6 @@ def create_group_task():
 
     except Exception as e:
         return error_response(f"创建团办任务失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/group/available", methods=["GET"])
@@ -233,7 +226,7 @@ def get_available_group_tasks():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
 
         # 获取查询参数
         page = int(request.args.get("page", 1))
@@ -248,8 +241,6 @@ def get_available_group_tasks():
 
     except Exception as e:
         return error_response(f"获取可参与团办任务列表失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/group/<group_task_id>/join", methods=["POST"])
@@ -262,7 +253,7 @@ def join_group_task(group_task_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         print("user_id:", user_id)
         group_task_id_decimal = Decimal(group_task_id)
@@ -291,8 +282,6 @@ def join_group_task(group_task_id):
 
     except Exception as e:
         return error_response(f"加入团办任务失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/group/<group_task_id>/participants", methods=["GET"])
@@ -305,7 +294,7 @@ def get_group_task_participants(group_task_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         group_task_id_decimal = Decimal(group_task_id)
 
         # 检查团办任务是否存在
@@ -363,8 +352,6 @@ def get_group_task_participants(group_task_id):
 
     except Exception as e:
         return error_response(f"获取参与者列表失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/staff/available", methods=["GET"])
@@ -382,7 +369,7 @@ def get_available_tasks_for_staff():
         if user_role != "staff":
             return error_response("只有代办人员可以查看此列表", 403)
 
-        db = get_db_session()
+        db = get_request_session()
 
         # 获取查询参数
         page = int(request.args.get("page", 1))
@@ -401,8 +388,6 @@ def get_available_tasks_for_staff():
 
     except Exception as e:
         return error_response(f"获取可接取任务列表失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/group/<group_task_id>/status", methods=["GET"])
@@ -415,28 +400,25 @@ def get_group_task_status(group_task_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         group_task_id_decimal = Decimal(group_task_id)
 
-        # 获取团办任务基本信息
-        group_task = (
-            db.query(GroupTask, Task)
-            .join(Task, GroupTask.TaskID == Task.TaskID)
-            .filter(GroupTask.GroupTaskID == group_task_id_decimal)
-            .first()
+        # 获取团办任务基本信息（第一个子任务为模板任务）
+        group_task_obj = db.get(GroupTask, group_task_id_decimal)
+        tasks = (
+            db.query(Task)
+            .filter(Task.GroupTaskID == group_task_id_decimal)
+            .order_by(Task.TaskID)
+            .all()
         )
 
-        if not group_task:
+        if not group_task_obj or not tasks:
             return error_response("团办任务不存在", 404)
 
-        group_task_obj, task_obj = group_task
+        task_obj = tasks[0]
 
-        # 获取参与人数
-        participant_count = (
-            db.query(GroupTaskUser)
-            .filter(GroupTaskUser.GroupTaskID == group_task_id_decimal)
-            .count()
-        )
+        # 获取参与人数（各子任务的冗余计数之和）
+        participant_count = sum(task.ActiveParticipants for task in tasks)
 
         # 获取参与用户列表
         participants = (
@@ -484,7 +466,7 @@ def get_group_task_status(group_task_id):
 
         result = {
             "group_task_id": str(group_task_obj.GroupTaskID),
-            "task_id": str(group_task_obj.TaskID),
+            "task_id": str(task_obj.TaskID),
             "description": task_obj.Description,
             "task_type": task_obj.TaskType,
             "estimated_time": task_obj.EstimatedTime,
@@ -503,8 +485,6 @@ def get_group_task_status(group_task_id):
 
     except Exception as e:
         return error_response(f"获取团办任务状态失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/staff/<task_id>/bid", methods=["POST"])
@@ -522,7 +502,7 @@ def bid_for_task(task_id):
         if user_role != "staff":
             return error_response("只有代办人员可以竞标", 403)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         task_id_decimal = Decimal(task_id)
 
@@ -540,10 +520,9 @@ def bid_for_task(task_id):
             return error_response("任务不存在或不可竞标", 400)
 
         # 检查竞标截止时间
-        if task.BidDeadline:
-            deadline = datetime.strptime(task.BidDeadline, "%Y-%m-%d %H:%M:%S")
-            if datetime.now() > deadline:
-                return error_response("竞标已截止", 400)
+        deadline = TypedColumnUtils.value(task, "BidDeadlineAt")
+        if deadline and datetime.now() > deadline:
+            return error_response("竞标已截止", 400)
 
         # 检查是否已经竞标
         existing_bid = (
@@ -555,8 +534,7 @@ def bid_for_task(task_id):
             return error_response("你已对该任务竞标过", 400)
 
         # 生成新的BidID
-        max_bid_id = db.query(func.max(BidRecord.BidID)).scalar() or 0
-        new_bid_id = max_bid_id + 1
+        new_bid_id = IdUtils.next_id()
 
         # 创建竞标记录
         bid_record = BidRecord(
@@ -575,8 +553,8 @@ def bid_for_task(task_id):
             .filter(BidRecord.TaskID == task_id_decimal, BidRecord.BidStatus == "pending")
             .count()
         )
-        if bid_count >= 5:
-            TaskUtils._auto_assign_task_to_best_bidder(db, task_id_decimal)
+        if bid_count >= config.BID_AUTO_ASSIGN_BIDS:
+            DeadlineUtils.request_assignment(db, task_id_decimal)
 
         return success_response({
             "bid_id": str(new_bid_id),
@@ -587,10 +565,7 @@ def bid_for_task(task_id):
         }, "竞标成功")
 
     except Exception as e:
-        db.rollback()
         return error_response(f"竞标失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/bid/my", methods=["GET"])
@@ -603,22 +578,24 @@ def get_my_bids():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         # 获取查询参数
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 10))
         status = request.args.get("status", "")
+        cursor = request.args.get("cursor")
+        count = request.args.get("count")
 
-        my_bids = TaskUtils.get_user_bids(db, user_id, page, per_page, status)
+        my_bids = TaskUtils.get_user_bids(db, user_id, page, per_page, status, cursor, count)
 
         return success_response(my_bids, "获取竞标记录成功")
 
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(f"获取竞标记录失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/task/<task_id>/participants", methods=["GET"])
@@ -631,7 +608,7 @@ def get_task_participants(task_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         task_id_decimal = Decimal(task_id)
 
         participants = TaskUtils.get_task_participants(db, task_id_decimal)
@@ -642,8 +619,6 @@ def get_task_participants(task_id):
 
     except Exception as e:
         return error_response(f"获取任务参与者失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @task_bp.route("/<task_id>/accept-bid/<bid_id>", methods=["POST"])
@@ -656,7 +631,7 @@ def accept_bid(task_id, bid_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         task_id_decimal = Decimal(task_id)
         bid_id_decimal = Decimal(bid_id)
@@ -676,5 +651,3 @@ def accept_bid(task_id, bid_id):
 
     except Exception as e:
         return error_response(f"接受竞标失败: {str(e)}", 500)
-    finally:
-        db.close()
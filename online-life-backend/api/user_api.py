@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
 from utils.auth_utils import AuthUtils
-from utils.db_utils import get_db_session
+from utils.db_utils import get_request_session
 from utils.response_utils import success_response, error_response
 from utils.user_utils import UserUtils
+from utils.pagination_utils import InvalidCursorError
 from models import User, Admin, Client, Staff, Points, Reputation, Orders
 from decimal import Decimal
 import traceback
@@ -23,7 +24,7 @@ def get_profile():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         user_info = UserUtils.get_user_info(db, user_id)
@@ -34,8 +35,6 @@ def get_profile():
 
     except Exception as e:
         return error_response(f"获取用户资料失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @user_bp.route("/profile", methods=["PUT"])
@@ -49,7 +48,7 @@ def update_profile():
             return error_response("认证失败", 401)
 
         data = request.get_json()
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         # 更新用户信息
@@ -61,8 +60,6 @@ def update_profile():
 
     except Exception as e:
         return error_response(f"更新用户资料失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @user_bp.route("/change-password", methods=["POST"])
@@ -82,7 +79,7 @@ def change_password():
             if field not in data:
                 return error_response(f"缺少必填字段: {field}", 400)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         # 验证旧密码
@@ -100,8 +97,6 @@ def change_password():
 
     except Exception as e:
         return error_response(f"修改密码失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @user_bp.route("/reputation", methods=["GET"])
@@ -114,7 +109,7 @@ def get_reputation():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         reputation_data = UserUtils.get_user_reputation(db, user_id)
@@ -123,8 +118,6 @@ def get_reputation():
 
     except Exception as e:
         return error_response(f"获取信誉信息失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 # @user_bp.route("/reputation", methods=["POST"])
@@ -144,7 +137,7 @@ def get_reputation():
 #             if field not in data:
 #                 return error_response(f"缺少必填字段: {field}", 400)
 
-#         db = get_db_session()
+#         db = get_request_session()
 #         reviewer_id = Decimal(payload["user_id"])
 #         target_user_id = Decimal(data["target_user_id"])
 
@@ -167,10 +160,26 @@ def get_reputation():
 #         db.close()
 
 
+@user_bp.route("/reputation/ranking", methods=["GET"])
+def get_reputation_ranking():
+    """获取信誉排行榜"""
+    try:
+        db = get_request_session()
+
+        # 获取查询参数
+        limit = int(request.args.get("limit", 50))
+
+        ranking = UserUtils.get_reputation_ranking(db, limit)
+
+        return success_response(ranking, "获取信誉排行榜成功")
+
+    except Exception as e:
+        return error_response(f"获取信誉排行榜失败: {str(e)}", 500)
+
+
 @user_bp.route("/order-reputation/<order_id>", methods=["POST"])
 def add_order_reputation(order_id):
     """添加订单相关的信誉评价"""
-    db = None  # 保证 finally 里 db 总是有定义
     try:
         # 验证token
         token = request.headers.get("Authorization", "").replace("Bearer ", "")
@@ -187,7 +196,7 @@ def add_order_reputation(order_id):
                 logger.warning(f"缺少必填字段: {field}")
                 return error_response(f"缺少必填字段: {field}", 400)
 
-        db = get_db_session()
+        db = get_request_session()
         reviewer_id = Decimal(payload["user_id"])
         target_user_id = Decimal(data["target_user_id"])
         order_id_decimal = Decimal(order_id)
@@ -239,11 +248,7 @@ def add_order_reputation(order_id):
 
     except Exception as e:
         logger.error(f"写入评价记录异常: {str(e)}")
-        db.rollback()
         return error_response(f"添加订单评价失败: {str(e)}", 500)
-    finally:
-        if db:
-            db.close()
 
 
 @user_bp.route("/order-reputation/<order_id>", methods=["GET"])
@@ -256,7 +261,7 @@ def get_order_reputation(order_id):
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         order_id_decimal = Decimal(order_id)
 
         # 获取订单评价
@@ -266,8 +271,6 @@ def get_order_reputation(order_id):
 
     except Exception as e:
         return error_response(f"获取订单评价失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @user_bp.route("/points", methods=["GET"])
@@ -280,7 +283,7 @@ def get_points():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
 
         points_data = UserUtils.get_user_points(db, user_id)
@@ -289,8 +292,6 @@ def get_points():
 
     except Exception as e:
         return error_response(f"获取积分信息失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @user_bp.route("/statistics", methods=["GET"])
@@ -303,7 +304,7 @@ def get_user_statistics():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         user_id = Decimal(payload["user_id"])
         print(payload)
 
@@ -316,8 +317,6 @@ def get_user_statistics():
 
     except Exception as e:
         return error_response(f"获取用户统计信息失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @user_bp.route("/admin/user-statistics/<user_id>", methods=["GET"])
@@ -330,7 +329,7 @@ def admin_get_user_statistics(user_id):
         if not payload or payload["role"] != "admin":
             return error_response("权限不足", 403)
 
-        db = get_db_session()
+        db = get_request_session()
         target_user_id = Decimal(user_id)
 
         # 获取用户统计信息
@@ -342,8 +341,6 @@ def admin_get_user_statistics(user_id):
 
     except Exception as e:
         return error_response(f"获取用户统计信息失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @user_bp.route("/admin/list", methods=["GET"])
@@ -356,21 +353,23 @@ def get_user_list():
         if not payload or payload["role"] != "admin":
             return error_response("权限不足", 403)
 
-        db = get_db_session()
+        db = get_request_session()
 
         # 获取查询参数
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 10))
         role = request.args.get("role", "")
+        cursor = request.args.get("cursor")
+        count = request.args.get("count")
 
-        users_data = UserUtils.get_users_list(db, page, per_page, role)
+        users_data = UserUtils.get_users_list(db, page, per_page, role, cursor, count)
 
         return success_response(users_data, "获取用户列表成功")
 
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(f"获取用户列表失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @user_bp.route("/admin/update-user", methods=["PUT"])
@@ -387,7 +386,7 @@ def admin_update_user():
         if not data or "user_id" not in data:
             return error_response("缺少必填字段: user_id", 400)
 
-        db = get_db_session()
+        db = get_request_session()
         admin_id = Decimal(payload["user_id"])
         user_id = Decimal(data["user_id"])
 
@@ -405,8 +404,6 @@ def admin_update_user():
 
     except Exception as e:
         return error_response(f"管理员更新用户信息失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @user_bp.route("/admin/reset-password", methods=["POST"])
@@ -426,7 +423,7 @@ def admin_reset_password():
             if field not in data:
                 return error_response(f"缺少必填字段: {field}", 400)
 
-        db = get_db_session()
+        db = get_request_session()
         admin_id = Decimal(payload["user_id"])
         user_id = Decimal(data["user_id"])
 
@@ -444,8 +441,6 @@ def admin_reset_password():
 
     except Exception as e:
         return error_response(f"管理员重置用户密码失败: {str(e)}", 500)
-    finally:
-        db.close()
 
 
 @user_bp.route("/list", methods=["GET"])
@@ -458,7 +453,7 @@ def list_users():
         if not payload:
             return error_response("认证失败", 401)
 
-        db = get_db_session()
+        db = get_request_session()
         username = request.args.get("username", "")
 
         query = db.query(User)
@@ -477,5 +472,3 @@ def list_users():
         return success_response(result, "获取用户列表成功")
     except Exception as e:
         return error_response(f"获取用户列表失败: {str(e)}", 500)
-    finally:
-        db.close()
@@ -1,8 +1,7 @@
+import csv
+import click
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
 from models import Base
 import logging
 logging.basicConfig(level=logging.DEBUG)
@@ -13,6 +12,26 @@ from api.user_api import user_bp
 from api.order_api import order_bp
 from api.task_api import task_bp
 from api.points_api import points_bp
+import config
+from utils.db_utils import (
+    PoolLeakDetector,
+    SessionLocal,
+    db_session_manager,
+    get_db_session,
+    get_engine,
+    get_pool_metrics,
+)
+from utils.id_utils import IdUtils
+from utils.user_utils import UserUtils
+from utils.points_utils import PointsUtils, POINTS_LOG_FILE
+from utils.map_utils import MapUtils
+from utils.order_utils import OrderUtils
+from utils.task_utils import TaskUtils
+from utils.migration_utils import MigrationUtils
+from utils.typed_column_utils import TypedColumnUtils
+from utils.dispatch_utils import DispatchEngine, DispatchUtils
+from utils.deadline_utils import DeadlineScheduler, DeadlineUtils
+from utils.job_utils import JobUtils, JobWorkerPool
 
 def create_app():
     app = Flask(__name__)
@@ -21,18 +40,32 @@ def create_app():
     # 启用CORS
     CORS(app)
 
-    # 数据库配置
-    DATABASE_URL = (
-        f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    )
-    engine = create_engine(DATABASE_URL, echo=True)
+    # 将数据库会话添加到应用配置（与蓝图共用引擎注册表中的连接池）
+    app.config["DB_SESSION"] = SessionLocal
+    app.config["DB_ENGINE"] = get_engine()
 
-    # 创建数据库会话
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # 请求级数据库会话：蓝图通过 get_request_session 获取，请求结束时自动提交/回滚并关闭
+    db_session_manager.init_app(app)
 
-    # 将数据库会话添加到应用配置
-    app.config["DB_SESSION"] = SessionLocal
-    app.config["DB_ENGINE"] = engine
+    # 生产环境启动时校验ID生成器的机器ID，未配置 ID_WORKER_ID 时拒绝启动
+    if config.APP_ENV == "production":
+        IdUtils.get_generator()
+
+    # 连接泄漏检测
+    if config.DB_LEAK_THRESHOLD > 0:
+        app.extensions["db_leak_detector"] = PoolLeakDetector().start()
+
+    # 周期批量派单（多 worker 部署时只在一个进程开启）
+    if config.DISPATCH_ENABLED:
+        app.extensions["dispatch_engine"] = DispatchEngine(get_db_session).start()
+
+    # 竞标截止调度（到期分配、延长或升级，竞标数达标时的分配也交给后台）
+    if config.DEADLINE_SCHEDULER_ENABLED:
+        app.extensions["deadline_scheduler"] = DeadlineScheduler(get_db_session).start()
+
+    # 异步任务队列 worker（支付奖励积分等提交后执行的后续操作）
+    if config.JOB_WORKERS_ENABLED:
+        app.extensions["job_workers"] = JobWorkerPool(get_db_session).start()
 
     # 注册蓝图
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -49,6 +82,212 @@ def create_app():
     def health_check():
         return {"status": "healthy", "message": "服务运行正常"}
 
+    @app.route("/health/db-pool")
+    def db_pool_metrics():
+        return {"status": "healthy", "pools": get_pool_metrics()}
+
+    @app.route("/health/dispatch")
+    def dispatch_metrics():
+        return {"status": "healthy", "enabled": config.DISPATCH_ENABLED, "dispatch": DispatchUtils.get_metrics()}
+
+    @app.route("/health/deadlines")
+    def deadline_metrics():
+        return {
+            "status": "healthy",
+            "enabled": config.DEADLINE_SCHEDULER_ENABLED,
+            "deadlines": DeadlineUtils.get_metrics(),
+        }
+
+    @app.route("/health/jobs")
+    def job_metrics():
+        db = get_db_session()
+        try:
+            return {"status": "healthy", "enabled": config.JOB_WORKERS_ENABLED, "jobs": JobUtils.get_metrics(db)}
+        finally:
+            db.close()
+
+    @app.cli.command("dispatch-orders")
+    @click.option("--method", type=click.Choice(["auto", "hungarian", "greedy"]), default="auto", help="分配算法")
+    def dispatch_orders(method):
+        """执行一轮批量派单"""
+        db = get_db_session()
+        try:
+            metrics = DispatchUtils.run_cycle(db, method=method)
+            print(
+                f"派单完成: 订单 {metrics['orders']} 个，骑手 {metrics['staff']} 个，分配 {metrics['assigned']} 个，"
+                f"分配率 {metrics['assignment_rate']:.1%}，平均取货时间 {metrics['mean_pickup_eta']} 秒（{metrics['solver']}）"
+            )
+        finally:
+            db.close()
+
+    @app.cli.command("process-bid-deadlines")
+    @click.option("--sync", is_flag=True, help="先为已开放竞标但没有调度记录的任务补登记截止时间")
+    def process_bid_deadlines(sync):
+        """处理所有已到期的竞标截止记录"""
+        db = get_db_session()
+        try:
+            if sync:
+                print(f"补登记竞标截止时间: {DeadlineUtils.sync_from_tasks(db)} 个任务")
+            while True:
+                metrics = DeadlineUtils.process_due(db)
+                print(
+                    f"竞标截止处理: 认领 {metrics['claimed']} 个，分配 {metrics['assigned']} 个，"
+                    f"延长 {metrics['extended']} 个，升级 {metrics['escalated']} 个，失败 {metrics['errors']} 个"
+                )
+                if metrics["claimed"] < config.DEADLINE_BATCH_SIZE:
+                    break
+        finally:
+            db.close()
+
+    @app.cli.command("run-jobs")
+    def run_jobs():
+        """执行任务队列中所有已到执行时间的任务"""
+        db = get_db_session()
+        try:
+            while True:
+                results = JobUtils.run_pending(db)
+                print(
+                    f"任务队列: 认领 {results['claimed']} 个，完成 {results['done']} 个，"
+                    f"待重试 {results['retry']} 个，失败 {results['failed']} 个"
+                )
+                if results["claimed"] < config.JOB_CLAIM_BATCH:
+                    break
+            print(JobUtils.get_queue_depth(db))
+        finally:
+            db.close()
+
+    @app.cli.command("rebuild-reputation-summary")
+    def rebuild_reputation_summary():
+        """根据 Reputation 表重建信誉汇总"""
+        db = get_db_session()
+        try:
+            count = UserUtils.rebuild_reputation_summary(db)
+            print(f"信誉汇总重建完成，共 {count} 个用户")
+        finally:
+            db.close()
+
+    @app.cli.command("import-points-log")
+    @click.argument("log_files", nargs=-1)
+    def import_points_log(log_files):
+        """从 points.log 日志文件回填积分流水表"""
+        db = get_db_session()
+        try:
+            for log_file in log_files or (POINTS_LOG_FILE,):
+                count = PointsUtils.import_points_log(db, log_file)
+                print(f"{log_file}: 导入积分流水 {count} 条")
+        finally:
+            db.close()
+
+    @app.cli.command("credit-points")
+    @click.argument("csv_file", type=click.File("r", encoding="utf-8"))
+    @click.option("--reason", default="批量发放积分", help="CSV 未提供 reason 列时使用的原因")
+    @click.option("--chunk-size", type=int, default=None, help="每批处理条数，默认 POINTS_BULK_CHUNK_SIZE")
+    @click.option("--atomicity", type=click.Choice(["all", "chunk"]), default="all",
+                  help="all: 全部成功才提交；chunk: 每批单独提交")
+    def credit_points(csv_file, reason, chunk_size, atomicity):
+        """按 CSV（user_id,points[,reason]）批量发放积分"""
+        rows = [
+            {"user_id": row["user_id"], "points": row["points"], "reason": row.get("reason") or reason}
+            for row in csv.DictReader(csv_file)
+        ]
+
+        def report(progress):
+            print(
+                f"第 {progress['chunks_done']}/{progress['chunks_total']} 批，"
+                f"已处理 {progress['processed']}/{progress['total']} 条，"
+                f"成功 {progress['success_count']} 条，失败 {progress['fail_count']} 条，"
+                f"耗时 {progress['elapsed']:.1f}s"
+            )
+
+        db = get_db_session()
+        try:
+            result = PointsUtils.batch_add_points(
+                db, rows, chunk_size=chunk_size, atomicity=atomicity, progress=report
+            )
+            print(f"批量发放完成: 成功 {result['success_count']} 条，失败 {result['fail_count']} 条")
+            for detail in result["fail_details"][:20]:
+                print(f"  失败: {detail}")
+        finally:
+            db.close()
+
+    @app.cli.command("check-participant-counters")
+    @click.option("--repair", is_flag=True, help="按实际参与记录修复不一致的计数")
+    def check_participant_counters(repair):
+        """校验 Task.ActiveParticipants 与 TaskParticipant 实际人数是否一致"""
+        db = get_db_session()
+        try:
+            mismatches = TaskUtils.check_participant_counters(db)
+            for item in mismatches:
+                print(f"Task {item['task_id']}: 计数 {item['stored']}，实际 {item['actual']}")
+            print(f"参与人数计数不一致的任务: {len(mismatches)} 个")
+            if repair and mismatches:
+                print(f"已修复 {TaskUtils.repair_participant_counters(db)} 个任务")
+        finally:
+            db.close()
+
+    @app.cli.command("warm-geocode-cache")
+    def warm_geocode_cache():
+        """预热地理编码缓存（用户地址和商家地址）"""
+        db = get_db_session()
+        try:
+            result = MapUtils.warm_geocode_cache(db)
+            print(f"地理编码缓存预热完成: 共 {result['total']} 个地址，成功 {result['resolved']} 个，失败 {result['failed']} 个")
+            print(MapUtils.get_geocode_cache_stats())
+        finally:
+            db.close()
+
+    @app.cli.command("backfill-order-locations")
+    @click.option("--all", "all_orders", is_flag=True, help="包括已接单和已完成的订单")
+    def backfill_order_locations(all_orders):
+        """为缺少坐标的历史订单回填取货点/收货点坐标"""
+        db = get_db_session()
+        try:
+            result = OrderUtils.backfill_order_locations(db, only_open=not all_orders)
+            print(f"订单坐标回填完成: 共 {result['total']} 个，成功 {result['updated']} 个，失败 {result['failed']} 个")
+        finally:
+            db.close()
+
+    @app.cli.command("db-migrate")
+    @click.option("--target", type=int, default=None, help="只执行到该版本（含）")
+    @click.option("--dry-run", is_flag=True, help="只列出待执行的迁移")
+    def db_migrate(target, dry_run):
+        """按版本顺序执行 migrations/versions 下未执行的迁移"""
+        versions = MigrationUtils.migrate(get_engine(), target=target, dry_run=dry_run)
+        action = "待执行" if dry_run else "已执行"
+        print(f"{action}迁移: {', '.join(f'V{v:03d}' for v in versions) or '无'}")
+
+    @app.cli.command("db-migrate-status")
+    def db_migrate_status():
+        """查看迁移执行状态"""
+        for item in MigrationUtils.get_status(get_engine()):
+            state = "已执行" if item["applied"] else "未执行"
+            if item["modified"]:
+                state += "（执行后文件已被修改）"
+            print(f"V{item['version']:03d} {item['description']}: {state}")
+
+    @app.cli.command("db-mark-applied")
+    @click.argument("versions", nargs=-1, type=int, required=True)
+    def db_mark_applied(versions):
+        """将已手动执行过的迁移标记为已执行"""
+        marked = MigrationUtils.mark_applied(get_engine(), list(versions))
+        print(f"已标记迁移: {', '.join(f'V{v:03d}' for v in marked) or '无'}")
+
+    @app.cli.command("backfill-typed-columns")
+    @click.option("--batch-size", type=int, default=None, help="每批回填行数")
+    @click.option("--pause", type=float, default=0.0, help="每批之间暂停秒数")
+    def backfill_typed_columns(batch_size, pause):
+        """分批回填积分、分数、金额和时间的类型列"""
+        result = TypedColumnUtils.backfill(get_engine(), batch_size=batch_size, pause=pause)
+        for table, count in result.items():
+            print(f"{table}: 回填 {count} 个字段值")
+
+    @app.cli.command("typed-columns-status")
+    def typed_columns_status():
+        """查看类型列待回填记录数，全部为 0 后可设置 TYPED_COLUMNS_READ=typed"""
+        print(f"当前读取阶段: {TypedColumnUtils.read_mode()}")
+        for table, count in TypedColumnUtils.get_backfill_status(get_engine()).items():
+            print(f"{table}: 待回填 {count} 条")
+
     return app
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+"""
+高德地图接口本地替身服务
+提供 /v3/geocode/geo 和 /v4/direction/bicycling，坐标由地址哈希确定性生成，
+可配置延迟和错误率，用于压测和离线测试
+
+用法：
+    python -m benchmark.amap_stub --port 8900 --latency-ms 30 --jitter-ms 10 --error-rate 0.01
+    AMAP_BASE_URL=http://127.0.0.1:8900 python app.py
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# 合成坐标范围（成都市区）
+MIN_LON, MAX_LON = 103.95, 104.20
+MIN_LAT, MAX_LAT = 30.55, 30.75
+# 以此开头的地址返回无结果，便于测试负缓存
+UNKNOWN_PREFIX = "unknown"
+
+EARTH_RADIUS_M = 6371000
+DETOUR_FACTOR = 1.3
+CYCLING_SPEED_MPS = 4.0
+
+
+def synthetic_location(address: str):
+    """根据地址生成确定性的经纬度"""
+    digest = hashlib.sha1(address.encode("utf-8")).digest()
+    lon_ratio = int.from_bytes(digest[:4], "big") / 0xFFFFFFFF
+    lat_ratio = int.from_bytes(digest[4:8], "big") / 0xFFFFFFFF
+    return (
+        round(MIN_LON + (MAX_LON - MIN_LON) * lon_ratio, 6),
+        round(MIN_LAT + (MAX_LAT - MIN_LAT) * lat_ratio, 6),
+    )
+
+
+def synthetic_route(origin: str, destination: str):
+    """按直线距离生成骑行距离（米）和时间（秒）"""
+    lon1, lat1 = map(math.radians, map(float, origin.split(",")))
+    lon2, lat2 = map(math.radians, map(float, destination.split(",")))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    distance = int(2 * EARTH_RADIUS_M * math.asin(math.sqrt(a)) * DETOUR_FACTOR)
+    return distance, int(distance / CYCLING_SPEED_MPS)
+
+
+class AmapStubHandler(BaseHTTPRequestHandler):
+    server_version = "AmapStub/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        server.count_request()
+        parsed = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json({"status": "0", "info": "SERVICE_NOT_AVAILABLE"}, status=503)
+            return
+
+        if parsed.path == "/v3/geocode/geo":
+            address = params.get("address", "")
+            if not address or address.lower().startswith(UNKNOWN_PREFIX):
+                self._send_json({"status": "1", "info": "OK", "count": "0", "geocodes": []})
+                return
+            lon, lat = synthetic_location(address)
+            self._send_json(
+                {
+                    "status": "1",
+                    "info": "OK",
+                    "count": "1",
+                    "geocodes": [{"formatted_address": address, "location": f"{lon},{lat}"}],
+                }
+            )
+        elif parsed.path == "/v4/direction/bicycling":
+            try:
+                distance, duration = synthetic_route(params["origin"], params["destination"])
+            except (KeyError, ValueError):
+                self._send_json({"errcode": 30001, "errmsg": "INVALID_PARAMS", "data": {}})
+                return
+            self._send_json(
+                {
+                    "errcode": 0,
+                    "errmsg": "OK",
+                    "data": {
+                        "origin": params["origin"],
+                        "destination": params["destination"],
+                        "paths": [{"distance": distance, "duration": duration, "steps": []}],
+                    },
+                }
+            )
+        else:
+            self._send_json({"status": "0", "info": "NOT_FOUND"}, status=404)
+
+
+class AmapStubServer(ThreadingHTTPServer):
+    """可在后台线程运行的替身服务，latency/jitter 单位为秒"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0):
+        super().__init__((host, port), AmapStubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    def count_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="amap-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="高德地图接口本地替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0, help="每个请求的固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="延迟的随机抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0, help="返回 503 的概率（0~1）")
+    args = parser.parse_args()
+
+    server = AmapStubServer(args.host, args.port, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate)
+    print(f"高德替身服务已启动: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
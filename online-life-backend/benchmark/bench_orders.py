@@ -0,0 +1,184 @@
+"""
+订单下单链路压测
+启动本地高德替身服务和 SQLite 数据库，在进程内并发调用 /api/order/create 或 /api/order/estimate-time，
+输出吞吐量与 p50/p95/p99 延迟
+
+默认的临时 SQLite 库会把 DECIMAL(20,0) 主键按浮点存储，64 位订单号可能因精度丢失偶发主键冲突，
+正式压测请通过 --db-url 指向 MySQL
+
+--endpoint insert 不经过接口和地图服务，直接比较下单写库的吞吐量（订单/秒）：
+--pipeline legacy 为原来的两次提交（写入订单、按 ID 重新查询、计算配送费后再次提交），
+--pipeline single 为计价后一次写入
+
+用法（在 online-life-backend 目录下）：
+    python -m benchmark.bench_orders --requests 500 --concurrency 16 --latency-ms 30
+    python -m benchmark.bench_orders --endpoint estimate --addresses 20
+    python -m benchmark.bench_orders --endpoint insert --pipeline legacy --requests 2000
+    python -m benchmark.bench_orders --endpoint insert --pipeline single --requests 2000
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmark.amap_stub import AmapStubServer
+
+
+def percentile(sorted_values, pct):
+    """最近秩法百分位数"""
+    if not sorted_values:
+        return 0.0
+    index = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="订单下单链路压测")
+    parser.add_argument("--endpoint", choices=["create", "estimate", "insert"], default="create")
+    parser.add_argument("--pipeline", choices=["single", "legacy"], default="single", help="insert 模式的写库方式")
+    parser.add_argument("--requests", type=int, default=200, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发数")
+    parser.add_argument("--addresses", type=int, default=50, help="不同收货地址数量（越少缓存命中越高）")
+    parser.add_argument("--latency-ms", type=float, default=20, help="替身服务固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=5, help="替身服务延迟抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0, help="替身服务 503 概率")
+    parser.add_argument("--amap-url", default="", help="使用已启动的替身服务而不是进程内启动")
+    parser.add_argument("--db-url", default="", help="数据库URL，默认使用临时 SQLite 文件")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    stub = None
+    if args.amap_url:
+        os.environ["AMAP_BASE_URL"] = args.amap_url
+    else:
+        stub = AmapStubServer(
+            latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, error_rate=args.error_rate
+        ).start()
+        os.environ["AMAP_BASE_URL"] = stub.base_url
+    workdir = tempfile.mkdtemp(prefix="bench-orders-")
+    os.environ["DATABASE_URL"] = args.db_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("DB_LEAK_THRESHOLD", "0")
+
+    # 必须在设置环境变量之后导入应用
+    from app import create_app
+    from models import Base, Orders, User
+    from utils.auth_utils import AuthUtils
+    from utils.db_utils import get_db_session, get_engine
+    from utils.map_utils import MapUtils
+    from utils.order_utils import OrderUtils
+    from utils.pricing_utils import PricingUtils
+
+    logging.getLogger().setLevel(logging.WARNING)
+    Base.metadata.create_all(get_engine())
+
+    db = get_db_session()
+    user_id = Decimal(1)
+    if not db.get(User, user_id):
+        db.add(
+            User(
+                UserID=user_id,
+                Username="bench",
+                Password="",
+                Email="bench@example.com",
+                Phone="",
+                Address="四川大学江安校区",
+                Role="client",
+            )
+        )
+        db.commit()
+    db.close()
+
+    app = create_app()
+    headers = {"Authorization": f"Bearer {AuthUtils.generate_token(user_id, 'client')}"}
+    if args.endpoint == "create":
+        path = "/api/order/create"
+    elif args.endpoint == "estimate":
+        path = "/api/order/estimate-time"
+    else:
+        path = f"OrderUtils.create_order（{args.pipeline}）"
+
+    shop_coords = {"longitude": 103.9946, "latitude": 30.5573}
+    order_coords = {"longitude": 104.0012, "latitude": 30.5621}
+
+    def insert(i):
+        order_data = {
+            "order_type": "immediate",
+            "orderlocation": f"成都市双流区测试小区{i % args.addresses}号楼",
+            "shop_address": "四川大学江安校区东门",
+        }
+        db = get_db_session()
+        start = time.perf_counter()
+        try:
+            if args.pipeline == "legacy":
+                order_id = OrderUtils.create_order(
+                    db, user_id, order_data, estimated_time=2700,
+                    shop_coords=shop_coords, order_coords=order_coords, amount=Decimal("0.00"),
+                )
+                order = db.query(Orders).filter(Orders.OrderID == order_id).first()
+                order.Amount = str(round(int(order.EstimatedTime) // 60 * 0.15, 2))
+                db.commit()
+            else:
+                quote = PricingUtils.quote("immediate", 2700)
+                OrderUtils.create_order(
+                    db, user_id, order_data, estimated_time=2700,
+                    shop_coords=shop_coords, order_coords=order_coords, amount=quote["delivery_fee"],
+                )
+            status = 200
+        except Exception:
+            status = 500
+        finally:
+            db.close()
+        return time.perf_counter() - start, status
+
+    def send(i):
+        body = {
+            "order_type": "immediate",
+            "description": f"bench order {i}",
+            "orderlocation": f"成都市双流区测试小区{i % args.addresses}号楼",
+            "shop_address": "四川大学江安校区东门",
+        }
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post(path, json=body, headers=headers)
+        return time.perf_counter() - start, response.status_code
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(insert if args.endpoint == "insert" else send, range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    errors = sum(1 for _, status in results if status >= 400)
+
+    print(f"接口: POST {path}" if args.endpoint != "insert" else f"写库: {path}")
+    print(f"请求数: {len(results)}  并发: {args.concurrency}  失败: {errors}")
+    unit = "orders/s" if args.endpoint == "insert" else "req/s"
+    print(f"吞吐量: {len(results) / elapsed:.1f} {unit}  总耗时: {elapsed:.2f} s")
+    print(
+        "延迟(ms): "
+        f"p50={percentile(latencies, 50):.1f}  p95={percentile(latencies, 95):.1f}  "
+        f"p99={percentile(latencies, 99):.1f}  max={latencies[-1]:.1f}"
+    )
+    if stub is not None:
+        print(f"高德替身请求数: {stub.request_count}")
+        stub.stop()
+    print(f"地理编码缓存: {MapUtils.get_geocode_cache_stats()}")
+    print(f"路线缓存: {MapUtils.get_route_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,139 @@ import os
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
-# 数据库配置
-DB_HOST = "39.104.19.8"
-DB_PORT = 3306
-DB_USER = "Database"
-DB_PASSWORD = "Online-life2025"
-DB_NAME = "Online"
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# 运行环境：production 时启动即校验部署参数（如每个进程唯一的 ID_WORKER_ID），缺失时拒绝启动
+APP_ENV = os.environ.get("APP_ENV", "development")
+
+# 数据库配置（可通过环境变量覆盖）
+DB_HOST = os.environ.get("DB_HOST", "39.104.19.8")
+DB_PORT = int(os.environ.get("DB_PORT", "3306"))
+DB_USER = os.environ.get("DB_USER", "Database")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "Online-life2025")
+DB_NAME = os.environ.get("DB_NAME", "Online")
+
+# 完整连接URL，设置后优先于上面的分项配置
+DATABASE_URL = os.environ.get("DATABASE_URL", "")
+
+# 连接池配置（按每个 worker 进程计算）
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))  # 等待连接超时（秒）
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "3600"))  # 连接回收时间（秒）
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", "30"))  # 建立连接超时（秒）
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", "0"))  # 单条查询超时，0为不限制
+DB_ECHO = _env_bool("DB_ECHO", False)
+
+# 连接泄漏检测：连接检出超过阈值（秒）未归还时记录日志，0为关闭
+DB_LEAK_THRESHOLD = float(os.environ.get("DB_LEAK_THRESHOLD", "30"))
+DB_LEAK_CHECK_INTERVAL = float(os.environ.get("DB_LEAK_CHECK_INTERVAL", "10"))
+
+# 地理编码缓存：进程内 LRU 容量及过期时间（秒），持久缓存过期时间（秒）
+GEOCODE_CACHE_SIZE = int(os.environ.get("GEOCODE_CACHE_SIZE", "10000"))
+GEOCODE_CACHE_TTL = int(os.environ.get("GEOCODE_CACHE_TTL", str(24 * 3600)))
+GEOCODE_STORE_TTL = int(os.environ.get("GEOCODE_STORE_TTL", str(30 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL = int(os.environ.get("GEOCODE_NEGATIVE_TTL", "600"))  # 无结果地址的缓存时间
+GEOCODE_PERSIST = _env_bool("GEOCODE_PERSIST", True)
+
+# 路线缓存：起终点对齐到约 ROUTE_CACHE_GRID_METERS 米的网格后缓存骑行距离和时间
+ROUTE_CACHE_GRID_METERS = float(os.environ.get("ROUTE_CACHE_GRID_METERS", "100"))
+ROUTE_CACHE_SIZE = int(os.environ.get("ROUTE_CACHE_SIZE", "50000"))
+ROUTE_CACHE_TTL = int(os.environ.get("ROUTE_CACHE_TTL", str(6 * 3600)))
+ROUTE_UPSTREAM_TIMEOUT = float(os.environ.get("ROUTE_UPSTREAM_TIMEOUT", "3"))  # 路径规划接口超时（秒）
+# 直线距离估算参数：绕行系数和骑行速度（米/秒）
+ROUTE_DETOUR_FACTOR = float(os.environ.get("ROUTE_DETOUR_FACTOR", "1.3"))
+CYCLING_SPEED_MPS = float(os.environ.get("CYCLING_SPEED_MPS", "4.0"))
+
+# 高德接口客户端：连接池大小、超时（秒）、重试、熔断和并发度
+MAP_POOL_SIZE = int(os.environ.get("MAP_POOL_SIZE", "20"))
+MAP_CONNECT_TIMEOUT = float(os.environ.get("MAP_CONNECT_TIMEOUT", "2"))
+MAP_READ_TIMEOUT = float(os.environ.get("MAP_READ_TIMEOUT", "5"))
+MAP_RETRIES = int(os.environ.get("MAP_RETRIES", "2"))
+MAP_RETRY_BACKOFF = float(os.environ.get("MAP_RETRY_BACKOFF", "0.2"))
+MAP_BREAKER_THRESHOLD = int(os.environ.get("MAP_BREAKER_THRESHOLD", "5"))  # 连续失败次数
+MAP_BREAKER_RESET = float(os.environ.get("MAP_BREAKER_RESET", "30"))  # 熔断持续时间（秒）
+MAP_CONCURRENCY = int(os.environ.get("MAP_CONCURRENCY", "8"))
+
+# 订单统计缓存时间（秒），0为不缓存
+ORDER_STATS_CACHE_TTL = int(os.environ.get("ORDER_STATS_CACHE_TTL", "30"))
+
+# 配送费计价方式（time 按预计时间、distance 按距离，可用 PricingUtils.register 注册其他方式）及单价（元）
+ORDER_PRICING = os.environ.get("ORDER_PRICING", "time").strip()
+ORDER_FEE_PER_MINUTE = float(os.environ.get("ORDER_FEE_PER_MINUTE", "0.15"))
+ORDER_BASE_FEE = float(os.environ.get("ORDER_BASE_FEE", "3"))
+ORDER_FEE_PER_KM = float(os.environ.get("ORDER_FEE_PER_KM", "1"))
+
+# 附近可接订单：默认/最大查询半径（米）和默认/最大返回数量
+NEARBY_ORDERS_RADIUS = float(os.environ.get("NEARBY_ORDERS_RADIUS", "3000"))
+NEARBY_ORDERS_MAX_RADIUS = float(os.environ.get("NEARBY_ORDERS_MAX_RADIUS", "20000"))
+NEARBY_ORDERS_LIMIT = int(os.environ.get("NEARBY_ORDERS_LIMIT", "50"))
+NEARBY_ORDERS_MAX_LIMIT = int(os.environ.get("NEARBY_ORDERS_MAX_LIMIT", "100"))
+
+# 批量派单：是否在本进程启动周期派单线程（多 worker 部署时只在一个进程开启）、派单间隔（秒）、
+# 参与派单的订单分配方式（逗号分隔，direct 订单仍由骑手自行接单）、最长取货时间（秒）、
+# 骑手位置有效期（秒）、每个骑手同时进行的订单上限、每轮最多处理订单数、使用匈牙利算法的最大规模（超过时用贪心）
+DISPATCH_ENABLED = _env_bool("DISPATCH_ENABLED", False)
+DISPATCH_INTERVAL = float(os.environ.get("DISPATCH_INTERVAL", "15"))
+DISPATCH_ASSIGNMENT_TYPES = [
+    item.strip() for item in os.environ.get("DISPATCH_ASSIGNMENT_TYPES", "dispatch").split(",") if item.strip()
+]
+DISPATCH_MAX_PICKUP_SECONDS = float(os.environ.get("DISPATCH_MAX_PICKUP_SECONDS", "900"))
+DISPATCH_LOCATION_MAX_AGE = int(os.environ.get("DISPATCH_LOCATION_MAX_AGE", "300"))
+DISPATCH_STAFF_CAPACITY = int(os.environ.get("DISPATCH_STAFF_CAPACITY", "1"))
+DISPATCH_MAX_ORDERS = int(os.environ.get("DISPATCH_MAX_ORDERS", "500"))
+DISPATCH_HUNGARIAN_MAX = int(os.environ.get("DISPATCH_HUNGARIAN_MAX", "200"))
+
+# 骑手多订单送达时间估算：取货、送达的停留时间（秒），参与规划的最多订单数，局部优化最多轮数
+ETA_PICKUP_SERVICE_SECONDS = int(os.environ.get("ETA_PICKUP_SERVICE_SECONDS", "300"))
+ETA_DROPOFF_SERVICE_SECONDS = int(os.environ.get("ETA_DROPOFF_SERVICE_SECONDS", "60"))
+ETA_MAX_ORDERS = int(os.environ.get("ETA_MAX_ORDERS", "20"))
+ETA_MAX_PASSES = int(os.environ.get("ETA_MAX_PASSES", "20"))
+
+# 团办任务竞标：满员后的竞标窗口（秒）、竞标数达到多少时分配给其中信誉最高者、
+# 截止时无人竞标时每次延长的时间（秒）和最多延长次数（用完后任务状态改为 escalated）
+BID_WINDOW_SECONDS = int(os.environ.get("BID_WINDOW_SECONDS", str(7 * 24 * 3600)))
+BID_AUTO_ASSIGN_BIDS = int(os.environ.get("BID_AUTO_ASSIGN_BIDS", "5"))
+BID_WINDOW_EXTENSION_SECONDS = int(os.environ.get("BID_WINDOW_EXTENSION_SECONDS", str(24 * 3600)))
+BID_WINDOW_MAX_EXTENSIONS = int(os.environ.get("BID_WINDOW_MAX_EXTENSIONS", "2"))
+
+# 竞标截止调度：是否在本进程启动调度线程（开启后竞标数达标时也交给后台分配，多个进程同时开启时按记录认领不会重复处理）、
+# 最长轮询间隔（秒）、每批处理记录数、认领租期（秒，处理中途退出的记录在租期后重新到期）
+DEADLINE_SCHEDULER_ENABLED = _env_bool("DEADLINE_SCHEDULER_ENABLED", False)
+DEADLINE_POLL_INTERVAL = float(os.environ.get("DEADLINE_POLL_INTERVAL", "30"))
+DEADLINE_BATCH_SIZE = int(os.environ.get("DEADLINE_BATCH_SIZE", "100"))
+DEADLINE_CLAIM_LEASE = int(os.environ.get("DEADLINE_CLAIM_LEASE", "300"))
+
+# 异步任务队列：是否在本进程启动 worker 线程（未开启时入队即在当前事务内同步执行；多个进程同时开启时按任务认领不会重复执行）、
+# worker 线程数、空闲轮询间隔（秒）、每次认领任务数、认领租期（秒）、最多执行次数、重试退避基数（秒，每次翻倍）
+JOB_WORKERS_ENABLED = _env_bool("JOB_WORKERS_ENABLED", False)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "2"))
+JOB_CLAIM_BATCH = int(os.environ.get("JOB_CLAIM_BATCH", "10"))
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF = float(os.environ.get("JOB_RETRY_BACKOFF", "5"))
+
+# 批量增加积分每批条数（每批一条 upsert + 一次批量写流水）
+POINTS_BULK_CHUNK_SIZE = int(os.environ.get("POINTS_BULK_CHUNK_SIZE", "1000"))
+
+# 列表接口 count=approximate 时最多统计的行数，超过后返回该上限并标记为估计值
+PAGINATION_COUNT_LIMIT = int(os.environ.get("PAGINATION_COUNT_LIMIT", "1000"))
+
+# 字符串列迁移到类型列（积分、分数、金额、时间）的读取阶段：
+# legacy 只读旧字符串列；dual 优先读类型列，为空时回退旧列；typed 只读类型列（回填完成后切换）
+TYPED_COLUMNS_READ = os.environ.get("TYPED_COLUMNS_READ", "dual").strip().lower()
+TYPED_COLUMNS_BACKFILL_BATCH = int(os.environ.get("TYPED_COLUMNS_BACKFILL_BATCH", "1000"))
+
+# 高德地图接口地址，压测时可指向 benchmark/amap_stub.py 启动的本地替身服务
+AMAP_BASE_URL = os.environ.get("AMAP_BASE_URL", "https://restapi.amap.com").rstrip("/")
 
 # 高德地图密钥
 # AMAP_KEY = "18c8c006e62cf64279e21d244639c2f2"
@@ -0,0 +1,168 @@
+"""
+高频查询索引检查
+对 order_utils / task_utils / user_utils 中的高频查询执行 EXPLAIN，发现全表扫描时以非零状态退出
+
+用法（在 online-life-backend 目录下，先执行 flask db-migrate）：
+    python -m migrations.check_indexes
+    python -m migrations.check_indexes --db-url sqlite:///check.db --create-schema
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, func, or_, select
+from sqlalchemy.engine import Connection, Engine
+
+from models import (
+    BidRecord,
+    GroupTaskUser,
+    Orders,
+    Points,
+    PointsTransaction,
+    Reputation,
+    Task,
+    TaskParticipant,
+    User,
+)
+
+SAMPLE_ID = Decimal(1)
+
+
+def hot_queries() -> Dict[str, object]:
+    """与业务代码中过滤/排序条件一致的高频查询"""
+    return {
+        # order_utils
+        "客户订单列表": select(Orders)
+        .where(Orders.ClientID == SAMPLE_ID)
+        .order_by(Orders.CreationTime.desc()),
+        "客户订单按状态筛选": select(Orders)
+        .where(Orders.ClientID == SAMPLE_ID, Orders.OrderStatus == "pending")
+        .order_by(Orders.CreationTime.desc()),
+        "客户订单统计": select(Orders.OrderStatus, func.count())
+        .where(Orders.ClientID == SAMPLE_ID)
+        .group_by(Orders.OrderStatus),
+        "代办人员订单列表": select(Orders)
+        .where(Orders.StaffID == SAMPLE_ID)
+        .order_by(Orders.CreationTime.desc()),
+        "代办人员订单统计": select(Orders.OrderStatus, func.count())
+        .where(Orders.StaffID == SAMPLE_ID)
+        .group_by(Orders.OrderStatus),
+        "可接订单列表": select(Orders)
+        .where(
+            Orders.OrderStatus == "pending",
+            Orders.AssignmentStatus == "open",
+            Orders.StaffID.is_(None),
+        )
+        .order_by(Orders.CreationTime.desc()),
+        "附近可接订单": select(Orders)
+        .where(
+            Orders.OrderStatus == "pending",
+            Orders.AssignmentStatus == "open",
+            Orders.StaffID.is_(None),
+            or_(Orders.ShopGeoHash.like("wm6jb%"), Orders.ShopGeoHash.like("wm6n0%")),
+        )
+        .limit(50),
+        # task_utils
+        "可接任务列表": select(Task).where(Task.Status == "full"),
+        "团内招募中任务": select(Task).where(Task.GroupTaskID == SAMPLE_ID, Task.Status == "recruiting"),
+        "任务待处理竞标": select(BidRecord)
+        .where(BidRecord.TaskID == SAMPLE_ID, BidRecord.BidStatus == "pending")
+        .order_by(BidRecord.BidTime),
+        "用户竞标记录": select(BidRecord)
+        .where(BidRecord.UserID == SAMPLE_ID)
+        .order_by(BidRecord.BidTime.desc()),
+        "竞标已截止任务": select(Task.TaskID)
+        .where(Task.Status == "full", Task.BidDeadlineAt < datetime(2025, 1, 1)),
+        "团办任务参与人": select(GroupTaskUser).where(GroupTaskUser.GroupTaskID == SAMPLE_ID),
+        "任务有效参与人": select(func.count())
+        .select_from(TaskParticipant)
+        .where(TaskParticipant.TaskID == SAMPLE_ID, TaskParticipant.Status == "active"),
+        # user_utils
+        "用户收到的评价": select(Reputation)
+        .where(Reputation.UserID == SAMPLE_ID)
+        .order_by(Reputation.ReviewTime.desc()),
+        "订单评价": select(Reputation).where(Reputation.OrderID == SAMPLE_ID),
+        "按用户名查找用户": select(User).where(User.Username == "sample"),
+        "按邮箱查找用户": select(User).where(User.Email == "sample@example.com"),
+        # points_utils
+        "积分排行榜": select(Points.UserID)
+        .order_by(Points.PointsValue.desc())
+        .limit(50),
+        "积分流水": select(PointsTransaction)
+        .where(PointsTransaction.UserID == SAMPLE_ID)
+        .order_by(PointsTransaction.CreatedAt.desc()),
+    }
+
+
+def _full_scans_mysql(conn: Connection, compiled: str) -> List[str]:
+    rows = conn.exec_driver_sql(f"EXPLAIN {compiled}").mappings().all()
+    return [row["table"] for row in rows if row["type"] == "ALL"]
+
+
+def _full_scans_sqlite(conn: Connection, compiled: str) -> List[str]:
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    scans = []
+    for row in rows:
+        detail = row[-1]
+        # "SCAN Orders" 为全表扫描；"SCAN Orders USING INDEX ..." 为索引扫描
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            scans.append(detail[len("SCAN "):])
+    return scans
+
+
+def find_full_scans(engine: Engine) -> Dict[str, List[str]]:
+    """
+    对高频查询执行 EXPLAIN
+    Returns:
+        Dict[str, List[str]]: 存在全表扫描的查询及被扫描的表
+    """
+    if engine.dialect.name == "mysql":
+        explain = _full_scans_mysql
+    elif engine.dialect.name == "sqlite":
+        explain = _full_scans_sqlite
+    else:
+        raise ValueError(f"不支持的数据库: {engine.dialect.name}")
+
+    problems = {}
+    with engine.connect() as conn:
+        for name, query in hot_queries().items():
+            compiled = str(query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            scans = explain(conn, compiled)
+            if scans:
+                problems[name] = scans
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="高频查询索引检查")
+    parser.add_argument("--db-url", default="", help="数据库URL，默认使用 config 中的配置")
+    parser.add_argument("--create-schema", action="store_true", help="先按 models 建表（用于空库）")
+    args = parser.parse_args()
+
+    if args.db_url:
+        engine = create_engine(args.db_url)
+    else:
+        from utils.db_utils import get_engine
+
+        engine = get_engine()
+    if args.create_schema:
+        from models import Base
+
+        Base.metadata.create_all(engine)
+
+    problems = find_full_scans(engine)
+    for name, tables in problems.items():
+        print(f"全表扫描: {name} -> {', '.join(tables)}")
+    if problems:
+        sys.exit(1)
+    print(f"检查通过: {len(hot_queries())} 个高频查询均使用索引")
+
+
+if __name__ == "__main__":
+    main()
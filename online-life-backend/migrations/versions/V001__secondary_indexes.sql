@@ -0,0 +1,40 @@
+-- 为 order_utils / task_utils / user_utils 中的高频查询添加二级索引
+-- 基线为 online-life-database/Online.sql（已包含 Reputation 表 idx_user_order 唯一索引的重建）
+
+-- 客户订单列表（ClientID + 可选状态，按 CreationTime 倒序）与订单统计（GROUP BY OrderStatus）
+ALTER TABLE `Orders`
+    ADD INDEX `idx_orders_client_created` (`ClientID`, `CreationTime`),
+    ADD INDEX `idx_orders_client_status_created` (`ClientID`, `OrderStatus`, `CreationTime`),
+-- 代办人员订单列表与接单统计
+    ADD INDEX `idx_orders_staff_created` (`StaffID`, `CreationTime`),
+    ADD INDEX `idx_orders_staff_status_created` (`StaffID`, `OrderStatus`, `CreationTime`),
+-- 可接单列表（pending + open，按 CreationTime 倒序）
+    ADD INDEX `idx_orders_status_assignment_created` (`OrderStatus`, `AssignmentStatus`, `CreationTime`);
+
+-- 代办人员可接任务（Status = full/assigned，可按 TaskType 筛选）；团内招募中的任务
+ALTER TABLE `Task`
+    ADD INDEX `idx_task_status_type` (`Status`, `TaskType`),
+    ADD INDEX `idx_task_group_status` (`GroupTaskID`, `Status`);
+
+-- 任务待处理竞标（按 BidTime 排序）；用户竞标记录（按 BidTime 倒序）
+ALTER TABLE `BidRecord`
+    ADD INDEX `idx_bid_task_status_time` (`TaskID`, `BidStatus`, `BidTime`),
+    ADD INDEX `idx_bid_user_time` (`UserID`, `BidTime`);
+
+-- 用户收到的评价（按 ReviewTime 倒序）；订单评价
+ALTER TABLE `Reputation`
+    ADD INDEX `idx_reputation_user_time` (`UserID`, `ReviewTime`),
+    ADD INDEX `idx_reputation_order` (`OrderID`);
+
+-- 团办任务参与人统计
+ALTER TABLE `GroupTaskUser`
+    ADD INDEX `idx_grouptaskuser_group_user` (`GroupTaskID`, `UserID`);
+
+-- 任务有效参与人
+ALTER TABLE `TaskParticipant`
+    ADD INDEX `idx_taskparticipant_task_status` (`TaskID`, `Status`);
+
+-- 登录、注册查重
+ALTER TABLE `User`
+    ADD INDEX `idx_user_username` (`Username`),
+    ADD INDEX `idx_user_email` (`Email`);
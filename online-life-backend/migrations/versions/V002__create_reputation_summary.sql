@@ -0,0 +1,21 @@
+-- 创建信誉汇总表（由 UserUtils.add_order_reputation 增量维护）
+CREATE TABLE `ReputationSummary` (
+    `UserID` decimal(20,0) NOT NULL,
+    `ReviewCount` INT NOT NULL DEFAULT 0,
+    `ScoreSum` decimal(20,2) NOT NULL DEFAULT 0,
+    `AverageScore` decimal(5,2) NOT NULL DEFAULT 0,
+    `Bucket0` INT NOT NULL DEFAULT 0,
+    `Bucket1` INT NOT NULL DEFAULT 0,
+    `Bucket2` INT NOT NULL DEFAULT 0,
+    `Bucket3` INT NOT NULL DEFAULT 0,
+    `Bucket4` INT NOT NULL DEFAULT 0,
+    `Bucket5` INT NOT NULL DEFAULT 0,
+    `Bucket6` INT NOT NULL DEFAULT 0,
+    `Bucket7` INT NOT NULL DEFAULT 0,
+    `Bucket8` INT NOT NULL DEFAULT 0,
+    `Bucket9` INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (`UserID`),
+    KEY `ix_ReputationSummary_AverageScore` (`AverageScore`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- 建表后执行回填：flask --app app rebuild-reputation-summary
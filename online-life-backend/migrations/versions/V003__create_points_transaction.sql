@@ -0,0 +1,15 @@
+-- 创建积分流水表（由 PointsUtils._log_points_transaction 在业务事务内写入）
+CREATE TABLE `PointsTransaction` (
+    `TransactionID` BIGINT NOT NULL AUTO_INCREMENT,
+    `UserID` decimal(20,0) NOT NULL,
+    `TransactionType` varchar(30) COLLATE utf8mb4_general_ci NOT NULL,
+    `PointsChange` INT NOT NULL,
+    `Reason` varchar(255) COLLATE utf8mb4_general_ci DEFAULT '',
+    `BalanceBefore` INT NOT NULL,
+    `BalanceAfter` INT NOT NULL,
+    `CreatedAt` DATETIME(6) NOT NULL,
+    PRIMARY KEY (`TransactionID`),
+    KEY `idx_points_tx_user_time` (`UserID`, `CreatedAt`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- 建表后从历史日志回填：flask --app app import-points-log points.log
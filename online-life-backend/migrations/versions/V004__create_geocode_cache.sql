@@ -0,0 +1,12 @@
+-- 创建地理编码持久缓存表（由 MapUtils.geocode 读写，多个 worker 共享）
+CREATE TABLE `GeocodeCache` (
+    `AddressHash` char(40) COLLATE utf8mb4_general_ci NOT NULL,
+    `Address` varchar(255) COLLATE utf8mb4_general_ci NOT NULL,
+    `Longitude` decimal(10,6) DEFAULT NULL,
+    `Latitude` decimal(10,6) DEFAULT NULL,
+    `ExpiresAt` DATETIME NOT NULL,
+    `UpdatedAt` DATETIME NOT NULL,
+    PRIMARY KEY (`AddressHash`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- 建表后预热：flask --app app warm-geocode-cache
@@ -0,0 +1,38 @@
+-- 为以字符串存储的积分、分数、金额和时间新增类型列（在线迁移第一步，见 utils/typed_column_utils.py）
+-- 新列均可为空，MySQL 8.0 可即时添加；应用双写新旧两列，历史数据由 flask backfill-typed-columns 分批回填
+-- 旧字符串列在切换到 TYPED_COLUMNS_READ=typed 且确认无旧版本实例后，再由后续迁移删除
+
+ALTER TABLE `Points`
+    ADD COLUMN `PointsValue` INT NULL;
+
+ALTER TABLE `Reputation`
+    ADD COLUMN `ScoreValue` DECIMAL(5, 2) NULL,
+    ADD COLUMN `ReviewedAt` DATETIME NULL;
+
+ALTER TABLE `Orders`
+    ADD COLUMN `AmountValue` DECIMAL(10, 2) NULL,
+    ADD COLUMN `CreatedAt` DATETIME NULL;
+
+ALTER TABLE `Staff`
+    ADD COLUMN `SalaryValue` DECIMAL(10, 2) NULL;
+
+ALTER TABLE `BidRecord`
+    ADD COLUMN `BidAt` DATETIME NULL;
+
+ALTER TABLE `Task`
+    ADD COLUMN `BidDeadlineAt` DATETIME NULL;
+
+ALTER TABLE `TaskParticipant`
+    ADD COLUMN `JoinedAt` DATETIME NULL;
+
+ALTER TABLE `GroupTask`
+    ADD COLUMN `JoinedAt` DATETIME NULL;
+
+-- 积分排行榜按积分值排序；竞标截止扫描按状态 + 截止时间范围过滤
+ALTER TABLE `Points`
+    ADD INDEX `idx_points_value` (`PointsValue`),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE `Task`
+    ADD INDEX `idx_task_status_deadline` (`Status`, `BidDeadlineAt`),
+    ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,14 @@
+-- 订单持久化取货点/收货点坐标，并按取货点 geohash 建立附近可接订单索引
+-- 历史订单的坐标由 flask backfill-order-locations 回填
+
+ALTER TABLE `Orders`
+    ADD COLUMN `ShopLongitude` DECIMAL(10, 6) NULL,
+    ADD COLUMN `ShopLatitude` DECIMAL(10, 6) NULL,
+    ADD COLUMN `ShopGeoHash` VARCHAR(12) NULL,
+    ADD COLUMN `OrderLongitude` DECIMAL(10, 6) NULL,
+    ADD COLUMN `OrderLatitude` DECIMAL(10, 6) NULL;
+
+-- 可接订单（pending + open）按 geohash 前缀范围查找
+ALTER TABLE `Orders`
+    ADD INDEX `idx_orders_status_assignment_geohash` (`OrderStatus`, `AssignmentStatus`, `ShopGeoHash`),
+    ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,6 @@
+-- 骑手上报的当前位置，批量派单按位置计算到取货点的时间
+
+ALTER TABLE `Staff`
+    ADD COLUMN `Longitude` DECIMAL(10, 6) NULL,
+    ADD COLUMN `Latitude` DECIMAL(10, 6) NULL,
+    ADD COLUMN `LocationUpdatedAt` DATETIME NULL;
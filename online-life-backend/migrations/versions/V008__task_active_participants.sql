@@ -0,0 +1,11 @@
+-- Task 冗余保存当前参与人数，容量判断和列表直接读取该列，不再对 TaskParticipant 做 COUNT
+-- 应用在加入、退出、重新分配时原子增减；flask check-participant-counters --repair 可重新校准
+
+ALTER TABLE `Task`
+    ADD COLUMN `ActiveParticipants` INT NOT NULL DEFAULT 0;
+
+UPDATE `Task` t
+SET t.`ActiveParticipants` = (
+    SELECT COUNT(*) FROM `TaskParticipant` p
+    WHERE p.`TaskID` = t.`TaskID` AND p.`Status` = 'active'
+);
@@ -0,0 +1,18 @@
+-- 竞标截止调度表：任务满员开放竞标时登记截止时间，DeadlineScheduler 按 (Status, DueAt) 顺序处理到期记录
+
+CREATE TABLE `TaskDeadline` (
+    `TaskID` decimal(20,0) NOT NULL,
+    `DueAt` DATETIME NOT NULL,
+    `Status` varchar(20) COLLATE utf8mb4_general_ci NOT NULL DEFAULT 'pending',
+    `Extensions` INT NOT NULL DEFAULT 0,
+    `Result` varchar(20) COLLATE utf8mb4_general_ci NOT NULL DEFAULT '',
+    `UpdatedAt` DATETIME NOT NULL,
+    PRIMARY KEY (`TaskID`),
+    KEY `idx_taskdeadline_status_due` (`Status`, `DueAt`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- 已开放竞标但尚未分配的任务补登记（也可执行 flask --app app process-bid-deadlines --sync）
+INSERT INTO `TaskDeadline` (`TaskID`, `DueAt`, `Status`, `Extensions`, `Result`, `UpdatedAt`)
+SELECT `TaskID`, COALESCE(`BidDeadlineAt`, NOW()), 'pending', 0, '', NOW()
+FROM `Task`
+WHERE `Status` = 'full' AND (`CurrentBidder` IS NULL OR `CurrentBidder` = '');
@@ -0,0 +1,18 @@
+-- 异步任务队列：业务事务内写入、提交后由 JobWorkerPool 按 (Status, AvailableAt) 认领执行
+
+CREATE TABLE `Job` (
+    `JobID` BIGINT NOT NULL AUTO_INCREMENT,
+    `Kind` varchar(50) COLLATE utf8mb4_general_ci NOT NULL,
+    `Payload` TEXT COLLATE utf8mb4_general_ci NOT NULL,
+    `IdempotencyKey` varchar(128) COLLATE utf8mb4_general_ci DEFAULT NULL,
+    `Status` varchar(20) COLLATE utf8mb4_general_ci NOT NULL DEFAULT 'pending',
+    `Attempts` INT NOT NULL DEFAULT 0,
+    `MaxAttempts` INT NOT NULL DEFAULT 5,
+    `AvailableAt` DATETIME NOT NULL,
+    `CreatedAt` DATETIME(6) NOT NULL,
+    `FinishedAt` DATETIME DEFAULT NULL,
+    `LastError` varchar(500) COLLATE utf8mb4_general_ci NOT NULL DEFAULT '',
+    PRIMARY KEY (`JobID`),
+    UNIQUE KEY `idx_job_idempotency_key` (`IdempotencyKey`),
+    KEY `idx_job_status_available` (`Status`, `AvailableAt`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -1,7 +1,18 @@
 from typing import Optional
 
-from sqlalchemy import DECIMAL, String, Integer, UniqueConstraint
+from sqlalchemy import (
+    DECIMAL,
+    BigInteger,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+import datetime
 import decimal
 
 
@@ -30,9 +41,15 @@ class BidRecord(Base):
     TaskID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0), primary_key=True)
     BidID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0))
     BidTime: Mapped[str] = mapped_column(String(30))
+    BidAt: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
     BidStatus: Mapped[str] = mapped_column(String(30))
     # BidAmount: Mapped[str] = mapped_column(String(30))
 
+    __table_args__ = (
+        Index("idx_bid_task_status_time", "TaskID", "BidStatus", "BidTime"),
+        Index("idx_bid_user_time", "UserID", "BidTime"),
+    )
+
 
 class Client(Base):
     __tablename__ = "Client"
@@ -47,6 +64,19 @@ class Client(Base):
     ClientID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0))
 
 
+class GeocodeCache(Base):
+    """地理编码持久缓存（按规范化地址的 SHA1 索引，Longitude 为空表示高德无结果）"""
+
+    __tablename__ = "GeocodeCache"
+
+    AddressHash: Mapped[str] = mapped_column(String(40), primary_key=True)
+    Address: Mapped[str] = mapped_column(String(255))
+    Longitude: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(10, 6), nullable=True)
+    Latitude: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(10, 6), nullable=True)
+    ExpiresAt: Mapped[datetime.datetime] = mapped_column(DateTime)
+    UpdatedAt: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.now)
+
+
 class GroupTask(Base):
     __tablename__ = "GroupTask"
 
@@ -56,6 +86,7 @@ class GroupTask(Base):
     # TaskID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0))
     # ParticipatingUserID: Mapped[str] = mapped_column(String(30))
     JoinTime: Mapped[str] = mapped_column(String(30))
+    JoinedAt: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
     endTime: Mapped[Optional[str]] = mapped_column(String(30))
 
 
@@ -67,6 +98,39 @@ class GroupTaskUser(Base):
     TaskID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0), primary_key=True)
     GroupTaskID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0))
 
+    __table_args__ = (
+        Index("idx_grouptaskuser_group_user", "GroupTaskID", "UserID"),
+    )
+
+
+class Job(Base):
+    """异步任务队列（提交后由 JobWorkerPool 认领执行，IdempotencyKey 相同的任务只入队一次）"""
+
+    __tablename__ = "Job"
+
+    JobID: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True
+    )
+    Kind: Mapped[str] = mapped_column(String(50))
+    Payload: Mapped[str] = mapped_column(Text)  # JSON
+    IdempotencyKey: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    Status: Mapped[str] = mapped_column(String(20), default="pending")  # pending, running, done, failed
+    Attempts: Mapped[int] = mapped_column(Integer, default=0)
+    MaxAttempts: Mapped[int] = mapped_column(Integer, default=5)
+    # pending 为最早可执行时间（重试退避），running 为认领租期到期时间
+    AvailableAt: Mapped[datetime.datetime] = mapped_column(DateTime)
+    CreatedAt: Mapped[datetime.datetime] = mapped_column(
+        DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"),
+        default=datetime.datetime.now,
+    )
+    FinishedAt: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
+    LastError: Mapped[str] = mapped_column(String(500), default="")
+
+    __table_args__ = (
+        UniqueConstraint("IdempotencyKey", name="idx_job_idempotency_key"),
+        Index("idx_job_status_available", "Status", "AvailableAt"),
+    )
+
 
 class Orders(Base):
     __tablename__ = "Orders"
@@ -74,6 +138,7 @@ class Orders(Base):
     OrderType: Mapped[str] = mapped_column(String(30))
     OrderStatus: Mapped[str] = mapped_column(String(30))
     CreationTime: Mapped[str] = mapped_column(String(30))
+    CreatedAt: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
     CompletionTime: Mapped[str] = mapped_column(String(30))
     EstimatedTime: Mapped[str] = mapped_column(String(30))
     AssignmentType: Mapped[str] = mapped_column(String(30))
@@ -85,7 +150,23 @@ class Orders(Base):
         DECIMAL(20, 0), nullable=True
     )
     Amount: Mapped[str] = mapped_column(String(20, 0))
+    AmountValue: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(10, 2), nullable=True)
     ShopAddress: Mapped[Optional[str]] = mapped_column(String(255), comment="商家地址")
+    # 下单时地理编码得到的取货点（商家）和收货点坐标，ShopGeoHash 用于附近订单查询
+    ShopLongitude: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(10, 6), nullable=True)
+    ShopLatitude: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(10, 6), nullable=True)
+    ShopGeoHash: Mapped[Optional[str]] = mapped_column(String(12), nullable=True)
+    OrderLongitude: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(10, 6), nullable=True)
+    OrderLatitude: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(10, 6), nullable=True)
+
+    __table_args__ = (
+        Index("idx_orders_client_created", "ClientID", "CreationTime"),
+        Index("idx_orders_client_status_created", "ClientID", "OrderStatus", "CreationTime"),
+        Index("idx_orders_staff_created", "StaffID", "CreationTime"),
+        Index("idx_orders_staff_status_created", "StaffID", "OrderStatus", "CreationTime"),
+        Index("idx_orders_status_assignment_created", "OrderStatus", "AssignmentStatus", "CreationTime"),
+        Index("idx_orders_status_assignment_geohash", "OrderStatus", "AssignmentStatus", "ShopGeoHash"),
+    )
 
     def to_dict(self):
         return {
@@ -111,6 +192,35 @@ class Points(Base):
 
     UserID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0), primary_key=True)
     Points: Mapped[str] = mapped_column(String(30))
+    PointsValue: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("idx_points_value", "PointsValue"),
+    )
+
+
+class PointsTransaction(Base):
+    """积分变更流水"""
+
+    __tablename__ = "PointsTransaction"
+
+    TransactionID: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True
+    )
+    UserID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0))
+    TransactionType: Mapped[str] = mapped_column(String(30))  # ADD, DEDUCT, TRANSFER_IN, TRANSFER_OUT
+    PointsChange: Mapped[int] = mapped_column(Integer)
+    Reason: Mapped[str] = mapped_column(String(255), default="")
+    BalanceBefore: Mapped[int] = mapped_column(Integer)
+    BalanceAfter: Mapped[int] = mapped_column(Integer)
+    CreatedAt: Mapped[datetime.datetime] = mapped_column(
+        DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"),
+        default=datetime.datetime.now,
+    )
+
+    __table_args__ = (
+        Index("idx_points_tx_user_time", "UserID", "CreatedAt"),
+    )
 
 
 class Reputation(Base):
@@ -118,15 +228,43 @@ class Reputation(Base):
 
     ReputationID: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     Score: Mapped[str] = mapped_column(String(30))
+    ScoreValue: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(5, 2), nullable=True)
     Review: Mapped[str] = mapped_column(String(30))
     RUserID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0))
     UserID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0))
     OrderID: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(20, 0), nullable=True)
     ReviewTime: Mapped[str] = mapped_column(String(30), default="")
+    ReviewedAt: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
 
     __table_args__ = (
         UniqueConstraint('RUserID', 'OrderID', name='idx_user_order'),
+        Index("idx_reputation_user_time", "UserID", "ReviewTime"),
+        Index("idx_reputation_order", "OrderID"),
+    )
+
+
+class ReputationSummary(Base):
+    """用户信誉汇总（由 Reputation 增量维护）"""
+
+    __tablename__ = "ReputationSummary"
+
+    UserID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0), primary_key=True)
+    ReviewCount: Mapped[int] = mapped_column(Integer, default=0)
+    ScoreSum: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 2), default=0)
+    AverageScore: Mapped[decimal.Decimal] = mapped_column(
+        DECIMAL(5, 2), default=0, index=True
     )
+    # 分数段分布：Bucket0 为 0-9 分，……，Bucket9 为 90-100 分
+    Bucket0: Mapped[int] = mapped_column(Integer, default=0)
+    Bucket1: Mapped[int] = mapped_column(Integer, default=0)
+    Bucket2: Mapped[int] = mapped_column(Integer, default=0)
+    Bucket3: Mapped[int] = mapped_column(Integer, default=0)
+    Bucket4: Mapped[int] = mapped_column(Integer, default=0)
+    Bucket5: Mapped[int] = mapped_column(Integer, default=0)
+    Bucket6: Mapped[int] = mapped_column(Integer, default=0)
+    Bucket7: Mapped[int] = mapped_column(Integer, default=0)
+    Bucket8: Mapped[int] = mapped_column(Integer, default=0)
+    Bucket9: Mapped[int] = mapped_column(Integer, default=0)
 
 
 class Staff(Base):
@@ -141,6 +279,11 @@ class Staff(Base):
     Role: Mapped[str] = mapped_column(String(30))
     StaffID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0))
     Salary: Mapped[str] = mapped_column(String(30))
+    SalaryValue: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(10, 2), nullable=True)
+    # 骑手最近上报的位置，批量派单时用于计算到取货点的时间
+    Longitude: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(10, 6), nullable=True)
+    Latitude: Mapped[Optional[decimal.Decimal]] = mapped_column(DECIMAL(10, 6), nullable=True)
+    LocationUpdatedAt: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
 
 
 class TaskParticipant(Base):
@@ -149,10 +292,15 @@ class TaskParticipant(Base):
     UserID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0), primary_key=True)
     TaskID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0), primary_key=True)
     JoinTime: Mapped[str] = mapped_column(String(30))
+    JoinedAt: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
     Status: Mapped[str] = mapped_column(
         String(30), default="active"
     )  # active, completed, left
 
+    __table_args__ = (
+        Index("idx_taskparticipant_task_status", "TaskID", "Status"),
+    )
+
 
 class Task(Base):
     __tablename__ = "Task"
@@ -164,6 +312,7 @@ class Task(Base):
     ActualTime: Mapped[str] = mapped_column(String(30))
     CurrentBidder: Mapped[str] = mapped_column(String(30))
     BidDeadline: Mapped[str] = mapped_column(String(30))
+    BidDeadlineAt: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
     GroupTaskID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0))
     TaskLocation: Mapped[str] = mapped_column(String(255))
     MaxParticipants: Mapped[int] = mapped_column(
@@ -172,6 +321,30 @@ class Task(Base):
     Status: Mapped[str] = mapped_column(
         String(30), default="recruiting"
     )  # recruiting, full, assigned, completed
+    # 当前 active 的 TaskParticipant 数，由加入/退出/重新分配原子增减，flask check-participant-counters 校验修复
+    ActiveParticipants: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("idx_task_status_type", "Status", "TaskType"),
+        Index("idx_task_group_status", "GroupTaskID", "Status"),
+        Index("idx_task_status_deadline", "Status", "BidDeadlineAt"),
+    )
+
+
+class TaskDeadline(Base):
+    """满员任务的竞标截止调度（由 DeadlineScheduler 按 DueAt 顺序处理，进程重启后从表中恢复）"""
+
+    __tablename__ = "TaskDeadline"
+
+    TaskID: Mapped[decimal.Decimal] = mapped_column(DECIMAL(20, 0), primary_key=True)
+    DueAt: Mapped[datetime.datetime] = mapped_column(DateTime)
+    Status: Mapped[str] = mapped_column(String(20), default="pending")  # pending, done
+    # 无人竞标时已延长竞标窗口的次数，达到 BID_WINDOW_MAX_EXTENSIONS 后升级为 escalated
+    Extensions: Mapped[int] = mapped_column(Integer, default=0)
+    Result: Mapped[str] = mapped_column(String(20), default="")  # assigned, extended, escalated, skipped
+    UpdatedAt: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.now)
+
+    __table_args__ = (Index("idx_taskdeadline_status_due", "Status", "DueAt"),)
 
 
 class User(Base):
@@ -184,3 +357,19 @@ class User(Base):
     Phone: Mapped[str] = mapped_column(String(30))
     Address: Mapped[str] = mapped_column(String(255))
     Role: Mapped[str] = mapped_column(String(30))
+
+    __table_args__ = (
+        Index("idx_user_username", "Username"),
+        Index("idx_user_email", "Email"),
+    )
+
+
+class SchemaVersion(Base):
+    """已执行的数据库迁移版本（由 MigrationUtils 维护）"""
+
+    __tablename__ = "SchemaVersion"
+
+    Version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    Description: Mapped[str] = mapped_column(String(255))
+    Checksum: Mapped[str] = mapped_column(String(64))
+    AppliedAt: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.now)
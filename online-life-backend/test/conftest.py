@@ -0,0 +1,51 @@
+import itertools
+import threading
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from models import Base
+from utils.id_utils import IdUtils
+
+
+@pytest.fixture
+def engine():
+    """已建表的内存数据库"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """已建表的文件数据库会话工厂：并发测试中每个会话使用独立连接"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", poolclass=NullPool, connect_args={"timeout": 60}
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def small_ids(monkeypatch):
+    """SQLite 的 DECIMAL 按浮点数存储，测试中 IdUtils.next_id 生成从1000开始的小整数ID"""
+    ids = itertools.count(1000)
+    lock = threading.Lock()
+
+    def next_id():
+        with lock:
+            return Decimal(next(ids))
+
+    monkeypatch.setattr(IdUtils, "next_id", staticmethod(next_id))
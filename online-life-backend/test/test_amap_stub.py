@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+import config
+from benchmark.amap_stub import AmapStubServer, synthetic_location
+from utils import map_utils
+from utils.map_utils import MapUtils
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = AmapStubServer().start()
+    monkeypatch.setattr(config, "AMAP_BASE_URL", server.base_url)
+    monkeypatch.setattr(config, "GEOCODE_PERSIST", False)
+    map_utils._geocode_cache.clear()
+    map_utils._route_cache.clear()
+    map_utils._map_client.breaker.record_success()
+    yield server
+    server.stop()
+    map_utils._geocode_cache.clear()
+    map_utils._route_cache.clear()
+
+
+def test_map_utils_against_stub(stub):
+    lon, lat = synthetic_location("四川大学江安校区")
+    assert MapUtils.geocode("四川大学江安校区") == {"longitude": lon, "latitude": lat}
+    assert MapUtils.geocode("unknown place") is None
+
+    route = MapUtils.calculate_route("四川大学江安校区", "四川大学望江校区")
+    assert route["distance"] > 0 and route["duration"] > 0
+    assert "approximate" not in route
+    assert stub.request_count == 4
+
+
+def test_stub_errors_trigger_fallback(stub):
+    stub.error_rate = 1.0
+    route = MapUtils.calculate_route("104.000000,30.600000", "104.010000,30.610000")
+    assert route["approximate"] is True
+
+
+def test_slow_upstream_is_bounded_by_route_timeout(stub, monkeypatch):
+    # 经过真实的 HTTPAdapter 重试层：读超时不重试，超时后立即回退到直线估算
+    monkeypatch.setattr(config, "ROUTE_UPSTREAM_TIMEOUT", 0.3)
+    stub.latency = 2.0
+    started = time.perf_counter()
+    route = MapUtils.calculate_route("104.000000,30.600000", "104.010000,30.610000")
+    elapsed = time.perf_counter() - started
+
+    assert route["approximate"] is True
+    assert stub.request_count == 1
+    assert elapsed < 1.0
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import exc, text
+
+from utils.db_utils import get_engine, get_pool_metrics
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = get_engine(
+        f"pool-test-{tmp_path.name}",
+        url=f"sqlite:///{tmp_path / 'pool.db'}",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_registry_returns_same_engine(engine, tmp_path):
+    assert get_engine(f"pool-test-{tmp_path.name}") is engine
+
+
+def test_pool_metrics_track_checkout_and_timeout(engine, tmp_path):
+    name = f"pool-test-{tmp_path.name}"
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        metrics = get_pool_metrics(name)[name]
+        assert metrics["checked_out"] == 1
+        assert metrics["pool_size"] == 1
+
+        # 连接池已满，第二次取连接应超时
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    metrics = get_pool_metrics(name)[name]
+    assert metrics["checked_out"] == 0
+    assert metrics["checkouts"] == 1
+    assert metrics["checkins"] == 1
+    assert metrics["timeouts"] == 1
+    assert metrics["wait_count"] == 2
+    assert metrics["wait_time_max_ms"] >= 100
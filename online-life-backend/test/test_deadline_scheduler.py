@@ -0,0 +1,181 @@
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import config
+from models import BidRecord, GroupTask, Orders, ReputationSummary, Task, TaskDeadline
+from utils.deadline_utils import DeadlineScheduler, DeadlineUtils
+from utils.order_utils import OrderUtils
+from utils.task_utils import TaskUtils
+
+GROUP = Decimal(1)
+TASK = Decimal(1)
+LATER = datetime.now() + timedelta(days=30)
+
+
+@pytest.fixture
+def session_factory(session_factory, small_ids):
+    # worker 线程各自使用独立连接，使用文件数据库
+    DeadlineUtils.reset_metrics()
+
+    session = session_factory()
+    session.add(GroupTask(GroupTaskID=GROUP, JoinTime="2025-06-01 10:00:00", endTime=""))
+    session.add(Task(
+        TaskID=TASK, TaskType="group", Description="", EstimatedTime="", ActualTime="",
+        CurrentBidder="", BidDeadline="", GroupTaskID=GROUP, TaskLocation="", MaxParticipants=5,
+        Status="recruiting", ActiveParticipants=0,
+    ))
+    for user_id in range(1, 6):
+        session.add(ReputationSummary(UserID=Decimal(100 + user_id), AverageScore=user_id * 10))
+    session.commit()
+    for user_id in range(1, 6):
+        assert TaskUtils.join_group_task_with_auto_assignment(session, Decimal(user_id), GROUP)
+    session.close()
+    return session_factory
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def add_bids(db, staff_ids):
+    for i, staff_id in enumerate(staff_ids):
+        db.add(BidRecord(
+            UserID=Decimal(staff_id), TaskID=TASK, BidID=Decimal(500 + i),
+            BidTime=f"2025-06-01 10:0{i}:00", BidStatus="pending",
+        ))
+    db.commit()
+
+
+def test_full_task_registers_deadline(db):
+    task = db.get(Task, TASK)
+    deadline = db.get(TaskDeadline, TASK)
+    assert task.Status == "full"
+    assert deadline.Status == "pending"
+    assert deadline.DueAt.replace(microsecond=0) == task.BidDeadlineAt
+    assert timedelta(days=6) < deadline.DueAt - datetime.now() <= timedelta(seconds=config.BID_WINDOW_SECONDS)
+
+    # 未到期时不处理
+    assert DeadlineUtils.process_due(db)["claimed"] == 0
+
+
+def test_expired_window_assigns_best_of_existing_bids(db):
+    add_bids(db, [102, 104, 103])
+    metrics = DeadlineUtils.process_due(db, now=LATER)
+    assert metrics["claimed"] == 1 and metrics["assigned"] == 1
+
+    db.expire_all()
+    task = db.get(Task, TASK)
+    assert (task.Status, task.CurrentBidder) == ("assigned", "104")
+    statuses = {bid.UserID: bid.BidStatus for bid in db.query(BidRecord)}
+    assert statuses == {Decimal(102): "rejected", Decimal(104): "accepted", Decimal(103): "rejected"}
+    deadline = db.get(TaskDeadline, TASK)
+    assert (deadline.Status, deadline.Result) == ("done", "assigned")
+
+
+def test_assignment_invalidates_order_statistics(db):
+    client = Decimal(9)
+    db.add(Orders(
+        OrderID=TASK, ClientID=client, OrderType="immediate", OrderStatus="pending",
+        CreationTime="2025-06-01 10:00:00", CompletionTime="", EstimatedTime="2700",
+        AssignmentType="direct", AssignmentStatus="open", OrderLocation="", Amount="12.5",
+    ))
+    db.commit()
+    add_bids(db, [102, 104])
+    assert OrderUtils.get_order_statistics(db, client)["pending_orders"] == 1
+    assert OrderUtils.get_staff_order_statistics(db, Decimal(104))["assigned_orders"] == 0
+
+    assert DeadlineUtils.process_due(db, now=LATER)["assigned"] == 1
+    assert OrderUtils.get_order_statistics(db, client)["assigned_orders"] == 1
+    assert OrderUtils.get_staff_order_statistics(db, Decimal(104))["assigned_orders"] == 1
+
+
+def test_no_bids_extends_then_escalates(db, monkeypatch):
+    monkeypatch.setattr(config, "BID_WINDOW_MAX_EXTENSIONS", 1)
+    assert DeadlineUtils.process_due(db, now=LATER)["extended"] == 1
+
+    db.expire_all()
+    deadline = db.get(TaskDeadline, TASK)
+    assert (deadline.Status, deadline.Extensions) == ("pending", 1)
+    assert deadline.DueAt == LATER + timedelta(seconds=config.BID_WINDOW_EXTENSION_SECONDS)
+    assert db.get(Task, TASK).BidDeadlineAt == deadline.DueAt.replace(microsecond=0)
+
+    assert DeadlineUtils.process_due(db, now=deadline.DueAt)["escalated"] == 1
+    db.expire_all()
+    assert db.get(Task, TASK).Status == "escalated"
+    assert db.get(TaskDeadline, TASK).Result == "escalated"
+    assert DeadlineUtils.get_metrics()["totals"]["escalated"] == 1
+
+
+def test_reopened_task_cancels_deadline(db):
+    TaskUtils.leave_group_task_completely(db, Decimal(1), GROUP)
+    db.expire_all()
+    assert db.get(Task, TASK).Status == "recruiting"
+    assert db.get(TaskDeadline, TASK).Status == "done"
+    assert DeadlineUtils.process_due(db, now=LATER)["claimed"] == 0
+
+
+def test_claim_is_exclusive(db, session_factory):
+    other = session_factory()
+    try:
+        assert DeadlineUtils.claim_due(db, LATER) == [TASK]
+        assert DeadlineUtils.claim_due(other, LATER) == []
+        # 租期过后重新到期
+        lease = LATER + timedelta(seconds=config.DEADLINE_CLAIM_LEASE)
+        assert DeadlineUtils.claim_due(other, lease) == [TASK]
+    finally:
+        other.close()
+
+
+def test_bid_threshold_is_assigned_off_request_path(db, monkeypatch):
+    monkeypatch.setattr(config, "DEADLINE_SCHEDULER_ENABLED", True)
+    for staff_id in range(101, 106):
+        assert TaskUtils.bid_for_task(db, Decimal(staff_id), TASK)
+
+    db.expire_all()
+    assert db.get(Task, TASK).Status == "full"
+    assert db.get(TaskDeadline, TASK).DueAt <= datetime.now()
+
+    assert DeadlineUtils.process_due(db)["assigned"] == 1
+    db.expire_all()
+    assert db.get(Task, TASK).CurrentBidder == "105"
+
+
+def test_scheduler_wakes_at_deadline(db, session_factory):
+    add_bids(db, [101])
+    scheduler = DeadlineScheduler(session_factory, poll_interval=30).start()
+    try:
+        due_at = datetime.now() + timedelta(seconds=0.3)
+        DeadlineUtils.schedule(db, TASK, due_at)
+        db.commit()
+        DeadlineUtils.notify(due_at)
+
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            db.expire_all()
+            if db.get(Task, TASK).Status == "assigned":
+                break
+            time.sleep(0.05)
+        assert db.get(Task, TASK).CurrentBidder == "101"
+    finally:
+        scheduler.stop()
+
+
+def test_notify_wakes_only_for_earlier_deadline(session_factory):
+    scheduler = DeadlineScheduler(session_factory, poll_interval=30)
+    soon = datetime.now() + timedelta(minutes=5)
+
+    scheduler.notify(soon)
+    assert scheduler._wakeup.is_set()
+    scheduler._wakeup.clear()
+
+    scheduler.notify(soon + timedelta(minutes=5))
+    assert not scheduler._wakeup.is_set()
+
+    scheduler.notify(soon - timedelta(minutes=1))
+    assert scheduler._wakeup.is_set()
@@ -0,0 +1,134 @@
+import itertools
+import math
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import config
+from models import Orders, Staff
+from utils.dispatch_utils import DispatchUtils
+from utils.map_utils import METERS_PER_DEGREE
+from utils.order_utils import OrderUtils
+
+CENTER_LON, CENTER_LAT = 104.0665, 30.5728
+CLIENT = Decimal(1)
+
+
+def offset(east_m, north_m):
+    """中心点向东、向北偏移若干米后的坐标"""
+    lat = CENTER_LAT + north_m / METERS_PER_DEGREE
+    lon = CENTER_LON + east_m / (METERS_PER_DEGREE * math.cos(math.radians(CENTER_LAT)))
+    return {"longitude": lon, "latitude": lat}
+
+
+@pytest.fixture
+def db(db):
+    DispatchUtils.reset_metrics()
+    return db
+
+
+def add_staff(db, staff_id, coords, updated_at=None):
+    staff = Staff(
+        UserID=Decimal(staff_id), Username=f"staff{staff_id}", Password="", Email="", Phone="",
+        Address="", Role="staff", StaffID=Decimal(staff_id), Salary="0",
+    )
+    db.add(staff)
+    db.flush()
+    DispatchUtils.update_staff_location(db, staff.UserID, coords["longitude"], coords["latitude"])
+    if updated_at is not None:
+        staff.LocationUpdatedAt = updated_at
+        db.commit()
+
+
+def add_order(db, order_id, coords, assignment_type="dispatch", status="pending", staff_id=None):
+    order = Orders(
+        OrderID=Decimal(order_id), ClientID=CLIENT, OrderType="immediate", OrderStatus=status,
+        CreationTime=f"2025-06-01 10:00:{order_id:02d}", CompletionTime="", EstimatedTime="2700",
+        AssignmentType=assignment_type, AssignmentStatus="open" if status == "pending" else "assigned",
+        OrderLocation="", ShopAddress="", Amount="0",
+        StaffID=Decimal(staff_id) if staff_id else None,
+    )
+    OrderUtils.set_order_coordinates(order, coords, coords)
+    db.add(order)
+    db.commit()
+
+
+def test_hungarian_matches_brute_force():
+    rng = random.Random(7)
+    for rows, cols in [(4, 4), (3, 6), (6, 3), (5, 5)]:
+        cost = [[rng.randint(1, 100) for _ in range(cols)] for _ in range(rows)]
+        pairs = DispatchUtils.hungarian(cost)
+        assert len(pairs) == min(rows, cols)
+        if rows <= cols:
+            best = min(sum(cost[i][p[i]] for i in range(rows)) for p in itertools.permutations(range(cols), rows))
+        else:
+            best = min(sum(cost[p[j]][j] for j in range(cols)) for p in itertools.permutations(range(rows), cols))
+        assert sum(cost[i][j] for i, j in pairs) == best
+
+
+def test_solve_skips_pairs_over_max_cost():
+    cost = [[100, 5000], [120, 6000]]
+    pairs, solver = DispatchUtils.solve(cost, max_cost=900)
+    assert solver == "hungarian"
+    assert len(pairs) == 1 and cost[pairs[0][0]][pairs[0][1]] <= 900
+
+    # 贪心在局部最优时会多花取货时间，匈牙利算法找到全局最优
+    cost = [[1, 2], [2, 100]]
+    assert DispatchUtils.solve(cost, method="greedy")[0] == [(0, 0), (1, 1)]
+    assert DispatchUtils.solve(cost, method="hungarian")[0] == [(0, 1), (1, 0)]
+
+
+def test_run_cycle_assigns_nearest_and_reports_metrics(db):
+    add_staff(db, 11, offset(0, 0))
+    add_staff(db, 12, offset(2000, 0))
+    add_staff(db, 13, offset(0, 2000), updated_at=datetime.now() - timedelta(hours=1))  # 位置过期
+    add_staff(db, 14, offset(100, 0))
+    add_order(db, 99, offset(0, 0), status="assigned", staff_id=14)  # 14 号骑手正忙
+    add_order(db, 1, offset(1900, 0))
+    add_order(db, 2, offset(100, 100))
+    add_order(db, 3, offset(0, 1900), assignment_type="direct")  # 骑手自行接单的订单不参与派单
+    add_order(db, 4, offset(50000, 0))  # 超过最长取货时间
+
+    metrics = DispatchUtils.run_cycle(db)
+    assert metrics["orders"] == 3
+    assert metrics["staff"] == 2
+    assert metrics["assigned"] == 2
+    assert metrics["assignment_rate"] == pytest.approx(2 / 3, abs=1e-3)
+    assert 0 < metrics["mean_pickup_eta"] < 100
+
+    assert db.get(Orders, Decimal(1)).StaffID == Decimal(12)
+    assert db.get(Orders, Decimal(2)).StaffID == Decimal(11)
+    assert db.get(Orders, Decimal(2)).OrderStatus == "assigned"
+    assert db.get(Orders, Decimal(3)).StaffID is None
+    assert db.get(Orders, Decimal(4)).AssignmentStatus == "open"
+
+    totals = DispatchUtils.get_metrics()["totals"]
+    assert totals["cycles"] == 1 and totals["assigned"] == 2
+
+    # 两个骑手都已有进行中的订单，下一轮不再分配
+    assert DispatchUtils.run_cycle(db)["assigned"] == 0
+
+
+def test_commit_skips_orders_taken_concurrently(db):
+    add_staff(db, 11, offset(0, 0))
+    add_staff(db, 12, offset(300, 0))
+    add_order(db, 1, offset(0, 0))
+    orders = DispatchUtils.get_dispatchable_orders(db)
+    staff = DispatchUtils.get_available_staff(db)
+
+    OrderUtils.accept_order(db, Decimal(1), Decimal(12))
+    committed = DispatchUtils.commit_assignments(db, [(staff[0], orders[0])])
+    assert committed == []
+    assert db.get(Orders, Decimal(1)).StaffID == Decimal(12)
+
+
+def test_greedy_used_above_hungarian_limit(db, monkeypatch):
+    monkeypatch.setattr(config, "DISPATCH_HUNGARIAN_MAX", 2)
+    for i in range(1, 4):
+        add_staff(db, 10 + i, offset(i * 100, 0))
+        add_order(db, i, offset(i * 100, 50))
+    metrics = DispatchUtils.run_cycle(db)
+    assert metrics["solver"] == "greedy"
+    assert metrics["assigned"] == 3
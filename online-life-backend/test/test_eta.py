@@ -0,0 +1,166 @@
+import itertools
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+import config
+import api.order_api as order_api
+from models import Orders, Staff, User
+from utils.dispatch_utils import DispatchUtils
+from utils.eta_utils import EtaUtils
+from utils.auth_utils import AuthUtils
+from utils.map_utils import METERS_PER_DEGREE, MapUtils, _route_cache
+from utils.order_utils import OrderUtils
+
+CENTER_LON, CENTER_LAT = 104.0665, 30.5728
+NOW = datetime(2025, 6, 1, 10, 0, 0)
+
+
+def offset(east_m, north_m):
+    """中心点向东、向北偏移若干米后的坐标"""
+    lat = CENTER_LAT + north_m / METERS_PER_DEGREE
+    lon = CENTER_LON + east_m / (METERS_PER_DEGREE * math.cos(math.radians(CENTER_LAT)))
+    return lon, lat
+
+
+def make_order(order_id, shop, dest):
+    return {
+        "order_id": str(order_id),
+        "shop_longitude": shop[0], "shop_latitude": shop[1],
+        "order_longitude": dest[0], "order_latitude": dest[1],
+    }
+
+
+def random_orders(rng, count):
+    def point():
+        return offset(rng.uniform(-3000, 3000), rng.uniform(-3000, 3000))
+    return [make_order(i, point(), point()) for i in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def empty_route_cache():
+    # 命中统计是进程级的，测试结束后恢复，避免影响其他用例的统计断言
+    hits, misses = _route_cache.hits, _route_cache.misses
+    _route_cache.clear()
+    yield
+    _route_cache.clear()
+    _route_cache.hits, _route_cache.misses = hits, misses
+
+
+def best_travel_time(matrix, count):
+    """穷举所有满足先取后送的访问顺序"""
+    best = float("inf")
+    for route in itertools.permutations(range(1, 2 * count + 1)):
+        position = {node: index for index, node in enumerate(route)}
+        if all(position[k] < position[k + count] for k in range(1, count + 1)):
+            best = min(best, EtaUtils.travel_time(matrix, (0,) + route))
+    return best
+
+
+def test_plan_respects_pickup_before_dropoff_and_is_near_optimal():
+    rng = random.Random(11)
+    for _ in range(5):
+        orders = random_orders(rng, 3)
+        origin = offset(0, 0)
+        plan = EtaUtils.plan_route(origin, orders, NOW)
+
+        seen = set()
+        for stop in plan["stops"]:
+            if stop["type"] == "pickup":
+                seen.add(stop["order_id"])
+            else:
+                assert stop["order_id"] in seen
+        etas = [stop["eta"] for stop in plan["stops"]]
+        assert etas == sorted(etas)
+
+        points = [origin] + [(o["shop_longitude"], o["shop_latitude"]) for o in orders]
+        points += [(o["order_longitude"], o["order_latitude"]) for o in orders]
+        matrix, _ = MapUtils.duration_matrix(points)
+        assert plan["travel_time"] <= best_travel_time(matrix, 3) * 1.1 + 1
+
+
+def test_projected_completion_and_service_times():
+    # 两个订单沿一条直线排列，最优顺序是依次取送
+    orders = [make_order(1, offset(2000, 0), offset(3000, 0)), make_order(2, offset(500, 0), offset(1000, 0))]
+    plan = EtaUtils.plan_route(offset(0, 0), orders, NOW)
+    assert [(s["order_id"], s["type"]) for s in plan["stops"]] == [
+        ("2", "pickup"), ("2", "dropoff"), ("1", "pickup"), ("1", "dropoff"),
+    ]
+    seconds_per_meter = config.ROUTE_DETOUR_FACTOR / config.CYCLING_SPEED_MPS
+    service = 2 * (config.ETA_PICKUP_SERVICE_SECONDS + config.ETA_DROPOFF_SERVICE_SECONDS)
+    assert plan["total_duration"] == pytest.approx(3000 * seconds_per_meter + service, abs=5)
+    first = plan["orders"][0]
+    assert first["order_id"] == "2"
+    expected = NOW + timedelta(seconds=first["delivery_eta"])
+    assert first["projected_completion_time"] == expected.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_cached_route_legs_override_estimates():
+    shop, dest = offset(1000, 0), offset(1000, 1000)
+    _route_cache.set(MapUtils.snap_to_grid(*shop) + MapUtils.snap_to_grid(*dest), (1500, 999))
+    plan = EtaUtils.plan_route(None, [make_order(1, shop, dest)], NOW)
+    assert plan["cached_legs"] == 1
+    assert plan["orders"][0]["delivery_eta"] == 999 + config.ETA_PICKUP_SERVICE_SECONDS + config.ETA_DROPOFF_SERVICE_SECONDS
+
+
+def test_twenty_orders_plan_quickly():
+    orders = random_orders(random.Random(5), 20)
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        plan = EtaUtils.plan_route(offset(0, 0), orders, NOW)
+        timings.append(time.perf_counter() - started)
+    assert len(plan["stops"]) == 40
+    assert min(timings) < 0.05
+
+
+def test_estimate_staff_queue_uses_reported_location(db):
+    db.add(User(UserID=Decimal(1), Username="client", Password="", Email="", Phone="", Address="", Role="client"))
+    db.add(Staff(UserID=Decimal(11), Username="staff", Password="", Email="", Phone="", Address="",
+                 Role="staff", StaffID=Decimal(11), Salary="0"))
+    db.commit()
+    DispatchUtils.update_staff_location(db, Decimal(11), *offset(0, 0))
+    for order_id, shop, dest in [(1, offset(500, 0), offset(900, 0)), (2, None, None)]:
+        order = Orders(
+            OrderID=Decimal(order_id), ClientID=Decimal(1), OrderType="immediate", OrderStatus="assigned",
+            CreationTime=f"2025-06-01 09:00:0{order_id}", CompletionTime="", EstimatedTime="2700",
+            AssignmentType="direct", AssignmentStatus="assigned", OrderLocation="", ShopAddress="",
+            Amount="0", StaffID=Decimal(11),
+        )
+        if shop:
+            OrderUtils.set_order_coordinates(
+                order, {"longitude": shop[0], "latitude": shop[1]}, {"longitude": dest[0], "latitude": dest[1]}
+            )
+        db.add(order)
+    db.commit()
+
+    result = EtaUtils.estimate_staff_queue(db, Decimal(11), now=NOW)
+    assert result["origin"]["longitude"] == pytest.approx(CENTER_LON, abs=1e-5)
+    assert [order["order_id"] for order in result["orders"]] == ["1"]
+    assert result["unplanned"] == ["2"]
+    assert not result["truncated"]
+
+
+def test_staff_eta_rejects_invalid_coordinates(monkeypatch):
+    calls = []
+    monkeypatch.setattr(AuthUtils, "verify_token", staticmethod(lambda token: {"role": "staff", "user_id": "11"}))
+    monkeypatch.setattr(order_api, "get_request_session", lambda: None)
+    monkeypatch.setattr(
+        EtaUtils, "estimate_staff_queue", staticmethod(lambda db, staff_id, lng, lat: calls.append((lng, lat)) or {})
+    )
+    app = Flask(__name__)
+    app.register_blueprint(order_api.order_bp, url_prefix="/api/order")
+    client = app.test_client()
+
+    for query in ["lng=abc&lat=31.2", "lng=104.0", "lat=31.2", "lng=190&lat=31.2", "lng=104.0&lat=nan"]:
+        assert client.get(f"/api/order/staff/eta?{query}").status_code == 400, query
+    assert calls == []
+
+    assert client.get("/api/order/staff/eta?lng=104.5&lat=31.2").status_code == 200
+    assert client.get("/api/order/staff/eta").status_code == 200
+    assert calls == [(104.5, 31.2), (None, None)]
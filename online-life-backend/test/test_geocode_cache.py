@@ -0,0 +1,110 @@
+from decimal import Decimal
+
+import pytest
+import requests
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base, Orders, User
+from utils import map_utils
+from utils.map_utils import MapUtils
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+        self.text = str(payload)
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture
+def amap(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(map_utils, "get_db_session", Session)
+    map_utils._geocode_cache.clear()
+
+    calls = []
+    known = {"四川大学江安校区": "104.003,30.558"}
+
+    def fake_get(url, params=None, **kwargs):
+        calls.append(params["address"])
+        if params["address"] == "timeout":
+            raise requests.Timeout("timeout")
+        location = known.get(params["address"])
+        if location:
+            return FakeResponse({"status": "1", "geocodes": [{"location": location}]})
+        return FakeResponse({"status": "1", "geocodes": []})
+
+    monkeypatch.setattr(map_utils._map_client.session, "get", fake_get)
+    map_utils._map_client.breaker.record_success()
+    yield calls, Session
+    map_utils._geocode_cache.clear()
+
+
+def test_memory_and_store_hits(amap):
+    calls, _ = amap
+
+    coords = MapUtils.geocode("四川大学江安校区")
+    assert coords == {"longitude": 104.003, "latitude": 30.558}
+    # 规范化后相同的地址直接命中进程内缓存
+    assert MapUtils.geocode(" 四川大学江安校区 ") == coords
+    assert len(calls) == 1
+
+    # 模拟 worker 重启：进程内缓存丢失，从持久缓存读取
+    map_utils._geocode_cache.clear()
+    assert MapUtils.geocode("四川大学江安校区") == coords
+    assert len(calls) == 1
+
+
+def test_negative_results_are_cached_but_errors_are_not(amap):
+    calls, _ = amap
+
+    assert MapUtils.geocode("不存在的地址") is None
+    assert MapUtils.geocode("不存在的地址") is None
+    map_utils._geocode_cache.clear()
+    assert MapUtils.geocode("不存在的地址") is None
+    assert calls == ["不存在的地址"]
+
+    assert MapUtils.geocode("timeout") is None
+    assert MapUtils.geocode("timeout") is None
+    assert calls.count("timeout") == 2
+
+
+def test_warm_up_geocodes_distinct_addresses(amap):
+    calls, Session = amap
+    db = Session()
+    for i, address in enumerate(["四川大学江安校区", "四川大学江安校区", "不存在的地址"]):
+        db.add(User(UserID=Decimal(i + 1), Username=f"u{i}", Password="", Email="", Phone="", Address=address, Role="client"))
+    db.add(
+        Orders(
+            OrderID=Decimal(1),
+            ClientID=Decimal(1),
+            OrderType="immediate",
+            OrderStatus="pending",
+            CreationTime="",
+            CompletionTime="",
+            EstimatedTime="",
+            AssignmentType="direct",
+            AssignmentStatus="open",
+            OrderLocation="",
+            Amount="0",
+            ShopAddress="四川大学江安校区",
+        )
+    )
+    db.commit()
+
+    result = MapUtils.warm_geocode_cache(db)
+    db.close()
+
+    assert result == {"total": 2, "resolved": 1, "failed": 1}
+    assert len(calls) == 2
+    stats = MapUtils.get_geocode_cache_stats()
+    assert stats["memory"]["size"] == 2
@@ -0,0 +1,96 @@
+import threading
+from collections import Counter
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func
+
+from models import GroupTask, GroupTaskUser, Task, TaskParticipant
+from utils.task_utils import TaskUtils
+
+GROUP = Decimal(1)
+JOINERS = 500
+
+
+@pytest.fixture
+def session_factory(session_factory, small_ids):
+    # 文件数据库 + 每个会话独立连接，模拟多个请求并发访问
+    db = session_factory()
+    db.add(GroupTask(GroupTaskID=GROUP, JoinTime="2025-06-01 10:00:00", endTime=""))
+    db.add(Task(
+        TaskID=Decimal(1), TaskType="group", Description="", EstimatedTime="", ActualTime="",
+        CurrentBidder="", BidDeadline="", GroupTaskID=GROUP, TaskLocation="", MaxParticipants=5,
+        Status="recruiting", ActiveParticipants=1,
+    ))
+    db.add(GroupTaskUser(UserID=Decimal(1), TaskID=Decimal(1), GroupTaskID=GROUP))
+    db.add(TaskParticipant(UserID=Decimal(1), TaskID=Decimal(1), JoinTime="", Status="active"))
+    db.commit()
+    db.close()
+    return session_factory
+
+
+def run_concurrently(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        barrier.wait()
+        results[index] = target(index)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def join(factory, user_id):
+    db = factory()
+    try:
+        return TaskUtils.join_group_task_with_auto_assignment(db, Decimal(user_id), GROUP)
+    finally:
+        db.close()
+
+
+def test_concurrent_joins_never_overfill(session_factory):
+    results = run_concurrently(JOINERS, lambda i: join(session_factory, 100 + i))
+    assert all(results)
+
+    db = session_factory()
+    try:
+        counts = dict(
+            db.query(TaskParticipant.TaskID, func.count())
+            .filter(TaskParticipant.Status == "active")
+            .group_by(TaskParticipant.TaskID)
+            .all()
+        )
+        tasks = {task.TaskID: task for task in db.query(Task).filter(Task.GroupTaskID == GROUP)}
+        members = Counter(user_id for (user_id,) in db.query(GroupTaskUser.UserID))
+    finally:
+        db.close()
+
+    total = JOINERS + 1
+    assert sum(counts.values()) == total
+    assert max(counts.values()) <= 5
+    # 没有重复创建子任务：恰好 ceil(501 / 5) 个，除最后一个外全部满员并开放竞标
+    assert len(tasks) == -(-total // 5)
+    not_full = [task_id for task_id, task in tasks.items() if task.Status != "full"]
+    assert len(not_full) <= 1
+    for task_id in not_full:
+        assert counts.get(task_id, 0) < 5
+    assert all(task.BidDeadline for task in tasks.values() if task.Status == "full")
+    # 冗余计数与实际参与记录一致
+    assert {task_id: task.ActiveParticipants for task_id, task in tasks.items()} == counts
+    assert set(members.values()) == {1}
+
+
+def test_same_user_joining_twice_concurrently_is_admitted_once(session_factory):
+    results = run_concurrently(20, lambda i: join(session_factory, 7))
+    assert sum(1 for result in results if result) == 1
+
+    db = session_factory()
+    try:
+        assert db.query(GroupTaskUser).filter(GroupTaskUser.UserID == Decimal(7)).count() == 1
+    finally:
+        db.close()
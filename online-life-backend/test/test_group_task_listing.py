@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from models import GroupTask, GroupTaskUser, Task
+from utils.task_utils import TaskUtils
+
+
+@pytest.fixture
+def db(db):
+    # 20个团办任务，每个任务参与人数为 1~4 人
+    for i in range(1, 21):
+        db.add(GroupTask(GroupTaskID=Decimal(i), JoinTime="2025-06-01 10:00:00", endTime=""))
+        db.add(
+            Task(
+                TaskID=Decimal(i),
+                TaskType="group",
+                Description=f"task {i}",
+                EstimatedTime="",
+                ActualTime="",
+                CurrentBidder="",
+                BidDeadline="",
+                GroupTaskID=Decimal(i),
+                TaskLocation="",
+                MaxParticipants=5,
+                Status="recruiting",
+            )
+        )
+        for user_id in range(1, i % 4 + 2):
+            db.add(
+                GroupTaskUser(UserID=Decimal(100 + user_id), TaskID=Decimal(i), GroupTaskID=Decimal(i))
+            )
+    db.commit()
+    return db
+
+
+def count_statements(db, func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, len(statements)
+
+
+@pytest.mark.parametrize(
+    "listing",
+    [
+        lambda db, per_page: TaskUtils.get_group_tasks(db, 1, per_page),
+        lambda db, per_page: TaskUtils.get_user_group_tasks(db, Decimal(101), 1, per_page),
+        lambda db, per_page: TaskUtils.get_available_group_tasks_for_users(db, 1, per_page),
+    ],
+    ids=["get_group_tasks", "get_user_group_tasks", "get_available_group_tasks_for_users"],
+)
+def test_listing_query_count_is_constant(db, listing):
+    counts = set()
+    for per_page in (1, 5, 20):
+        result, statements = count_statements(db, lambda: listing(db, per_page))
+        assert len(result["tasks"]) == per_page
+        counts.add(statements)
+
+    assert len(counts) == 1
+
+
+def test_group_tasks_participant_stats(db):
+    result = TaskUtils.get_group_tasks(db, 1, 20)
+
+    for item in result["tasks"]:
+        expected = int(item["group_task_id"]) % 4 + 1
+        assert item["participant_count"] == expected
+        assert item["main_participant_id"] == "101"
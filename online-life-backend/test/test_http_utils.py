@@ -0,0 +1,81 @@
+import time
+
+import pytest
+import requests
+
+from benchmark.amap_stub import AmapStubServer
+from utils.http_utils import CircuitBreaker, CircuitOpenError, HttpClient
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"status": "1"}
+
+
+def test_circuit_breaker_opens_and_recovers(monkeypatch):
+    client = HttpClient(failure_threshold=3, reset_timeout=0.05)
+    calls = []
+    state = {"fail": True}
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(timeout)
+        if state["fail"]:
+            raise requests.ConnectionError("down")
+        return FakeResponse()
+
+    monkeypatch.setattr(client.session, "get", fake_get)
+
+    for _ in range(3):
+        with pytest.raises(requests.ConnectionError):
+            client.get_json("http://amap.test/v3/geocode/geo")
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    # 熔断期间不发出请求
+    with pytest.raises(CircuitOpenError):
+        client.get_json("http://amap.test/v3/geocode/geo")
+    assert len(calls) == 3
+
+    time.sleep(0.06)
+    state["fail"] = False
+    assert client.get_json("http://amap.test/v3/geocode/geo") == {"status": "1"}
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert calls[-1] == (2, 5)
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.fixture
+def stub():
+    server = AmapStubServer().start()
+    yield server
+    server.stop()
+
+
+def test_retry_layer_retries_server_errors_but_not_read_timeouts(stub):
+    client = HttpClient(timeout=0.3, retries=2, backoff_factor=0, failure_threshold=100)
+    url = f"{stub.base_url}/v3/geocode/geo"
+
+    stub.error_rate = 1.0
+    with pytest.raises(requests.HTTPError):
+        client.get_json(url, params={"address": "四川大学"})
+    assert stub.request_count == 3
+
+    stub.error_rate = 0.0
+    stub.latency = 2.0
+    started = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        client.get_json(url, params={"address": "四川大学"})
+    assert time.perf_counter() - started < 1.0
+    assert stub.request_count == 4
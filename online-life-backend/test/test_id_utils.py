@@ -0,0 +1,70 @@
+import multiprocessing
+import time
+
+import pytest
+
+import config
+from utils.id_utils import MAX_WORKER_ID, IdUtils, SnowflakeGenerator, _default_worker_id
+
+PROCESSES = 4
+IDS_PER_PROCESS = 50000
+
+
+def generate_ids(worker_id, queue):
+    generator = IdUtils.configure(worker_id)
+    queue.put([generator.next_id() for _ in range(IDS_PER_PROCESS)])
+
+
+def test_ids_are_time_ordered_and_parseable():
+    generator = SnowflakeGenerator(7)
+    ids = [generator.next_id() for _ in range(10000)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert max(ids) < 2 ** 63
+
+    parts = IdUtils.parse_id(ids[-1])
+    assert parts["worker_id"] == 7
+    assert abs(parts["timestamp"] - time.time() * 1000) < 5000
+
+
+def test_no_duplicates_across_processes():
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    workers = [
+        ctx.Process(target=generate_ids, args=(worker_id, queue))
+        for worker_id in range(MAX_WORKER_ID - PROCESSES + 1, MAX_WORKER_ID + 1)
+    ]
+    for worker in workers:
+        worker.start()
+    results = [queue.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=60)
+
+    all_ids = [id_value for ids in results for id_value in ids]
+    assert len(all_ids) == PROCESSES * IDS_PER_PROCESS
+    assert len(set(all_ids)) == len(all_ids)
+
+    # 宽松的速率检查：按ID中的时间戳而非墙钟计算，每个进程平均每毫秒至少生成2个ID
+    for ids in results:
+        millis = {IdUtils.parse_id(id_value)["timestamp"] for id_value in ids}
+        assert len(millis) < IDS_PER_PROCESS // 2
+        assert max(IdUtils.parse_id(id_value)["sequence"] for id_value in ids) > 1
+
+
+def test_worker_id_must_be_configured_in_production(monkeypatch):
+    monkeypatch.setenv("ID_WORKER_ID", "42")
+    monkeypatch.setattr(config, "APP_ENV", "production")
+    assert _default_worker_id() == 42
+
+    monkeypatch.setenv("ID_WORKER_ID", str(MAX_WORKER_ID + 1))
+    with pytest.raises(ValueError):
+        _default_worker_id()
+
+    monkeypatch.delenv("ID_WORKER_ID")
+    with pytest.raises(RuntimeError):
+        _default_worker_id()
+
+    # 开发环境未配置时使用推导的机器ID
+    monkeypatch.setattr(config, "APP_ENV", "development")
+    assert 0 <= _default_worker_id() <= MAX_WORKER_ID
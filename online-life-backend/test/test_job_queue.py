@@ -0,0 +1,163 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import config
+from models import Job, Orders, Points, PointsTransaction
+from utils.job_utils import JobUtils, JobWorkerPool
+from utils.order_utils import OrderUtils
+from utils.points_utils import PointsUtils
+
+CLIENT = Decimal(1)
+LATER = datetime.now() + timedelta(days=1)
+
+
+@pytest.fixture
+def session_factory(session_factory, monkeypatch):
+    # worker 线程各自使用独立连接，使用文件数据库
+    monkeypatch.setattr(config, "JOB_WORKERS_ENABLED", True)
+    JobUtils.reset_metrics()
+    return session_factory
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    session.add(Points(UserID=CLIENT, Points="100"))
+    session.add(Orders(
+        OrderID=Decimal(10), ClientID=CLIENT, OrderType="immediate", OrderStatus="completed",
+        CreationTime="2025-06-01 10:00:00", CompletionTime="", EstimatedTime="2700",
+        AssignmentType="direct", AssignmentStatus="assigned", OrderLocation="", Amount="12.5",
+    ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def balance(db):
+    db.expire_all()
+    return int(db.get(Points, CLIENT).Points)
+
+
+def test_payment_reward_is_queued_once(db):
+    result = OrderUtils.process_payment(db, Decimal(10), CLIENT, {"payment_method": "alipay", "amount": 12.5})
+    assert result["points_earned"] == 1200
+    assert balance(db) == 100
+    assert JobUtils.get_queue_depth(db)["pending"] == 1
+
+    # 重复支付不会再次奖励
+    result = OrderUtils.process_payment(db, Decimal(10), CLIENT, {"payment_method": "alipay", "amount": 12.5})
+    assert "points_earned" not in result
+    assert db.query(Job).count() == 1
+
+    assert JobUtils.run_pending(db) == {"claimed": 1, "done": 1, "retry": 0, "failed": 0, "conflict": 0}
+    assert balance(db) == 1300
+    assert db.query(PointsTransaction).count() == 1
+    assert JobUtils.run_pending(db)["claimed"] == 0
+
+    metrics = JobUtils.get_metrics(db)
+    assert metrics["totals"]["succeeded"] == 1 and metrics["totals"]["duplicates"] == 1
+    assert metrics["queue"]["pending"] == 0 and metrics["latency"]["p50"] is not None
+
+
+def test_inline_execution_without_workers(db, monkeypatch):
+    monkeypatch.setattr(config, "JOB_WORKERS_ENABLED", False)
+    OrderUtils.process_payment(db, Decimal(10), CLIENT, {"payment_method": "alipay", "amount": 12.5})
+    assert balance(db) == 1300
+    assert db.query(Job).one().Status == "done"
+
+
+def test_failed_job_retries_with_backoff_then_fails(db, monkeypatch):
+    calls = []
+
+    def flaky(session, payload):
+        calls.append(payload)
+        PointsUtils._credit_points(session, CLIENT, 1, "flaky")
+        raise RuntimeError("upstream down")
+
+    JobUtils.register_handler("test.flaky", flaky)
+    monkeypatch.setattr(config, "JOB_RETRY_BACKOFF", 10)
+    JobUtils.enqueue(db, "test.flaky", {"n": 1}, max_attempts=2)
+    db.commit()
+
+    assert JobUtils.run_pending(db)["retry"] == 1
+    job = db.query(Job).one()
+    assert (job.Status, job.Attempts, job.LastError) == ("pending", 1, "upstream down")
+    assert job.AvailableAt > datetime.now() + timedelta(seconds=5)
+    assert JobUtils.run_pending(db)["claimed"] == 0  # 退避期间不执行
+
+    assert JobUtils.run_pending(db, now=LATER)["failed"] == 1
+    db.expire_all()
+    assert db.query(Job).one().Status == "failed"
+    assert len(calls) == 2
+    assert balance(db) == 100  # 失败的执行已回滚
+    assert JobUtils.get_queue_depth(db)["depth"]["failed"] == {"test.flaky": 1}
+
+
+def test_expired_lease_is_reclaimed_and_stale_worker_conflicts(db, session_factory):
+    JobUtils.enqueue(db, "points.credit", {"user_id": "1", "points": 5, "reason": "test"})
+    db.commit()
+    stale = JobUtils.claim(db)[0]
+    assert JobUtils.claim(db) == []
+
+    other = session_factory()
+    try:
+        lease_expired = LATER + timedelta(seconds=config.JOB_LEASE_SECONDS)
+        assert JobUtils.run_pending(other, now=lease_expired)["done"] == 1
+    finally:
+        other.close()
+    assert JobUtils.run_job(db, stale) == "conflict"
+    assert balance(db) == 105
+
+
+def test_worker_pool_runs_jobs_after_commit(db, session_factory):
+    pool = JobWorkerPool(session_factory, workers=2, poll_interval=30).start()
+    try:
+        for i in range(5):
+            JobUtils.enqueue(db, "points.credit", {"user_id": "1", "points": 10, "reason": f"test {i}"})
+        db.commit()
+
+        deadline = time.time() + 5
+        while time.time() < deadline and balance(db) != 150:
+            time.sleep(0.05)
+        assert balance(db) == 150
+    finally:
+        pool.stop()
+    assert {job.Status for job in db.query(Job)} == {"done"}
+
+
+def test_concurrent_enqueue_with_same_key_keeps_both_transactions(db, session_factory):
+    barrier = threading.Barrier(4)
+    results = []
+    errors = []
+
+    def pay(index):
+        session = session_factory()
+        try:
+            barrier.wait()
+            job = JobUtils.enqueue(
+                session, "points.credit", {"user_id": "1", "points": 10, "reason": "test"},
+                idempotency_key="order-payment-reward:10",
+            )
+            # 调用方同一事务中的其他修改
+            session.add(Points(UserID=Decimal(100 + index), Points="1"))
+            session.commit()
+            results.append(job is not None)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=pay, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(results) == [False, False, False, True]
+    assert db.query(Job).count() == 1
+    assert db.query(Points).count() == 5
@@ -0,0 +1,51 @@
+from sqlalchemy import create_engine, inspect, text
+
+from migrations.check_indexes import find_full_scans
+from utils.migration_utils import MigrationUtils
+
+
+def test_hot_queries_use_indexes(engine):
+    assert find_full_scans(engine) == {}
+
+
+def test_full_scan_is_reported(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_user_email"))
+    assert "按邮箱查找用户" in find_full_scans(engine)
+
+
+def test_migrate_applies_pending_versions_in_order(tmp_path):
+    (tmp_path / "V002__add_index.sql").write_text(
+        "-- 注释\nCREATE INDEX idx_demo_name ON demo (name);\n", encoding="utf-8"
+    )
+    (tmp_path / "V001__create_demo.sql").write_text(
+        "CREATE TABLE demo (id INTEGER PRIMARY KEY, name TEXT);\nINSERT INTO demo VALUES (1, 'a');\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "README.txt").write_text("ignored", encoding="utf-8")
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+
+    assert MigrationUtils.migrate(engine, dry_run=True, migrations_dir=str(tmp_path)) == [1, 2]
+    assert MigrationUtils.migrate(engine, target=1, migrations_dir=str(tmp_path)) == [1]
+    assert MigrationUtils.migrate(engine, migrations_dir=str(tmp_path)) == [2]
+    assert MigrationUtils.migrate(engine, migrations_dir=str(tmp_path)) == []
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("demo")}
+    assert "idx_demo_name" in indexes
+    status = MigrationUtils.get_status(engine, migrations_dir=str(tmp_path))
+    assert [item["applied"] for item in status] == [True, True]
+    assert not any(item["modified"] for item in status)
+
+    (tmp_path / "V002__add_index.sql").write_text("-- 修改\n", encoding="utf-8")
+    status = MigrationUtils.get_status(engine, migrations_dir=str(tmp_path))
+    assert status[1]["modified"]
+
+
+def test_mark_applied_skips_manual_migration(tmp_path):
+    (tmp_path / "V001__create_demo.sql").write_text("CREATE TABLE demo (id INTEGER PRIMARY KEY);", encoding="utf-8")
+    engine = create_engine("sqlite://")
+
+    assert MigrationUtils.mark_applied(engine, [1], migrations_dir=str(tmp_path)) == [1]
+    assert MigrationUtils.mark_applied(engine, [1], migrations_dir=str(tmp_path)) == []
+    assert MigrationUtils.migrate(engine, migrations_dir=str(tmp_path)) == []
+    assert not inspect(engine).has_table("demo")
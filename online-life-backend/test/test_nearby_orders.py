@@ -0,0 +1,105 @@
+import math
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+import api.order_api as order_api
+from models import Orders, User
+from utils.auth_utils import AuthUtils
+from utils.map_utils import METERS_PER_DEGREE, MapUtils
+from utils.order_utils import OrderUtils
+
+CENTER_LON, CENTER_LAT = 104.0665, 30.5728
+CLIENT = Decimal(1)
+
+
+def offset(east_m, north_m):
+    """中心点向东、向北偏移若干米后的坐标"""
+    lat = CENTER_LAT + north_m / METERS_PER_DEGREE
+    lon = CENTER_LON + east_m / (METERS_PER_DEGREE * math.cos(math.radians(CENTER_LAT)))
+    return {"longitude": lon, "latitude": lat}
+
+
+@pytest.fixture
+def db(db):
+    db.add(User(UserID=CLIENT, Username="client", Password="", Email="", Phone="", Address="", Role="client"))
+    db.commit()
+    return db
+
+
+def add_order(db, order_id, coords, status="pending"):
+    order = Orders(
+        OrderID=Decimal(order_id), ClientID=CLIENT, OrderType="immediate", OrderStatus=status,
+        CreationTime="2025-06-01 10:00:00", CompletionTime="", EstimatedTime="2700",
+        AssignmentType="direct", AssignmentStatus="open" if status == "pending" else "assigned",
+        OrderLocation="", ShopAddress="", Amount="0",
+    )
+    OrderUtils.set_order_coordinates(order, coords, coords)
+    db.add(order)
+
+
+def test_geohash_encode_known_value():
+    assert MapUtils.geohash_encode(-5.6, 42.6, 5) == "ezs42"
+    assert MapUtils.geohash_encode(CENTER_LON, CENTER_LAT).startswith("wm6jb")
+
+
+def test_geohash_cover_contains_nearby_points():
+    prefixes = MapUtils.geohash_cover(CENTER_LON, CENTER_LAT, 1000)
+    assert len(prefixes) <= 16
+    for east, north in [(0, 0), (900, 0), (-700, 700), (0, -990)]:
+        point = offset(east, north)
+        geohash = MapUtils.geohash_encode(point["longitude"], point["latitude"])
+        assert any(geohash.startswith(prefix) for prefix in prefixes)
+
+
+def test_nearby_orders_sorted_and_filtered(db):
+    add_order(db, 1, offset(1500, 0))
+    add_order(db, 2, offset(0, 300))
+    add_order(db, 3, offset(-800, -800))
+    add_order(db, 4, offset(2500, 2500))  # 超出 3 公里
+    add_order(db, 5, offset(100, 0), status="assigned")  # 已被接单
+    add_order(db, 6, None)  # 历史订单没有坐标
+    db.commit()
+
+    result = OrderUtils.get_nearby_available_orders(db, CENTER_LON, CENTER_LAT, radius=3000)
+    assert [order["order_id"] for order in result["orders"]] == ["2", "3", "1"]
+    distances = [order["distance"] for order in result["orders"]]
+    assert abs(distances[0] - 300) < 5
+    assert distances == sorted(distances)
+
+    limited = OrderUtils.get_nearby_available_orders(db, CENTER_LON, CENTER_LAT, radius=3000, limit=2)
+    assert [order["order_id"] for order in limited["orders"]] == ["2", "3"]
+
+
+def test_create_order_persists_coordinates(db):
+    shop = offset(200, 0)
+    order_id = OrderUtils.create_order(
+        db, CLIENT, {"order_type": "immediate", "orderlocation": "收货地址", "shop_address": "商家地址"},
+        estimated_time=600, shop_coords=shop, order_coords=offset(0, 500),
+    )
+    order = db.get(Orders, order_id)
+    assert float(order.ShopLongitude) == pytest.approx(shop["longitude"], abs=1e-6)
+    assert order.ShopGeoHash == MapUtils.geohash_encode(shop["longitude"], shop["latitude"])
+    assert order.OrderLatitude is not None
+
+
+def test_available_map_rejects_invalid_coordinates(monkeypatch):
+    calls = []
+    monkeypatch.setattr(AuthUtils, "verify_token", staticmethod(lambda token: {"role": "staff", "user_id": "11"}))
+    monkeypatch.setattr(order_api, "get_request_session", lambda: None)
+    monkeypatch.setattr(
+        OrderUtils, "get_nearby_available_orders", staticmethod(lambda db, lng, lat, *args: calls.append((lng, lat)) or {})
+    )
+    monkeypatch.setattr(OrderUtils, "get_available_orders_map", staticmethod(lambda *args: calls.append("list") or {}))
+    app = Flask(__name__)
+    app.register_blueprint(order_api.order_bp, url_prefix="/api/order")
+    client = app.test_client()
+
+    for query in ["lng=abc&lat=xyz", "lng=abc&lat=31.2", "lng=104.0", "lat=", "lng=104.0&lat=91"]:
+        assert client.get(f"/api/order/available-map?{query}").status_code == 400, query
+    assert calls == []
+
+    assert client.get("/api/order/available-map?lng=104.5&lat=31.2").status_code == 200
+    assert client.get("/api/order/available-map").status_code == 200
+    assert calls == [(104.5, 31.2), "list"]
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+import config
+from models import Orders
+from utils.map_utils import MapUtils
+from utils.order_utils import OrderUtils, OrderValidationError
+from utils.pricing_utils import PricingUtils
+
+CLIENT = Decimal(1)
+SHOP = {"longitude": 104.0, "latitude": 30.5}
+HOME = {"longitude": 104.01, "latitude": 30.51}
+ORDER_DATA = {"order_type": "immediate", "orderlocation": "收货地址", "shop_address": "商家地址"}
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    # SQLite 的 DECIMAL 按浮点数存储，测试中使用小整数ID
+    ids = iter(range(1000, 2000))
+    monkeypatch.setattr(OrderUtils, "generate_order_id", staticmethod(lambda: Decimal(next(ids))))
+    monkeypatch.setattr(MapUtils, "geocode_many", staticmethod(lambda addresses: [SHOP, HOME]))
+    monkeypatch.setattr(
+        MapUtils, "estimate_delivery_time",
+        staticmethod(lambda shop_address, delivery_address: {
+            "total_time": 2400, "distance": 3500, "status": "calculated",
+        }),
+    )
+    return db
+
+
+def test_quote_rounds_to_cents():
+    assert PricingUtils.quote("immediate", 2700)["delivery_fee"] == Decimal("6.75")
+    assert PricingUtils.quote("immediate", None)["delivery_fee"] == Decimal("6.75")
+    assert PricingUtils.quote("immediate", 3000, 3500, PricingUtils.get("distance"))["delivery_fee"] == Decimal("6.50")
+    with pytest.raises(ValueError):
+        PricingUtils.get("unknown")
+
+
+def test_place_order_writes_fee_in_one_commit(db):
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(1))
+
+    result = OrderUtils.place_order(db, CLIENT, ORDER_DATA)
+    assert result == {"order_id": "1000", "delivery_fee": 6.0, "estimated_time": 40}
+    assert len(commits) == 1
+
+    order = db.get(Orders, Decimal(1000))
+    assert order.Amount == "6.00" and order.AmountValue == Decimal("6.00")
+    assert order.EstimatedTime == "2400"
+    assert order.ShopGeoHash is not None
+
+
+def test_place_order_uses_configured_or_given_pricing(db, monkeypatch):
+    monkeypatch.setattr(config, "ORDER_PRICING", "distance")
+    assert OrderUtils.place_order(db, CLIENT, ORDER_DATA)["delivery_fee"] == 6.5
+
+    flat = OrderUtils.place_order(db, CLIENT, ORDER_DATA, pricing=lambda quote: Decimal("9.999"))
+    assert flat["delivery_fee"] == 10.0
+
+
+def test_place_order_validation_errors_write_nothing(db, monkeypatch):
+    monkeypatch.setattr(MapUtils, "geocode_many", staticmethod(lambda addresses: [SHOP, None]))
+    with pytest.raises(OrderValidationError):
+        OrderUtils.place_order(db, CLIENT, ORDER_DATA)
+    with pytest.raises(OrderValidationError):
+        OrderUtils.place_order(db, CLIENT, dict(ORDER_DATA, order_type="someday"))
+    assert db.query(Orders).count() == 0
@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from models import Orders, Staff
+from utils import order_utils
+from utils.order_utils import OrderUtils
+
+CLIENT = Decimal(1)
+STAFF = Decimal(2)
+
+
+def make_order(order_id, status, staff_id=None):
+    return Orders(
+        OrderID=Decimal(order_id),
+        ClientID=CLIENT,
+        OrderType="immediate",
+        OrderStatus=status,
+        CreationTime="2025-06-01 10:00:00",
+        CompletionTime="",
+        EstimatedTime="2700",
+        AssignmentType="direct",
+        AssignmentStatus="open" if status == "pending" else "assigned",
+        OrderLocation="",
+        StaffID=staff_id,
+        Amount="0",
+    )
+
+
+@pytest.fixture
+def db(db):
+    statuses = ["pending"] * 3 + ["assigned"] * 2 + ["completed", "paid", "cancelled"]
+    for i, status in enumerate(statuses, start=1):
+        db.add(make_order(i, status, STAFF if status in ("assigned", "completed", "paid") else None))
+    db.add(Staff(UserID=STAFF, Username="staff", Password="", Email="", Phone="", Address="", Role="staff", StaffID=STAFF, Salary="0"))
+    db.commit()
+    order_utils._order_stats_cache.clear()
+    return db
+    order_utils._order_stats_cache.clear()
+
+
+def count_statements(db, func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, len(statements)
+
+
+def test_client_statistics_single_query(db):
+    result, statements = count_statements(db, lambda: OrderUtils.get_order_statistics(db, CLIENT, use_cache=False))
+
+    assert statements == 1
+    assert result == {
+        "total_orders": 8,
+        "pending_orders": 3,
+        "assigned_orders": 2,
+        "paid_orders": 1,
+        "completed_orders": 1,
+        "cancelled_orders": 1,
+    }
+
+
+def test_staff_statistics(db):
+    result = OrderUtils.get_staff_order_statistics(db, STAFF, use_cache=False)
+
+    assert result == {
+        "total_orders": 4,
+        "assigned_orders": 2,
+        "completed_orders": 1,
+        "paid_orders": 1,
+        "cancelled_orders": 0,
+    }
+
+
+def test_cache_is_invalidated_by_order_changes(db):
+    OrderUtils.get_order_statistics(db, CLIENT)
+    OrderUtils.get_staff_order_statistics(db, STAFF)
+    _, statements = count_statements(db, lambda: OrderUtils.get_order_statistics(db, CLIENT))
+    assert statements == 0
+
+    OrderUtils.accept_order(db, Decimal(1), STAFF)
+    assert OrderUtils.get_order_statistics(db, CLIENT)["pending_orders"] == 2
+    assert OrderUtils.get_staff_order_statistics(db, STAFF)["assigned_orders"] == 3
+
+    OrderUtils.complete_order(db, Decimal(1), STAFF)
+    assert OrderUtils.get_staff_order_statistics(db, STAFF)["completed_orders"] == 2
+
+    OrderUtils.cancel_order(db, Decimal(2), CLIENT)
+    assert OrderUtils.get_order_statistics(db, CLIENT)["cancelled_orders"] == 2
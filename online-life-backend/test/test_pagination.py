@@ -0,0 +1,104 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import config
+from models import BidRecord, Orders, Task
+from utils.order_utils import OrderUtils
+from utils.pagination_utils import InvalidCursorError, PaginationUtils
+from utils.task_utils import TaskUtils
+
+CLIENT = Decimal(1)
+
+
+@pytest.fixture
+def db(db):
+    for i in range(1, 24):
+        # 每 3 个订单同一创建时间，检验排序键相同时不重不漏
+        db.add(Orders(
+            OrderID=Decimal(i), ClientID=CLIENT, OrderType="immediate", OrderStatus="pending",
+            CreationTime=f"2025-06-01 10:{i // 3:02d}:00", CompletionTime="", EstimatedTime="2700",
+            AssignmentType="direct", AssignmentStatus="open", OrderLocation="", Amount="0",
+        ))
+    db.commit()
+    return db
+
+
+def test_cursor_round_trip():
+    values = [datetime(2025, 6, 1, 10, 0, 0, 123456), Decimal("1748491837027703"), "2025-06-01 10:00:00", 7]
+    cursor = PaginationUtils.encode_cursor(values)
+    assert PaginationUtils.decode_cursor(cursor, 4) == values
+
+    with pytest.raises(InvalidCursorError):
+        PaginationUtils.decode_cursor("not-a-cursor", 4)
+    with pytest.raises(InvalidCursorError):
+        PaginationUtils.decode_cursor(cursor, 2)
+
+
+def test_cursor_pages_match_offset_order(db):
+    offset_ids = [
+        order["order_id"] for order in OrderUtils.get_user_orders(db, CLIENT, 1, 100)["orders"]
+    ]
+
+    cursor_ids = []
+    cursor = ""
+    while cursor is not None:
+        result = OrderUtils.get_user_orders(db, CLIENT, per_page=5, cursor=cursor)
+        cursor_ids.extend(order["order_id"] for order in result["orders"])
+        pagination = result["pagination"]
+        assert pagination["total"] is None
+        cursor = pagination["next_cursor"]
+        assert pagination["has_next"] == (cursor is not None)
+
+    assert cursor_ids == offset_ids
+    assert len(cursor_ids) == 23
+
+
+def test_offset_mode_keeps_page_fields(db):
+    pagination = OrderUtils.get_user_orders(db, CLIENT, 2, 10)["pagination"]
+    assert pagination["current_page"] == 2
+    assert pagination["total"] == 23
+    assert pagination["total_pages"] == 3
+    assert pagination["has_next"] and pagination["has_prev"]
+    assert pagination["next_cursor"]
+
+
+def test_approximate_count_is_capped(db, monkeypatch):
+    monkeypatch.setattr(config, "PAGINATION_COUNT_LIMIT", 10)
+    pagination = OrderUtils.get_user_orders(db, CLIENT, per_page=5, cursor="", count="approximate")["pagination"]
+    assert pagination["total"] == 10
+    assert pagination["total_is_estimate"]
+
+    monkeypatch.setattr(config, "PAGINATION_COUNT_LIMIT", 100)
+    pagination = OrderUtils.get_user_orders(db, CLIENT, per_page=5, cursor="", count="approximate")["pagination"]
+    assert pagination["total"] == 23
+    assert "total_is_estimate" not in pagination
+
+
+def test_invalid_cursor_is_not_swallowed(db):
+    with pytest.raises(InvalidCursorError):
+        OrderUtils.get_user_orders(db, CLIENT, cursor="bogus")
+    with pytest.raises(InvalidCursorError):
+        TaskUtils.get_user_bids(db, CLIENT, cursor="bogus")
+
+
+def test_user_bids_cursor(db):
+    for i in range(1, 8):
+        db.add(Task(
+            TaskID=Decimal(i), TaskType="errand", Description="", EstimatedTime="", ActualTime="",
+            CurrentBidder="", BidDeadline="", GroupTaskID=Decimal(1), TaskLocation="", Status="full",
+        ))
+        db.add(BidRecord(
+            UserID=CLIENT, TaskID=Decimal(i), BidID=Decimal(i),
+            BidTime=f"2025-06-01 10:0{i // 2}:00", BidStatus="pending",
+        ))
+    db.commit()
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        result = TaskUtils.get_user_bids(db, CLIENT, per_page=3, cursor=cursor)
+        seen.extend(bid["task_id"] for bid in result["bids"])
+        cursor = result["next_cursor"]
+    assert seen == ["7", "6", "5", "4", "3", "2", "1"]
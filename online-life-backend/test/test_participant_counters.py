@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import update
+
+from models import GroupTask, GroupTaskUser, Task, TaskParticipant
+from utils.task_utils import TaskUtils
+
+GROUP = Decimal(1)
+
+
+@pytest.fixture
+def db(db, small_ids):
+    db.add(GroupTask(GroupTaskID=GROUP, JoinTime="2025-06-01 10:00:00", endTime=""))
+    db.add(Task(
+        TaskID=Decimal(1), TaskType="group", Description="", EstimatedTime="", ActualTime="",
+        CurrentBidder="", BidDeadline="", GroupTaskID=GROUP, TaskLocation="", MaxParticipants=5,
+        Status="recruiting", ActiveParticipants=0,
+    ))
+    db.commit()
+    return db
+
+
+def counters(db):
+    db.expire_all()
+    return {task.TaskID: task.ActiveParticipants for task in db.query(Task).order_by(Task.TaskID)}
+
+
+def test_join_leave_and_reassign_maintain_counter(db):
+    for user_id in range(1, 8):
+        assert TaskUtils.join_group_task_with_auto_assignment(db, Decimal(user_id), GROUP)
+    assert counters(db) == {Decimal(1): 5, Decimal(1000): 2}
+    assert db.get(Task, Decimal(1)).Status == "full"
+
+    # 退出满员任务：原任务减一并重新开放招募，用户被重新分配到另一个子任务
+    result = TaskUtils.leave_specific_task(db, Decimal(1), Decimal(1))
+    assert result["reassigned_task_id"] == "1000"
+    assert counters(db) == {Decimal(1): 4, Decimal(1000): 3}
+    assert db.get(Task, Decimal(1)).Status == "recruiting"
+
+    assert TaskUtils.leave_group_task_completely(db, Decimal(2), GROUP)
+    assert counters(db) == {Decimal(1): 3, Decimal(1000): 3}
+    assert TaskUtils.check_participant_counters(db) == []
+
+
+def test_available_listing_reads_counter(db):
+    for user_id in range(1, 6):
+        TaskUtils.join_group_task_with_auto_assignment(db, Decimal(user_id), GROUP)
+    assert TaskUtils.get_available_group_tasks_for_users(db)["tasks"] == []
+
+    TaskUtils.join_group_task_with_auto_assignment(db, Decimal(6), GROUP)
+    tasks = TaskUtils.get_available_group_tasks_for_users(db)["tasks"]
+    assert [(t["task_id"], t["current_participants"], t["spots_remaining"]) for t in tasks] == [("1000", 1, 4)]
+
+    staff_tasks = TaskUtils.get_full_tasks_for_staff(db)["tasks"]
+    assert [(t["task_id"], t["participants_count"]) for t in staff_tasks] == [("1", 5)]
+
+
+def test_checker_reports_and_repair_fixes_drift(db):
+    for user_id in range(1, 4):
+        TaskUtils.join_group_task_with_auto_assignment(db, Decimal(user_id), GROUP)
+    # 模拟绕过应用直接改数据造成的偏差
+    db.execute(update(Task).where(Task.TaskID == Decimal(1)).values(ActiveParticipants=9))
+    db.add(Task(
+        TaskID=Decimal(2), TaskType="group", Description="", EstimatedTime="", ActualTime="",
+        CurrentBidder="", BidDeadline="", GroupTaskID=GROUP, TaskLocation="", MaxParticipants=5,
+        Status="recruiting", ActiveParticipants=0,
+    ))
+    db.add(TaskParticipant(UserID=Decimal(50), TaskID=Decimal(2), JoinTime="", Status="active"))
+    db.add(GroupTaskUser(UserID=Decimal(50), TaskID=Decimal(2), GroupTaskID=GROUP))
+    db.commit()
+
+    assert TaskUtils.check_participant_counters(db) == [
+        {"task_id": "1", "stored": 9, "actual": 3},
+        {"task_id": "2", "stored": 0, "actual": 1},
+    ]
+    assert TaskUtils.repair_participant_counters(db, batch_size=1) == 2
+    assert TaskUtils.check_participant_counters(db) == []
+    assert counters(db) == {Decimal(1): 3, Decimal(2): 1}
+
+
+def test_full_task_rejects_participant_without_writing(db, monkeypatch):
+    for user_id in range(1, 6):
+        TaskUtils.join_group_task_with_auto_assignment(db, Decimal(user_id), GROUP)
+    full_task = db.get(Task, Decimal(1))
+    with pytest.raises(Exception):
+        TaskUtils._add_participant(db, Decimal(6), full_task)
+    db.rollback()
+
+    # 查找空位时读到过期的计数，加入整体回滚
+    monkeypatch.setattr(TaskUtils, "_find_available_task", staticmethod(lambda *args, **kwargs: full_task))
+    assert TaskUtils.join_group_task_with_auto_assignment(db, Decimal(6), GROUP) is None
+    assert counters(db) == {Decimal(1): 5}
+    assert db.query(TaskParticipant).filter_by(UserID=Decimal(6)).count() == 0
+    assert db.query(GroupTaskUser).filter_by(UserID=Decimal(6)).count() == 0
+    assert TaskUtils.check_participant_counters(db) == []
+
+
+def test_leaving_ended_group_task_is_rejected(db):
+    for user_id in range(1, 3):
+        TaskUtils.join_group_task_with_auto_assignment(db, Decimal(user_id), GROUP)
+    db.execute(update(GroupTask).where(GroupTask.GroupTaskID == GROUP).values(endTime="2025-06-02 10:00:00"))
+    db.commit()
+
+    assert TaskUtils.leave_specific_task(db, Decimal(1), Decimal(1)) is None
+    assert TaskUtils.leave_group_task_completely(db, Decimal(2), GROUP) is None
+    assert counters(db) == {Decimal(1): 2}
+    assert db.query(TaskParticipant).filter_by(Status="active").count() == 2
+    assert db.query(GroupTaskUser).count() == 2
+
+
+def test_leave_with_drifted_counter_logs_warning(db, caplog):
+    for user_id in range(1, 3):
+        TaskUtils.join_group_task_with_auto_assignment(db, Decimal(user_id), GROUP)
+    db.execute(update(Task).where(Task.TaskID == Decimal(1)).values(ActiveParticipants=0))
+    db.commit()
+
+    with caplog.at_level("WARNING", logger="utils.task_utils"):
+        assert TaskUtils.leave_group_task_completely(db, Decimal(1), GROUP)
+    assert "任务 1 参与人数计数已为0" in caplog.text
+    assert counters(db) == {Decimal(1): 0}
@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from models import Points, PointsTransaction
+from utils.points_utils import PointsUtils
+
+
+@pytest.fixture
+def db(db):
+    db.add(Points(UserID=Decimal(1), Points="100"))
+    db.commit()
+    # 尚未回填类型列的旧记录
+    db.execute(Points.__table__.insert().values(UserID=Decimal(2), Points="50", PointsValue=None))
+    db.commit()
+    return db
+
+
+def balances(db):
+    db.expire_all()
+    return {int(p.UserID): (p.Points, p.PointsValue) for p in db.query(Points).order_by(Points.UserID)}
+
+
+def payout(user_ids, points=10):
+    return [{"user_id": Decimal(user_id), "points": points, "reason": "活动奖励"} for user_id in user_ids]
+
+
+def test_bulk_credit_upserts_and_writes_ledger(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    items = payout([1, 2, 3, 1]) + [{"user_id": "bad", "points": 5}, {"user_id": 4, "points": -1}]
+    result = PointsUtils.batch_add_points(db, items, chunk_size=10)
+
+    # 一批只有三条语句：锁定读取余额、upsert、批量写流水
+    assert len(statements) == 3
+    assert result["success_count"] == 4 and result["fail_count"] == 2 and result["chunks"] == 1
+    assert balances(db) == {1: ("120", 120), 2: ("60", 60), 3: ("10", 10)}
+
+    ledger = [
+        (int(tx.UserID), tx.BalanceBefore, tx.BalanceAfter)
+        for tx in db.query(PointsTransaction).order_by(PointsTransaction.TransactionID)
+    ]
+    assert ledger == [(1, 100, 110), (2, 50, 60), (3, 0, 10), (1, 110, 120)]
+
+
+def test_all_mode_rolls_back_everything(db, monkeypatch):
+    original = PointsUtils._credit_points_chunk
+    calls = []
+
+    def failing_chunk(session, items, now):
+        calls.append(len(items))
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        original(session, items, now)
+
+    monkeypatch.setattr(PointsUtils, "_credit_points_chunk", staticmethod(failing_chunk))
+    result = PointsUtils.batch_add_points(db, payout(range(1, 8)), chunk_size=3, atomicity="all")
+    assert result["success_count"] == 0
+    assert balances(db) == {1: ("100", 100), 2: ("50", None)}
+    assert db.query(PointsTransaction).count() == 0
+
+    calls.clear()
+    reports = []
+    result = PointsUtils.batch_add_points(
+        db, payout(range(1, 8)), chunk_size=3, atomicity="chunk", progress=reports.append
+    )
+    assert (result["success_count"], result["fail_count"]) == (4, 3)
+    assert sorted(detail["user_id"] for detail in result["fail_details"]) == ["4", "5", "6"]
+    assert balances(db)[1] == ("110", 110) and 4 not in balances(db) and balances(db)[7] == ("10", 10)
+    assert [(r["chunks_done"], r["processed"], r["success_count"]) for r in reports] == [
+        (1, 3, 3), (2, 6, 3), (3, 7, 4)
+    ]
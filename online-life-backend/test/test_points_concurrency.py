@@ -0,0 +1,96 @@
+import threading
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, update
+from sqlalchemy.dialects import mysql
+
+from models import Points, PointsTransaction
+from utils.points_utils import PointsUtils
+
+HOT = Decimal(1)
+LEGACY = Decimal(2)
+NEW = Decimal(3)
+INITIAL = {HOT: 600, LEGACY: 500}
+
+
+@pytest.fixture
+def session_factory(session_factory):
+    # 每个线程使用独立连接，使用文件数据库
+    session = session_factory()
+    session.add(Points(UserID=HOT, Points=str(INITIAL[HOT])))
+    session.commit()
+    # 尚未回填类型列的旧记录
+    session.execute(Points.__table__.insert().values(UserID=LEGACY, Points=str(INITIAL[LEGACY]), PointsValue=None))
+    session.commit()
+    session.close()
+    return session_factory
+
+
+def test_deduct_and_transfer_guard_balance(session_factory):
+    db = session_factory()
+    try:
+        assert not PointsUtils.deduct_points(db, HOT, 601, "超额扣除")
+        assert not PointsUtils.deduct_points(db, NEW, 1, "无积分记录")
+        assert not PointsUtils.transfer_points(db, LEGACY, HOT, 501, "超额转账")
+        assert PointsUtils.transfer_points(db, LEGACY, NEW, 20, "")
+        assert PointsUtils.deduct_points(db, HOT, 600, "全部扣除")
+
+        db.expire_all()
+        balances = {p.UserID: (p.Points, p.PointsValue) for p in db.query(Points)}
+        assert balances == {HOT: ("0", 0), LEGACY: ("480", 480), NEW: ("20", 20)}
+        assert db.query(PointsTransaction).count() == 3
+    finally:
+        db.close()
+
+
+def test_mysql_update_assigns_typed_column_first():
+    db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=mysql.dialect()))
+    statement = update(Points).ordered_values(*PointsUtils._balance_update_values(db, -5))
+    sql = str(statement.compile(dialect=mysql.dialect()))
+    # MySQL 按顺序赋值：PointsValue 由原值计算，Points 取更新后的 PointsValue
+    assert sql.index("`PointsValue`=(coalesce") < sql.index("`Points`=CAST(`Points`.`PointsValue`")
+
+
+def test_concurrent_operations_conserve_points(session_factory):
+    deducted = []
+    errors = []
+
+    def worker(index):
+        db = session_factory()
+        try:
+            for i in range(15):
+                if PointsUtils.deduct_points(db, HOT, 7, f"线程{index}扣除{i}"):
+                    deducted.append(7)
+                PointsUtils.transfer_points(db, HOT, LEGACY, 5, "")
+                PointsUtils.transfer_points(db, LEGACY, HOT, 3, "")
+                PointsUtils.transfer_points(db, HOT, NEW, 2, "")
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    db = session_factory()
+    try:
+        balances = {p.UserID: p for p in db.query(Points)}
+        assert all(int(p.Points) == p.PointsValue >= 0 for p in balances.values())
+        # 需求超过余额，部分扣除必然因余额不足失败
+        assert len(deducted) < 8 * 15
+        # 积分守恒：余额合计 + 已扣除 = 初始合计
+        assert sum(p.PointsValue for p in balances.values()) + sum(deducted) == sum(INITIAL.values())
+        # 每个用户的流水合计与余额变化一致
+        for user_id, record in balances.items():
+            change = db.query(func.sum(PointsTransaction.PointsChange)).filter(
+                PointsTransaction.UserID == user_id
+            ).scalar()
+            assert change == record.PointsValue - INITIAL.get(user_id, 0)
+    finally:
+        db.close()
@@ -0,0 +1,102 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from models import PointsTransaction
+from utils.pagination_utils import InvalidCursorError
+from utils.points_utils import PointsUtils
+
+SENDER = Decimal(1748434864506324)
+RECEIVER = Decimal(1748498150567521)
+
+# 摘自仓库中的 points.log：积分变更、其他 INFO 日志和跨两行的 ERROR 日志
+SAMPLE_LOG = """\
+2025-06-02 00:07:03,085 INFO 积分变更 - 用户: 1748434864506324, 类型: ADD, 变更: 100, 原因: 订单支付奖励-订单号：1748444737651029，支付金额：1元, 余额: 1149 -> 1249
+2025-06-02 00:07:03,282 INFO 用户 1748434864506324 积分增加成功: +100, 原因: 订单支付奖励-订单号：1748444737651029，支付金额：1元
+2025-06-02 17:36:53,065 INFO 积分变更 - 用户: 1748434864506324, 类型: ADD, 变更: 100, 原因: 订单支付奖励-订单号：1748854790767495，支付金额：1元, 余额: 1249 -> 1349
+2025-06-02 17:36:53,293 INFO 用户 1748434864506324 积分增加成功: +100, 原因: 订单支付奖励-订单号：1748854790767495，支付金额：1元
+2025-06-02 17:58:10,727 INFO 积分变更 - 用户: 1748434864506324, 类型: TRANSFER_OUT, 变更: -1, 原因: 转账给用户1748498150567521: , 余额: 1349 -> 1348
+2025-06-02 17:58:10,727 INFO 积分变更 - 用户: 1748498150567521, 类型: TRANSFER_IN, 变更: 1, 原因: 收到用户1748434864506324转账: , 余额: 0 -> 1
+2025-06-02 17:58:10,927 INFO 积分转账成功: 1748434864506324 -> 1748498150567521, 数量: 1
+2025-06-02 17:58:17,832 INFO 积分变更 - 用户: 1748434864506324, 类型: TRANSFER_OUT, 变更: -1, 原因: 转账给用户1748498150567521: , 余额: 1348 -> 1347
+2025-06-02 17:58:17,832 INFO 积分变更 - 用户: 1748498150567521, 类型: TRANSFER_IN, 变更: 1, 原因: 收到用户1748434864506324转账: , 余额: 1 -> 2
+2025-06-02 17:58:18,035 INFO 积分转账成功: 1748434864506324 -> 1748498150567521, 数量: 1
+2025-06-03 12:03:20,396 ERROR 获取用户积分余额失败: (pymysql.err.OperationalError) (2003, "Can't connect to MySQL server on '39.104.19.8' ([WinError 10053] 你的主机中的软件中止了一个已建立的连接。)")
+(Background on this error at: https://sqlalche.me/e/20/e3q8)
+"""
+
+
+def ledger(db, user_id):
+    return [
+        (tx.TransactionType, tx.PointsChange, tx.BalanceBefore, tx.BalanceAfter)
+        for tx in db.query(PointsTransaction)
+        .filter(PointsTransaction.UserID == user_id)
+        .order_by(PointsTransaction.TransactionID)
+    ]
+
+
+def page_through(db, user_id, per_page):
+    pages = []
+    cursor = ""
+    while cursor is not None:
+        history = PointsUtils.get_points_history(db, user_id, per_page=per_page, cursor=cursor)
+        pages.append(history["records"])
+        cursor = history["next_cursor"]
+    return pages
+
+
+def test_balance_changes_write_ledger(db):
+    assert PointsUtils.add_points(db, Decimal(1), 100, "注册奖励")
+    assert PointsUtils.deduct_points(db, Decimal(1), 30, "兑换")
+    assert PointsUtils.transfer_points(db, Decimal(1), Decimal(2), 20, "谢谢")
+    assert not PointsUtils.deduct_points(db, Decimal(1), 500, "余额不足")
+
+    assert ledger(db, Decimal(1)) == [("ADD", 100, 0, 100), ("DEDUCT", -30, 100, 70), ("TRANSFER_OUT", -20, 70, 50)]
+    assert ledger(db, Decimal(2)) == [("TRANSFER_IN", 20, 0, 20)]
+    transfer = db.query(PointsTransaction).filter_by(TransactionType="TRANSFER_IN").one()
+    assert transfer.Reason == "收到用户1转账: 谢谢"
+
+
+def test_import_points_log(db, tmp_path):
+    log_file = tmp_path / "points.log"
+    log_file.write_text(SAMPLE_LOG, encoding="utf-8")
+
+    assert PointsUtils.import_points_log(db, str(log_file)) == 6
+    assert ledger(db, SENDER) == [
+        ("ADD", 100, 1149, 1249), ("ADD", 100, 1249, 1349),
+        ("TRANSFER_OUT", -1, 1349, 1348), ("TRANSFER_OUT", -1, 1348, 1347),
+    ]
+    assert ledger(db, RECEIVER) == [("TRANSFER_IN", 1, 0, 1), ("TRANSFER_IN", 1, 1, 2)]
+    first = db.query(PointsTransaction).order_by(PointsTransaction.TransactionID).first()
+    assert first.CreatedAt == datetime(2025, 6, 2, 0, 7, 3, 85000)
+    assert first.Reason == "订单支付奖励-订单号：1748444737651029，支付金额：1元"
+
+    # 重复导入跳过已有记录
+    assert PointsUtils.import_points_log(db, str(log_file)) == 0
+    assert db.query(PointsTransaction).count() == 6
+
+
+def test_history_pages_with_cursor(db, tmp_path):
+    log_file = tmp_path / "points.log"
+    log_file.write_text(SAMPLE_LOG, encoding="utf-8")
+    PointsUtils.import_points_log(db, str(log_file))
+
+    pages = page_through(db, SENDER, per_page=3)
+    assert [[record["balance_after"] for record in page] for page in pages] == [[1347, 1348, 1349], [1249]]
+    assert pages[0][0]["created_at"] == "2025-06-02 17:58:17"
+
+    first_page = PointsUtils.get_points_history(db, SENDER, page=1, per_page=3)
+    assert first_page["total_records"] == 4 and first_page["total_pages"] == 2
+
+    with pytest.raises(InvalidCursorError):
+        PointsUtils.get_points_history(db, SENDER, cursor="not-a-cursor")
+
+
+def test_history_cursor_breaks_ties_by_transaction_id(db):
+    # 批量入账的流水共用同一个 CreatedAt
+    PointsUtils.batch_add_points(db, [{"user_id": Decimal(1), "points": 10, "reason": "活动"}] * 5)
+    assert db.query(PointsTransaction.CreatedAt).distinct().count() == 1
+
+    pages = page_through(db, Decimal(1), per_page=2)
+    assert [[record["balance_after"] for record in page] for page in pages] == [[50, 40], [30, 20], [10]]
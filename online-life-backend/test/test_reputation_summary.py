@@ -0,0 +1,115 @@
+import threading
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from models import Reputation, ReputationSummary, User
+from utils.user_utils import UserUtils
+
+REVIEWS = {1: [90, 85, 42], 2: [100], 3: [70, 75]}
+
+
+@pytest.fixture
+def db(session_factory):
+    # 并发测试中每个线程使用独立连接，使用文件数据库
+    session = session_factory()
+    for user_id in REVIEWS:
+        session.add(User(
+            UserID=Decimal(user_id), Username=f"user{user_id}", Password="", Email="", Phone="",
+            Address="", Role="staff",
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def add_reviews(db):
+    for user_id, scores in REVIEWS.items():
+        for index, score in enumerate(scores):
+            db.add(Reputation(
+                Score=str(score), Review="", RUserID=Decimal(100 + index), UserID=Decimal(user_id),
+                ReviewTime="2025-06-01 10:00:00",
+            ))
+            UserUtils._apply_reputation_to_summary(db, Decimal(user_id), score)
+    db.commit()
+
+
+def summaries(db):
+    db.expire_all()
+    return {
+        int(summary.UserID): (
+            summary.ReviewCount,
+            float(summary.ScoreSum),
+            float(summary.AverageScore),
+            [getattr(summary, f"Bucket{bucket}") for bucket in range(10)],
+        )
+        for summary in db.query(ReputationSummary)
+    }
+
+
+def test_incremental_summary_matches_rebuild(db):
+    add_reviews(db)
+    incremental = summaries(db)
+    assert incremental[1] == (3, 217.0, 72.33, [0, 0, 0, 0, 1, 0, 0, 0, 1, 1])
+    assert incremental[2][:3] == (1, 100.0, 100.0)
+    assert UserUtils.get_reputation_scores(db, [Decimal(3), Decimal(4)]) == {Decimal(3): 72.5, Decimal(4): 0.0}
+
+    assert UserUtils.rebuild_reputation_summary(db) == 3
+    assert summaries(db) == incremental
+
+    # 只重建指定用户
+    db.query(ReputationSummary).filter(ReputationSummary.UserID == Decimal(2)).delete()
+    db.commit()
+    assert UserUtils.rebuild_reputation_summary(db, [Decimal(2)]) == 1
+    assert summaries(db) == incremental
+
+
+def test_reputation_ranking(db):
+    add_reviews(db)
+    ranking = UserUtils.get_reputation_ranking(db, limit=2)
+    assert [(item["rank"], item["username"], item["average_score"], item["total_reviews"]) for item in ranking] == [
+        (1, "user2", 100.0, 1), (2, "user3", 72.5, 2),
+    ]
+
+
+def test_concurrent_first_reviews(db, session_factory):
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def review(index):
+        session = session_factory()
+        try:
+            barrier.wait()
+            UserUtils._apply_reputation_to_summary(session, Decimal(1), 60 + index)
+            session.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=review, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    count, score_sum, average, buckets = summaries(db)[1]
+    assert (count, score_sum, average) == (8, 508.0, 63.5)
+    assert buckets[6] == 8
+
+
+def test_user_reputation_reads_summary(db):
+    add_reviews(db)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    reputation = UserUtils.get_user_reputation(db, Decimal(1))
+    assert (reputation["average_score"], reputation["total_reviews"]) == (72.33, 3)
+    assert reputation["score_distribution"] == {"40": 1, "80": 1, "90": 1}
+    assert sorted(review["score"] for review in reputation["recent_reviews"]) == [42.0, 85.0, 90.0]
+    # 汇总按主键读取，Reputation 只查询最近评价，不再分组聚合
+    assert len(statements) == 2 and not any("GROUP BY" in sql for sql in statements)
+
+    assert UserUtils.get_user_reputation(db, Decimal(4))["total_reviews"] == 0
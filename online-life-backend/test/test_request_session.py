@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Points
+from utils.db_utils import FlaskSessionManager, PoolLeakDetector, get_engine, get_pool_metrics, get_request_session
+from utils.response_utils import error_response, success_response
+
+
+@pytest.fixture
+def engine(tmp_path):
+    name = f"request-session-{tmp_path.name}"
+    engine = get_engine(name, url=f"sqlite:///{tmp_path / 'app.db'}", pool_size=2, max_overflow=0)
+    Base.metadata.create_all(engine)
+    yield name, engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    _, bind = engine
+    app = Flask(__name__)
+    FlaskSessionManager(app, sessionmaker(bind=bind, autoflush=False))
+
+    @app.route("/points/<int:user_id>/<outcome>", methods=["POST"])
+    def add_points(user_id, outcome):
+        db = get_request_session()
+        db.add(Points(UserID=Decimal(user_id), Points="10"))
+        db.flush()
+        if outcome == "fail":
+            return error_response("失败", 400)
+        if outcome == "raise":
+            raise RuntimeError("boom")
+        return success_response({}, "成功")
+
+    @app.route("/noop")
+    def noop():
+        return success_response({}, "成功")
+
+    return app.test_client()
+
+
+def stored_user_ids(bind):
+    with bind.connect() as conn:
+        return [row[0] for row in conn.execute(text("SELECT UserID FROM Points ORDER BY UserID"))]
+
+
+def test_commit_on_success_and_rollback_on_error(engine, client):
+    name, bind = engine
+
+    assert client.post("/points/1/ok").status_code == 200
+    assert client.post("/points/2/fail").status_code == 400
+    assert client.post("/points/3/raise").status_code == 500
+
+    assert [int(user_id) for user_id in stored_user_ids(bind)] == [1]
+    assert get_pool_metrics(name)[name]["checked_out"] == 0
+
+
+def test_session_is_acquired_lazily(engine, client):
+    name, _ = engine
+    before = get_pool_metrics(name)[name]["checkouts"]
+
+    assert client.get("/noop").status_code == 200
+    assert get_pool_metrics(name)[name]["checkouts"] == before
+
+
+def test_leak_detector_reports_request_path(engine):
+    name, bind = engine
+    app = Flask(__name__)
+
+    with app.test_request_context("/api/order/list"):
+        conn = bind.connect()
+    try:
+        leaks = [item for item in PoolLeakDetector(threshold_seconds=1e-9).check() if item["engine"] == name]
+        assert len(leaks) == 1
+        assert leaks[0]["checkout_by"] == "GET /api/order/list"
+
+        # 同一次检出只告警一次
+        assert not [item for item in PoolLeakDetector(threshold_seconds=1e-9).check() if item["engine"] == name]
+    finally:
+        conn.close()
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+import requests
+
+from utils import map_utils
+from utils.map_utils import MapUtils
+
+SHOP = "104.003000,30.558000"
+HOME = "104.012000,30.566000"
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture
+def amap(monkeypatch):
+    map_utils._route_cache.clear()
+    calls = []
+    state = {"fail": False}
+
+    def fake_get(url, params=None, timeout=None, **kwargs):
+        calls.append(params)
+        if state["fail"]:
+            raise requests.Timeout("timeout")
+        return FakeResponse({"errcode": 0, "data": {"paths": [{"distance": 1500, "duration": 420}]}})
+
+    monkeypatch.setattr(map_utils._map_client.session, "get", fake_get)
+    map_utils._map_client.breaker.record_success()
+    yield calls, state
+    map_utils._route_cache.clear()
+
+
+def test_nearby_points_share_cached_route(amap):
+    calls, _ = amap
+
+    first = MapUtils.calculate_route(SHOP, HOME)
+    assert first["distance"] == 1500 and first["duration"] == 420
+
+    # 终点偏移约 20 米，仍在同一网格内
+    start = time.perf_counter()
+    second = MapUtils.calculate_route(SHOP, "104.012100,30.566100")
+    elapsed = time.perf_counter() - start
+
+    assert second["cached"] is True
+    assert (second["distance"], second["duration"]) == (1500, 420)
+    assert len(calls) == 1
+    assert elapsed < 0.01
+    assert MapUtils.get_route_cache_stats()["hits"] == 1
+
+
+def test_upstream_failure_falls_back_to_haversine(amap):
+    calls, state = amap
+    state["fail"] = True
+
+    route = MapUtils.calculate_route(SHOP, HOME)
+
+    assert route["approximate"] is True
+    straight = MapUtils.haversine_distance(104.003, 30.558, 104.012, 30.566)
+    assert route["distance"] == int(straight * 1.3)
+    assert route["duration"] > 0
+    # 估算结果不写入缓存
+    state["fail"] = False
+    assert "cached" not in MapUtils.calculate_route(SHOP, HOME)
+    assert len(calls) == 2
+
+
+def test_snap_to_grid_cell_size():
+    step = 100 / 111320
+    # 取某个网格中心，向北 30 米仍在同一网格，向北 100 米进入相邻网格
+    lat = (int(30.5 / step) + 0.5) * step
+    lon_cell, lat_cell = MapUtils.snap_to_grid(104.0, lat, 100)
+    assert MapUtils.snap_to_grid(104.0, lat + 30 / 111320, 100) == (lon_cell, lat_cell)
+    assert MapUtils.snap_to_grid(104.0, lat + 100 / 111320, 100)[1] == lat_cell + 1
+
+
+def test_order_time_legs_run_concurrently(monkeypatch):
+    map_utils._route_cache.clear()
+
+    def slow_get(url, params=None, timeout=None, **kwargs):
+        time.sleep(0.2)
+        return FakeResponse({"errcode": 0, "data": {"paths": [{"distance": 1000, "duration": 300}]}})
+
+    monkeypatch.setattr(map_utils._map_client.session, "get", slow_get)
+    map_utils._map_client.breaker.record_success()
+
+    start = time.perf_counter()
+    result = MapUtils.estimate_order_time("104.100000,30.600000", SHOP, HOME)
+    elapsed = time.perf_counter() - start
+
+    assert result == {"to_store": 300, "to_user": 300, "total": 600, "status": "calculated"}
+    assert elapsed < 0.35
+    map_utils._route_cache.clear()
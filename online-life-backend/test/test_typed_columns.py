@@ -0,0 +1,106 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import insert, select
+
+import config
+from models import BidRecord, Points, Reputation, Task, User
+from utils.points_utils import PointsUtils
+from utils.typed_column_utils import TypedColumnUtils, parse_datetime
+
+
+def add_user(db, user_id, username):
+    db.add(User(UserID=Decimal(user_id), Username=username, Password="", Email="", Phone="", Address="", Role="client"))
+
+
+def test_orm_writes_both_columns(db):
+    db.add(Points(UserID=Decimal(1), Points="120"))
+    db.add(Task(
+        TaskID=Decimal(1), TaskType="errand", Description="", EstimatedTime="", ActualTime="",
+        CurrentBidder="", BidDeadline="2025-06-01 12:00:00", GroupTaskID=Decimal(1), TaskLocation="",
+    ))
+    db.commit()
+
+    points = db.get(Points, Decimal(1))
+    task = db.get(Task, Decimal(1))
+    assert points.PointsValue == 120
+    assert task.BidDeadlineAt == datetime(2025, 6, 1, 12, 0, 0)
+
+    points.Points = "80"
+    db.commit()
+    assert db.get(Points, Decimal(1)).PointsValue == 80
+
+    # 只写类型列时回写旧列，未升级的实例仍能读到
+    task.BidDeadlineAt = datetime(2025, 7, 1, 8, 30, 0)
+    db.commit()
+    assert db.get(Task, Decimal(1)).BidDeadline == "2025-07-01 08:30:00"
+
+
+def test_backfill_fills_legacy_rows_in_batches(engine, db):
+    with engine.begin() as conn:
+        conn.execute(insert(Points), [{"UserID": Decimal(i), "Points": str(i * 10)} for i in range(1, 8)])
+        conn.execute(insert(Points), [{"UserID": Decimal(8), "Points": "abc"}, {"UserID": Decimal(9), "Points": ""}])
+        conn.execute(insert(BidRecord), [{
+            "UserID": Decimal(1), "TaskID": Decimal(i), "BidID": Decimal(i),
+            "BidTime": "2025-06-01 10:00:00", "BidStatus": "pending",
+        } for i in range(1, 4)])
+
+    status = TypedColumnUtils.get_backfill_status(engine)
+    assert status["Points"] == 8
+    assert status["BidRecord"] == 3
+
+    result = TypedColumnUtils.backfill(engine, batch_size=3, models=[Points, BidRecord])
+    assert result == {"Points": 7, "BidRecord": 3}
+
+    with engine.connect() as conn:
+        values = dict(conn.execute(select(Points.UserID, Points.PointsValue)).all())
+        bid_times = conn.execute(select(BidRecord.BidAt)).scalars().all()
+    assert values[Decimal(7)] == 70
+    assert values[Decimal(8)] is None
+    assert bid_times == [datetime(2025, 6, 1, 10, 0, 0)] * 3
+    # 无法解析的旧值仍计为待回填
+    assert TypedColumnUtils.get_backfill_status(engine)["Points"] == 1
+
+
+@pytest.mark.parametrize("mode", ["legacy", "dual", "typed"])
+def test_points_ranking_in_each_read_mode(engine, db, monkeypatch, mode):
+    for user_id, points in [(1, "5"), (2, "100"), (3, "20")]:
+        add_user(db, user_id, f"user{user_id}")
+        db.add(Points(UserID=Decimal(user_id), Points=points))
+    db.commit()
+    monkeypatch.setattr(config, "TYPED_COLUMNS_READ", mode)
+
+    ranking = PointsUtils.get_points_ranking(db, limit=10)
+    assert [item["username"] for item in ranking] == ["user2", "user3", "user1"]
+    assert [item["points"] for item in ranking] == [100, 20, 5]
+    assert PointsUtils.get_user_points_balance(db, Decimal(2)) == 100
+
+
+def test_dual_read_falls_back_to_legacy_value(engine, db, monkeypatch):
+    with engine.begin() as conn:
+        conn.execute(insert(Points), [{"UserID": Decimal(1), "Points": "42"}])
+    points = db.get(Points, Decimal(1))
+
+    monkeypatch.setattr(config, "TYPED_COLUMNS_READ", "dual")
+    assert TypedColumnUtils.value(points, "PointsValue") == 42
+    monkeypatch.setattr(config, "TYPED_COLUMNS_READ", "typed")
+    assert TypedColumnUtils.value(points, "PointsValue") is None
+
+
+def test_backfill_parses_timestamps_with_microseconds(engine):
+    assert parse_datetime("2025-06-02 23:27:32.298184") == datetime(2025, 6, 2, 23, 27, 32, 298184)
+    assert parse_datetime("2025-06-02") is None
+
+    with engine.begin() as conn:
+        conn.execute(insert(Reputation), [{
+            "Score": "90", "Review": "", "RUserID": Decimal(1), "UserID": Decimal(2),
+            "ReviewTime": "2025-06-02 23:27:32.298184",
+        }])
+    assert TypedColumnUtils.get_backfill_status(engine)["Reputation"] == 1
+
+    # ScoreValue 和 ReviewedAt 各回填一个值
+    assert TypedColumnUtils.backfill(engine, models=[Reputation]) == {"Reputation": 2}
+    with engine.connect() as conn:
+        assert conn.execute(select(Reputation.ReviewedAt)).scalar_one() == datetime(2025, 6, 2, 23, 27, 32, 298184)
+    assert TypedColumnUtils.get_backfill_status(engine)["Reputation"] == 0
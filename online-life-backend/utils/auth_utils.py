@@ -1,10 +1,9 @@
 import hashlib
 import jwt
-import time
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-import secrets
 from models import User
+from utils.id_utils import IdUtils
 
 
 class AuthUtils:
@@ -23,9 +22,7 @@ class AuthUtils:
     @staticmethod
     def generate_user_id() -> Decimal:
         """生成用户ID"""
-        timestamp = int(time.time() * 1000)  # 毫秒级时间戳
-        random_part = secrets.randbelow(1000)  # 3位随机数
-        return Decimal(timestamp * 1000 + random_part)
+        return IdUtils.next_id()
 
     @staticmethod
     def generate_token(user_id: Decimal, role: str) -> str:
@@ -1,21 +1,413 @@
-from sqlalchemy import create_engine
+"""
+数据库连接工具模块
+维护全局唯一的引擎注册表，Flask 与 FastAPI 入口共用同一套连接池配置和监控指标
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm import sessionmaker
-from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+import config
 from models import Base
+import utils.typed_column_utils  # noqa: F401  注册类型列双写监听
+from utils.pagination_utils import InvalidCursorError, PaginationUtils
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_database_url(driver: str = "pymysql") -> str:
+    """获取数据库连接URL，DATABASE_URL 优先于分项配置"""
+    if config.DATABASE_URL:
+        url = make_url(config.DATABASE_URL)
+        if url.get_backend_name() == "mysql":
+            url = url.set(drivername=f"mysql+{driver}")
+        return url.render_as_string(hide_password=False)
+    return (
+        f"mysql+{driver}://{config.DB_USER}:{config.DB_PASSWORD}"
+        f"@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
+    )
+
+
+class PoolMetrics:
+    """连接池指标：建连、检出/归还、等待耗时与超时次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_wait(self, elapsed: float, timed_out: bool):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_time_total += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "wait_count": self.wait_count,
+                "wait_time_avg_ms": (
+                    round(self.wait_time_total * 1000 / self.wait_count, 3) if self.wait_count else 0.0
+                ),
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+                "timeouts": self.timeouts,
+            }
+
+
+class _MeteredPoolMixin:
+    """统计从连接池取连接的等待时间"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - start, timed_out)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    pass
+
+
+class MeteredAsyncAdaptedQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_engines: Dict[str, Any] = {}
+_metrics: Dict[str, PoolMetrics] = {}
+_active_checkouts: Dict[str, Dict[int, Any]] = {}
+_registry_lock = threading.Lock()
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _engine_options(url, is_async: bool, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """根据配置生成引擎参数，overrides 可覆盖单个引擎的配置"""
+    options: Dict[str, Any] = {"echo": config.DB_ECHO}
+    if not _is_memory_sqlite(url):
+        options.update(
+            poolclass=MeteredAsyncAdaptedQueuePool if is_async else MeteredQueuePool,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=config.DB_POOL_PRE_PING,
+        )
+    if url.get_backend_name() == "mysql":
+        options["connect_args"] = {"connect_timeout": config.DB_CONNECT_TIMEOUT}
+    options.update(overrides)
+    return options
+
+
+def _instrument(name: str, sync_engine: Engine, statement_timeout_ms: int):
+    """挂载连接池指标与查询超时设置"""
+    metrics = PoolMetrics()
+    _metrics[name] = metrics
+    active = _active_checkouts.setdefault(name, {})
+    pool = sync_engine.pool
+    if isinstance(pool, _MeteredPoolMixin):
+        pool.metrics = metrics
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.incr("connects")
+        if statement_timeout_ms and sync_engine.dialect.name == "mysql":
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET SESSION max_execution_time = {int(statement_timeout_ms)}")
+            cursor.close()
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.incr("checkouts")
+        # 记录检出时间和来源，供连接泄漏检测使用
+        connection_record.info["checkout_at"] = time.monotonic()
+        connection_record.info["checkout_by"] = (
+            f"{request.method} {request.path}" if has_request_context() else threading.current_thread().name
+        )
+        connection_record.info.pop("leak_reported", None)
+        active[id(connection_record)] = connection_record
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.incr("checkins")
+        active.pop(id(connection_record), None)
+
+    @event.listens_for(sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr("invalidations")
+
+
+def get_engine(name: str = "default", url: Optional[str] = None, **overrides) -> Engine:
+    """
+    从注册表获取同步引擎，不存在时按配置创建
+    Args:
+        name: 引擎名称
+        url: 连接URL，默认使用配置中的数据库
+        overrides: 覆盖默认的 create_engine 参数（如 pool_size）
+    """
+    engine = _engines.get(name)
+    if engine is not None:
+        return engine
+
+    with _registry_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            db_url = make_url(url or get_database_url("pymysql"))
+            statement_timeout_ms = overrides.pop("statement_timeout_ms", config.DB_STATEMENT_TIMEOUT_MS)
+            engine = create_engine(db_url, **_engine_options(db_url, False, overrides))
+            _instrument(name, engine, statement_timeout_ms)
+            _engines[name] = engine
+            logger.info(f"创建数据库引擎 {name}: {engine.pool.status()}")
+    return engine
+
+
+def get_async_engine(name: str = "async", url: Optional[str] = None, **overrides):
+    """从注册表获取异步引擎（FastAPI 入口使用），配置与同步引擎一致"""
+    engine = _engines.get(name)
+    if engine is not None:
+        return engine
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    with _registry_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            db_url = make_url(url or get_database_url("aiomysql"))
+            statement_timeout_ms = overrides.pop("statement_timeout_ms", config.DB_STATEMENT_TIMEOUT_MS)
+            engine = create_async_engine(db_url, **_engine_options(db_url, True, overrides))
+            _instrument(name, engine.sync_engine, statement_timeout_ms)
+            _engines[name] = engine
+    return engine
+
+
+def get_pool_metrics(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    获取连接池指标
+    Args:
+        name: 引擎名称，为空时返回所有引擎
+    Returns:
+        Dict: 引擎名称 -> 连接池大小、占用、溢出及检出等待统计
+    """
+    names = [name] if name else list(_engines.keys())
+    result = {}
+    for engine_name in names:
+        engine = _engines.get(engine_name)
+        if engine is None:
+            continue
+        pool = getattr(engine, "sync_engine", engine).pool
+        stats = _metrics[engine_name].snapshot()
+        if isinstance(pool, QueuePool):
+            stats.update(
+                {
+                    "pool_size": pool.size(),
+                    "checked_in": pool.checkedin(),
+                    "checked_out": pool.checkedout(),
+                    "overflow": max(pool.overflow(), 0),
+                    "max_overflow": pool._max_overflow,
+                }
+            )
+        result[engine_name] = stats
+    return result
+
+
+def find_leaked_checkouts(threshold_seconds: float) -> List[Dict[str, Any]]:
+    """
+    查找检出时间超过阈值仍未归还的连接
+    Args:
+        threshold_seconds: 检出时长阈值（秒）
+    Returns:
+        List[Dict]: 引擎名称、检出时长和检出来源（请求路径或线程名）
+    """
+    now = time.monotonic()
+    leaked = []
+    for name, active in list(_active_checkouts.items()):
+        for record in list(active.values()):
+            checkout_at = record.info.get("checkout_at")
+            if checkout_at is None or now - checkout_at < threshold_seconds:
+                continue
+            leaked.append(
+                {
+                    "engine": name,
+                    "age_seconds": round(now - checkout_at, 1),
+                    "checkout_by": record.info.get("checkout_by", ""),
+                    "record": record,
+                }
+            )
+    return leaked
+
+
+class PoolLeakDetector:
+    """后台线程定期检查长时间未归还的连接并记录日志"""
+
+    def __init__(self, threshold_seconds: float = None, interval_seconds: float = None):
+        self.threshold_seconds = threshold_seconds or config.DB_LEAK_THRESHOLD
+        self.interval_seconds = interval_seconds or config.DB_LEAK_CHECK_INTERVAL
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> List[Dict[str, Any]]:
+        """执行一次检查，每个连接的同一次检出只告警一次"""
+        reported = []
+        for item in find_leaked_checkouts(self.threshold_seconds):
+            record = item.pop("record")
+            if record.info.get("leak_reported"):
+                continue
+            record.info["leak_reported"] = True
+            logger.warning(
+                f"疑似连接泄漏: 引擎 {item['engine']} 的连接已检出 {item['age_seconds']} 秒未归还, "
+                f"来源: {item['checkout_by']}"
+            )
+            reported.append(item)
+        return reported
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"连接泄漏检测失败: {str(e)}")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="db-leak-detector", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def dispose_engines():
+    """关闭所有引擎的连接池"""
+    for engine in list(_engines.values()):
+        getattr(engine, "sync_engine", engine).dispose()
+
+
+def _dispose_after_fork():
+    # 子进程不能复用父进程的连接，丢弃继承的连接池但不关闭父进程的连接
+    for engine in list(_engines.values()):
+        getattr(engine, "sync_engine", engine).dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
 
 # 创建数据库引擎
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL, echo=False, pool_recycle=3600)
+engine = get_engine()
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
 def get_db_session():
-    """获取数据库会话"""
+    """获取数据库会话（调用方负责关闭，蓝图中请使用 get_request_session）"""
     return SessionLocal()
 
 
+class FlaskSessionManager:
+    """
+    Flask 扩展：请求级数据库会话
+    会话在请求中第一次使用时才创建；响应状态码小于400时提交，否则回滚；
+    请求结束时统一关闭并归还连接
+    """
+
+    def __init__(self, app=None, session_factory=None):
+        if app is not None:
+            self.init_app(app, session_factory)
+
+    def init_app(self, app, session_factory=None):
+        app.extensions["db_session_factory"] = session_factory or SessionLocal
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    @staticmethod
+    def get_session():
+        """获取当前请求的数据库会话"""
+        if "db_session" not in g:
+            g.db_session = current_app.extensions["db_session_factory"]()
+        return g.db_session
+
+    @staticmethod
+    def _finish_request(response):
+        session = g.get("db_session")
+        if session is None:
+            return response
+        try:
+            if response.status_code < 400:
+                session.commit()
+            else:
+                session.rollback()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"请求 {request.path} 提交事务失败: {str(e)}")
+            from utils.response_utils import error_response
+
+            return current_app.make_response(error_response(f"提交事务失败: {str(e)}", 500))
+        return response
+
+    @staticmethod
+    def _teardown_request(exception=None):
+        session = g.pop("db_session", None)
+        if session is None:
+            return
+        try:
+            if exception is not None:
+                session.rollback()
+        finally:
+            session.close()
+
+
+db_session_manager = FlaskSessionManager()
+
+
+def get_request_session():
+    """获取当前请求的数据库会话，由 FlaskSessionManager 负责提交和关闭"""
+    return db_session_manager.get_session()
+
+
 def init_database():
     """初始化数据库表"""
     Base.metadata.create_all(bind=engine)
@@ -68,17 +460,26 @@ class DatabaseManager:
             return result.rowcount
 
 
-def paginate_query(query, page=1, per_page=10):
-    """分页查询"""
-    total = query.count()
-    items = query.offset((page - 1) * per_page).limit(per_page).all()
+def paginate_query(query, page=1, per_page=10, sort_columns=None, cursor=None, count=None):
+    """
+    分页查询
+    提供 sort_columns（[(列, 是否倒序)]，最后一列唯一）时支持游标分页，见 PaginationUtils.paginate
+    """
+    if sort_columns is None:
+        if cursor is not None:
+            raise InvalidCursorError("游标分页需要指定排序列")
+        sort_columns = []
+    page_data = PaginationUtils.paginate(query, sort_columns, page, per_page, cursor, count)
+    pagination = page_data["pagination"]
+    total = pagination["total"]
 
     return {
-        "items": items,
+        "items": page_data["items"],
         "total": total,
         "page": page,
         "per_page": per_page,
-        "pages": (total + per_page - 1) // per_page,
-        "has_prev": page > 1,
-        "has_next": page * per_page < total,
+        "pages": pagination.get("total_pages"),
+        "has_prev": pagination.get("has_prev", False),
+        "has_next": pagination["has_next"],
+        "next_cursor": pagination["next_cursor"],
     }
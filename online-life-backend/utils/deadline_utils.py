@@ -0,0 +1,443 @@
+"""
+竞标截止调度模块
+任务满员开放竞标时在 TaskDeadline 表中登记截止时间（与任务状态在同一事务提交，进程重启后从表中恢复），
+后台线程用最小堆记录最近的截止时间并在到期时唤醒，每轮按 DueAt 批量认领到期记录：
+有竞标的任务分配给信誉最高的竞标者，无人竞标的任务延长竞标窗口，延长次数用完后升级为 escalated
+"""
+
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+import config
+from models import BidRecord, Orders, Task, TaskDeadline
+from utils.order_utils import OrderUtils
+from utils.user_utils import UserUtils
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_RESULTS = ("assigned", "extended", "escalated", "skipped")
+
+# 调度指标：最近一轮的结果和启动以来的累计值
+_deadline_metrics: Dict[str, Any] = {
+    "last_tick": None,
+    "totals": {"ticks": 0, "processed": 0, "assigned": 0, "extended": 0, "escalated": 0, "skipped": 0, "errors": 0},
+}
+_deadline_metrics_lock = threading.Lock()
+
+# 本进程运行中的调度线程，新登记的截止时间早于其下次唤醒时间时提前唤醒
+_active_scheduler: Optional["DeadlineScheduler"] = None
+
+
+class DeadlineUtils:
+    """竞标截止调度工具类"""
+
+    @staticmethod
+    def schedule(db: Session, task_id: Decimal, due_at: datetime, reset: bool = False) -> TaskDeadline:
+        """
+        登记（或改期）任务的竞标截止时间，不提交事务，由调用方与任务状态一起提交
+        Args:
+            reset: 是否清零延长次数（任务重新满员开放竞标时）
+        """
+        deadline = db.get(TaskDeadline, task_id)
+        if deadline is None:
+            deadline = TaskDeadline(TaskID=task_id, Extensions=0, Result="")
+            db.add(deadline)
+        elif reset:
+            deadline.Extensions = 0
+            deadline.Result = ""
+        deadline.DueAt = due_at
+        deadline.Status = "pending"
+        deadline.UpdatedAt = datetime.now()
+        return deadline
+
+    @staticmethod
+    def open_bid_window(db: Session, task: Task, now: Optional[datetime] = None) -> datetime:
+        """设置满员任务的竞标截止时间（BID_WINDOW_SECONDS 后）并登记调度，不提交事务"""
+        due_at = (now or datetime.now()) + timedelta(seconds=config.BID_WINDOW_SECONDS)
+        task.BidDeadline = due_at.strftime("%Y-%m-%d %H:%M:%S")
+        DeadlineUtils.schedule(db, task.TaskID, due_at, reset=True)
+        return due_at
+
+    @staticmethod
+    def cancel(db: Session, task_id: Decimal) -> None:
+        """任务重新开放招募时取消未处理的截止调度，不提交事务"""
+        db.execute(
+            update(TaskDeadline)
+            .where(TaskDeadline.TaskID == task_id, TaskDeadline.Status == "pending")
+            .values(Status="done", Result="skipped", UpdatedAt=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def request_assignment(db: Session, task_id: Decimal) -> bool:
+        """
+        竞标数达到 BID_AUTO_ASSIGN_BIDS 时把截止时间改为现在并唤醒调度线程，由后台完成分配
+        调度未开启（DEADLINE_SCHEDULER_ENABLED=false）时仍在请求内直接分配
+        """
+        if not config.DEADLINE_SCHEDULER_ENABLED:
+            from utils.task_utils import TaskUtils
+
+            return TaskUtils._auto_assign_task_to_best_bidder(db, task_id)
+        try:
+            now = datetime.now()
+            DeadlineUtils.schedule(db, task_id, now)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"登记任务 {task_id} 自动分配失败: {str(e)}")
+            return False
+        DeadlineUtils.notify(now)
+        return True
+
+    @staticmethod
+    def notify(due_at: datetime) -> None:
+        """通知本进程的调度线程有新的截止时间"""
+        scheduler = _active_scheduler
+        if scheduler is not None:
+            scheduler.notify(due_at)
+
+    @staticmethod
+    def claim_due(db: Session, now: Optional[datetime] = None, limit: Optional[int] = None) -> List[Decimal]:
+        """
+        按 DueAt 顺序认领一批到期记录：把 DueAt 推后 DEADLINE_CLAIM_LEASE 秒，
+        多个进程同时认领时只有一个能更新成功；处理中途进程退出的记录在租期过后重新到期
+        """
+        now = now or datetime.now()
+        rows = db.execute(
+            select(TaskDeadline.TaskID)
+            .where(TaskDeadline.Status == "pending", TaskDeadline.DueAt <= now)
+            .order_by(TaskDeadline.DueAt)
+            .limit(limit or config.DEADLINE_BATCH_SIZE)
+        ).all()
+        lease_until = now + timedelta(seconds=config.DEADLINE_CLAIM_LEASE)
+        claimed = []
+        try:
+            for (task_id,) in rows:
+                result = db.execute(
+                    update(TaskDeadline)
+                    .where(
+                        TaskDeadline.TaskID == task_id,
+                        TaskDeadline.Status == "pending",
+                        TaskDeadline.DueAt <= now,
+                    )
+                    .values(DueAt=lease_until)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 1:
+                    claimed.append(task_id)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"认领到期竞标截止记录失败: {str(e)}")
+        return claimed
+
+    @staticmethod
+    def pick_winner(bids: Sequence[BidRecord], scores: Dict[Decimal, float]) -> Optional[BidRecord]:
+        """选择信誉分最高的竞标，分数相同时取较早的竞标（bids 已按竞标时间升序）"""
+        best, best_score = None, None
+        for bid in bids:
+            score = scores.get(bid.UserID, 0.0)
+            if best is None or score > best_score:
+                best, best_score = bid, score
+        return best
+
+    @staticmethod
+    def _assign(db: Session, task_id: Decimal, winner: BidRecord) -> bool:
+        """带状态条件地把任务分配给中标者，同步写入 Orders 并结束其余竞标"""
+        result = db.execute(
+            update(Task)
+            .where(
+                Task.TaskID == task_id,
+                Task.Status == "full",
+                or_(Task.CurrentBidder.is_(None), Task.CurrentBidder == ""),
+            )
+            .values(CurrentBidder=str(winner.UserID), Status="assigned")
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return False
+        db.execute(
+            update(Orders)
+            .where(Orders.OrderID == task_id)
+            .values(StaffID=winner.UserID, OrderStatus="assigned")
+            .execution_options(synchronize_session=False)
+        )
+        winner.BidStatus = "accepted"
+        db.execute(
+            update(BidRecord)
+            .where(BidRecord.TaskID == task_id, BidRecord.BidStatus == "pending", BidRecord.UserID != winner.UserID)
+            .values(BidStatus="rejected")
+            .execution_options(synchronize_session=False)
+        )
+        return True
+
+    @staticmethod
+    def _invalidate_order_statistics(db: Session, task_id: Decimal) -> None:
+        """分配提交后清除对应订单的客户和代办人员统计缓存（任务没有对应订单时不处理）"""
+        order = db.execute(
+            select(Orders.ClientID, Orders.StaffID).where(Orders.OrderID == task_id)
+        ).first()
+        if order is not None:
+            OrderUtils.invalidate_order_statistics(client_id=order.ClientID, staff_id=order.StaffID)
+
+    @staticmethod
+    def _resolve(
+        db: Session,
+        deadline: TaskDeadline,
+        task: Optional[Task],
+        bids: Sequence[BidRecord],
+        scores: Dict[Decimal, float],
+        now: datetime,
+    ) -> str:
+        """处理一条到期记录，返回处理结果（assigned/extended/escalated/skipped），不提交事务"""
+        result = "skipped"
+        if task is not None and task.Status == "full" and not task.CurrentBidder:
+            winner = DeadlineUtils.pick_winner(bids, scores)
+            if winner is not None:
+                if DeadlineUtils._assign(db, task.TaskID, winner):
+                    result = "assigned"
+                    logger.info(
+                        f"任务 {task.TaskID} 竞标截止，分配给代办人员 {winner.UserID}"
+                        f"（信誉分数: {scores.get(winner.UserID, 0.0)}）"
+                    )
+            elif deadline.Extensions < config.BID_WINDOW_MAX_EXTENSIONS:
+                due_at = now + timedelta(seconds=config.BID_WINDOW_EXTENSION_SECONDS)
+                task.BidDeadline = due_at.strftime("%Y-%m-%d %H:%M:%S")
+                deadline.DueAt = due_at
+                deadline.Extensions += 1
+                result = "extended"
+                logger.info(f"任务 {task.TaskID} 无人竞标，竞标截止延长至 {task.BidDeadline}")
+            else:
+                task.Status = "escalated"
+                result = "escalated"
+                logger.warning(f"任务 {task.TaskID} 延长 {deadline.Extensions} 次后仍无人竞标，已升级处理")
+
+        deadline.Result = result
+        deadline.UpdatedAt = now
+        if result != "extended":
+            deadline.Status = "done"
+        return result
+
+    @staticmethod
+    def process_due(db: Session, now: Optional[datetime] = None, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        处理一批到期的竞标截止记录：批量读取任务、竞标和信誉分，每个任务单独提交，
+        单个任务失败时回滚该任务，记录在租期过后重新到期
+        Returns:
+            本轮指标：认领数、各处理结果数量、失败数和耗时
+        """
+        started = time.perf_counter()
+        now = now or datetime.now()
+        counts = {result: 0 for result in DEADLINE_RESULTS}
+        errors = 0
+        try:
+            claimed = DeadlineUtils.claim_due(db, now, batch_size)
+            if claimed:
+                deadlines = db.query(TaskDeadline).filter(TaskDeadline.TaskID.in_(claimed)).all()
+                tasks = {task.TaskID: task for task in db.query(Task).filter(Task.TaskID.in_(claimed)).all()}
+                bids_by_task: Dict[Decimal, List[BidRecord]] = {}
+                for bid in (
+                    db.query(BidRecord)
+                    .filter(BidRecord.TaskID.in_(claimed), BidRecord.BidStatus == "pending")
+                    .order_by(BidRecord.TaskID, BidRecord.BidTime)
+                ):
+                    # 与竞标数达标时的规则一致，只在最早的 BID_AUTO_ASSIGN_BIDS 个竞标中选择
+                    task_bids = bids_by_task.setdefault(bid.TaskID, [])
+                    if len(task_bids) < config.BID_AUTO_ASSIGN_BIDS:
+                        task_bids.append(bid)
+                scores = UserUtils.get_reputation_scores(
+                    db, [bid.UserID for task_bids in bids_by_task.values() for bid in task_bids]
+                )
+
+                for deadline in deadlines:
+                    task_id = deadline.TaskID
+                    try:
+                        result = DeadlineUtils._resolve(
+                            db, deadline, tasks.get(task_id), bids_by_task.get(task_id, []), scores, now
+                        )
+                        db.commit()
+                        counts[result] += 1
+                        if result == "assigned":
+                            DeadlineUtils._invalidate_order_statistics(db, task_id)
+                    except Exception as e:
+                        db.rollback()
+                        errors += 1
+                        logger.error(f"处理任务 {task_id} 竞标截止失败: {str(e)}")
+        except Exception as e:
+            with _deadline_metrics_lock:
+                _deadline_metrics["totals"]["errors"] += 1
+            logger.error(f"竞标截止调度失败: {str(e)}")
+            raise
+
+        metrics = {
+            "processed": sum(counts.values()),
+            "claimed": len(claimed),
+            "errors": errors,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "finished_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        metrics.update(counts)
+        with _deadline_metrics_lock:
+            _deadline_metrics["last_tick"] = metrics
+            totals = _deadline_metrics["totals"]
+            totals["ticks"] += 1
+            totals["processed"] += metrics["processed"]
+            totals["errors"] += errors
+            for result, count in counts.items():
+                totals[result] += count
+        if claimed:
+            logger.info(
+                f"竞标截止处理完成: 认领 {len(claimed)} 个，分配 {counts['assigned']} 个，延长 {counts['extended']} 个，"
+                f"升级 {counts['escalated']} 个，耗时 {metrics['duration_ms']} 毫秒"
+            )
+        return metrics
+
+    @staticmethod
+    def upcoming(db: Session, limit: int) -> List[Tuple[datetime, Decimal]]:
+        """最近的若干个未处理截止时间 [(DueAt, TaskID)]，按 DueAt 升序"""
+        rows = db.execute(
+            select(TaskDeadline.DueAt, TaskDeadline.TaskID)
+            .where(TaskDeadline.Status == "pending")
+            .order_by(TaskDeadline.DueAt)
+            .limit(limit)
+        ).all()
+        return [(due_at, task_id) for due_at, task_id in rows]
+
+    @staticmethod
+    def sync_from_tasks(db: Session, batch_size: int = 500) -> int:
+        """
+        为已满员、未分配但没有调度记录的任务补登记截止时间（上线前开放竞标的任务），
+        没有截止时间的任务按现在到期
+        Returns:
+            补登记的任务数
+        """
+        total = 0
+        now = datetime.now()
+        try:
+            while True:
+                rows = db.execute(
+                    select(Task.TaskID, Task.BidDeadlineAt)
+                    .outerjoin(TaskDeadline, TaskDeadline.TaskID == Task.TaskID)
+                    .where(
+                        Task.Status == "full",
+                        or_(Task.CurrentBidder.is_(None), Task.CurrentBidder == ""),
+                        TaskDeadline.TaskID.is_(None),
+                    )
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                for task_id, deadline_at in rows:
+                    db.add(TaskDeadline(
+                        TaskID=task_id, DueAt=deadline_at or now, Status="pending",
+                        Extensions=0, Result="", UpdatedAt=now,
+                    ))
+                db.commit()
+                total += len(rows)
+            return total
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"补登记竞标截止时间失败: {str(e)}")
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """调度指标：最近一轮和累计处理结果"""
+        with _deadline_metrics_lock:
+            return {"last_tick": _deadline_metrics["last_tick"], "totals": dict(_deadline_metrics["totals"])}
+
+    @staticmethod
+    def reset_metrics():
+        with _deadline_metrics_lock:
+            _deadline_metrics["last_tick"] = None
+            for key in _deadline_metrics["totals"]:
+                _deadline_metrics["totals"][key] = 0
+
+
+class DeadlineScheduler:
+    """
+    后台线程按截止时间唤醒处理到期记录，每轮使用独立的数据库会话
+    最小堆缓存最近 DEADLINE_BATCH_SIZE 个截止时间，每轮结束后从表中重建（其他进程登记的记录也能看到），
+    最长等待 DEADLINE_POLL_INTERVAL 秒
+    """
+
+    def __init__(self, session_factory, poll_interval: float = None, batch_size: int = None):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval or config.DEADLINE_POLL_INTERVAL
+        self.batch_size = batch_size or config.DEADLINE_BATCH_SIZE
+        self._heap: List[float] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self, due_at: datetime):
+        """登记截止时间，只有早于当前最近截止时间时才唤醒线程重新计算等待时间"""
+        timestamp = due_at.timestamp()
+        with self._lock:
+            earlier = not self._heap or timestamp < self._heap[0]
+            heapq.heappush(self._heap, timestamp)
+        if earlier:
+            self._wakeup.set()
+
+    def next_wait(self) -> float:
+        """距离最近截止时间的秒数，不超过 poll_interval"""
+        with self._lock:
+            if not self._heap:
+                return self.poll_interval
+            return min(max(self._heap[0] - time.time(), 0.0), self.poll_interval)
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        """处理所有到期记录（每批 batch_size 个），再从表中重建最小堆"""
+        db = self.session_factory()
+        try:
+            metrics = DeadlineUtils.process_due(db, batch_size=self.batch_size)
+            while metrics["claimed"] >= self.batch_size and not self._stop_event.is_set():
+                metrics = DeadlineUtils.process_due(db, batch_size=self.batch_size)
+            upcoming = DeadlineUtils.upcoming(db, self.batch_size)
+            heap = [due_at.timestamp() for due_at, _ in upcoming]
+            heapq.heapify(heap)
+            with self._lock:
+                self._heap = heap
+            return metrics
+        except Exception:
+            with self._lock:
+                self._heap = []
+            return None
+        finally:
+            db.close()
+
+    def _run(self):
+        self.run_once()
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.next_wait())
+            self._wakeup.clear()
+            if self._stop_event.is_set():
+                break
+            self.run_once()
+
+    def start(self):
+        global _active_scheduler
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="bid-deadline-scheduler", daemon=True)
+            self._thread.start()
+        _active_scheduler = self
+        return self
+
+    def stop(self):
+        global _active_scheduler
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if _active_scheduler is self:
+            _active_scheduler = None
@@ -0,0 +1,380 @@
+"""
+批量派单模块
+周期性取出所有待派单订单和有空位的骑手，以骑手当前位置到取货点的预计骑行时间构建代价矩阵，
+用匈牙利算法求总取货时间最小的分配（规模超过 DISPATCH_HUNGARIAN_MAX 时改用贪心），
+再在一个事务中用带状态条件的 UPDATE 批量提交，与骑手手动接单并发时不会重复分配
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+import config
+from models import Orders, Staff
+from utils.map_utils import EARTH_RADIUS_M
+from utils.order_utils import OrderUtils
+
+logger = logging.getLogger(__name__)
+
+# 派单指标：最近一轮的结果和启动以来的累计值
+_dispatch_metrics: Dict[str, Any] = {
+    "last_cycle": None,
+    "totals": {"cycles": 0, "orders": 0, "assigned": 0, "conflicts": 0, "pickup_seconds": 0.0, "errors": 0},
+}
+_dispatch_metrics_lock = threading.Lock()
+
+
+class DispatchUtils:
+    """批量派单工具类"""
+
+    @staticmethod
+    def update_staff_location(db: Session, staff_id: Decimal, longitude: float, latitude: float) -> bool:
+        """
+        记录骑手当前位置
+        Returns:
+            骑手是否存在
+        """
+        try:
+            staff = db.query(Staff).filter(Staff.UserID == staff_id).first()
+            if not staff:
+                return False
+            staff.Longitude = Decimal(f"{longitude:.6f}")
+            staff.Latitude = Decimal(f"{latitude:.6f}")
+            staff.LocationUpdatedAt = datetime.now()
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"更新骑手位置失败: {str(e)}")
+
+    @staticmethod
+    def get_available_staff(db: Session, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        获取可派单的骑手：位置在有效期内，且进行中的订单数未达到 DISPATCH_STAFF_CAPACITY
+        """
+        now = now or datetime.now()
+        busy = (
+            select(Orders.StaffID)
+            .where(Orders.OrderStatus == "assigned", Orders.StaffID.isnot(None))
+            .group_by(Orders.StaffID)
+            .having(func.count() >= config.DISPATCH_STAFF_CAPACITY)
+        )
+        rows = (
+            db.query(Staff.UserID, Staff.Longitude, Staff.Latitude)
+            .filter(
+                Staff.Longitude.isnot(None),
+                Staff.Latitude.isnot(None),
+                Staff.LocationUpdatedAt >= now - timedelta(seconds=config.DISPATCH_LOCATION_MAX_AGE),
+                Staff.UserID.notin_(busy),
+            )
+            .order_by(Staff.UserID)
+            .all()
+        )
+        return [
+            {"staff_id": staff_id, "longitude": float(lon), "latitude": float(lat)}
+            for staff_id, lon, lat in rows
+        ]
+
+    @staticmethod
+    def get_dispatchable_orders(db: Session, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取待派单订单：pending + open，分配方式属于 DISPATCH_ASSIGNMENT_TYPES 且有取货点坐标，先下单的优先"""
+        rows = (
+            db.query(Orders.OrderID, Orders.ClientID, Orders.ShopLongitude, Orders.ShopLatitude)
+            .filter(
+                Orders.OrderStatus == "pending",
+                Orders.AssignmentStatus == "open",
+                Orders.AssignmentType.in_(config.DISPATCH_ASSIGNMENT_TYPES),
+                Orders.StaffID.is_(None),
+                Orders.ShopLongitude.isnot(None),
+                Orders.ShopLatitude.isnot(None),
+            )
+            .order_by(Orders.CreationTime, Orders.OrderID)
+            .limit(limit or config.DISPATCH_MAX_ORDERS)
+            .all()
+        )
+        return [
+            {"order_id": order_id, "client_id": client_id, "longitude": float(lon), "latitude": float(lat)}
+            for order_id, client_id, lon, lat in rows
+        ]
+
+    @staticmethod
+    def build_cost_matrix(staff: Sequence[Dict[str, Any]], orders: Sequence[Dict[str, Any]]) -> List[List[float]]:
+        """
+        构建取货时间矩阵（秒）：cost[i][j] 为骑手 i 到订单 j 取货点的直线距离 × 绕行系数 ÷ 骑行速度
+        每个点的弧度和纬度余弦只算一次，内层循环只剩一次 haversine
+        """
+        seconds_per_meter = config.ROUTE_DETOUR_FACTOR / config.CYCLING_SPEED_MPS
+        targets = [
+            (math.radians(o["longitude"]), math.radians(o["latitude"]), math.cos(math.radians(o["latitude"])))
+            for o in orders
+        ]
+        matrix = []
+        for s in staff:
+            lon1, lat1 = math.radians(s["longitude"]), math.radians(s["latitude"])
+            cos_lat1 = math.cos(lat1)
+            row = []
+            for lon2, lat2, cos_lat2 in targets:
+                a = math.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos_lat2 * math.sin((lon2 - lon1) / 2) ** 2
+                row.append(2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a))) * seconds_per_meter)
+            matrix.append(row)
+        return matrix
+
+    @staticmethod
+    def hungarian(cost: Sequence[Sequence[float]]) -> List[Tuple[int, int]]:
+        """
+        匈牙利算法（势函数 + 最短增广路，O(n²m)），返回总代价最小的 (行, 列) 匹配
+        行数多于列数时先转置，保证较小的一侧全部匹配
+        """
+        n = len(cost)
+        m = len(cost[0]) if n else 0
+        if n == 0 or m == 0:
+            return []
+        transposed = n > m
+        if transposed:
+            cost = [list(column) for column in zip(*cost)]
+            n, m = m, n
+
+        inf = float("inf")
+        u = [0.0] * (n + 1)
+        v = [0.0] * (m + 1)
+        match = [0] * (m + 1)  # match[j]: 匹配到列 j 的行（从 1 开始，0 为未匹配）
+        way = [0] * (m + 1)
+        for i in range(1, n + 1):
+            match[0] = i
+            j0 = 0
+            minv = [inf] * (m + 1)
+            used = [False] * (m + 1)
+            while True:
+                used[j0] = True
+                i0 = match[j0]
+                row = cost[i0 - 1]
+                ui0 = u[i0]
+                delta = inf
+                j1 = 0
+                for j in range(1, m + 1):
+                    if not used[j]:
+                        current = row[j - 1] - ui0 - v[j]
+                        if current < minv[j]:
+                            minv[j] = current
+                            way[j] = j0
+                        if minv[j] < delta:
+                            delta = minv[j]
+                            j1 = j
+                for j in range(m + 1):
+                    if used[j]:
+                        u[match[j]] += delta
+                        v[j] -= delta
+                    else:
+                        minv[j] -= delta
+                j0 = j1
+                if match[j0] == 0:
+                    break
+            while j0:
+                j1 = way[j0]
+                match[j0] = match[j1]
+                j0 = j1
+
+        pairs = [(match[j] - 1, j - 1) for j in range(1, m + 1) if match[j]]
+        if transposed:
+            pairs = [(j, i) for i, j in pairs]
+        return sorted(pairs)
+
+    @staticmethod
+    def greedy(cost: Sequence[Sequence[float]], max_cost: Optional[float] = None) -> List[Tuple[int, int]]:
+        """贪心匹配：所有可行 (骑手, 订单) 按代价从小到大，依次选取双方都未匹配的组合"""
+        candidates = sorted(
+            (value, i, j)
+            for i, row in enumerate(cost)
+            for j, value in enumerate(row)
+            if max_cost is None or value <= max_cost
+        )
+        used_rows, used_cols, pairs = set(), set(), []
+        for _, i, j in candidates:
+            if i not in used_rows and j not in used_cols:
+                used_rows.add(i)
+                used_cols.add(j)
+                pairs.append((i, j))
+        return sorted(pairs)
+
+    @staticmethod
+    def solve(
+        cost: Sequence[Sequence[float]], max_cost: Optional[float] = None, method: str = "auto"
+    ) -> Tuple[List[Tuple[int, int]], str]:
+        """
+        求解分配
+        Args:
+            cost: 代价矩阵
+            max_cost: 超过该代价的组合不分配
+            method: hungarian / greedy / auto（规模不超过 DISPATCH_HUNGARIAN_MAX 时用匈牙利算法）
+        Returns:
+            (匹配列表, 实际使用的算法)
+        """
+        if not cost or not cost[0]:
+            return [], "none"
+        if method == "auto":
+            method = "hungarian" if max(len(cost), len(cost[0])) <= config.DISPATCH_HUNGARIAN_MAX else "greedy"
+        if method == "greedy":
+            return DispatchUtils.greedy(cost, max_cost), method
+
+        if max_cost is None:
+            return DispatchUtils.hungarian(cost), method
+        # 不可行组合换成足够大的惩罚值：任何多匹配一个可行组合的方案总代价都更小，求解后再剔除
+        feasible = [value for row in cost for value in row if value <= max_cost]
+        if not feasible:
+            return [], method
+        penalty = (max(feasible) + 1) * (min(len(cost), len(cost[0])) + 1)
+        masked = [[value if value <= max_cost else penalty for value in row] for row in cost]
+        pairs = DispatchUtils.hungarian(masked)
+        return [(i, j) for i, j in pairs if cost[i][j] <= max_cost], method
+
+    @staticmethod
+    def commit_assignments(
+        db: Session, assignments: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        在一个事务中批量提交分配
+        每条 UPDATE 都带 pending/open/未分配条件，订单已被骑手手动接走时影响行数为 0，跳过该条
+        Returns:
+            实际提交成功的 (骑手, 订单)
+        """
+        committed = []
+        try:
+            for staff, order in assignments:
+                result = db.execute(
+                    update(Orders)
+                    .where(
+                        Orders.OrderID == order["order_id"],
+                        Orders.OrderStatus == "pending",
+                        Orders.AssignmentStatus == "open",
+                        Orders.StaffID.is_(None),
+                    )
+                    .values(StaffID=staff["staff_id"], OrderStatus="assigned", AssignmentStatus="assigned")
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 1:
+                    committed.append((staff, order))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"提交派单结果失败: {str(e)}")
+
+        for staff, order in committed:
+            OrderUtils.invalidate_order_statistics(client_id=order["client_id"], staff_id=staff["staff_id"])
+        return committed
+
+    @staticmethod
+    def run_cycle(db: Session, method: str = "auto", now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        执行一轮派单并记录指标
+        Returns:
+            本轮指标：订单数、骑手数、分配数、冲突数、分配率、平均/最大取货时间、算法和耗时
+        """
+        started = time.perf_counter()
+        try:
+            orders = DispatchUtils.get_dispatchable_orders(db)
+            staff = DispatchUtils.get_available_staff(db, now)
+            cost = DispatchUtils.build_cost_matrix(staff, orders) if orders and staff else []
+            pairs, solver = DispatchUtils.solve(cost, config.DISPATCH_MAX_PICKUP_SECONDS or None, method)
+            planned = {orders[j]["order_id"]: cost[i][j] for i, j in pairs}
+            committed = DispatchUtils.commit_assignments(db, [(staff[i], orders[j]) for i, j in pairs])
+        except Exception as e:
+            with _dispatch_metrics_lock:
+                _dispatch_metrics["totals"]["errors"] += 1
+            logger.error(f"批量派单失败: {str(e)}")
+            raise
+
+        pickups = [planned[order["order_id"]] for _, order in committed]
+        metrics = {
+            "orders": len(orders),
+            "staff": len(staff),
+            "assigned": len(committed),
+            "conflicts": len(pairs) - len(committed),
+            "assignment_rate": round(len(committed) / len(orders), 4) if orders else 0.0,
+            "mean_pickup_eta": round(sum(pickups) / len(pickups), 1) if pickups else None,
+            "max_pickup_eta": round(max(pickups), 1) if pickups else None,
+            "solver": solver,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "assignments": [
+                {"order_id": str(order["order_id"]), "staff_id": str(s["staff_id"]),
+                 "pickup_eta": round(planned[order["order_id"]], 1)}
+                for s, order in committed
+            ],
+        }
+        with _dispatch_metrics_lock:
+            _dispatch_metrics["last_cycle"] = metrics
+            totals = _dispatch_metrics["totals"]
+            totals["cycles"] += 1
+            totals["orders"] += metrics["orders"]
+            totals["assigned"] += metrics["assigned"]
+            totals["conflicts"] += metrics["conflicts"]
+            totals["pickup_seconds"] += sum(pickups)
+        if orders:
+            logger.info(
+                f"批量派单完成: 订单 {metrics['orders']} 个，骑手 {metrics['staff']} 个，分配 {metrics['assigned']} 个，"
+                f"平均取货时间 {metrics['mean_pickup_eta']} 秒，耗时 {metrics['duration_ms']} 毫秒"
+            )
+        return metrics
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """派单指标：最近一轮（不含明细）和累计分配率、平均取货时间"""
+        with _dispatch_metrics_lock:
+            last_cycle = _dispatch_metrics["last_cycle"]
+            totals = dict(_dispatch_metrics["totals"])
+        if last_cycle is not None:
+            last_cycle = {key: value for key, value in last_cycle.items() if key != "assignments"}
+        pickup_seconds = totals.pop("pickup_seconds")
+        totals["assignment_rate"] = round(totals["assigned"] / totals["orders"], 4) if totals["orders"] else 0.0
+        totals["mean_pickup_eta"] = round(pickup_seconds / totals["assigned"], 1) if totals["assigned"] else None
+        return {"last_cycle": last_cycle, "totals": totals}
+
+    @staticmethod
+    def reset_metrics():
+        with _dispatch_metrics_lock:
+            _dispatch_metrics["last_cycle"] = None
+            for key in _dispatch_metrics["totals"]:
+                _dispatch_metrics["totals"][key] = 0.0 if key == "pickup_seconds" else 0
+
+
+class DispatchEngine:
+    """后台线程按 DISPATCH_INTERVAL 周期执行批量派单，每轮使用独立的数据库会话"""
+
+    def __init__(self, session_factory, interval_seconds: float = None):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds or config.DISPATCH_INTERVAL
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            return DispatchUtils.run_cycle(db)
+        except Exception:
+            return None
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            self.run_once()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="order-dispatch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,190 @@
+"""
+多站点配送时间估算模块
+把骑手所有已接订单的取货点和收货点放进一张骑行时间矩阵（路线缓存或直线估算，不调用接口），
+用最近邻构造 + 单点移动（relocate）局部优化求访问顺序（每个订单先取货后送达），
+再沿路线累加得到每个订单的预计取货、送达时间
+"""
+
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+import config
+from models import Staff
+from utils.map_utils import MapUtils
+from utils.order_utils import OrderUtils
+
+# 路线上的节点：0 为骑手起点，1..K 为各订单取货点，K+1..2K 为对应的收货点
+
+
+class EtaUtils:
+    """多站点配送时间估算工具类"""
+
+    @staticmethod
+    def _nearest_neighbor(matrix: List[List[float]], order_count: int) -> List[int]:
+        """最近邻构造：每次前往最近的可访问站点（未取货订单的取货点，或已取货订单的收货点）"""
+        route = [0]
+        candidates = set(range(1, order_count + 1))
+        current = 0
+        while candidates:
+            row = matrix[current]
+            current = min(candidates, key=row.__getitem__)
+            candidates.remove(current)
+            if current <= order_count:
+                candidates.add(current + order_count)
+            route.append(current)
+        return route
+
+    @staticmethod
+    def _relocate(matrix: List[List[float]], route: List[int], order_count: int, max_passes: int) -> List[int]:
+        """
+        单点移动局部优化：把某个站点移到路线其他位置能缩短总骑行时间时就移动，直到没有改进
+        路线不回到起点；移动后仍需满足取货点在收货点之前，增量代价 O(1) 计算
+        """
+        for _ in range(max_passes):
+            improved = False
+            for i in range(1, len(route)):
+                node = route[i]
+                prev = route[i - 1]
+                removal_gain = matrix[prev][node]
+                if i + 1 < len(route):
+                    nxt = route[i + 1]
+                    removal_gain += matrix[node][nxt] - matrix[prev][nxt]
+
+                rest = route[:i] + route[i + 1:]
+                if node <= order_count:
+                    partner = rest.index(node + order_count)
+                    positions = range(1, partner + 1)
+                else:
+                    partner = rest.index(node - order_count)
+                    positions = range(partner + 1, len(rest) + 1)
+
+                best_delta, best_position = -1e-9, None
+                for position in positions:
+                    before = rest[position - 1]
+                    insert_cost = matrix[before][node]
+                    if position < len(rest):
+                        after = rest[position]
+                        insert_cost += matrix[node][after] - matrix[before][after]
+                    delta = insert_cost - removal_gain
+                    if delta < best_delta:
+                        best_delta, best_position = delta, position
+                if best_position is not None:
+                    rest.insert(best_position, node)
+                    route = rest
+                    improved = True
+            if not improved:
+                break
+        return route
+
+    @staticmethod
+    def travel_time(matrix: List[List[float]], route: Sequence[int]) -> float:
+        """路线总骑行时间（秒，不含取货/送达停留）"""
+        return sum(matrix[a][b] for a, b in zip(route, route[1:]))
+
+    @staticmethod
+    def plan_route(
+        origin: Optional[Tuple[float, float]],
+        orders: Sequence[Dict[str, Any]],
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        规划多订单访问顺序并估算每个订单的送达时间
+        Args:
+            origin: 骑手当前位置 (经度, 纬度)；为 None 时从第一个站点出发，不计到达第一站的时间
+            orders: get_staff_orders 返回的订单（需包含取货点和收货点坐标）
+            now: 计算预计时间的起始时刻
+        Returns:
+            Dict: 按访问顺序的站点 stops、每个订单的预计取货/送达时间 orders、总耗时 total_duration，
+            缺少坐标未参与规划的订单 unplanned
+        """
+        started = time.perf_counter()
+        now = now or datetime.now()
+        planned, unplanned = [], []
+        for order in orders:
+            coords = (order.get("shop_longitude"), order.get("shop_latitude"),
+                      order.get("order_longitude"), order.get("order_latitude"))
+            (planned if None not in coords else unplanned).append(order)
+
+        count = len(planned)
+        points = [origin or (0.0, 0.0)]
+        points += [(o["shop_longitude"], o["shop_latitude"]) for o in planned]
+        points += [(o["order_longitude"], o["order_latitude"]) for o in planned]
+        matrix, cached_legs = MapUtils.duration_matrix(points)
+        if origin is None:
+            matrix[0] = [0.0] * len(points)
+
+        route = EtaUtils._nearest_neighbor(matrix, count)
+        route = EtaUtils._relocate(matrix, route, count, config.ETA_MAX_PASSES)
+
+        stops, estimates = [], {}
+        elapsed = 0.0
+        for prev, node in zip(route, route[1:]):
+            elapsed += matrix[prev][node]
+            is_pickup = node <= count
+            order = planned[node - 1 if is_pickup else node - count - 1]
+            elapsed += config.ETA_PICKUP_SERVICE_SECONDS if is_pickup else config.ETA_DROPOFF_SERVICE_SECONDS
+            stops.append({
+                "order_id": order["order_id"],
+                "type": "pickup" if is_pickup else "dropoff",
+                "eta": int(elapsed),
+            })
+            estimates.setdefault(order["order_id"], {})["pickup_eta" if is_pickup else "delivery_eta"] = int(elapsed)
+
+        orders_result = []
+        for order in planned:
+            estimate = estimates[order["order_id"]]
+            orders_result.append({
+                "order_id": order["order_id"],
+                "pickup_eta": estimate["pickup_eta"],
+                "delivery_eta": estimate["delivery_eta"],
+                "projected_completion_time": (
+                    now + timedelta(seconds=estimate["delivery_eta"])
+                ).strftime("%Y-%m-%d %H:%M:%S"),
+            })
+        orders_result.sort(key=lambda item: item["delivery_eta"])
+
+        return {
+            "origin": {"longitude": origin[0], "latitude": origin[1]} if origin else None,
+            "stops": stops,
+            "orders": orders_result,
+            "total_duration": int(elapsed),
+            "travel_time": int(EtaUtils.travel_time(matrix, route)),
+            "cached_legs": cached_legs,
+            "unplanned": [order["order_id"] for order in unplanned],
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    @staticmethod
+    def estimate_staff_queue(
+        db: Session,
+        staff_id: Decimal,
+        longitude: Optional[float] = None,
+        latitude: Optional[float] = None,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        估算骑手所有已接订单（最多 ETA_MAX_ORDERS 个）的送达时间
+        Args:
+            longitude, latitude: 骑手当前位置，不传时使用最近一次上报的位置
+        """
+        try:
+            page = OrderUtils.get_staff_orders(
+                db, staff_id, per_page=config.ETA_MAX_ORDERS, status="assigned", cursor=""
+            )
+            origin = None
+            if longitude is not None and latitude is not None:
+                origin = (longitude, latitude)
+            else:
+                staff = db.query(Staff).filter(Staff.UserID == staff_id).first()
+                if staff and staff.Longitude is not None and staff.Latitude is not None:
+                    origin = (float(staff.Longitude), float(staff.Latitude))
+
+            result = EtaUtils.plan_route(origin, page["orders"], now)
+            result["truncated"] = page["pagination"]["has_next"]
+            return result
+        except Exception as e:
+            raise Exception(f"估算配送时间失败: {str(e)}")
@@ -0,0 +1,127 @@
+"""
+HTTP 客户端工具模块
+为高德等外部接口提供连接池复用、超时、重试退避和熔断
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.RequestException):
+    """熔断器打开，请求未发出"""
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败达到阈值后打开，在 reset_timeout 秒内直接拒绝请求；
+    到期后进入半开状态放行一个试探请求，成功则关闭，失败则重新打开
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"外部接口连续失败 {self._failures} 次，熔断 {self.reset_timeout} 秒")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class HttpClient:
+    """带连接池、超时、重试和熔断的 JSON 接口客户端"""
+
+    def __init__(
+        self,
+        pool_size: int = 20,
+        timeout: Union[float, Tuple[float, float]] = (2, 5),
+        retries: int = 2,
+        backoff_factor: float = 0.2,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+    ):
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.session = requests.Session()
+        # 只重试连接失败和 429/5xx 响应；读超时不重试（直接抛出 Timeout），timeout 即单次调用的等待上限
+        retry = Retry(
+            total=retries,
+            read=False,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Union[float, Tuple[float, float], None] = None,
+    ) -> Dict[str, Any]:
+        """
+        发送 GET 请求并解析 JSON
+        Raises:
+            CircuitOpenError: 熔断器打开
+            requests.RequestException: 超时、连接失败或重试后仍为 5xx
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"熔断中，跳过请求: {url}")
+        try:
+            response = self.session.get(url, params=params, timeout=timeout or self.timeout)
+            response.raise_for_status()
+            result = response.json()
+        except (requests.RequestException, ValueError):
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
@@ -0,0 +1,157 @@
+"""
+分布式ID生成工具模块
+提供 Snowflake 风格的 64 位有序ID，用于订单、任务、团办任务、竞标和用户
+"""
+
+import os
+import socket
+import threading
+import time
+import zlib
+from decimal import Decimal
+from typing import Dict, Optional
+import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ID 结构：1位符号位(0) | 41位毫秒时间戳 | 10位机器ID | 12位序列号
+EPOCH_MS = 1735660800000  # 2025-01-01 00:00:00 UTC+8
+WORKER_ID_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_ID_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+WORKER_ID_SHIFT = SEQUENCE_BITS
+TIMESTAMP_SHIFT = SEQUENCE_BITS + WORKER_ID_BITS
+
+# 允许等待的最大时钟回拨（毫秒），超过则拒绝生成
+MAX_CLOCK_BACKWARD_MS = 5
+
+
+def _default_worker_id() -> int:
+    """
+    获取当前进程的机器ID
+    读取环境变量 ID_WORKER_ID，多进程、多主机部署时必须为每个 worker 分配不同的值。
+    由主机名和进程号推导的ID可能在进程间重复，进而生成重复主键，只在非生产环境作为后备；
+    APP_ENV=production 且未配置时直接报错
+    """
+    configured = os.environ.get("ID_WORKER_ID")
+    if configured is not None and configured != "":
+        worker_id = int(configured)
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"ID_WORKER_ID 必须在 0~{MAX_WORKER_ID} 之间")
+        return worker_id
+
+    if config.APP_ENV == "production":
+        raise RuntimeError("生产环境必须通过 ID_WORKER_ID 为每个进程配置唯一的机器ID")
+
+    host_hash = zlib.crc32(socket.gethostname().encode())
+    worker_id = (host_hash ^ os.getpid()) & MAX_WORKER_ID
+    logger.warning(f"未配置 ID_WORKER_ID，使用推导的机器ID {worker_id}（不保证进程间唯一，仅用于开发环境）")
+    return worker_id
+
+
+class SnowflakeGenerator:
+    """Snowflake ID 生成器（线程安全，不访问数据库）"""
+
+    def __init__(self, worker_id: int):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id 必须在 0~{MAX_WORKER_ID} 之间")
+        self.worker_id = worker_id
+        self._lock = threading.Lock()
+        self._last_timestamp = -1
+        self._sequence = 0
+
+    @staticmethod
+    def _current_millis() -> int:
+        return time.time_ns() // 1000000
+
+    def _wait_next_millis(self, last_timestamp: int) -> int:
+        timestamp = self._current_millis()
+        while timestamp <= last_timestamp:
+            time.sleep(0.0001)
+            timestamp = self._current_millis()
+        return timestamp
+
+    def next_id(self) -> int:
+        """生成下一个ID"""
+        with self._lock:
+            timestamp = self._current_millis()
+
+            if timestamp < self._last_timestamp:
+                backward = self._last_timestamp - timestamp
+                if backward > MAX_CLOCK_BACKWARD_MS:
+                    raise RuntimeError(f"系统时钟回拨 {backward} 毫秒，拒绝生成ID")
+                timestamp = self._wait_next_millis(self._last_timestamp - 1)
+
+            if timestamp == self._last_timestamp:
+                self._sequence = (self._sequence + 1) & SEQUENCE_MASK
+                if self._sequence == 0:
+                    # 当前毫秒序列号用尽，等待下一毫秒
+                    timestamp = self._wait_next_millis(self._last_timestamp)
+            else:
+                self._sequence = 0
+
+            self._last_timestamp = timestamp
+            return (
+                ((timestamp - EPOCH_MS) << TIMESTAMP_SHIFT)
+                | (self.worker_id << WORKER_ID_SHIFT)
+                | self._sequence
+            )
+
+
+_generator: Optional[SnowflakeGenerator] = None
+_generator_lock = threading.Lock()
+
+
+def _reset_generator():
+    """fork 后子进程重新推导机器ID并重置序列号"""
+    global _generator, _generator_lock
+    _generator = None
+    _generator_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_generator)
+
+
+class IdUtils:
+    """ID生成工具类"""
+
+    @staticmethod
+    def get_generator() -> SnowflakeGenerator:
+        """获取当前进程的ID生成器"""
+        global _generator
+        if _generator is None:
+            with _generator_lock:
+                if _generator is None:
+                    _generator = SnowflakeGenerator(_default_worker_id())
+                    logger.info(f"ID生成器初始化，机器ID: {_generator.worker_id}")
+        return _generator
+
+    @staticmethod
+    def configure(worker_id: int) -> SnowflakeGenerator:
+        """显式指定当前进程的机器ID"""
+        global _generator
+        with _generator_lock:
+            _generator = SnowflakeGenerator(worker_id)
+        return _generator
+
+    @staticmethod
+    def next_id() -> Decimal:
+        """生成唯一ID（与模型中 DECIMAL(20,0) 主键一致）"""
+        return Decimal(IdUtils.get_generator().next_id())
+
+    @staticmethod
+    def parse_id(id_value) -> Dict[str, int]:
+        """
+        解析ID的组成部分
+        Returns:
+            Dict: timestamp(毫秒时间戳)、worker_id、sequence
+        """
+        value = int(id_value)
+        return {
+            "timestamp": (value >> TIMESTAMP_SHIFT) + EPOCH_MS,
+            "worker_id": (value >> WORKER_ID_SHIFT) & MAX_WORKER_ID,
+            "sequence": value & SEQUENCE_MASK,
+        }
@@ -0,0 +1,337 @@
+"""
+异步任务队列模块
+请求处理中的后续操作（如支付后的积分奖励）在业务事务内写入 Job 表，随业务一起提交后由 worker 线程池认领执行：
+处理函数的数据库修改与任务完成标记在同一事务提交，失败时按指数退避重试，超过最多次数标记为 failed；
+IdempotencyKey 相同的任务只入队一次。未开启 worker（JOB_WORKERS_ENABLED=false）时入队即在当前事务内同步执行
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import config
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+# 任务类型 -> 处理函数 handler(db, payload)，处理函数只修改数据、不提交事务
+_job_handlers: Dict[str, Callable[[Session, Dict[str, Any]], None]] = {}
+
+# 队列指标：启动以来的累计值和最近完成任务的排队到完成耗时（秒）
+_job_metrics: Dict[str, Any] = {
+    "totals": {"enqueued": 0, "duplicates": 0, "succeeded": 0, "retried": 0, "failed": 0, "conflicts": 0},
+    "latencies": deque(maxlen=1000),
+    "run_times": deque(maxlen=1000),
+}
+_job_metrics_lock = threading.Lock()
+
+# 本进程运行中的 worker 线程池，会话提交了新任务时唤醒
+_active_pool: Optional["JobWorkerPool"] = None
+
+
+def _percentile(values: List[float], ratio: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(int(len(ordered) * ratio), len(ordered) - 1)], 3)
+
+
+def _count(name: str, amount: int = 1):
+    with _job_metrics_lock:
+        _job_metrics["totals"][name] += amount
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers_after_commit(session):
+    if session.info.pop("jobs_enqueued", False) and _active_pool is not None:
+        _active_pool.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_enqueued_flag(session):
+    session.info.pop("jobs_enqueued", None)
+
+
+class JobUtils:
+    """异步任务队列工具类"""
+
+    @staticmethod
+    def register_handler(kind: str, handler: Callable[[Session, Dict[str, Any]], None]) -> None:
+        """注册任务处理函数（模块导入时调用）"""
+        _job_handlers[kind] = handler
+
+    @staticmethod
+    def enqueue(
+        db: Session,
+        kind: str,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+        delay_seconds: float = 0,
+        max_attempts: Optional[int] = None,
+    ) -> Optional[Job]:
+        """
+        在当前事务中写入一个任务，不提交事务，随调用方的业务修改一起提交
+        Args:
+            idempotency_key: 幂等键，已有相同键的任务时不再入队
+        Returns:
+            新写入的任务；幂等键重复时返回 None
+        """
+        if kind not in _job_handlers:
+            raise ValueError(f"未注册的任务类型: {kind}")
+
+        now = datetime.now()
+        job = Job(
+            Kind=kind,
+            Payload=json.dumps(payload, ensure_ascii=False, default=str),
+            IdempotencyKey=idempotency_key,
+            Status="pending",
+            Attempts=0,
+            MaxAttempts=max_attempts or config.JOB_MAX_ATTEMPTS,
+            AvailableAt=now + timedelta(seconds=delay_seconds),
+            CreatedAt=now,
+            LastError="",
+        )
+        if idempotency_key:
+            # 在保存点内插入，依靠唯一索引判重：并发入队同一个键时后提交的一方只回滚保存点，不影响调用方的事务
+            try:
+                with db.begin_nested():
+                    db.add(job)
+            except IntegrityError:
+                _count("duplicates")
+                logger.info(f"任务 {idempotency_key} 已入队，跳过")
+                return None
+        else:
+            db.add(job)
+        _count("enqueued")
+
+        if not config.JOB_WORKERS_ENABLED and not delay_seconds:
+            # 未开启 worker：在当前事务内直接执行，保持与业务修改的原子性
+            _job_handlers[kind](db, payload)
+            job.Status = "done"
+            job.Attempts = 1
+            job.FinishedAt = datetime.now()
+            _count("succeeded")
+        else:
+            db.info["jobs_enqueued"] = True
+        return job
+
+    @staticmethod
+    def claim(db: Session, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[Job]:
+        """
+        按 AvailableAt 顺序认领一批可执行任务（待执行，或租期已过的执行中任务），
+        认领时执行次数加一并把 AvailableAt 推后 JOB_LEASE_SECONDS 秒，多个 worker 同时认领时只有一个能更新成功
+        """
+        now = now or datetime.now()
+        rows = db.execute(
+            select(Job.JobID, Job.Attempts)
+            .where(Job.Status.in_(("pending", "running")), Job.AvailableAt <= now)
+            .order_by(Job.AvailableAt)
+            .limit(limit or config.JOB_CLAIM_BATCH)
+        ).all()
+        lease_until = now + timedelta(seconds=config.JOB_LEASE_SECONDS)
+        claimed = []
+        try:
+            for job_id, attempts in rows:
+                result = db.execute(
+                    update(Job)
+                    .where(
+                        Job.JobID == job_id,
+                        Job.Attempts == attempts,
+                        Job.Status.in_(("pending", "running")),
+                        Job.AvailableAt <= now,
+                    )
+                    .values(Status="running", Attempts=attempts + 1, AvailableAt=lease_until)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 1:
+                    claimed.append(job_id)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"认领任务失败: {str(e)}")
+        if not claimed:
+            return []
+        return db.query(Job).filter(Job.JobID.in_(claimed)).order_by(Job.AvailableAt, Job.JobID).all()
+
+    @staticmethod
+    def _finish(db: Session, job_id: int, attempts: int, values: Dict[str, Any]) -> bool:
+        """只有仍持有认领（执行次数未被其他 worker 改变）时才更新任务状态"""
+        result = db.execute(
+            update(Job)
+            .where(Job.JobID == job_id, Job.Status == "running", Job.Attempts == attempts)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def run_job(db: Session, job: Job) -> str:
+        """
+        执行一个已认领的任务
+        Returns:
+            执行结果：done、retry、failed 或 conflict（认领已被其他 worker 接管）
+        """
+        job_id, kind, attempts, max_attempts = job.JobID, job.Kind, job.Attempts, job.MaxAttempts
+        created_at = job.CreatedAt
+        started = time.perf_counter()
+        try:
+            handler = _job_handlers.get(kind)
+            if handler is None:
+                raise ValueError(f"未注册的任务类型: {kind}")
+            handler(db, json.loads(job.Payload))
+            finished_at = datetime.now()
+            if not JobUtils._finish(db, job_id, attempts, {"Status": "done", "FinishedAt": finished_at, "LastError": ""}):
+                db.rollback()
+                _count("conflicts")
+                return "conflict"
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            error = str(e)[:500]
+            now = datetime.now()
+            if attempts >= max_attempts:
+                values = {"Status": "failed", "FinishedAt": now, "LastError": error}
+                outcome = "failed"
+            else:
+                backoff = config.JOB_RETRY_BACKOFF * (2 ** (attempts - 1))
+                values = {"Status": "pending", "AvailableAt": now + timedelta(seconds=backoff), "LastError": error}
+                outcome = "retry"
+            try:
+                if JobUtils._finish(db, job_id, attempts, values):
+                    db.commit()
+                else:
+                    db.rollback()
+            except Exception as update_error:
+                db.rollback()
+                logger.error(f"更新任务 {job_id} 状态失败: {str(update_error)}")
+            _count("failed" if outcome == "failed" else "retried")
+            logger.error(f"任务 {job_id}（{kind}）第 {attempts} 次执行失败: {error}")
+            return outcome
+
+        with _job_metrics_lock:
+            _job_metrics["totals"]["succeeded"] += 1
+            _job_metrics["latencies"].append((finished_at - created_at).total_seconds())
+            _job_metrics["run_times"].append(time.perf_counter() - started)
+        return "done"
+
+    @staticmethod
+    def run_pending(db: Session, limit: Optional[int] = None, now: Optional[datetime] = None) -> Dict[str, int]:
+        """认领并执行一批任务，返回各执行结果的数量"""
+        results = {"claimed": 0, "done": 0, "retry": 0, "failed": 0, "conflict": 0}
+        for job in JobUtils.claim(db, limit, now):
+            results["claimed"] += 1
+            results[JobUtils.run_job(db, job)] += 1
+        return results
+
+    @staticmethod
+    def get_queue_depth(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """按状态和任务类型统计队列中的任务数，以及最早一个待执行任务的排队时间（秒）"""
+        now = now or datetime.now()
+        depth: Dict[str, Dict[str, int]] = {}
+        for status, kind, count in db.execute(
+            select(Job.Status, Job.Kind, func.count())
+            .where(Job.Status.in_(("pending", "running", "failed")))
+            .group_by(Job.Status, Job.Kind)
+        ):
+            depth.setdefault(status, {})[kind] = count
+        oldest = db.execute(select(func.min(Job.CreatedAt)).where(Job.Status == "pending")).scalar()
+        return {
+            "depth": depth,
+            "pending": sum(depth.get("pending", {}).values()),
+            "oldest_pending_age": round((now - oldest).total_seconds(), 1) if oldest else None,
+        }
+
+    @staticmethod
+    def get_metrics(db: Optional[Session] = None) -> Dict[str, Any]:
+        """队列指标：累计执行结果、排队到完成耗时和执行耗时的分位数，传入 db 时附带队列深度"""
+        with _job_metrics_lock:
+            totals = dict(_job_metrics["totals"])
+            latencies = list(_job_metrics["latencies"])
+            run_times = list(_job_metrics["run_times"])
+        metrics = {
+            "totals": totals,
+            "latency": {"p50": _percentile(latencies, 0.5), "p95": _percentile(latencies, 0.95),
+                        "max": round(max(latencies), 3) if latencies else None},
+            "run_time": {"p50": _percentile(run_times, 0.5), "p95": _percentile(run_times, 0.95)},
+        }
+        if db is not None:
+            metrics["queue"] = JobUtils.get_queue_depth(db)
+        return metrics
+
+    @staticmethod
+    def reset_metrics():
+        with _job_metrics_lock:
+            for key in _job_metrics["totals"]:
+                _job_metrics["totals"][key] = 0
+            _job_metrics["latencies"].clear()
+            _job_metrics["run_times"].clear()
+
+
+class JobWorkerPool:
+    """JOB_WORKERS 个后台线程循环认领执行任务，每个线程使用独立的数据库会话；队列为空时最长等待 poll_interval 秒"""
+
+    def __init__(self, session_factory, workers: int = None, poll_interval: float = None):
+        self.session_factory = session_factory
+        self.workers = workers or config.JOB_WORKERS
+        self.poll_interval = poll_interval or config.JOB_POLL_INTERVAL
+        self._condition = threading.Condition()
+        self._wakeups = 0  # 唤醒计数，避免在线程开始等待前到来的唤醒丢失
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def wake(self):
+        with self._condition:
+            self._wakeups += 1
+            self._condition.notify_all()
+
+    def run_once(self) -> Optional[Dict[str, int]]:
+        db = self.session_factory()
+        try:
+            return JobUtils.run_pending(db)
+        except Exception as e:
+            logger.error(f"执行任务队列失败: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._condition:
+                seen = self._wakeups
+            results = self.run_once()
+            if results and results["claimed"]:
+                continue
+            with self._condition:
+                if self._wakeups == seen and not self._stop_event.is_set():
+                    self._condition.wait(self.poll_interval)
+
+    def start(self):
+        global _active_pool
+        if not any(thread.is_alive() for thread in self._threads):
+            self._stop_event.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+        _active_pool = self
+        return self
+
+    def stop(self):
+        global _active_pool
+        self._stop_event.set()
+        self.wake()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if _active_pool is self:
+            _active_pool = None
@@ -1,26 +1,144 @@
 import requests
+import hashlib
 import json
 import logging
-from typing import Dict, Any, Tuple, Optional
+import math
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple, Optional
+import config
 from config import AMAP_KEY
 from typing import Dict, Any, Optional
 from decimal import Decimal
-from models import Orders, Task, Staff, Client, User  # 导入Client模型
+from models import Orders, Task, Staff, Client, User, GeocodeCache  # 导入Client模型
 from utils.db_utils import get_db_session  # 导入数据库会话工具
-from datetime import datetime
+from utils.cache_utils import MISSING, TTLCache
+from utils.http_utils import HttpClient
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
-_geocode_cache = {}
+# 地理编码两级缓存：进程内 LRU（值为 None 表示高德无结果）+ GeocodeCache 表
+_geocode_cache = TTLCache(maxsize=config.GEOCODE_CACHE_SIZE, ttl=config.GEOCODE_CACHE_TTL)
+_geocode_stats = {"store_hits": 0, "store_misses": 0, "negative_hits": 0, "upstream_calls": 0, "upstream_errors": 0}
+_geocode_stats_lock = threading.Lock()
+
+
+# 高德接口客户端：连接池复用、超时、重试退避和熔断
+_map_client = HttpClient(
+    pool_size=config.MAP_POOL_SIZE,
+    timeout=(config.MAP_CONNECT_TIMEOUT, config.MAP_READ_TIMEOUT),
+    retries=config.MAP_RETRIES,
+    backoff_factor=config.MAP_RETRY_BACKOFF,
+    failure_threshold=config.MAP_BREAKER_THRESHOLD,
+    reset_timeout=config.MAP_BREAKER_RESET,
+)
+# 并发请求高德接口的线程池（多个地址地理编码、多段路线规划）
+_map_executor = ThreadPoolExecutor(max_workers=config.MAP_CONCURRENCY, thread_name_prefix="amap")
+
+# 路线缓存：键为起终点所在网格，值为 (距离米, 时间秒)
+_route_cache = TTLCache(maxsize=config.ROUTE_CACHE_SIZE, ttl=config.ROUTE_CACHE_TTL)
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = 111320
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+# 订单存储的 geohash 长度（约 5 米精度），附近查询按半径选取更短的前缀
+GEOHASH_PRECISION = 9
+
+
+def _incr_geocode_stat(name: str):
+    with _geocode_stats_lock:
+        _geocode_stats[name] += 1
+
 
 class MapUtils:
     """地图工具类，用于处理地理位置和路径规划"""
 
+    @staticmethod
+    def normalize_address(address: str) -> str:
+        """规范化地址作为缓存键：全角转半角、合并空白、统一小写"""
+        normalized = unicodedata.normalize("NFKC", address or "")
+        return " ".join(normalized.split()).lower()
+
+    @staticmethod
+    def _load_geocode_from_store(key: str):
+        """从持久缓存读取，返回 (是否命中, 坐标或None)"""
+        if not config.GEOCODE_PERSIST:
+            return False, None
+        db = get_db_session()
+        try:
+            row = db.get(GeocodeCache, hashlib.sha1(key.encode("utf-8")).hexdigest())
+            if not row or row.ExpiresAt <= datetime.now():
+                return False, None
+            if row.Longitude is None or row.Latitude is None:
+                return True, None
+            return True, {"longitude": float(row.Longitude), "latitude": float(row.Latitude)}
+        except Exception as e:
+            logger.error(f"读取地理编码缓存失败: {str(e)}")
+            return False, None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _save_geocode_to_store(key: str, coords: Optional[Dict[str, float]], ttl: int):
+        """写入持久缓存，coords 为 None 时记录为无结果"""
+        if not config.GEOCODE_PERSIST:
+            return
+        db = get_db_session()
+        try:
+            now = datetime.now()
+            db.merge(
+                GeocodeCache(
+                    AddressHash=hashlib.sha1(key.encode("utf-8")).hexdigest(),
+                    Address=key[:255],
+                    Longitude=coords["longitude"] if coords else None,
+                    Latitude=coords["latitude"] if coords else None,
+                    ExpiresAt=now + timedelta(seconds=ttl),
+                    UpdatedAt=now,
+                )
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"写入地理编码缓存失败: {str(e)}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _request_geocode(address: str):
+        """调用高德地理编码接口，返回 (是否得到确定结果, 坐标或None)；网络异常不视为确定结果"""
+        _incr_geocode_stat("upstream_calls")
+        try:
+            url = f"{config.AMAP_BASE_URL}/v3/geocode/geo"
+            params = {"key": AMAP_KEY, "address": address, "output": "json"}
+            result = _map_client.get_json(url, params=params)
+            logger.debug(f"[高德地理编码API] 地址: {address} 响应: {result}")
+
+            if result.get("status") != "1":
+                logger.error(f"地理编码失败: {result}")
+                _incr_geocode_stat("upstream_errors")
+                return False, None
+            if result.get("geocodes") and len(result["geocodes"]) > 0:
+                location = result["geocodes"][0]["location"].split(",")
+                return True, {"longitude": float(location[0]), "latitude": float(location[1])}
+            logger.error(f"地理编码无结果: {address}")
+            return True, None
+
+        except Exception as e:
+            logger.error(f"地理编码异常: {str(e)}")
+            _incr_geocode_stat("upstream_errors")
+            return False, None
+
     @staticmethod
     def geocode(address: str) -> Optional[Dict[str, float]]:
         """地理编码：将地址转换为经纬度坐标
 
+        依次查询进程内缓存、GeocodeCache 表和高德接口；
+        高德明确返回无结果的地址也会缓存 GEOCODE_NEGATIVE_TTL 秒
+
         Args:
             address: 地址字符串
 
@@ -28,38 +146,227 @@ class MapUtils:
             包含经纬度的字典 {"longitude": 经度, "latitude": 纬度}
             如果转换失败则返回None
         """
-        if address in _geocode_cache:
-            return _geocode_cache[address]
-        try:
-            url = "https://restapi.amap.com/v3/geocode/geo"
-            params = {"key": AMAP_KEY, "address": address, "output": "json"}
-            full_url = f"{url}?key={AMAP_KEY}&address={address}&output=json"
-            print(f"[DEBUG] 请求URL: {full_url}")
-            response = requests.get(url, params=params)
-            print(f"[DEBUG] 响应内容: {response.text}")
-            result = response.json()
+        key = MapUtils.normalize_address(address)
+        if not key:
+            return None
 
-            if (
-                result.get("status") == "1"
-                and result.get("geocodes")
-                and len(result["geocodes"]) > 0
-            ):
-                location = result["geocodes"][0]["location"].split(",")
-                coords = {"longitude": float(location[0]), "latitude": float(location[1])}
-                _geocode_cache[address] = coords
-                return coords
+        cached = _geocode_cache.get(key, MISSING)
+        if cached is not MISSING:
+            if cached is None:
+                _incr_geocode_stat("negative_hits")
+            return cached
+
+        found, coords = MapUtils._load_geocode_from_store(key)
+        if found:
+            _incr_geocode_stat("store_hits")
+            if coords is None:
+                _incr_geocode_stat("negative_hits")
+            _geocode_cache.set(key, coords, None if coords else config.GEOCODE_NEGATIVE_TTL)
+            return coords
+        _incr_geocode_stat("store_misses")
+
+        resolved, coords = MapUtils._request_geocode(address)
+        if resolved:
+            ttl = config.GEOCODE_STORE_TTL if coords else config.GEOCODE_NEGATIVE_TTL
+            _geocode_cache.set(key, coords, None if coords else config.GEOCODE_NEGATIVE_TTL)
+            MapUtils._save_geocode_to_store(key, coords, ttl)
+        return coords
+
+    @staticmethod
+    def geocode_many(addresses: List[str]) -> List[Optional[Dict[str, float]]]:
+        """并发地理编码多个地址，结果顺序与输入一致"""
+        # 已在线程池中（如并发计算多段路线）时顺序执行，避免嵌套提交占满线程池
+        if len(addresses) <= 1 or threading.current_thread().name.startswith("amap"):
+            return [MapUtils.geocode(address) for address in addresses]
+        return list(_map_executor.map(MapUtils.geocode, addresses))
+
+    @staticmethod
+    def get_geocode_cache_stats() -> Dict[str, Any]:
+        """地理编码缓存命中统计"""
+        with _geocode_stats_lock:
+            stats = dict(_geocode_stats)
+        stats["memory"] = _geocode_cache.stats()
+        return stats
+
+    @staticmethod
+    def warm_geocode_cache(db: Session) -> Dict[str, int]:
+        """
+        预热地理编码缓存：对所有不同的用户地址和商家地址做一次地理编码
+        Returns:
+            Dict: 地址总数、成功数、失败数
+        """
+        addresses = set()
+        for (address,) in db.query(User.Address).distinct():
+            if address and address.strip():
+                addresses.add(address.strip())
+        for (address,) in db.query(Orders.ShopAddress).filter(Orders.ShopAddress.isnot(None)).distinct():
+            if address.strip():
+                addresses.add(address.strip())
+
+        resolved = 0
+        for address in sorted(addresses):
+            if MapUtils.geocode(address):
+                resolved += 1
+        logger.info(f"地理编码缓存预热完成: 共 {len(addresses)} 个地址，成功 {resolved} 个")
+        return {"total": len(addresses), "resolved": resolved, "failed": len(addresses) - resolved}
+
+    @staticmethod
+    def haversine_distance(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+        """两点间球面距离（米）"""
+        lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+    @staticmethod
+    def snap_to_grid(lon: float, lat: float, cell_meters: float = None) -> Tuple[int, int]:
+        """将坐标对齐到约 cell_meters 见方的网格，返回网格编号"""
+        cell_meters = cell_meters or config.ROUTE_CACHE_GRID_METERS
+        lat_step = cell_meters / METERS_PER_DEGREE
+        lat_cell = math.floor(lat / lat_step)
+        # 经度方向按网格中心纬度换算，保证同一网格内换算比例一致
+        lat_center = (lat_cell + 0.5) * lat_step
+        lon_step = cell_meters / (METERS_PER_DEGREE * max(math.cos(math.radians(lat_center)), 1e-6))
+        return math.floor(lon / lon_step), lat_cell
+
+    @staticmethod
+    def geohash_encode(lon: float, lat: float, precision: int = GEOHASH_PRECISION) -> str:
+        """将经纬度编码为 geohash，前缀相同的点位于同一矩形网格内"""
+        lon_range = [-180.0, 180.0]
+        lat_range = [-90.0, 90.0]
+        chars = []
+        bits = 0
+        value = 0
+        even = True
+        while len(chars) < precision:
+            coord_range, coord = (lon_range, lon) if even else (lat_range, lat)
+            mid = (coord_range[0] + coord_range[1]) / 2
+            value <<= 1
+            if coord >= mid:
+                value |= 1
+                coord_range[0] = mid
             else:
-                logger.error(f"地理编码失败: {result}")
-                return None
+                coord_range[1] = mid
+            even = not even
+            bits += 1
+            if bits == 5:
+                chars.append(GEOHASH_ALPHABET[value])
+                bits = 0
+                value = 0
+        return "".join(chars)
 
-        except Exception as e:
-            logger.error(f"地理编码异常: {str(e)}")
-            return None
+    @staticmethod
+    def _geohash_cell_size(precision: int) -> Tuple[float, float]:
+        """geohash 网格的经度、纬度跨度（度）"""
+        total_bits = precision * 5
+        lon_bits = (total_bits + 1) // 2
+        lat_bits = total_bits // 2
+        return 360.0 / (1 << lon_bits), 180.0 / (1 << lat_bits)
+
+    @staticmethod
+    def bounding_box(lon: float, lat: float, radius_m: float) -> Tuple[float, float, float, float]:
+        """以 (lon, lat) 为中心、radius_m 为半径的外接矩形 (min_lon, min_lat, max_lon, max_lat)"""
+        lat_delta = radius_m / METERS_PER_DEGREE
+        lon_delta = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        return (
+            max(lon - lon_delta, -180.0),
+            max(lat - lat_delta, -90.0),
+            min(lon + lon_delta, 180.0),
+            min(lat + lat_delta, 90.0),
+        )
+
+    @staticmethod
+    def geohash_cover(lon: float, lat: float, radius_m: float, max_cells: int = 16) -> List[str]:
+        """
+        覆盖圆形范围的 geohash 前缀集合
+        从最精细的网格开始尝试，取格子数不超过 max_cells 的最长前缀，用于 LIKE '前缀%' 索引范围查询
+        """
+        min_lon, min_lat, max_lon, max_lat = MapUtils.bounding_box(lon, lat, radius_m)
+        for precision in range(GEOHASH_PRECISION, 0, -1):
+            lon_step, lat_step = MapUtils._geohash_cell_size(precision)
+            lon_cells = range(math.floor((min_lon + 180) / lon_step), math.floor((max_lon + 180) / lon_step) + 1)
+            lat_cells = range(math.floor((min_lat + 90) / lat_step), math.floor((max_lat + 90) / lat_step) + 1)
+            if len(lon_cells) * len(lat_cells) > max_cells and precision > 1:
+                continue
+            prefixes = set()
+            for lon_index in lon_cells:
+                for lat_index in lat_cells:
+                    center_lon = min((lon_index + 0.5) * lon_step - 180, 180.0)
+                    center_lat = min((lat_index + 0.5) * lat_step - 90, 90.0)
+                    prefixes.add(MapUtils.geohash_encode(center_lon, center_lat, precision))
+            return sorted(prefixes)
+        return [""]
+
+    @staticmethod
+    def _parse_coords(location: str) -> Tuple[float, float]:
+        lon, lat = location.split(",")
+        return float(lon), float(lat)
+
+    @staticmethod
+    def estimate_route_by_distance(origin: str, destination: str) -> Dict[str, Any]:
+        """按直线距离粗略估算骑行路线（路径规划接口不可用时的兜底）"""
+        origin_lon, origin_lat = MapUtils._parse_coords(origin)
+        dest_lon, dest_lat = MapUtils._parse_coords(destination)
+        distance = MapUtils.haversine_distance(origin_lon, origin_lat, dest_lon, dest_lat) * config.ROUTE_DETOUR_FACTOR
+        return {
+            "distance": int(distance),
+            "duration": int(distance / config.CYCLING_SPEED_MPS),
+            "route": None,
+            "approximate": True,
+        }
+
+    @staticmethod
+    def duration_matrix(points: List[Tuple[float, float]]) -> Tuple[List[List[float]], int]:
+        """
+        多点两两之间的骑行时间矩阵（秒），不调用路径规划接口
+        路线缓存中已有的段使用缓存时间，其余按直线距离 × 绕行系数 ÷ 骑行速度估算；
+        每个点的弧度、纬度余弦和网格只算一次，直线距离按对称性只算上三角，缓存一次加锁批量查询
+        Args:
+            points: [(经度, 纬度)]
+        Returns:
+            (矩阵, 使用缓存时间的段数)
+        """
+        n = len(points)
+        seconds_per_meter = config.ROUTE_DETOUR_FACTOR / config.CYCLING_SPEED_MPS
+        radians = [(math.radians(lon), math.radians(lat)) for lon, lat in points]
+        cos_lat = [math.cos(lat) for _, lat in radians]
+        matrix = [[0.0] * n for _ in range(n)]
+        for i in range(n):
+            lon1, lat1 = radians[i]
+            cos_lat1 = cos_lat[i]
+            row = matrix[i]
+            for j in range(i + 1, n):
+                lon2, lat2 = radians[j]
+                a = math.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos_lat[j] * math.sin((lon2 - lon1) / 2) ** 2
+                row[j] = matrix[j][i] = 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a))) * seconds_per_meter
+
+        if not len(_route_cache):
+            return matrix, 0
+        cells = [MapUtils.snap_to_grid(lon, lat) for lon, lat in points]
+        # 同一网格对可能对应多个点对
+        legs: Dict[Tuple[int, int, int, int], List[Tuple[int, int]]] = {}
+        for i in range(n):
+            for j in range(n):
+                if cells[i] != cells[j]:
+                    legs.setdefault(cells[i] + cells[j], []).append((i, j))
+        cached_legs = 0
+        for key, (_, duration) in _route_cache.get_many(legs).items():
+            for i, j in legs[key]:
+                matrix[i][j] = float(duration)
+                cached_legs += 1
+        return matrix, cached_legs
+
+    @staticmethod
+    def get_route_cache_stats() -> Dict[str, Any]:
+        """路线缓存命中统计"""
+        return _route_cache.stats()
 
     @staticmethod
     def calculate_route(origin: str, destination: str) -> Optional[Dict[str, Any]]:
         """计算两点之间的骑行路线
 
+        起终点对齐到网格后查询路线缓存；未命中时调用高德接口，
+        接口超时或失败则按直线距离估算（结果带 approximate 标记，不写入缓存）
+
         Args:
             origin: 起点地址或经纬度(经度,纬度)
             destination: 终点地址或经纬度(经度,纬度)
@@ -71,8 +378,7 @@ class MapUtils:
         try:
             # 如果输入的是地址而非坐标，先进行地理编码
             if not ("," in origin and "," in destination):
-                origin_coords = MapUtils.geocode(origin)
-                destination_coords = MapUtils.geocode(destination)
+                origin_coords, destination_coords = MapUtils.geocode_many([origin, destination])
 
                 if not origin_coords or not destination_coords:
                     return {"error": "geocode_failed"}
@@ -80,8 +386,15 @@ class MapUtils:
                 origin = f"{origin_coords['longitude']},{origin_coords['latitude']}"
                 destination = f"{destination_coords['longitude']},{destination_coords['latitude']}"
 
+            cache_key = MapUtils.snap_to_grid(*MapUtils._parse_coords(origin)) + MapUtils.snap_to_grid(
+                *MapUtils._parse_coords(destination)
+            )
+            cached = _route_cache.get(cache_key)
+            if cached is not None:
+                return {"distance": cached[0], "duration": cached[1], "route": None, "cached": True}
+
             # 调用骑行路径规划API
-            url = "https://restapi.amap.com/v4/direction/bicycling"
+            url = f"{config.AMAP_BASE_URL}/v4/direction/bicycling"
             params = {
                 "key": AMAP_KEY,
                 "origin": origin,
@@ -89,8 +402,13 @@ class MapUtils:
                 "output": "json",
             }
 
-            response = requests.get(url, params=params)
-            result = response.json()
+            try:
+                result = _map_client.get_json(
+                    url, params=params, timeout=(config.MAP_CONNECT_TIMEOUT, config.ROUTE_UPSTREAM_TIMEOUT)
+                )
+            except (requests.RequestException, ValueError) as e:
+                logger.error(f"路径规划接口超时或异常，按直线距离估算: {str(e)}")
+                return MapUtils.estimate_route_by_distance(origin, destination)
             logger.info(f"[高德路径规划API] 请求: {url} 参数: {params} 响应: {result}")
 
             if (
@@ -99,14 +417,17 @@ class MapUtils:
                 and result["data"].get("paths")
             ):
                 path = result["data"]["paths"][0]
+                distance = int(path.get("distance", 0))
+                duration = int(path.get("duration", 0))
+                _route_cache.set(cache_key, (distance, duration))
                 return {
-                    "distance": int(path.get("distance", 0)),
-                    "duration": int(path.get("duration", 0)),
+                    "distance": distance,
+                    "duration": duration,
                     "route": path,
                 }
             else:
-                logger.error(f"路径规划失败: {result}")
-                return {"error": result}
+                logger.error(f"路径规划失败，按直线距离估算: {result}")
+                return MapUtils.estimate_route_by_distance(origin, destination)
         except Exception as e:
             logger.error(f"路径规划异常: {str(e)}")
             return {"error": str(e)}
@@ -148,7 +469,7 @@ class MapUtils:
                 "delivery_time": delivery_time,
                 "total_time": result["to_shop_time"] + delivery_time,
                 "distance": route_info["distance"],
-                "status": "calculated",
+                "status": "approximate" if route_info.get("approximate") else "calculated",
                 "error": None,
             })
         elif route_info and "error" in route_info:
@@ -187,14 +508,17 @@ class MapUtils:
         Returns:
             包含 to_store（骑手到店）、to_user（到用户）、total（总计） 的字典
         """
-        route_to_store = MapUtils.calculate_route(rider_location, store_location)
+        # 两段路线并发计算
+        route_to_store, route_to_user = _map_executor.map(
+            lambda leg: MapUtils.calculate_route(*leg),
+            [(rider_location, store_location), (store_location, delivery_location)],
+        )
         to_store_time = (
-            route_to_store["duration"] if route_to_store else 15 * 60
+            route_to_store["duration"] if route_to_store and "duration" in route_to_store else 15 * 60
         )  # 默认15分钟
 
-        route_to_user = MapUtils.calculate_route(store_location, delivery_location)
         to_user_time = (
-            route_to_user["duration"] if route_to_user else 30 * 60
+            route_to_user["duration"] if route_to_user and "duration" in route_to_user else 30 * 60
         )  # 默认30分钟
 
         total_time = to_store_time + to_user_time
@@ -203,11 +527,18 @@ class MapUtils:
             "to_store": to_store_time,
             "to_user": to_user_time,
             "total": total_time,
-            "status": (
-                "calculated" if (route_to_store and route_to_user) else "estimated"
-            ),
+            "status": MapUtils._combined_route_status(route_to_store, route_to_user),
         }
 
+    @staticmethod
+    def _combined_route_status(*routes) -> str:
+        """多段路线的整体状态：任一段失败为 estimated，任一段为直线估算则为 approximate"""
+        if not all(route and "duration" in route for route in routes):
+            return "estimated"
+        if any(route.get("approximate") for route in routes):
+            return "approximate"
+        return "calculated"
+
     @staticmethod
     def get_order_location(db_session, order_id: Decimal) -> Optional[Dict[str, Any]]:
         """从数据库获取订单位置信息"""
@@ -0,0 +1,163 @@
+"""
+数据库迁移工具模块
+按版本号顺序执行 migrations/versions 下的 V<版本号>__<说明>.sql，并在 SchemaVersion 表中记录
+"""
+
+import hashlib
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from config import BASE_DIR
+from models import SchemaVersion
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "migrations", "versions")
+MIGRATION_FILE_PATTERN = re.compile(r"^V(\d+)__(\w+)\.sql$")
+
+
+class MigrationUtils:
+    """数据库迁移工具类"""
+
+    @staticmethod
+    def list_migrations(migrations_dir: str = MIGRATIONS_DIR) -> List[Dict[str, Any]]:
+        """列出全部迁移文件，按版本号排序"""
+        migrations = []
+        for filename in os.listdir(migrations_dir):
+            match = MIGRATION_FILE_PATTERN.match(filename)
+            if not match:
+                continue
+            path = os.path.join(migrations_dir, filename)
+            with open(path, "rb") as f:
+                checksum = hashlib.sha256(f.read()).hexdigest()
+            migrations.append(
+                {
+                    "version": int(match.group(1)),
+                    "description": match.group(2).replace("_", " "),
+                    "path": path,
+                    "checksum": checksum,
+                }
+            )
+        migrations.sort(key=lambda item: item["version"])
+
+        versions = [item["version"] for item in migrations]
+        if len(versions) != len(set(versions)):
+            raise ValueError(f"迁移版本号重复: {versions}")
+        return migrations
+
+    @staticmethod
+    def split_statements(sql: str) -> List[str]:
+        """去掉注释行并按分号拆分SQL语句"""
+        lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+        statements = []
+        for statement in "\n".join(lines).split(";"):
+            statement = statement.strip()
+            if statement:
+                statements.append(statement)
+        return statements
+
+    @staticmethod
+    def get_applied_versions(engine: Engine) -> Dict[int, Dict[str, Any]]:
+        """已执行的迁移版本"""
+        SchemaVersion.__table__.create(bind=engine, checkfirst=True)
+        with engine.connect() as conn:
+            rows = conn.execute(SchemaVersion.__table__.select()).mappings().all()
+        return {row["Version"]: dict(row) for row in rows}
+
+    @staticmethod
+    def _record_version(conn, migration: Dict[str, Any]):
+        conn.execute(
+            SchemaVersion.__table__.insert().values(
+                Version=migration["version"],
+                Description=migration["description"],
+                Checksum=migration["checksum"],
+            )
+        )
+
+    @staticmethod
+    def get_status(engine: Engine, migrations_dir: str = MIGRATIONS_DIR) -> List[Dict[str, Any]]:
+        """
+        获取每个迁移的执行状态
+        Returns:
+            List[Dict]: version、description、applied、applied_at、modified（执行后文件被修改）
+        """
+        applied = MigrationUtils.get_applied_versions(engine)
+        status = []
+        for migration in MigrationUtils.list_migrations(migrations_dir):
+            record = applied.get(migration["version"])
+            status.append(
+                {
+                    "version": migration["version"],
+                    "description": migration["description"],
+                    "applied": record is not None,
+                    "applied_at": record["AppliedAt"] if record else None,
+                    "modified": bool(record) and record["Checksum"] != migration["checksum"],
+                }
+            )
+        return status
+
+    @staticmethod
+    def migrate(
+        engine: Engine,
+        target: Optional[int] = None,
+        dry_run: bool = False,
+        migrations_dir: str = MIGRATIONS_DIR,
+    ) -> List[int]:
+        """
+        按版本号顺序执行所有未执行的迁移
+        Args:
+            engine: 数据库引擎
+            target: 只执行到该版本（含）
+            dry_run: 只返回待执行版本，不实际执行
+        Returns:
+            List[int]: 执行（或待执行）的版本号
+        """
+        applied = MigrationUtils.get_applied_versions(engine)
+        pending = [
+            migration
+            for migration in MigrationUtils.list_migrations(migrations_dir)
+            if migration["version"] not in applied and (target is None or migration["version"] <= target)
+        ]
+        if dry_run:
+            return [migration["version"] for migration in pending]
+
+        done = []
+        for migration in pending:
+            with open(migration["path"], encoding="utf-8") as f:
+                statements = MigrationUtils.split_statements(f.read())
+            logger.info(f"执行迁移 V{migration['version']:03d} {migration['description']}")
+            try:
+                # MySQL 的 DDL 会隐式提交，每个版本执行完立即记录，失败时停止
+                with engine.begin() as conn:
+                    for statement in statements:
+                        conn.execute(text(statement))
+                    MigrationUtils._record_version(conn, migration)
+            except Exception as e:
+                logger.error(f"迁移 V{migration['version']:03d} 执行失败: {str(e)}")
+                raise
+            done.append(migration["version"])
+        return done
+
+    @staticmethod
+    def mark_applied(engine: Engine, versions: List[int], migrations_dir: str = MIGRATIONS_DIR) -> List[int]:
+        """
+        将已手动执行过的迁移标记为已执行（例如此前单独执行过的建表脚本）
+        Returns:
+            List[int]: 新标记的版本号
+        """
+        applied = MigrationUtils.get_applied_versions(engine)
+        migrations = {item["version"]: item for item in MigrationUtils.list_migrations(migrations_dir)}
+        marked = []
+        with engine.begin() as conn:
+            for version in versions:
+                if version not in migrations:
+                    raise ValueError(f"迁移版本不存在: {version}")
+                if version in applied:
+                    continue
+                MigrationUtils._record_version(conn, migrations[version])
+                marked.append(version)
+        return marked
@@ -7,16 +7,33 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy import and_, or_, func
 import json
-from models import Orders, Task, User, Points, BidRecord, Staff, Reputation
+import math
+import config
+from models import Orders, Task, User, BidRecord, Staff, Reputation
 from utils.points_utils import PointsUtils
+from utils.job_utils import JobUtils
+from utils.pricing_utils import PricingFunction, PricingUtils
 from utils.user_utils import UserUtils
 from utils.map_utils import MapUtils
+from utils.id_utils import IdUtils
+from utils.cache_utils import TTLCache
+from utils.pagination_utils import InvalidCursorError, PaginationUtils
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 订单列表按 (CreationTime, OrderID) 倒序，游标分页使用同一排序键
+ORDER_LIST_SORT = [(Orders.CreationTime, True), (Orders.OrderID, True)]
+
+# 订单统计短时缓存，键为 ("client"|"staff", 用户ID)
+_order_stats_cache = TTLCache(maxsize=10000, ttl=config.ORDER_STATS_CACHE_TTL)
+
+
+class OrderValidationError(ValueError):
+    """下单校验失败（地址无法识别、无法计算预计时间等），接口返回 400"""
+
 
 class OrderUtils:
     """订单管理工具类"""
@@ -24,28 +41,52 @@ class OrderUtils:
     @staticmethod
     def generate_order_id() -> Decimal:
         """生成唯一订单ID"""
-        # 使用时间戳生成唯一ID
-        timestamp = int(datetime.now().timestamp() * 1000000)  # 微秒时间戳
-        return Decimal(str(timestamp))
+        return IdUtils.next_id()
 
     @staticmethod
     def generate_task_id() -> Decimal:
         """生成唯一任务ID"""
-        # 使用时间戳生成唯一ID，加上前缀以区分
-        timestamp = int(datetime.now().timestamp() * 1000000)
-        return Decimal(str(2000000000000000000 + timestamp))
+        return IdUtils.next_id()
+
+    @staticmethod
+    def _coordinate(value: float) -> Decimal:
+        return Decimal(str(round(value, 6)))
+
+    @staticmethod
+    def set_order_coordinates(
+        order: Orders,
+        shop_coords: Optional[Dict[str, float]],
+        order_coords: Optional[Dict[str, float]],
+    ):
+        """写入取货点/收货点坐标和取货点 geohash"""
+        if shop_coords:
+            order.ShopLongitude = OrderUtils._coordinate(shop_coords["longitude"])
+            order.ShopLatitude = OrderUtils._coordinate(shop_coords["latitude"])
+            order.ShopGeoHash = MapUtils.geohash_encode(shop_coords["longitude"], shop_coords["latitude"])
+        if order_coords:
+            order.OrderLongitude = OrderUtils._coordinate(order_coords["longitude"])
+            order.OrderLatitude = OrderUtils._coordinate(order_coords["latitude"])
 
     @staticmethod
     def create_order(
-        db: Session, user_id: Decimal, order_data: Dict[str, Any], estimated_time: int = None
+        db: Session,
+        user_id: Decimal,
+        order_data: Dict[str, Any],
+        estimated_time: int = None,
+        shop_coords: Optional[Dict[str, float]] = None,
+        order_coords: Optional[Dict[str, float]] = None,
+        amount: Optional[Decimal] = None,
     ) -> Decimal:
         """
-        创建订单
+        创建订单（一次提交写入含配送费的完整订单）
         Args:
             db: 数据库会话
             user_id: 用户ID
             order_data: 订单数据
             estimated_time: 预计时间（秒）
+            shop_coords: 商家地址坐标（下单校验时已地理编码），用于附近订单查询
+            order_coords: 收货地址坐标
+            amount: 配送费，不传时按 ORDER_PRICING 计价
         Returns:
             订单ID
         """
@@ -60,6 +101,8 @@ class OrderUtils:
 
             # 直接用 estimated_time 参数，不再重复计算
             total_seconds = estimated_time if estimated_time is not None else 45 * 60
+            if amount is None:
+                amount = PricingUtils.quote(order_type, total_seconds)["delivery_fee"]
 
             # 创建订单记录
             order = Orders(
@@ -75,17 +118,62 @@ class OrderUtils:
                 OrderLocation=order_data.get("orderlocation", ""),
                 ShopAddress=order_data.get("shop_address", ""),  # 新增：商家地址
                 StaffID=None,
-                Amount="0.00"  # 初始化为0，后续会更新
+                Amount=str(amount),
             )
+            OrderUtils.set_order_coordinates(order, shop_coords, order_coords)
             db.add(order)
             db.commit()
-        
+            OrderUtils.invalidate_order_statistics(client_id=user_id)
+
             return order_id
 
         except Exception as e:
             db.rollback()
             raise Exception(f"创建订单失败: {str(e)}")
 
+    @staticmethod
+    def place_order(
+        db: Session,
+        user_id: Decimal,
+        order_data: Dict[str, Any],
+        pricing: Optional[PricingFunction] = None,
+    ) -> Dict[str, Any]:
+        """
+        下单：地理编码商家和收货地址、估算送达时间、计价，全部校验通过后一次写入订单
+        Args:
+            order_data: 请求数据，需包含 shop_address、orderlocation、order_type
+            pricing: 计价函数，不传时按 ORDER_PRICING
+        Returns:
+            Dict: order_id、delivery_fee（元）、estimated_time（分钟）
+        Raises:
+            OrderValidationError: 地址无法识别或无法计算预计时间
+        """
+        shop_address = str(order_data.get("shop_address", "")).strip()
+        order_location = str(order_data.get("orderlocation", "")).strip()
+        order_type = order_data.get("order_type", "immediate")
+        if order_type not in ["immediate", "scheduled"]:
+            raise OrderValidationError("无效的订单类型")
+
+        shop_coords, order_coords = MapUtils.geocode_many([shop_address, order_location])
+        if not shop_coords or not order_coords:
+            raise OrderValidationError("商家地址或收货地址无法识别，请检查输入")
+
+        time_estimate = MapUtils.estimate_delivery_time(shop_address=shop_address, delivery_address=order_location)
+        total_seconds = time_estimate.get("total_time")
+        if not total_seconds or time_estimate.get("status") not in ("ok", "calculated", "approximate"):
+            raise OrderValidationError("无法计算预计时间，请检查地址")
+
+        quote = PricingUtils.quote(order_type, total_seconds, time_estimate.get("distance"), pricing)
+        order_id = OrderUtils.create_order(
+            db, user_id, order_data, estimated_time=total_seconds,
+            shop_coords=shop_coords, order_coords=order_coords, amount=quote["delivery_fee"],
+        )
+        return {
+            "order_id": str(order_id),
+            "delivery_fee": float(quote["delivery_fee"]),
+            "estimated_time": int(total_seconds) // 60,
+        }
+
     @staticmethod
     def get_user_orders(
         db: Session,
@@ -94,6 +182,8 @@ class OrderUtils:
         per_page: int = 10,
         status: str = "",
         order_type: str = "",
+        cursor: Optional[str] = None,
+        count: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         获取用户订单列表
@@ -104,6 +194,8 @@ class OrderUtils:
             per_page: 每页数量
             status: 订单状态筛选
             order_type: 订单类型筛选
+            cursor: 游标分页，"" 为第一页，其余为上一页的 next_cursor；为 None 时按页码分页
+            count: 总数统计方式 none/exact/approximate
         """
         try:
             # 构建查询
@@ -115,16 +207,11 @@ class OrderUtils:
             if order_type:
                 query = query.filter(Orders.OrderType == order_type)
 
-            # 总数统计
-            total = query.count()
-
             # 分页查询
-            orders = (
-                query.order_by(desc(Orders.CreationTime))
-                .offset((page - 1) * per_page)
-                .limit(per_page)
-                .all()
+            page_data = PaginationUtils.paginate(
+                query, ORDER_LIST_SORT, page, per_page, cursor, count
             )
+            orders = page_data["items"]
 
             # 构建返回数据
             orders_list = []
@@ -147,14 +234,11 @@ class OrderUtils:
 
             return {
                 "orders": orders_list,
-                "pagination": {
-                    "current_page": page,
-                    "per_page": per_page,
-                    "total": total,
-                    "total_pages": (total + per_page - 1) // per_page,
-                },
+                "pagination": page_data["pagination"],
             }
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
             raise Exception(f"获取订单列表失败: {str(e)}")
 
@@ -240,6 +324,7 @@ class OrderUtils:
             order.AssignmentStatus = "closed"
 
             db.commit()
+            OrderUtils.invalidate_order_statistics(client_id=order.ClientID, staff_id=order.StaffID)
             return True
 
         except Exception as e:
@@ -279,6 +364,7 @@ class OrderUtils:
             order.AssignmentStatus = "closed"
 
             db.commit()
+            OrderUtils.invalidate_order_statistics(client_id=order.ClientID, staff_id=order.StaffID)
             return True
 
         except Exception as e:
@@ -314,8 +400,7 @@ class OrderUtils:
                 raise Exception("订单状态不允许使用积分支付")
 
             # 检查用户信誉度
-            user_reputation = UserUtils.get_user_reputation(db, user_id)
-            reputation_score = user_reputation.get("average_score", 0.0)
+            reputation_score = UserUtils.get_reputation_scores(db, [user_id])[user_id]
 
             # 如果信誉低于80，不支持积分支付
             if reputation_score < 80.0:
@@ -408,8 +493,7 @@ class OrderUtils:
 
             # 如果用户选择使用积分，检查信誉度
             if points_deduction > 0:
-                user_reputation = UserUtils.get_user_reputation(db, user_id)
-                reputation_score = user_reputation.get("average_score", 0.0)
+                reputation_score = UserUtils.get_reputation_scores(db, [user_id])[user_id]
 
                 if reputation_score < 80.0:
                     raise Exception(
@@ -436,26 +520,16 @@ class OrderUtils:
             if points_deduction > 0:
                 print(f"[DEBUG] 开始处理积分抵扣，用户ID: {user_id}, 请求扣除积分: {points_deduction}")
 
-                # 获取用户积分记录
-                points_record = db.query(Points).filter(Points.UserID == user_id).first()
-                if not points_record:
-                    raise Exception("积分记录不存在，请联系管理员处理")
-
-                try:
-                    current_points = int(points_record.Points)
-                except ValueError:
-                    raise Exception("积分数据异常，请检查数据库中的积分值是否合法")
-
-                print(f"[DEBUG] 当前积分: {current_points}")
-
-                if current_points < points_deduction:
+                # 带余额条件的原子扣减，并发支付不会丢失更新或把余额扣成负数
+                if not PointsUtils._debit_points(db, user_id, points_deduction):
+                    current_points = PointsUtils._read_balance(db, user_id)
+                    if current_points is None:
+                        raise Exception("积分记录不存在，请联系管理员处理")
                     raise Exception(f"积分不足，当前积分：{current_points}，需要积分：{points_deduction}")
 
-                # 扣除积分
-                new_points = current_points - points_deduction
-                print('[DEBUG] 扣除积分成功，新积分: {new_points}')
-                points_record.Points = str(new_points)
-                db.add(points_record)
+                new_points = PointsUtils._read_balance(db, user_id)
+                current_points = new_points + points_deduction
+                print(f"[DEBUG] 扣除积分成功，新积分: {new_points}")
 
                 # 记录积分扣除日志
                 PointsUtils._log_points_transaction(
@@ -495,21 +569,27 @@ class OrderUtils:
                 cash_amount = int(payment_result["cash_payment"])  # 取整数部分
                 if cash_amount > 0:
                     points_to_add = cash_amount * 100  # 1元=100积分
-                    success = PointsUtils.add_points(
+                    # 积分奖励随支付一起提交到任务队列，由 worker 异步入账；每个订单只奖励一次
+                    job = JobUtils.enqueue(
                         db,
-                        user_id,
-                        points_to_add,
-                        f"订单支付奖励-订单号：{order_id}，支付金额：{cash_amount}元",
+                        "points.credit",
+                        {
+                            "user_id": str(user_id),
+                            "points": points_to_add,
+                            "reason": f"订单支付奖励-订单号：{order_id}，支付金额：{cash_amount}元",
+                        },
+                        idempotency_key=f"order-payment-reward:{order_id}",
                     )
-                    if success:
+                    if job is not None:
                         payment_result["points_earned"] = points_to_add
                         payment_result["points_earned_reason"] = (
                             f"现金支付{cash_amount}元获得{points_to_add}积分"
                         )
                     else:
-                        logger.warning(f"订单 {order_id} 支付成功，但积分奖励失败")
+                        logger.info(f"订单 {order_id} 已发放过支付奖励积分")
 
             db.commit()
+            OrderUtils.invalidate_order_statistics(client_id=order.ClientID, staff_id=order.StaffID)
             return payment_result
 
         except Exception as e:
@@ -522,6 +602,8 @@ class OrderUtils:
         per_page: int = 10,
         task_type: str = "",
         staff_id: Optional[Decimal] = None,
+        cursor: Optional[str] = None,
+        count: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         获取可接单列表（代办人员使用）
@@ -531,6 +613,8 @@ class OrderUtils:
             per_page: 每页数量
             task_type: 任务类型筛选
             staff_id: 员工ID（用于排除已接取的订单）
+            cursor: 游标分页，"" 为第一页，其余为上一页的 next_cursor；为 None 时按页码分页
+            count: 总数统计方式 none/exact/approximate
         """
         try:
             # 构建查询 - 查找待接单的订单
@@ -551,13 +635,10 @@ class OrderUtils:
                 query = query.filter(Orders.OrderType == task_type)
 
             # 分页查询
-            total = query.count()
-            results = (
-                query.order_by(desc(Orders.CreationTime))
-                .offset((page - 1) * per_page)
-                .limit(per_page)
-                .all()
+            page_data = PaginationUtils.paginate(
+                query, ORDER_LIST_SORT, page, per_page, cursor, count
             )
+            results = page_data["items"]
 
             # 构建返回数据
             orders_list = []
@@ -578,14 +659,11 @@ class OrderUtils:
 
             return {
                 "orders": orders_list,
-                "pagination": {
-                    "current_page": page,
-                    "per_page": per_page,
-                    "total": total,
-                    "total_pages": (total + per_page - 1) // per_page,
-                },
+                "pagination": page_data["pagination"],
             }
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
             raise Exception(f"获取可接单列表失败: {str(e)}")
 
@@ -617,6 +695,7 @@ class OrderUtils:
             order.StaffID = staff_id  # 设置接单的staff_id
 
             db.commit()
+            OrderUtils.invalidate_order_statistics(client_id=order.ClientID, staff_id=staff_id)
             return True
 
         except Exception as e:
@@ -625,65 +704,89 @@ class OrderUtils:
 
 
     @staticmethod
-    def get_order_statistics(db: Session, user_id: Decimal) -> Dict[str, Any]:
+    def _count_orders_by_status(db: Session, owner_column, owner_id: Decimal) -> Dict[str, int]:
+        """一次 GROUP BY OrderStatus 统计某个用户各状态的订单数"""
+        rows = (
+            db.query(Orders.OrderStatus, func.count())
+            .filter(owner_column == owner_id)
+            .group_by(Orders.OrderStatus)
+            .all()
+        )
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def invalidate_order_statistics(client_id: Optional[Decimal] = None, staff_id: Optional[Decimal] = None):
+        """订单状态变化后清除相关用户的统计缓存"""
+        if client_id is not None:
+            _order_stats_cache.delete(("client", Decimal(client_id)))
+        if staff_id is not None:
+            _order_stats_cache.delete(("staff", Decimal(staff_id)))
+
+    @staticmethod
+    def get_order_statistics(db: Session, user_id: Decimal, use_cache: bool = True) -> Dict[str, Any]:
         """
         获取用户订单统计信息
         Args:
             db: 数据库会话
             user_id: 用户ID
+            use_cache: 是否使用短时缓存（ORDER_STATS_CACHE_TTL 为0时不缓存）
         """
         try:
-            # 统计各状态订单数量
-            total_orders = db.query(Orders).filter(Orders.ClientID == user_id).count()
-            pending_orders = (
-                db.query(Orders)
-                .filter(
-                    and_(Orders.ClientID == user_id, Orders.OrderStatus == "pending")
-                )
-                .count()
-            )
-            assigned_orders = (
-                db.query(Orders)
-                .filter(
-                    and_(Orders.ClientID == user_id, Orders.OrderStatus == "assigned")
-                )
-                .count()
-            )
-            completed_orders = (
-                db.query(Orders)
-                .filter(
-                    and_(Orders.ClientID == user_id, Orders.OrderStatus == "completed")
-                )
-                .count()
-            )
-            cancelled_orders = (
-                db.query(Orders)
-                .filter(
-                    and_(Orders.ClientID == user_id, Orders.OrderStatus == "cancelled")
-                )
-                .count()
-            )
-            paid_orders = (
-                db.query(Orders)
-                .filter(
-                    and_(
-                        Orders.ClientID == user_id, Orders.OrderStatus == "paid"
-                    )
-                )
-                .count()
-            )
-
-            return {
-                "total_orders": total_orders,
-                "pending_orders": pending_orders,
-                "paid_orders": paid_orders,
-                "completed_orders": completed_orders,
-                "cancelled_orders": cancelled_orders,
+            cache_key = ("client", Decimal(user_id))
+            if use_cache and config.ORDER_STATS_CACHE_TTL > 0:
+                cached = _order_stats_cache.get(cache_key)
+                if cached is not None:
+                    return dict(cached)
+
+            counts = OrderUtils._count_orders_by_status(db, Orders.ClientID, user_id)
+            result = {
+                "total_orders": sum(counts.values()),
+                "pending_orders": counts.get("pending", 0),
+                "assigned_orders": counts.get("assigned", 0),
+                "paid_orders": counts.get("paid", 0),
+                "completed_orders": counts.get("completed", 0),
+                "cancelled_orders": counts.get("cancelled", 0),
             }
 
+            if config.ORDER_STATS_CACHE_TTL > 0:
+                _order_stats_cache.set(cache_key, result, config.ORDER_STATS_CACHE_TTL)
+            return dict(result)
+
         except Exception as e:
             raise Exception(f"获取订单统计失败: {str(e)}")
 
+    @staticmethod
+    def get_staff_order_statistics(db: Session, staff_id: Decimal, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        获取代办人员接单统计信息
+        Args:
+            db: 数据库会话
+            staff_id: 代办人员ID
+            use_cache: 是否使用短时缓存
+        """
+        try:
+            cache_key = ("staff", Decimal(staff_id))
+            if use_cache and config.ORDER_STATS_CACHE_TTL > 0:
+                cached = _order_stats_cache.get(cache_key)
+                if cached is not None:
+                    return dict(cached)
+
+            counts = OrderUtils._count_orders_by_status(db, Orders.StaffID, staff_id)
+            result = {
+                "total_orders": sum(counts.values()),
+                "assigned_orders": counts.get("assigned", 0),
+                "completed_orders": counts.get("completed", 0),
+                "paid_orders": counts.get("paid", 0),
+                "cancelled_orders": counts.get("cancelled", 0),
+            }
+
+            if config.ORDER_STATS_CACHE_TTL > 0:
+                _order_stats_cache.set(cache_key, result, config.ORDER_STATS_CACHE_TTL)
+            return dict(result)
+
+        except Exception as e:
+            raise Exception(f"获取接单统计失败: {str(e)}")
+
     @staticmethod
     def accept_order(
         db: Session, order_id: Decimal, staff_id: Decimal
@@ -721,6 +824,7 @@ class OrderUtils:
             accept_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
             db.commit()
+            OrderUtils.invalidate_order_statistics(client_id=order.ClientID, staff_id=staff_id)
 
             return {
                 "type": "order",
@@ -743,6 +847,8 @@ class OrderUtils:
         per_page: int = 10,
         status: str = "",
         order_type: str = "",
+        cursor: Optional[str] = None,
+        count: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         获取代办人员订单列表
@@ -753,6 +859,8 @@ class OrderUtils:
             per_page: 每页数量
             status: 订单状态筛选
             order_type: 订单类型筛选
+            cursor: 游标分页，"" 为第一页，其余为上一页的 next_cursor；为 None 时按页码分页
+            count: 总数统计方式 none/exact/approximate
         """
         try:
             # 构建查询
@@ -768,16 +876,11 @@ class OrderUtils:
             if order_type:
                 query = query.filter(Orders.OrderType == order_type)
 
-            # 总数统计
-            total = query.count()
-
             # 分页查询
-            orders = (
-                query.order_by(desc(Orders.CreationTime))
-                .offset((page - 1) * per_page)
-                .limit(per_page)
-                .all()
+            page_data = PaginationUtils.paginate(
+                query, ORDER_LIST_SORT, page, per_page, cursor, count
             )
+            orders = page_data["items"]
 
             # 构建返回数据
             orders_list = []
@@ -799,6 +902,10 @@ class OrderUtils:
                     "client_id": str(order.ClientID),
                     "client_name": client.Username if client else "",
                     "estimated_time": order.EstimatedTime,  # 添加预计时间
+                    "shop_longitude": float(order.ShopLongitude) if order.ShopLongitude is not None else None,
+                    "shop_latitude": float(order.ShopLatitude) if order.ShopLatitude is not None else None,
+                    "order_longitude": float(order.OrderLongitude) if order.OrderLongitude is not None else None,
+                    "order_latitude": float(order.OrderLatitude) if order.OrderLatitude is not None else None,
                 }
 
                 # 检查是否已评价
@@ -820,14 +927,11 @@ class OrderUtils:
 
             return {
                 "orders": orders_list,
-                "pagination": {
-                    "current_page": page,
-                    "per_page": per_page,
-                    "total": total,
-                    "total_pages": (total + per_page - 1) // per_page,
-                },
+                "pagination": page_data["pagination"],
             }
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
             raise Exception(f"获取代办人员订单列表失败: {str(e)}")
 
@@ -838,6 +942,8 @@ class OrderUtils:
         per_page: int = 10,
         task_type: str = "",
         staff_id: Optional[Decimal] = None,
+        cursor: Optional[str] = None,
+        count: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         获取可接单列表（地图模式，带经纬度）
@@ -847,6 +953,8 @@ class OrderUtils:
             per_page: 每页数量
             task_type: 任务类型筛选
             staff_id: 员工ID（用于排除已接取的订单）
+            cursor: 游标分页，"" 为第一页，其余为上一页的 next_cursor；为 None 时按页码分页
+            count: 总数统计方式 none/exact/approximate
         """
         try:
             query = (
@@ -862,34 +970,146 @@ class OrderUtils:
             )
             if task_type:
                 query = query.filter(Orders.OrderType == task_type)
-            total = query.count()
+            page_data = PaginationUtils.paginate(
+                query, ORDER_LIST_SORT, page, per_page, cursor, count
+            )
+            results = page_data["items"]
+            orders_list = [OrderUtils._map_order_item(order, user) for order, user in results]
+            return {
+                "orders": orders_list,
+                "pagination": page_data["pagination"],
+            }
+        except InvalidCursorError:
+            raise
+        except Exception as e:
+            raise Exception(f"获取可接单地图列表失败: {str(e)}")
+
+    @staticmethod
+    def _map_order_item(order: Orders, user: User) -> Dict[str, Any]:
+        """地图模式的订单数据（含取货点和收货点坐标，未回填的历史订单为 None）"""
+        return {
+            "type": "order",
+            "order_id": str(order.OrderID),
+            "client_name": user.Username,
+            "client_address": user.Address,
+            "order_type": order.OrderType,
+            "order_location": order.OrderLocation,
+            "shop_address": order.ShopAddress,
+            "creation_time": order.CreationTime,
+            "assignment_type": order.AssignmentType,
+            "order_status": order.OrderStatus,
+            "shop_longitude": float(order.ShopLongitude) if order.ShopLongitude is not None else None,
+            "shop_latitude": float(order.ShopLatitude) if order.ShopLatitude is not None else None,
+            "order_longitude": float(order.OrderLongitude) if order.OrderLongitude is not None else None,
+            "order_latitude": float(order.OrderLatitude) if order.OrderLatitude is not None else None,
+        }
+
+    @staticmethod
+    def get_nearby_available_orders(
+        db: Session,
+        longitude: float,
+        latitude: float,
+        radius: float = None,
+        limit: int = None,
+        task_type: str = "",
+    ) -> Dict[str, Any]:
+        """
+        获取骑手附近的可接订单（按取货点距离由近到远）
+        先用覆盖查询范围的 geohash 前缀走 (OrderStatus, AssignmentStatus, ShopGeoHash) 索引，
+        再按外接矩形和平面近似距离排序取前 limit 条，最后用球面距离精确过滤
+        Args:
+            db: 数据库会话
+            longitude: 骑手经度
+            latitude: 骑手纬度
+            radius: 查询半径（米）
+            limit: 最多返回数量
+            task_type: 任务类型筛选
+        """
+        try:
+            radius = min(radius or config.NEARBY_ORDERS_RADIUS, config.NEARBY_ORDERS_MAX_RADIUS)
+            limit = min(limit or config.NEARBY_ORDERS_LIMIT, config.NEARBY_ORDERS_MAX_LIMIT)
+            prefixes = MapUtils.geohash_cover(longitude, latitude, radius)
+            min_lon, min_lat, max_lon, max_lat = MapUtils.bounding_box(longitude, latitude, radius)
+
+            center_lon = OrderUtils._coordinate(longitude)
+            center_lat = OrderUtils._coordinate(latitude)
+            lon_scale = OrderUtils._coordinate(math.cos(math.radians(latitude)))
+            lat_diff = Orders.ShopLatitude - center_lat
+            lon_diff = (Orders.ShopLongitude - center_lon) * lon_scale
+
+            query = (
+                db.query(Orders, User)
+                .join(User, Orders.ClientID == User.UserID)
+                .filter(
+                    Orders.OrderStatus == "pending",
+                    Orders.AssignmentStatus == "open",
+                    Orders.StaffID.is_(None),
+                    or_(*[Orders.ShopGeoHash.like(f"{prefix}%") for prefix in prefixes]),
+                    Orders.ShopLongitude.between(OrderUtils._coordinate(min_lon), OrderUtils._coordinate(max_lon)),
+                    Orders.ShopLatitude.between(OrderUtils._coordinate(min_lat), OrderUtils._coordinate(max_lat)),
+                )
+            )
+            if task_type:
+                query = query.filter(Orders.OrderType == task_type)
             results = (
-                query.order_by(desc(Orders.CreationTime))
-                .offset((page - 1) * per_page)
-                .limit(per_page)
+                query.order_by(lat_diff * lat_diff + lon_diff * lon_diff, Orders.OrderID)
+                .limit(limit)
                 .all()
             )
+
             orders_list = []
             for order, user in results:
-                orders_list.append({
-                    "type": "order",
-                    "order_id": str(order.OrderID),
-                    "client_name": user.Username,
-                    "client_address": user.Address,
-                    "order_type": order.OrderType,
-                    "order_location": order.OrderLocation,
-                    "creation_time": order.CreationTime,
-                    "assignment_type": order.AssignmentType,
-                    "order_status": order.OrderStatus,
-                })
+                distance = MapUtils.haversine_distance(
+                    longitude, latitude, float(order.ShopLongitude), float(order.ShopLatitude)
+                )
+                if distance > radius:
+                    continue
+                item = OrderUtils._map_order_item(order, user)
+                item["distance"] = int(distance)
+                orders_list.append(item)
+            orders_list.sort(key=lambda item: item["distance"])
+
             return {
                 "orders": orders_list,
-                "pagination": {
-                    "current_page": page,
-                    "per_page": per_page,
-                    "total": total,
-                    "total_pages": (total + per_page - 1) // per_page,
-                },
+                "center": {"longitude": longitude, "latitude": latitude},
+                "radius": radius,
             }
         except Exception as e:
-            raise Exception(f"获取可接单地图列表失败: {str(e)}")
+            raise Exception(f"获取附近可接订单失败: {str(e)}")
+
+    @staticmethod
+    def backfill_order_locations(db: Session, batch_size: int = 200, only_open: bool = True) -> Dict[str, int]:
+        """
+        为缺少坐标的历史订单回填取货点/收货点坐标（地理编码走缓存）
+        Args:
+            db: 数据库会话
+            batch_size: 每批处理并提交的订单数
+            only_open: 只回填可接订单（附近查询只涉及这些订单）
+        Returns:
+            Dict: total 处理数、updated 成功数、failed 地址无法识别数
+        """
+        total = updated = failed = 0
+        last_id = None
+        while True:
+            query = db.query(Orders).filter(Orders.ShopGeoHash.is_(None))
+            if only_open:
+                query = query.filter(Orders.OrderStatus == "pending", Orders.AssignmentStatus == "open")
+            if last_id is not None:
+                query = query.filter(Orders.OrderID > last_id)
+            orders = query.order_by(Orders.OrderID).limit(batch_size).all()
+            if not orders:
+                break
+            for order in orders:
+                total += 1
+                shop_coords, order_coords = MapUtils.geocode_many(
+                    [order.ShopAddress or "", order.OrderLocation or ""]
+                )
+                if not shop_coords:
+                    failed += 1
+                    continue
+                OrderUtils.set_order_coordinates(order, shop_coords, order_coords)
+                updated += 1
+            last_id = orders[-1].OrderID
+            db.commit()
+        logger.info(f"订单坐标回填完成: 共 {total} 个，成功 {updated} 个，失败 {failed} 个")
+        return {"total": total, "updated": updated, "failed": failed}
@@ -0,0 +1,192 @@
+"""
+分页工具模块
+提供基于排序键的游标分页（keyset pagination）和可选的总数统计。
+游标对客户端不透明，内容为最后一行排序键的编码，翻页时按
+(CreationTime, OrderID) < (上一页最后一行) 这样的条件直接走索引定位，不再 OFFSET 扫描丢弃前面的行
+"""
+
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.engine import Row
+import config
+
+# 游标格式版本，排序键编码方式变化时递增
+CURSOR_VERSION = 1
+
+COUNT_NONE = "none"
+COUNT_EXACT = "exact"
+COUNT_APPROXIMATE = "approximate"
+
+
+class InvalidCursorError(ValueError):
+    """分页游标无法解析或与当前排序不匹配"""
+
+
+class PaginationUtils:
+    """分页工具类"""
+
+    @staticmethod
+    def _encode_value(value: Any) -> List[Any]:
+        if value is None:
+            return ["n", None]
+        if isinstance(value, Decimal):
+            return ["d", str(value)]
+        if isinstance(value, datetime):
+            return ["t", value.isoformat()]
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise TypeError(f"不支持的游标排序键类型: {type(value).__name__}")
+        return ["i" if isinstance(value, int) else "s", value]
+
+    @staticmethod
+    def _decode_value(item: List[Any]) -> Any:
+        kind, value = item
+        if kind == "n":
+            return None
+        if kind == "d":
+            return Decimal(value)
+        if kind == "t":
+            return datetime.fromisoformat(value)
+        if kind == "i":
+            return int(value)
+        if kind == "s":
+            return str(value)
+        raise ValueError(kind)
+
+    @staticmethod
+    def encode_cursor(values: Sequence[Any]) -> str:
+        """将排序键编码为 URL 安全的游标"""
+        payload = {"v": CURSOR_VERSION, "k": [PaginationUtils._encode_value(value) for value in values]}
+        raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str, size: int) -> List[Any]:
+        """
+        解析游标
+        Raises:
+            InvalidCursorError: 游标被篡改、版本不符或排序键数量不一致
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw.decode("utf-8"))
+            if payload["v"] != CURSOR_VERSION or len(payload["k"]) != size:
+                raise ValueError("版本或排序键数量不匹配")
+            return [PaginationUtils._decode_value(item) for item in payload["k"]]
+        except (ValueError, TypeError, KeyError, UnicodeDecodeError) as e:
+            raise InvalidCursorError(f"无效的分页游标: {cursor}") from e
+
+    @staticmethod
+    def keyset_condition(sort_columns: Sequence[Tuple[Any, bool]], values: Sequence[Any]):
+        """
+        生成“位于游标之后”的过滤条件
+        Args:
+            sort_columns: [(列, 是否倒序)]，最后一列必须唯一（通常是主键）
+            values: 上一页最后一行的排序键
+        Returns:
+            (c1 < v1) OR (c1 = v1 AND c2 < v2) OR ...（正序列为 >）
+        """
+        clauses = []
+        for index, (column, descending) in enumerate(sort_columns):
+            value = values[index]
+            after = column < value if descending else column > value
+            equals = [sort_columns[i][0] == values[i] for i in range(index)]
+            clauses.append(and_(*equals, after) if equals else after)
+        return or_(*clauses)
+
+    @staticmethod
+    def _row_values(row: Any, sort_columns: Sequence[Tuple[Any, bool]]) -> List[Any]:
+        """从查询结果行中取出排序键（支持单实体和多实体查询）"""
+        entities = tuple(row) if isinstance(row, Row) else (row,)
+        values = []
+        for column, _ in sort_columns:
+            for entity in entities:
+                if isinstance(entity, column.class_):
+                    values.append(getattr(entity, column.key))
+                    break
+            else:
+                raise ValueError(f"查询结果中没有排序列 {column}")
+        return values
+
+    @staticmethod
+    def count(query, mode: str) -> Tuple[Optional[int], bool]:
+        """
+        统计总数
+        Args:
+            mode: none 不统计；exact 精确 COUNT；approximate 最多数到 PAGINATION_COUNT_LIMIT 条
+        Returns:
+            (总数, 是否为估计值)；approximate 超过上限时返回上限并标记为估计值
+        """
+        if mode == COUNT_NONE:
+            return None, False
+        if mode == COUNT_APPROXIMATE:
+            limit = config.PAGINATION_COUNT_LIMIT
+            total = query.order_by(None).limit(limit + 1).count()
+            if total > limit:
+                return limit, True
+            return total, False
+        return query.count(), False
+
+    @staticmethod
+    def paginate(
+        query,
+        sort_columns: Sequence[Tuple[Any, bool]],
+        page: int = 1,
+        per_page: int = 10,
+        cursor: Optional[str] = None,
+        count: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        分页查询
+        Args:
+            query: 已添加过滤条件、尚未排序的查询
+            sort_columns: [(列, 是否倒序)]，最后一列必须唯一
+            page: 页码（cursor 为 None 时使用 OFFSET 分页）
+            per_page: 每页数量
+            cursor: 游标模式：None 为页码模式，"" 为游标模式第一页，其余为上一页返回的 next_cursor
+            count: 总数统计方式 none/exact/approximate，默认页码模式 exact、游标模式 none
+        Returns:
+            Dict: items 和 pagination（含 next_cursor、has_next，页码模式另含 current_page/total_pages）
+        Raises:
+            InvalidCursorError: 游标无效
+        """
+        cursor_mode = cursor is not None
+        if count not in (COUNT_NONE, COUNT_EXACT, COUNT_APPROXIMATE):
+            count = COUNT_NONE if cursor_mode else COUNT_EXACT
+        total, estimated = PaginationUtils.count(query, count)
+
+        if cursor:
+            values = PaginationUtils.decode_cursor(cursor, len(sort_columns))
+            query = query.filter(PaginationUtils.keyset_condition(sort_columns, values))
+        query = query.order_by(
+            *[column.desc() if descending else column.asc() for column, descending in sort_columns]
+        )
+        if not cursor_mode:
+            query = query.offset((page - 1) * per_page)
+
+        # 多取一行判断是否还有下一页
+        rows = query.limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        next_cursor = None
+        if has_next and sort_columns:
+            next_cursor = PaginationUtils.encode_cursor(PaginationUtils._row_values(items[-1], sort_columns))
+
+        pagination = {
+            "per_page": per_page,
+            "total": total,
+            "has_next": has_next,
+            "next_cursor": next_cursor,
+        }
+        if estimated:
+            pagination["total_is_estimate"] = True
+        if not cursor_mode:
+            pagination["current_page"] = page
+            pagination["has_prev"] = page > 1
+            if total is not None:
+                pagination["total_pages"] = (total + per_page - 1) // per_page
+        return {"items": items, "pagination": pagination}
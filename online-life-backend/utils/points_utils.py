@@ -1,10 +1,15 @@
 from decimal import Decimal
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-from sqlalchemy import Integer
-from typing import Dict, List, Optional, Any
-from models import Points, User
+from sqlalchemy import Integer, String, cast, desc, func, insert, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from typing import Callable, Dict, List, Optional, Any, Tuple
+import config
+import time
+from models import Points, PointsTransaction, User
+from utils.typed_column_utils import TypedColumnUtils
+from utils.pagination_utils import COUNT_EXACT, InvalidCursorError, PaginationUtils
+from utils.job_utils import JobUtils
 import logging
 import traceback
 import re
@@ -21,6 +26,9 @@ file_handler.setFormatter(formatter)
 if not logger.hasHandlers():
     logger.addHandler(file_handler)
 
+# 数据库端的当前余额：优先类型列，尚未回填的旧记录回退到字符串列
+CURRENT_BALANCE = func.coalesce(Points.PointsValue, cast(Points.Points, Integer))
+
 
 class PointsUtils:
     """积分管理工具类"""
@@ -40,30 +48,45 @@ class PointsUtils:
         try:
             points_record = db.query(Points).filter(Points.UserID == user_id).first()
             if points_record:
-                return int(points_record.Points) if points_record.Points else 0
+                return TypedColumnUtils.value(points_record, "PointsValue") or 0
             return 0
         except Exception as e:
             logger.error(f"获取用户积分余额失败: {str(e)}")
             return 0
 
     @staticmethod
-    def _ensure_user_points_record(db: Session, user_id: Decimal) -> Points:
+    def _read_balance(db: Session, user_id: Decimal) -> Optional[int]:
+        """读取数据库中的当前余额（不经过会话缓存），记录不存在时返回 None"""
+        return db.execute(select(CURRENT_BALANCE).where(Points.UserID == user_id)).scalar_one_or_none()
+
+    @staticmethod
+    def _balance_update_values(db: Session, points_change: int) -> List[Tuple[Any, Any]]:
+        """
+        余额变更的 SET 子句（按顺序），新余额在数据库端由当前值计算
+        MySQL 按顺序赋值且后面的表达式看到前面的新值，先更新 PointsValue 再由其得到 Points；
+        其他数据库的赋值都基于原值
         """
-        确保用户积分记录存在，如果不存在则创建
+        new_balance = CURRENT_BALANCE + points_change
+        if db.get_bind().dialect.name == "mysql":
+            return [(Points.PointsValue, new_balance), (Points.Points, cast(Points.PointsValue, String(30)))]
+        return [(Points.Points, cast(new_balance, String(30))), (Points.PointsValue, new_balance)]
 
-        Args:
-            db: 数据库会话
-            user_id: 用户ID
+    @staticmethod
+    def _debit_points(db: Session, user_id: Decimal, points_amount: int) -> bool:
+        """
+        原子扣减余额（不提交事务）：UPDATE ... WHERE UserID = :u AND 余额 >= :n，
+        余额判断和扣减在同一条语句中完成，并发扣减不会丢失更新或扣成负数
 
         Returns:
-            Points: 用户积分记录
+            bool: 是否扣减成功，余额不足或记录不存在时不修改任何数据
         """
-        points_record = db.query(Points).filter(Points.UserID == user_id).first()
-        if not points_record:
-            points_record = Points(UserID=user_id, Points="0")
-            db.add(points_record)
-            db.flush()  # 立即执行插入但不提交
-        return points_record
+        result = db.execute(
+            update(Points)
+            .where(Points.UserID == user_id, CURRENT_BALANCE >= points_amount)
+            .ordered_values(*PointsUtils._balance_update_values(db, -points_amount))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
 
     @staticmethod
     def add_points(
@@ -82,19 +105,7 @@ class PointsUtils:
             bool: 操作是否成功
         """
         try:
-            # 确保用户积分记录存在
-            points_record = PointsUtils._ensure_user_points_record(db, user_id)
-
-            # 更新积分
-            current_points = int(points_record.Points) if points_record.Points else 0
-            new_points = current_points + points_amount
-            points_record.Points = str(new_points)
-
-            # 记录积分变更日志
-            PointsUtils._log_points_transaction(
-                db, user_id, points_amount, "ADD", reason, current_points, new_points
-            )
-
+            PointsUtils._credit_points(db, user_id, points_amount, reason)
             db.commit()
             logger.info(
                 f"用户 {user_id} 积分增加成功: +{points_amount}, 原因: {reason}"
@@ -106,6 +117,35 @@ class PointsUtils:
             logger.error(f"增加积分失败: {str(e)}")
             return False
 
+    @staticmethod
+    def _credit_points(db: Session, user_id: Decimal, points_amount: int, reason: str) -> int:
+        """
+        增加用户积分并记录流水，不提交事务
+
+        Returns:
+            int: 增加后的积分余额
+        """
+        # 数据库端原子累加，记录不存在时插入
+        db.execute(PointsUtils._upsert_points_statement(db, [{"user_id": user_id, "points": points_amount}]))
+        new_points = PointsUtils._read_balance(db, user_id)
+        current_points = new_points - points_amount
+
+        # 记录积分变更日志
+        PointsUtils._log_points_transaction(
+            db, user_id, points_amount, "ADD", reason, current_points, new_points
+        )
+        return new_points
+
+    @staticmethod
+    def _credit_points_job(db: Session, payload: Dict[str, Any]) -> None:
+        """异步任务 points.credit：payload 为 {"user_id", "points", "reason"}"""
+        new_points = PointsUtils._credit_points(
+            db, Decimal(payload["user_id"]), int(payload["points"]), payload["reason"]
+        )
+        logger.info(
+            f"用户 {payload['user_id']} 积分增加成功: +{payload['points']}, 原因: {payload['reason']}，余额 {new_points}"
+        )
+
     @staticmethod
     def deduct_points(
         db: Session, user_id: Decimal, points_amount: int, reason: str
@@ -123,24 +163,20 @@ class PointsUtils:
             bool: 操作是否成功
         """
         try:
-            # 获取用户积分记录
-            points_record = db.query(Points).filter(Points.UserID == user_id).first()
-            if not points_record:
-                logger.warning(f"用户 {user_id} 积分记录不存在")
-                return False
-
-            current_points = int(points_record.Points) if points_record.Points else 0
-
-            # 检查积分是否足够
-            if current_points < points_amount:
-                logger.warning(
-                    f"用户 {user_id} 积分不足: 当前{current_points}, 需要扣除{points_amount}"
-                )
+            # 带余额条件的原子扣减
+            if not PointsUtils._debit_points(db, user_id, points_amount):
+                db.rollback()
+                current_points = PointsUtils._read_balance(db, user_id)
+                if current_points is None:
+                    logger.warning(f"用户 {user_id} 积分记录不存在")
+                else:
+                    logger.warning(
+                        f"用户 {user_id} 积分不足: 当前{current_points}, 需要扣除{points_amount}"
+                    )
                 return False
 
-            # 扣除积分
-            new_points = current_points - points_amount
-            points_record.Points = str(new_points)
+            new_points = PointsUtils._read_balance(db, user_id)
+            current_points = new_points + points_amount
 
             # 记录积分变更日志
             PointsUtils._log_points_transaction(
@@ -186,34 +222,32 @@ class PointsUtils:
             bool: 操作是否成功
         """
         try:
-            # 检查转出用户积分
-            from_points_record = (
-                db.query(Points).filter(Points.UserID == from_user_id).first()
+            # 按用户ID升序锁定双方余额记录：相反方向的并发转账以相同顺序加锁，不会互相死锁
+            balances = dict(
+                db.execute(
+                    select(Points.UserID, CURRENT_BALANCE)
+                    .where(Points.UserID.in_([from_user_id, to_user_id]))
+                    .order_by(Points.UserID)
+                    .with_for_update()
+                ).all()
             )
-            if not from_points_record:
+            if from_user_id not in balances:
+                db.rollback()
                 logger.warning(f"转出用户 {from_user_id} 积分记录不存在")
                 return False
 
-            current_from_points = (
-                int(from_points_record.Points) if from_points_record.Points else 0
-            )
-            if current_from_points < points_amount:
+            # 带余额条件的原子扣减，再原子累加到转入用户（记录不存在时插入）
+            if not PointsUtils._debit_points(db, from_user_id, points_amount):
+                db.rollback()
                 logger.warning(f"转出用户 {from_user_id} 积分不足")
                 return False
+            db.execute(PointsUtils._upsert_points_statement(db, [{"user_id": to_user_id, "points": points_amount}]))
 
-            # 确保转入用户积分记录存在
-            to_points_record = PointsUtils._ensure_user_points_record(db, to_user_id)
-            current_to_points = (
-                int(to_points_record.Points) if to_points_record.Points else 0
-            )
-
-            # 执行转账
+            current_from_points = balances[from_user_id]
+            current_to_points = balances.get(to_user_id, 0)
             new_from_points = current_from_points - points_amount
             new_to_points = current_to_points + points_amount
 
-            from_points_record.Points = str(new_from_points)
-            to_points_record.Points = str(new_to_points)
-
             # 记录转账日志
             transfer_reason = f"转账给用户{to_user_id}: {message}"
             receive_reason = f"收到用户{from_user_id}转账: {message}"
@@ -251,12 +285,73 @@ class PointsUtils:
 
     @staticmethod
     def get_points_history(
-        db: Session, user_id: Decimal, page: int = 1, per_page: int = 20
+        db: Session,
+        user_id: Decimal,
+        page: int = 1,
+        per_page: int = 20,
+        cursor: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
-        获取用户积分历史记录（从日志文件读取）
+        获取用户积分历史记录（从 PointsTransaction 流水表读取）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            page: 页码（未提供 cursor 时使用）
+            per_page: 每页记录数
+            cursor: 上一页返回的 next_cursor，提供时按游标翻页
+
+        Returns:
+            Dict: 包含积分记录、分页信息和 next_cursor 的字典
         """
-        return PointsUtils.get_points_history_from_log(user_id, page, per_page)
+        try:
+            query = db.query(PointsTransaction).filter(
+                PointsTransaction.UserID == user_id
+            )
+
+            page_data = PaginationUtils.paginate(
+                query,
+                [(PointsTransaction.CreatedAt, True), (PointsTransaction.TransactionID, True)],
+                page,
+                per_page,
+                cursor or None,
+                COUNT_EXACT,
+            )
+            transactions = page_data["items"]
+            total_records = page_data["pagination"]["total"]
+
+            records = [
+                {
+                    "transaction_type": tx.TransactionType,
+                    "points_change": tx.PointsChange,
+                    "reason": tx.Reason,
+                    "balance_after": tx.BalanceAfter,
+                    "created_at": tx.CreatedAt.strftime("%Y-%m-%d %H:%M:%S"),
+                }
+                for tx in transactions
+            ]
+
+            return {
+                "records": records,
+                "current_page": page,
+                "per_page": per_page,
+                "total_records": total_records,
+                "total_pages": (total_records + per_page - 1) // per_page,
+                "next_cursor": page_data["pagination"]["next_cursor"],
+            }
+
+        except InvalidCursorError:
+            raise
+        except Exception as e:
+            logger.error(f"获取积分历史失败: {str(e)}")
+            return {
+                "records": [],
+                "current_page": page,
+                "per_page": per_page,
+                "total_records": 0,
+                "total_pages": 0,
+                "next_cursor": None,
+            }
 
     # @staticmethod
     # def get_points_ranking(db: Session, limit: int = 50) -> List[Dict[str, Any]]:
@@ -309,16 +404,16 @@ class PointsUtils:
             List[Dict]: 积分排行榜列表, 包含 'rank', 'username', 'points'
         """
         try:
+            # typed 阶段直接按 PointsValue 索引排序，无需逐行 CAST
+            points_column = TypedColumnUtils.column(Points, "PointsValue")
             ranking_query = (
                 db.query(
                     User.Username,  # 选择 User 表中的 Username
-                    Points.Points,  # 选择 Points 表中的 Points
+                    points_column,  # 选择积分值
                 )
                 .join(User, Points.UserID == User.UserID)  # 通过 UserID 关联两个表
-                .filter(Points.Points.isnot(None))  # 过滤掉 Points 为空的记录
-                .order_by(
-                    desc(func.cast(Points.Points, Integer))
-                )  # 按 Points 降序排列 (转换为整数比较)
+                .filter(points_column.isnot(None))  # 过滤掉 Points 为空的记录
+                .order_by(desc(points_column))  # 按积分降序排列
                 .limit(limit)  # 限制返回的记录数
             )
 
@@ -350,70 +445,189 @@ class PointsUtils:
         balance_after: int,
     ) -> None:
         """
-        记录积分变更日志（写入 points.log 文件）
+        记录积分变更流水（写入 PointsTransaction 表，随调用方事务一起提交）
         """
-        try:
-            log_message = (
-                f"积分变更 - 用户: {user_id}, 类型: {transaction_type}, "
-                f"变更: {points_change}, 原因: {reason}, "
-                f"余额: {balance_before} -> {balance_after}"
+        db.add(
+            PointsTransaction(
+                UserID=user_id,
+                TransactionType=transaction_type,
+                PointsChange=points_change,
+                Reason=reason,
+                BalanceBefore=balance_before,
+                BalanceAfter=balance_after,
+                CreatedAt=datetime.now(),
             )
-            logger.info(log_message)  # 这行会写入 points.log
-        except Exception as e:
-            logger.error(f"记录积分变更日志失败: {str(e)}")
+        )
+        logger.info(
+            f"积分变更 - 用户: {user_id}, 类型: {transaction_type}, "
+            f"变更: {points_change}, 原因: {reason}, "
+            f"余额: {balance_before} -> {balance_after}"
+        )
+
+    @staticmethod
+    def _upsert_points_statement(db: Session, deltas: List[Dict[str, Any]]):
+        """
+        批量增加余额的 upsert 语句：不存在的用户插入新记录，已存在的在数据库端原子累加
+        MySQL 使用 INSERT ... ON DUPLICATE KEY UPDATE（按顺序赋值，先更新 Points 再由其得到 PointsValue），
+        SQLite/PostgreSQL 使用 INSERT ... ON CONFLICT DO UPDATE（赋值都基于原值）
+        """
+        rows = [
+            {"UserID": item["user_id"], "Points": str(item["points"]), "PointsValue": item["points"]}
+            for item in deltas
+        ]
+        current = CURRENT_BALANCE
+        dialect = db.get_bind().dialect.name
+        if dialect == "mysql":
+            statement = mysql.insert(Points).values(rows)
+            return statement.on_duplicate_key_update([
+                ("Points", cast(current + statement.inserted.PointsValue, String(30))),
+                ("PointsValue", cast(Points.Points, Integer)),
+            ])
+        if dialect in ("sqlite", "postgresql"):
+            module = sqlite if dialect == "sqlite" else postgresql
+            statement = module.insert(Points).values(rows)
+            new_value = current + statement.excluded.PointsValue
+            return statement.on_conflict_do_update(
+                index_elements=[Points.UserID],
+                set_={"Points": cast(new_value, String(30)), "PointsValue": new_value},
+            )
+        raise ValueError(f"批量积分不支持的数据库: {dialect}")
+
+    @staticmethod
+    def _credit_points_chunk(db: Session, items: List[Dict[str, Any]], now: datetime) -> None:
+        """
+        一个分批的积分入账（不提交事务）：锁定并读取现有余额、一条 upsert 更新余额、一次批量写入流水
+        """
+        user_ids = list({item["user_id"] for item in items})
+        balances = {
+            user_id: (value if value is not None else (int(points) if points else 0))
+            for user_id, points, value in db.execute(
+                select(Points.UserID, Points.Points, Points.PointsValue)
+                .where(Points.UserID.in_(user_ids))
+                .with_for_update()
+            )
+        }
+
+        deltas: Dict[Decimal, int] = {}
+        ledger = []
+        for item in items:
+            user_id = item["user_id"]
+            before = balances.get(user_id, 0)
+            after = before + item["points"]
+            balances[user_id] = after
+            deltas[user_id] = deltas.get(user_id, 0) + item["points"]
+            ledger.append({
+                "UserID": user_id,
+                "TransactionType": "ADD",
+                "PointsChange": item["points"],
+                "Reason": item["reason"],
+                "BalanceBefore": before,
+                "BalanceAfter": after,
+                "CreatedAt": now,
+            })
+
+        db.execute(PointsUtils._upsert_points_statement(
+            db, [{"user_id": user_id, "points": points} for user_id, points in deltas.items()]
+        ))
+        db.execute(insert(PointsTransaction), ledger)
 
     @staticmethod
     def batch_add_points(
-        db: Session, user_points_list: List[Dict[str, Any]]
+        db: Session,
+        user_points_list: List[Dict[str, Any]],
+        chunk_size: Optional[int] = None,
+        atomicity: str = "all",
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
     ) -> Dict[str, Any]:
         """
-        批量增加积分
+        批量增加积分：按 chunk_size 分批，每批一次 upsert 更新余额、一次批量写入流水
 
         Args:
             db: 数据库会话
             user_points_list: 用户积分列表，格式: [{"user_id": Decimal, "points": int, "reason": str}]
+            chunk_size: 每批条数，默认 POINTS_BULK_CHUNK_SIZE
+            atomicity: all 全部成功才提交，任一批失败全部回滚；chunk 每批单独提交，失败的批次回滚后继续
+            progress: 每批完成后回调，参数为进度信息（已完成批数、已处理条数、成功/失败数、耗时）
 
         Returns:
             Dict: 操作结果统计
         """
-        success_count = 0
-        fail_count = 0
+        if atomicity not in ("all", "chunk"):
+            raise ValueError(f"无效的原子性模式: {atomicity}")
+        chunk_size = chunk_size or config.POINTS_BULK_CHUNK_SIZE
+        started = time.perf_counter()
+        now = datetime.now()
+
+        # 校验输入，无效条目不入账
+        valid = []
         fail_details = []
-
+        for item in user_points_list:
+            try:
+                user_id = Decimal(str(item.get("user_id")))
+                points = int(item.get("points"))
+                if points <= 0:
+                    raise ValueError("积分必须为正数")
+            except Exception as e:
+                fail_details.append({"user_id": str(item.get("user_id")), "points": item.get("points"), "reason": str(e)})
+                continue
+            valid.append({"user_id": user_id, "points": points, "reason": item.get("reason", "批量增加积分")})
+
+        chunks = [valid[i:i + chunk_size] for i in range(0, len(valid), chunk_size)]
+        success_count = 0
+        processed = 0
         try:
-            for item in user_points_list:
-                user_id = item.get("user_id")
-                points = item.get("points")
-                reason = item.get("reason", "批量增加积分")
-
-                if PointsUtils.add_points(db, user_id, points, reason):
-                    success_count += 1
-                else:
-                    fail_count += 1
-                    fail_details.append(
-                        {
-                            "user_id": str(user_id),
-                            "points": points,
-                            "reason": "操作失败",
-                        }
+            for index, chunk in enumerate(chunks, 1):
+                try:
+                    PointsUtils._credit_points_chunk(db, chunk, now)
+                    if atomicity == "chunk":
+                        db.commit()
+                    success_count += len(chunk)
+                except Exception as e:
+                    if atomicity == "all":
+                        raise
+                    db.rollback()
+                    logger.error(f"批量增加积分第 {index} 批失败，已回滚: {str(e)}")
+                    fail_details.extend(
+                        {"user_id": str(item["user_id"]), "points": item["points"], "reason": str(e)}
+                        for item in chunk
                     )
-
-            return {
-                "success_count": success_count,
-                "fail_count": fail_count,
-                "fail_details": fail_details,
-                "total_processed": len(user_points_list),
-            }
-
+                processed += len(chunk)
+                report = {
+                    "chunks_done": index,
+                    "chunks_total": len(chunks),
+                    "processed": processed,
+                    "total": len(valid),
+                    "success_count": success_count,
+                    "fail_count": processed - success_count,
+                    "elapsed": round(time.perf_counter() - started, 3),
+                }
+                logger.info(
+                    f"批量增加积分进度: 第 {index}/{len(chunks)} 批，已处理 {processed}/{len(valid)} 条，"
+                    f"成功 {success_count} 条"
+                )
+                if progress:
+                    progress(report)
+            if atomicity == "all":
+                db.commit()
         except Exception as e:
-            logger.error(f"批量增加积分失败: {str(e)}")
+            db.rollback()
+            logger.error(f"批量增加积分失败，全部回滚: {str(e)}")
             return {
                 "success_count": 0,
                 "fail_count": len(user_points_list),
                 "fail_details": [{"error": str(e)}],
                 "total_processed": len(user_points_list),
+                "chunks": len(chunks),
             }
 
+        return {
+            "success_count": success_count,
+            "fail_count": len(fail_details),
+            "fail_details": fail_details,
+            "total_processed": len(user_points_list),
+            "chunks": len(chunks),
+        }
+
     @staticmethod
     def check_points_sufficient(
         db: Session, user_id: Decimal, required_points: int
@@ -433,48 +647,87 @@ class PointsUtils:
         return current_balance >= required_points
 
     @staticmethod
-    def get_points_history_from_log(user_id: Decimal, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    def import_points_log(db: Session, log_file_path: str = POINTS_LOG_FILE) -> int:
         """
-        从日志文件中获取用户积分历史记录
+        从 points.log 日志文件回填积分流水（一次性迁移，重复导入时跳过已有记录）
+
+        Args:
+            db: 数据库会话
+            log_file_path: 日志文件路径
+
+        Returns:
+            int: 新导入的流水条数
         """
-        log_file_path = POINTS_LOG_FILE  # 使用统一的日志文件路径
         pattern = re.compile(
-            rf"积分变更 - 用户: {user_id}, 类型: (\w+), 变更: ([\-\d]+), 原因: (.*?), 余额: (\d+) -> (\d+)"
+            r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) \w+ 积分变更 - 用户: (\d+), "
+            r"类型: (\w+), 变更: ([\-\d]+), 原因: (.*?), 余额: (\d+) -> (\d+)"
         )
-        history = []
+
+        entries = []
+        with open(log_file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                match = pattern.match(line)
+                if not match:
+                    continue
+                (
+                    log_time,
+                    millis,
+                    user_id,
+                    transaction_type,
+                    points_change,
+                    reason,
+                    balance_before,
+                    balance_after,
+                ) = match.groups()
+                entries.append(
+                    {
+                        "UserID": Decimal(user_id),
+                        "TransactionType": transaction_type,
+                        "PointsChange": int(points_change),
+                        "Reason": reason,
+                        "BalanceBefore": int(balance_before),
+                        "BalanceAfter": int(balance_after),
+                        "CreatedAt": datetime.strptime(log_time, "%Y-%m-%d %H:%M:%S").replace(
+                            microsecond=int(millis) * 1000
+                        ),
+                    }
+                )
+
+        if not entries:
+            return 0
+
         try:
-            with open(log_file_path, "r", encoding="utf-8") as f:
-                for line in reversed(f.readlines()):
-                    match = pattern.search(line)
-                    if match:
-                        transaction_type, points_change, reason, balance_before, balance_after = match.groups()
-                        # 从日志时间戳中提取时间
-                        time_match = re.match(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})", line)
-                        created_at = time_match.group(1) if time_match else ""
-                        history.append({
-                            "transaction_type": transaction_type,
-                            "points_change": int(points_change),
-                            "reason": reason,
-                            "balance_after": int(balance_after),
-                            "created_at": created_at,
-                        })
-            total_records = len(history)
-            start = (page - 1) * per_page
-            end = start + per_page
-            paged_history = history[start:end]
-            return {
-                "records": paged_history,
-                "current_page": page,
-                "per_page": per_page,
-                "total_records": total_records,
-                "total_pages": (total_records + per_page - 1) // per_page,
+            # 跳过已导入的记录
+            existing = {
+                (tx.UserID, tx.TransactionType, tx.PointsChange, tx.BalanceAfter, tx.CreatedAt)
+                for tx in db.query(PointsTransaction).filter(
+                    PointsTransaction.UserID.in_({entry["UserID"] for entry in entries}),
+                    PointsTransaction.CreatedAt <= max(entry["CreatedAt"] for entry in entries),
+                )
             }
+            new_entries = [
+                entry
+                for entry in entries
+                if (
+                    entry["UserID"],
+                    entry["TransactionType"],
+                    entry["PointsChange"],
+                    entry["BalanceAfter"],
+                    entry["CreatedAt"],
+                )
+                not in existing
+            ]
+
+            if new_entries:
+                db.bulk_insert_mappings(PointsTransaction, new_entries)
+            db.commit()
+            logger.info(f"从 {log_file_path} 导入积分流水 {len(new_entries)} 条")
+            return len(new_entries)
+
         except Exception as e:
-            logger.error(f"日志解析积分历史失败: {str(e)}")
-            return {
-                "records": [],
-                "current_page": page,
-                "per_page": per_page,
-                "total_records": 0,
-                "total_pages": 0,
-            }
+            db.rollback()
+            logger.error(f"导入积分日志失败: {str(e)}")
+            raise
+
+
+JobUtils.register_handler("points.credit", PointsUtils._credit_points_job)
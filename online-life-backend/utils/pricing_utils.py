@@ -0,0 +1,73 @@
+"""
+订单计价模块
+下单时按报价信息（订单类型、预计时间、距离）计算配送费，计价函数按名称注册，
+通过 ORDER_PRICING 选择，也可在调用 OrderUtils.create_order 时直接传入
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Callable, Dict, Optional
+
+import config
+
+# 计价函数：pricing(quote) -> 配送费（元），quote 包含 order_type、estimated_seconds、distance（米，可能缺失）
+PricingFunction = Callable[[Dict[str, Any]], Decimal]
+
+_pricing_functions: Dict[str, PricingFunction] = {}
+
+CENT = Decimal("0.01")
+
+
+class PricingUtils:
+    """订单计价工具类"""
+
+    @staticmethod
+    def register(name: str, pricing: PricingFunction) -> None:
+        """注册计价函数"""
+        _pricing_functions[name] = pricing
+
+    @staticmethod
+    def get(name: Optional[str] = None) -> PricingFunction:
+        """按名称取计价函数，默认使用 ORDER_PRICING"""
+        name = name or config.ORDER_PRICING
+        if name not in _pricing_functions:
+            raise ValueError(f"未知的计价方式: {name}")
+        return _pricing_functions[name]
+
+    @staticmethod
+    def quote(
+        order_type: str,
+        estimated_seconds: Optional[int],
+        distance: Optional[float] = None,
+        pricing: Optional[PricingFunction] = None,
+    ) -> Dict[str, Any]:
+        """
+        计算配送费
+        Returns:
+            Dict: 报价信息和 delivery_fee（保留两位小数的 Decimal）
+        """
+        quote = {
+            "order_type": order_type,
+            "estimated_seconds": estimated_seconds if estimated_seconds is not None else 45 * 60,
+            "distance": distance,
+        }
+        fee = Decimal((pricing or PricingUtils.get())(quote))
+        quote["delivery_fee"] = fee.quantize(CENT, rounding=ROUND_HALF_UP)
+        return quote
+
+    @staticmethod
+    def time_based_fee(quote: Dict[str, Any]) -> Decimal:
+        """按预计时间计价：预计分钟数 × ORDER_FEE_PER_MINUTE"""
+        minutes = int(quote["estimated_seconds"]) // 60
+        return Decimal(minutes) * Decimal(str(config.ORDER_FEE_PER_MINUTE))
+
+    @staticmethod
+    def distance_based_fee(quote: Dict[str, Any]) -> Decimal:
+        """按距离计价：起步价 + 每公里单价，没有距离时按预计时间计价"""
+        if not quote.get("distance"):
+            return PricingUtils.time_based_fee(quote)
+        kilometers = Decimal(str(quote["distance"])) / 1000
+        return Decimal(str(config.ORDER_BASE_FEE)) + kilometers * Decimal(str(config.ORDER_FEE_PER_KM))
+
+
+PricingUtils.register("time", PricingUtils.time_based_fee)
+PricingUtils.register("distance", PricingUtils.distance_based_fee)
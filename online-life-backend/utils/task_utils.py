@@ -3,7 +3,7 @@ import time
 from decimal import Decimal
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc, func, and_, or_
+from sqlalchemy import desc, asc, func, and_, or_, select, update
 from sqlalchemy import DECIMAL
 from typing import Dict, List, Optional, Any
 from models import (
@@ -17,7 +17,12 @@ from models import (
     Orders,
 )
 import logging
+import config
 from utils.user_utils import UserUtils
+from utils.deadline_utils import DeadlineUtils
+from utils.id_utils import IdUtils
+from utils.typed_column_utils import TypedColumnUtils
+from utils.pagination_utils import InvalidCursorError, PaginationUtils
 import traceback
 
 logger = logging.getLogger(__name__)
@@ -26,9 +31,6 @@ logger = logging.getLogger(__name__)
 class TaskUtils:
     """任务管理工具类"""
 
-    # 存储定时器的字典，key为task_id，value为timer对象
-    _assignment_timers = {}
-
     @staticmethod
     def get_group_tasks(
         db: Session,
@@ -78,19 +80,17 @@ class TaskUtils:
             offset = (page - 1) * per_page
             results = query.offset(offset).limit(per_page).all()
 
+            # 批量获取本页所有团办任务的参与人数和主要参与用户
+            participant_stats = TaskUtils._load_group_participant_stats(
+                db, [group_task.GroupTaskID for group_task, _ in results]
+            )
+
             # 处理结果
             group_tasks = []
             for group_task, task in results:
-                # 获取参与用户数量和用户列表
-                participants = (
-                    db.query(GroupTaskUser)
-                    .filter(GroupTaskUser.GroupTaskID == group_task.GroupTaskID)
-                    .all()
-                )
-
-                participant_count = len(participants)
-                # 获取第一个参与用户作为主要参与用户（或者可以根据业务逻辑调整）
-                main_participant_id = participants[0].UserID if participants else None
+                stats = participant_stats.get(group_task.GroupTaskID, {})
+                participant_count = stats.get("participant_count", 0)
+                main_participant_id = stats.get("main_participant_id")
 
                 group_tasks.append(
                     {
@@ -137,6 +137,43 @@ class TaskUtils:
                 "total_pages": 0,
             }
 
+    @staticmethod
+    def _load_group_participant_stats(
+        db: Session, group_task_ids: List[Decimal]
+    ) -> Dict[Decimal, Dict[str, Any]]:
+        """
+        批量获取团办任务的参与人数和主要参与用户（一次分组查询）
+
+        Args:
+            db: 数据库会话
+            group_task_ids: 团办任务ID列表（通常为当前页的任务）
+
+        Returns:
+            Dict: {GroupTaskID: {"participant_count": 人数, "main_participant_id": 用户ID}}
+        """
+        if not group_task_ids:
+            return {}
+
+        rows = (
+            db.query(
+                GroupTaskUser.GroupTaskID,
+                func.count(GroupTaskUser.UserID),
+                # 主键(UserID, TaskID)顺序下的第一个参与用户
+                func.min(GroupTaskUser.UserID),
+            )
+            .filter(GroupTaskUser.GroupTaskID.in_(set(group_task_ids)))
+            .group_by(GroupTaskUser.GroupTaskID)
+            .all()
+        )
+
+        return {
+            group_task_id: {
+                "participant_count": participant_count,
+                "main_participant_id": main_participant_id,
+            }
+            for group_task_id, participant_count, main_participant_id in rows
+        }
+
     @staticmethod
     def get_group_task_detail(
         db: Session, group_task_id: Decimal
@@ -211,12 +248,145 @@ class TaskUtils:
             logger.error(f"获取团办任务详情失败: {str(e)}")
             return None
 
+    @staticmethod
+    def _lock_group_task(db: Session, group_task_id: Decimal) -> bool:
+        """
+        锁定团办任务行，同一团办任务的加入/退出/重新分配在事务内串行执行
+        用带条件的空更新加锁：MySQL 对命中行加排他锁直到提交，SQLite 获取写锁；
+        必须是事务中的第一条语句，之后读取的参与人数才不会过期
+        Returns:
+            团办任务存在且未结束
+        """
+        result = db.execute(
+            update(GroupTask)
+            .where(
+                GroupTask.GroupTaskID == group_task_id,
+                or_(GroupTask.endTime.is_(None), GroupTask.endTime == ""),
+            )
+            .values(JoinTime=GroupTask.JoinTime)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def _adjust_active_participants(db: Session, task_id: Decimal, delta: int) -> bool:
+        """
+        原子增减 Task.ActiveParticipants
+        增加时带 ActiveParticipants + delta <= MaxParticipants 条件，减少时不低于 0；
+        条件不满足时影响行数为 0，返回 False
+        """
+        guard = (
+            Task.ActiveParticipants + delta <= Task.MaxParticipants
+            if delta > 0
+            else Task.ActiveParticipants + delta >= 0
+        )
+        result = db.execute(
+            update(Task)
+            .where(Task.TaskID == task_id, guard)
+            .values(ActiveParticipants=Task.ActiveParticipants + delta)
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def _add_participant(db: Session, user_id: Decimal, task: Task):
+        """
+        增加计数并写入（或重新激活）TaskParticipant，满员时开放给代办人员竞标
+        计数带 MaxParticipants 条件，已满员时抛出异常且不写入参与记录，由调用方回滚
+        """
+        if not TaskUtils._adjust_active_participants(db, task.TaskID, 1):
+            raise Exception(f"任务 {task.TaskID} 已满员")
+
+        existing = (
+            db.query(TaskParticipant)
+            .filter_by(UserID=user_id, TaskID=task.TaskID)
+            .first()
+        )
+        if existing:
+            existing.Status = "active"
+            existing.JoinTime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            logger.info("用户已存在，更新状态为 active")
+        else:
+            db.add(
+                TaskParticipant(
+                    UserID=user_id,
+                    TaskID=task.TaskID,
+                    JoinTime=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    Status="active",
+                )
+            )
+        if task.ActiveParticipants >= task.MaxParticipants:
+            TaskUtils._make_task_available_for_staff(db, task.TaskID)
+
+    @staticmethod
+    def check_participant_counters(db: Session) -> List[Dict[str, Any]]:
+        """
+        校验 Task.ActiveParticipants 与 TaskParticipant 中 active 记录数是否一致（一次分组查询）
+
+        Returns:
+            List[Dict]: 不一致的任务：task_id、stored（计数列）、actual（实际人数）
+        """
+        actual_counts = (
+            select(TaskParticipant.TaskID, func.count().label("actual"))
+            .where(TaskParticipant.Status == "active")
+            .group_by(TaskParticipant.TaskID)
+            .subquery()
+        )
+        actual = func.coalesce(actual_counts.c.actual, 0)
+        rows = (
+            db.query(Task.TaskID, Task.ActiveParticipants, actual)
+            .outerjoin(actual_counts, actual_counts.c.TaskID == Task.TaskID)
+            .filter(Task.ActiveParticipants != actual)
+            .order_by(Task.TaskID)
+            .all()
+        )
+        return [
+            {"task_id": str(task_id), "stored": stored, "actual": int(count)}
+            for task_id, stored, count in rows
+        ]
+
+    @staticmethod
+    def repair_participant_counters(db: Session, batch_size: int = 500) -> int:
+        """
+        修复不一致的参与人数计数：按批用相关子查询在数据库中重新计数，
+        执行时刻的实际人数为准，不会覆盖校验之后发生的加入/退出
+
+        Returns:
+            int: 修复的任务数
+        """
+        try:
+            task_ids = [Decimal(item["task_id"]) for item in TaskUtils.check_participant_counters(db)]
+            actual = (
+                select(func.count())
+                .where(
+                    TaskParticipant.TaskID == Task.TaskID,
+                    TaskParticipant.Status == "active",
+                )
+                .scalar_subquery()
+            )
+            for start in range(0, len(task_ids), batch_size):
+                db.execute(
+                    update(Task)
+                    .where(Task.TaskID.in_(task_ids[start:start + batch_size]))
+                    .values(ActiveParticipants=actual)
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+            if task_ids:
+                logger.warning(f"已修复 {len(task_ids)} 个任务的参与人数计数")
+            return len(task_ids)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"修复参与人数计数失败: {str(e)}")
+            raise
+
     @staticmethod
     def join_group_task_with_auto_assignment(
         db: Session, user_id: Decimal, group_task_id: Decimal
     ) -> Optional[Dict[str, Any]]:
         """
         加入团办任务并自动分配到合适的Task
+        先锁定团办任务行，查找空位、写入参与记录和满员判断在同一事务中完成，
+        并发加入时不会超过 MaxParticipants，也不会重复创建子任务
 
         Args:
             db: 数据库会话
@@ -227,19 +397,10 @@ class TaskUtils:
             Optional[Dict]: 分配结果，失败返回None
         """
         try:
-            # 检查团办任务是否存在
-            group_task = (
-                db.query(GroupTask)
-                .filter(GroupTask.GroupTaskID == group_task_id)
-                .first()
-            )
-            if not group_task:
-                logger.warning(f"团办任务 {group_task_id} 不存在")
-                return None
-
-            # 检查任务是否已结束
-            if group_task.endTime and group_task.endTime != "":
-                logger.warning(f"团办任务 {group_task_id} 已结束")
+            # 锁定团办任务（同时检查是否存在、是否已结束）
+            if not TaskUtils._lock_group_task(db, group_task_id):
+                db.rollback()
+                logger.warning(f"团办任务 {group_task_id} 不存在或已结束")
                 return None
 
             # 检查用户是否已经参加
@@ -253,6 +414,7 @@ class TaskUtils:
             )
 
             if existing:
+                db.rollback()
                 logger.warning(f"用户 {user_id} 已经参加团办任务 {group_task_id}")
                 return None
 
@@ -263,6 +425,7 @@ class TaskUtils:
             if not available_task:
                 available_task = TaskUtils._create_new_task_for_group(db, group_task_id)
                 if not available_task:
+                    db.rollback()
                     return None
 
             # 添加用户到GroupTaskUser
@@ -271,43 +434,12 @@ class TaskUtils:
             )
             db.add(group_task_user)
 
-            # 添加用户到TaskParticipant
-            existing = (
-                db.query(TaskParticipant)
-                .filter_by(UserID=user_id, TaskID=available_task.TaskID)
-                .first()
-            )
-
-            if existing:
-                existing.Status = "active"
-                existing.JoinTime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                logger.info("用户已存在，更新状态为 active")
-            else:
-                task_participant = TaskParticipant(
-                    UserID=user_id,
-                    TaskID=available_task.TaskID,
-                    JoinTime=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    Status="active",
-                )
-                db.add(task_participant)
+            # 添加用户到TaskParticipant，满员则自动开放给代办人员（与加入在同一事务中提交）
+            TaskUtils._add_participant(db, user_id, available_task)
+            new_participant_count = available_task.ActiveParticipants
 
             db.commit()
 
-            # 检查Task是否满员，满员则自动开放给代办人员
-            new_participant_count = (
-                db.query(TaskParticipant)
-                .filter(
-                    TaskParticipant.TaskID == available_task.TaskID,
-                    TaskParticipant.Status == "active",
-                )
-                .count()
-            )
-            if new_participant_count >= available_task.MaxParticipants:
-                available_task.Status = "full"
-                # 设置竞标截止时间（如7天后）
-                available_task.BidDeadline = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d %H:%M:%S")
-                db.commit()
-
             logger.info(
                 f"用户 {user_id} 成功加入团办任务 {group_task_id}，分配到Task {available_task.TaskID}"
             )
@@ -327,83 +459,6 @@ class TaskUtils:
             logger.error(f"加入团办任务失败: {str(e)}")
             return None
 
-    @staticmethod
-    def _create_new_task_for_group(
-        db: Session, group_task_id: Decimal
-    ) -> Optional[Task]:
-        """
-        为GroupTask创建新的子Task
-        """
-        try:
-            # 获取GroupTask的基本信息
-            group_task = (
-                db.query(GroupTask)
-                .filter(GroupTask.GroupTaskID == group_task_id)
-                .first()
-            )
-            if not group_task:
-                return None
-
-            # 获取第一个Task作为模板
-            template_task = (
-                db.query(Task).filter(Task.GroupTaskID == group_task_id).first()
-            )
-            if not template_task:
-                return None
-
-            # 生成新的TaskID
-            max_task_id = db.query(func.max(Task.TaskID)).scalar() or 0
-            new_task_id = max_task_id + 1
-
-            # 创建新Task
-            new_task = Task(
-                TaskID=new_task_id,
-                TaskType=template_task.TaskType,
-                Description=template_task.Description,
-                EstimatedTime=template_task.EstimatedTime,
-                ActualTime="",
-                CurrentBidder="",
-                BidDeadline=template_task.BidDeadline,
-                GroupTaskID=group_task_id,
-                TaskLocation=template_task.TaskLocation,
-                MaxParticipants=5,
-                Status="recruiting",
-            )
-
-            db.add(new_task)
-            db.flush()
-
-            logger.info(f"为团办任务 {group_task_id} 创建新的子任务 {new_task_id}")
-            return new_task
-
-        except Exception as e:
-            logger.error(f"创建新子任务失败: {str(e)}")
-            return None
-
-    @staticmethod
-    def _make_task_available_for_staff(db: Session, task_id: Decimal) -> bool:
-        """
-        将满员的Task开放给代办人员竞标
-        """
-        try:
-            task = db.query(Task).filter(Task.TaskID == task_id).first()
-            if not task:
-                return False
-
-            # 设置竞标截止时间（7天后）
-            bid_deadline = (datetime.now() + timedelta(days=7)).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            task.BidDeadline = bid_deadline
-            task.Status = "full"
-
-            logger.info(f"任务 {task_id} 已满员，开放给代办人员竞标")
-            return True
-
-        except Exception as e:
-            logger.error(f"开放任务给代办人员失败: {str(e)}")
-            return False
-
     @staticmethod
     def create_group_task_with_first_task(
         db: Session, creator_id: Decimal, task_data: Dict[str, Any]
@@ -421,12 +476,10 @@ class TaskUtils:
         """
         try:
             # 生成新的GroupTaskID
-            max_group_task_id = db.query(func.max(GroupTask.GroupTaskID)).scalar() or 0
-            new_group_task_id = max_group_task_id + 1
+            new_group_task_id = IdUtils.next_id()
 
             # 生成新的TaskID
-            max_task_id = db.query(func.max(Task.TaskID)).scalar() or 0
-            new_task_id = max_task_id + 1
+            new_task_id = IdUtils.next_id()
 
             # 创建GroupTask记录
             group_task = GroupTask(
@@ -448,6 +501,7 @@ class TaskUtils:
                 TaskLocation=task_data.get("task_location", ""),
                 MaxParticipants=5,
                 Status="recruiting",
+                ActiveParticipants=1,
             )
 
             # 创建创建者的GroupTask参与记录
@@ -517,6 +571,12 @@ class TaskUtils:
             Optional[Dict]: 退出结果，失败返回None
         """
         try:
+            # 锁定团办任务，与并发加入串行执行（同时检查是否存在、是否已结束）
+            if not TaskUtils._lock_group_task(db, group_task_id):
+                db.rollback()
+                logger.warning(f"团办任务 {group_task_id} 不存在或已结束")
+                return None
+
             # 查找用户在该GroupTask中的所有参与记录
             user_participations = (
                 db.query(GroupTaskUser)
@@ -528,6 +588,7 @@ class TaskUtils:
             )
 
             if not user_participations:
+                db.rollback()
                 logger.warning(f"用户 {user_id} 未参加团办任务 {group_task_id}")
                 return None
 
@@ -547,6 +608,12 @@ class TaskUtils:
                 )
 
                 if task_participant:
+                    if task_participant.Status == "active" and not TaskUtils._adjust_active_participants(
+                        db, task_id, -1
+                    ):
+                        logger.warning(
+                            f"任务 {task_id} 参与人数计数已为0，与参与记录不一致，可运行 check-participant-counters 校验"
+                        )
                     task_participant.Status = "left"
                     left_tasks.append(str(task_id))
 
@@ -589,6 +656,17 @@ class TaskUtils:
             Optional[Dict]: 退出结果，失败返回None
         """
         try:
+            # 获取Task信息
+            group_task_id = db.query(Task.GroupTaskID).filter(Task.TaskID == task_id).scalar()
+            if group_task_id is None:
+                return None
+
+            # 锁定团办任务，重新分配到其他Task时与并发加入串行执行（同时检查是否存在、是否已结束）
+            if not TaskUtils._lock_group_task(db, group_task_id):
+                db.rollback()
+                logger.warning(f"团办任务 {group_task_id} 不存在或已结束")
+                return None
+
             # 查找Task参与记录
             task_participant = (
                 db.query(TaskParticipant)
@@ -601,18 +679,16 @@ class TaskUtils:
             )
 
             if not task_participant:
+                db.rollback()
                 logger.warning(f"用户 {user_id} 未参加任务 {task_id}")
                 return None
 
-            # 获取Task信息
-            task = db.query(Task).filter(Task.TaskID == task_id).first()
-            if not task:
-                return None
-
-            group_task_id = task.GroupTaskID
-
             # 更新TaskParticipant状态
             task_participant.Status = "left"
+            if not TaskUtils._adjust_active_participants(db, task_id, -1):
+                logger.warning(
+                    f"任务 {task_id} 参与人数计数已为0，与参与记录不一致，可运行 check-participant-counters 校验"
+                )
 
             # 更新GroupTaskUser记录（指向其他Task或删除）
             group_task_user = (
@@ -636,13 +712,7 @@ class TaskUtils:
                     group_task_user.TaskID = available_task.TaskID
 
                     # 创建新的TaskParticipant记录
-                    new_task_participant = TaskParticipant(
-                        UserID=user_id,
-                        TaskID=available_task.TaskID,
-                        JoinTime=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        Status="active",
-                    )
-                    db.add(new_task_participant)
+                    TaskUtils._add_participant(db, user_id, available_task)
 
                     reassigned_task_id = available_task.TaskID
                 else:
@@ -651,13 +721,7 @@ class TaskUtils:
                     if new_task:
                         group_task_user.TaskID = new_task.TaskID
 
-                        new_task_participant = TaskParticipant(
-                            UserID=user_id,
-                            TaskID=new_task.TaskID,
-                            JoinTime=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            Status="active",
-                        )
-                        db.add(new_task_participant)
+                        TaskUtils._add_participant(db, user_id, new_task)
 
                         reassigned_task_id = new_task.TaskID
                     else:
@@ -695,28 +759,15 @@ class TaskUtils:
         """
         try:
             query = db.query(Task).filter(
-                Task.GroupTaskID == group_task_id, Task.Status == "recruiting"
+                Task.GroupTaskID == group_task_id,
+                Task.Status == "recruiting",
+                Task.ActiveParticipants < Task.MaxParticipants,
             )
 
             if exclude_task_id:
                 query = query.filter(Task.TaskID != exclude_task_id)
 
-            tasks = query.all()
-
-            for task in tasks:
-                current_participants = (
-                    db.query(TaskParticipant)
-                    .filter(
-                        TaskParticipant.TaskID == task.TaskID,
-                        TaskParticipant.Status == "active",
-                    )
-                    .count()
-                )
-
-                if current_participants < task.MaxParticipants:
-                    return task
-
-            return None
+            return query.order_by(Task.TaskID).first()
 
         except Exception as e:
             logger.error(f"查找可用Task失败: {str(e)}")
@@ -739,8 +790,7 @@ class TaskUtils:
                 return None
 
             # 生成新的TaskID
-            max_task_id = db.query(func.max(Task.TaskID)).scalar() or 0
-            new_task_id = max_task_id + 1
+            new_task_id = IdUtils.next_id()
 
             # 创建新Task
             new_task = Task(
@@ -755,6 +805,7 @@ class TaskUtils:
                 TaskLocation=template_task.TaskLocation,
                 MaxParticipants=5,
                 Status="recruiting",
+                ActiveParticipants=0,
             )
 
             db.add(new_task)
@@ -777,11 +828,8 @@ class TaskUtils:
             if not task:
                 return False
 
-            # 设置竞标截止时间（7天后）
-            bid_deadline = (datetime.now() + timedelta(days=7)).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            task.BidDeadline = bid_deadline
+            # 设置竞标截止时间并登记截止调度，到期由 DeadlineScheduler 分配或延长
+            DeadlineUtils.open_bid_window(db, task)
             task.Status = "full"
 
             logger.info(f"任务 {task_id} 已满员，开放给代办人员竞标")
@@ -801,15 +849,8 @@ class TaskUtils:
             if not task:
                 return False
 
-            # 统计当前活跃参与者
-            current_participants = (
-                db.query(TaskParticipant)
-                .filter(
-                    TaskParticipant.TaskID == task_id,
-                    TaskParticipant.Status == "active",
-                )
-                .count()
-            )
+            # 当前活跃参与者
+            current_participants = task.ActiveParticipants
 
             # 如果人数不足且Task状态为full，重新开放招募
             if current_participants < task.MaxParticipants and task.Status == "full":
@@ -827,6 +868,7 @@ class TaskUtils:
 
                 for bid in pending_bids:
                     bid.BidStatus = "cancelled"
+                DeadlineUtils.cancel(db, task_id)
 
                 logger.info(
                     f"任务 {task_id} 重新开放招募，当前人数: {current_participants}"
@@ -874,15 +916,17 @@ class TaskUtils:
             results = query.offset(offset).limit(per_page).all()
             print(results)
 
+            # 批量获取本页所有团办任务的参与人数
+            participant_stats = TaskUtils._load_group_participant_stats(
+                db, [group_task.GroupTaskID for group_task, _, _ in results]
+            )
+
             # 处理结果
             my_group_tasks = []
             for group_task, task, group_task_user in results:
-                # 获取参与用户数量
-                participant_count = (
-                    db.query(GroupTaskUser)
-                    .filter(GroupTaskUser.GroupTaskID == group_task.GroupTaskID)
-                    .count()
-                )
+                participant_count = participant_stats.get(
+                    group_task.GroupTaskID, {}
+                ).get("participant_count", 0)
 
                 my_group_tasks.append(
                     {
@@ -951,15 +995,14 @@ class TaskUtils:
 
             # 检查竞标截止时间（如果有的话）
             if task.BidDeadline:
-                try:
-                    deadline = datetime.strptime(task.BidDeadline, "%Y-%m-%d %H:%M:%S")
-                    if datetime.now() > deadline:
-                        logger.warning(f"任务 {task_id} 竞标已截止")
-                        return False
-                except ValueError:
+                deadline = TypedColumnUtils.value(task, "BidDeadlineAt")
+                if deadline is None:
                     logger.warning(
                         f"任务 {task_id} 竞标截止时间格式不正确: {task.BidDeadline}"
                     )
+                elif datetime.now() > deadline:
+                    logger.warning(f"任务 {task_id} 竞标已截止")
+                    return False
 
             # 检查是否已经竞标
             existing_bid = (
@@ -973,8 +1016,7 @@ class TaskUtils:
                 return False
 
             # 生成BidID
-            max_bid_id = db.query(func.max(BidRecord.BidID)).scalar() or 0
-            new_bid_id = max_bid_id + 1
+            new_bid_id = IdUtils.next_id()
 
             # 创建竞标记录
             bid_record = BidRecord(
@@ -1029,17 +1071,22 @@ class TaskUtils:
             # 获取前5位竞标者的信誉信息
             bidder_ids = [bid.UserID for bid in pending_bids]
 
-            # 修改：使用UserUtils获取每个竞标者的信誉分数
+            # 批量获取竞标者的信誉分数和用户信息
+            reputation_scores = UserUtils.get_reputation_scores(db, bidder_ids)
+            users = {
+                user.UserID: user
+                for user in db.query(User).filter(User.UserID.in_(bidder_ids)).all()
+            }
+
             bidders_with_reputation = []
             for bidder_id in bidder_ids:
-                reputation_info = UserUtils.get_user_reputation(db, bidder_id)
-                user = db.query(User).filter(User.UserID == bidder_id).first()
-                if user and reputation_info:
+                user = users.get(bidder_id)
+                if user:
                     bidders_with_reputation.append(
                         {
                             "user": user,
                             "user_id": bidder_id,
-                            "reputation_score": reputation_info["average_score"],
+                            "reputation_score": reputation_scores[bidder_id],
                         }
                     )
 
@@ -1095,21 +1142,19 @@ class TaskUtils:
                 db.query(BidRecord)
                 .filter(BidRecord.TaskID == task_id, BidRecord.BidStatus == "pending")
                 .order_by(BidRecord.BidTime)
-                .limit(5)
+                .limit(config.BID_AUTO_ASSIGN_BIDS)
                 .all()
             )
-            if len(bids) < 5:
+            if len(bids) < config.BID_AUTO_ASSIGN_BIDS:
                 return False
-            # 获取竞标者的信誉分数
+            # 批量获取竞标者的信誉分数
+            reputation_scores = UserUtils.get_reputation_scores(
+                db, [bid.UserID for bid in bids]
+            )
             best_bidder = None
             highest_reputation = -1
             for bid in bids:
-                avg_score = (
-                    db.query(func.avg(func.cast(Reputation.Score, DECIMAL)))
-                    .filter(Reputation.UserID == bid.UserID)
-                    .scalar()
-                    or 0
-                )
+                avg_score = reputation_scores[bid.UserID]
                 if avg_score > highest_reputation:
                     highest_reputation = avg_score
                     best_bidder = bid
@@ -1234,9 +1279,11 @@ class TaskUtils:
         page: int = 1,
         per_page: int = 10,
         status: str = "",
+        cursor: Optional[str] = None,
+        count: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
-        获取用户的竞标记录
+        获取用户的竞标记录（按 BidTime 倒序）
 
         Args:
             db: 数据库会话
@@ -1244,6 +1291,8 @@ class TaskUtils:
             page: 页码
             per_page: 每页记录数
             status: 状态过滤
+            cursor: 游标分页，"" 为第一页，其余为上一页的 next_cursor；为 None 时按页码分页
+            count: 总数统计方式 none/exact/approximate
 
         Returns:
             Dict: 包含竞标记录和分页信息的字典
@@ -1260,14 +1309,17 @@ class TaskUtils:
             if status:
                 query = query.filter(BidRecord.BidStatus == status)
 
-            query = query.order_by(desc(BidRecord.BidTime))
-
-            # 计算总数
-            total_count = query.count()
-
-            # 分页查询
-            offset = (page - 1) * per_page
-            results = query.offset(offset).limit(per_page).all()
+            # 同一用户的竞标按 (BidTime, TaskID) 唯一排序
+            page_data = PaginationUtils.paginate(
+                query,
+                [(BidRecord.BidTime, True), (BidRecord.TaskID, True)],
+                page,
+                per_page,
+                cursor,
+                count,
+            )
+            results = page_data["items"]
+            pagination = page_data["pagination"]
 
             # 处理结果
             my_bids = []
@@ -1288,16 +1340,18 @@ class TaskUtils:
                     }
                 )
 
-            total_pages = (total_count + per_page - 1) // per_page
-
             return {
                 "bids": my_bids,
                 "current_page": page,
                 "per_page": per_page,
-                "total_records": total_count,
-                "total_pages": total_pages,
+                "total_records": pagination["total"],
+                "total_pages": pagination.get("total_pages"),
+                "has_next": pagination["has_next"],
+                "next_cursor": pagination["next_cursor"],
             }
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"获取用户竞标记录失败: {str(e)}")
             return {
@@ -1506,12 +1560,10 @@ class TaskUtils:
         """
         try:
             # 生成新的TaskID
-            max_task_id = db.query(func.max(Task.TaskID)).scalar() or 0
-            new_task_id = max_task_id + 1
+            new_task_id = IdUtils.next_id()
 
             # 生成新的GroupTaskID
-            max_group_task_id = db.query(func.max(GroupTask.GroupTaskID)).scalar() or 0
-            new_group_task_id = max_group_task_id + 1
+            new_group_task_id = IdUtils.next_id()
 
             # 创建GroupTask记录
             group_task = GroupTask(
@@ -1647,7 +1699,7 @@ class TaskUtils:
         db: Session, page: int = 1, per_page: int = 10, task_type: str = ""
     ) -> Dict[str, Any]:
         """
-        获取用户可参与的团办任务列表（人数未满5人的）
+        获取用户可参与的团办任务列表（招募中且人数未满的子任务，人数直接读取 Task.ActiveParticipants）
 
         Args:
             db: 数据库会话
@@ -1659,23 +1711,15 @@ class TaskUtils:
             Dict: 包含任务列表和分页信息的字典
         """
         try:
-            # 构建子查询：查找参与人数 < 5 的 GroupTaskID
-            subquery = (
-                db.query(
-                    GroupTaskUser.GroupTaskID,
-                    func.count(GroupTaskUser.UserID).label("participant_count"),
-                )
-                .group_by(GroupTaskUser.GroupTaskID)
-                .having(func.count(GroupTaskUser.UserID) < 5)
-                .subquery()
-            )
-
-            # 主查询：从 Task 和 GroupTask 联查，并筛选人数 < 5，且 endTime 未结束的任务
+            # 从 Task 和 GroupTask 联查，筛选招募中、人数未满且 endTime 未结束的任务
             query = (
                 db.query(GroupTask, Task)
                 .join(Task, Task.GroupTaskID == GroupTask.GroupTaskID)
-                .join(subquery, GroupTask.GroupTaskID == subquery.c.GroupTaskID)
-                .filter(or_(GroupTask.endTime.is_(None), GroupTask.endTime == ""))
+                .filter(
+                    Task.Status == "recruiting",
+                    Task.ActiveParticipants < Task.MaxParticipants,
+                    or_(GroupTask.endTime.is_(None), GroupTask.endTime == ""),
+                )
             )
 
             # 添加任务类型过滤
@@ -1692,12 +1736,8 @@ class TaskUtils:
             # 处理结果
             available_tasks = []
             for group_task, task in results:
-                # 获取当前参与人数
-                participant_count = (
-                    db.query(GroupTaskUser)
-                    .filter(GroupTaskUser.GroupTaskID == group_task.GroupTaskID)
-                    .count()
-                )
+                participant_count = task.ActiveParticipants
+                max_participants = int(task.MaxParticipants)
 
                 available_tasks.append(
                     {
@@ -1710,8 +1750,8 @@ class TaskUtils:
                         "bid_deadline": task.BidDeadline,
                         "join_time": group_task.JoinTime,
                         "current_participants": participant_count,
-                        "max_participants": 5,
-                        "spots_remaining": 5 - participant_count,
+                        "max_participants": max_participants,
+                        "spots_remaining": max_participants - participant_count,
                         "status": "recruiting",
                     }
                 )
@@ -1759,17 +1799,20 @@ class TaskUtils:
             offset = (page - 1) * per_page
             results = query.offset(offset).limit(per_page).all()
             assigned_results = assigned_query.offset(max(0, offset - len(results))).limit(per_page - len(results)).all() if per_page > len(results) else []
-            staff_tasks = []
-            for task in results:
-                bid_count = (
-                    db.query(BidRecord)
+            # 本页可竞标任务的待处理竞标数（一次分组查询）
+            bid_counts = {}
+            if results:
+                bid_counts = dict(
+                    db.query(BidRecord.TaskID, func.count())
                     .filter(
-                        BidRecord.TaskID == task.TaskID,
+                        BidRecord.TaskID.in_([task.TaskID for task in results]),
                         BidRecord.BidStatus == "pending",
                     )
-                    .count()
+                    .group_by(BidRecord.TaskID)
+                    .all()
                 )
-                participants = TaskUtils.get_task_participants(db, task.TaskID)
+            staff_tasks = []
+            for task in results:
                 staff_tasks.append(
                     {
                         "type": "group_task",
@@ -1780,15 +1823,12 @@ class TaskUtils:
                         "estimated_time": task.EstimatedTime,
                         "task_location": task.TaskLocation,
                         "bid_deadline": task.BidDeadline,
-                        "participants_count": (
-                            len(participants["participants"]) if participants else 0
-                        ),
-                        "bid_count": bid_count,
+                        "participants_count": task.ActiveParticipants,
+                        "bid_count": bid_counts.get(task.TaskID, 0),
                         "status": "available_for_bidding",
                     }
                 )
             for task in assigned_results:
-                participants = TaskUtils.get_task_participants(db, task.TaskID)
                 staff_tasks.append(
                     {
                         "type": "group_task",
@@ -1799,9 +1839,7 @@ class TaskUtils:
                         "estimated_time": task.EstimatedTime,
                         "task_location": task.TaskLocation,
                         "bid_deadline": task.BidDeadline,
-                        "participants_count": (
-                            len(participants["participants"]) if participants else 0
-                        ),
+                        "participants_count": task.ActiveParticipants,
                         "bid_count": 0,
                         "status": "assigned",
                     }
@@ -1848,11 +1886,10 @@ class TaskUtils:
                 return None
 
             # 检查竞标截止时间
-            if task.BidDeadline:
-                deadline = datetime.strptime(task.BidDeadline, "%Y-%m-%d %H:%M:%S")
-                if datetime.now() > deadline:
-                    logger.warning(f"任务 {task_id} 竞标已截止")
-                    return None
+            deadline = TypedColumnUtils.value(task, "BidDeadlineAt")
+            if deadline and datetime.now() > deadline:
+                logger.warning(f"任务 {task_id} 竞标已截止")
+                return None
 
             # 检查是否已经竞标
             existing_bid = (
@@ -1866,8 +1903,7 @@ class TaskUtils:
                 return None
 
             # 生成新的BidID
-            max_bid_id = db.query(func.max(BidRecord.BidID)).scalar() or 0
-            new_bid_id = max_bid_id + 1
+            new_bid_id = IdUtils.next_id()
 
             # 创建竞标记录
             bid_record = BidRecord(
@@ -1889,8 +1925,8 @@ class TaskUtils:
                 .count()
             )
 
-            if bid_count >= 5:
-                TaskUtils._auto_assign_task_to_best_bidder(db, task_id)
+            if bid_count >= config.BID_AUTO_ASSIGN_BIDS:
+                DeadlineUtils.request_assignment(db, task_id)
 
             logger.info(f"代办人员 {staff_id} 成功竞标任务 {task_id}")
 
@@ -0,0 +1,272 @@
+"""
+类型列迁移工具模块
+积分、分数、金额和时间原先以字符串存储，排序和聚合需要逐行 CAST/strptime。
+迁移按以下步骤在线进行，每一步都可单独回退：
+    1. V005 迁移新增可为空的类型列（如 Points.PointsValue、Task.BidDeadlineAt）
+    2. 部署后 ORM 写入时自动双写新旧两列，读取使用 dual 模式（优先类型列，为空时回退旧列）
+    3. flask backfill-typed-columns 分批回填历史数据，flask typed-columns-status 确认无待回填记录
+    4. 设置 TYPED_COLUMNS_READ=typed，读取只使用类型列及其索引
+    5. 确认无旧版本实例后，再通过后续迁移删除旧字符串列
+"""
+
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import DECIMAL, Integer, and_, bindparam, cast, event, func, inspect, or_, select, tuple_
+from sqlalchemy.engine import Engine
+import config
+from models import BidRecord, GroupTask, Orders, Points, Reputation, Staff, Task, TaskParticipant
+import logging
+
+logger = logging.getLogger(__name__)
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+TIME_FORMAT_MICROSECONDS = "%Y-%m-%d %H:%M:%S.%f"
+
+READ_LEGACY = "legacy"
+READ_DUAL = "dual"
+READ_TYPED = "typed"
+
+
+def parse_int(value: Any) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    try:
+        return int(Decimal(str(value).strip()))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def parse_decimal(value: Any) -> Optional[Decimal]:
+    if value is None or value == "":
+        return None
+    try:
+        result = Decimal(str(value).strip())
+    except InvalidOperation:
+        return None
+    return result if result.is_finite() else None
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    # 由 datetime.now() 转成字符串写入的时间带微秒
+    for time_format in (TIME_FORMAT, TIME_FORMAT_MICROSECONDS):
+        try:
+            return datetime.strptime(text, time_format)
+        except ValueError:
+            continue
+    return None
+
+
+def format_number(value: Any) -> str:
+    return str(value)
+
+
+def format_datetime(value: datetime) -> str:
+    return value.strftime(TIME_FORMAT)
+
+
+# 模型 -> [(旧字符串列, 类型列, 解析函数, 格式化函数)]
+TYPED_COLUMNS: Dict[type, List[Tuple[str, str, Callable, Callable]]] = {
+    Points: [("Points", "PointsValue", parse_int, format_number)],
+    Reputation: [
+        ("Score", "ScoreValue", parse_decimal, format_number),
+        ("ReviewTime", "ReviewedAt", parse_datetime, format_datetime),
+    ],
+    Orders: [
+        ("Amount", "AmountValue", parse_decimal, format_number),
+        ("CreationTime", "CreatedAt", parse_datetime, format_datetime),
+    ],
+    Staff: [("Salary", "SalaryValue", parse_decimal, format_number)],
+    BidRecord: [("BidTime", "BidAt", parse_datetime, format_datetime)],
+    Task: [("BidDeadline", "BidDeadlineAt", parse_datetime, format_datetime)],
+    TaskParticipant: [("JoinTime", "JoinedAt", parse_datetime, format_datetime)],
+    GroupTask: [("JoinTime", "JoinedAt", parse_datetime, format_datetime)],
+}
+
+# 数据库端回退时旧列的 CAST 类型（时间列在 SQL 中不做回退，按固定格式字符串比较即可）
+_SQL_CAST_TYPES = {parse_int: Integer, parse_decimal: DECIMAL(20, 2)}
+
+_typed_lookup = {
+    (model, typed): (legacy, parse, fmt)
+    for model, pairs in TYPED_COLUMNS.items()
+    for legacy, typed, parse, fmt in pairs
+}
+
+
+def _sync_typed_columns(mapper, connection, target):
+    """ORM 写入前双写：旧列被修改时更新类型列，只修改类型列时回写旧列，兼容尚未升级的实例"""
+    state = inspect(target)
+    for legacy, typed, parse, fmt in TYPED_COLUMNS[type(target)]:
+        legacy_changed = state.attrs[legacy].history.has_changes()
+        typed_changed = state.attrs[typed].history.has_changes()
+        if legacy_changed or (state.key is None and not typed_changed):
+            setattr(target, typed, parse(getattr(target, legacy)))
+        elif typed_changed:
+            value = getattr(target, typed)
+            setattr(target, legacy, fmt(value) if value is not None else "")
+
+
+for _model in TYPED_COLUMNS:
+    event.listen(_model, "before_insert", _sync_typed_columns)
+    event.listen(_model, "before_update", _sync_typed_columns)
+
+
+class TypedColumnUtils:
+    """类型列双读与回填工具类"""
+
+    @staticmethod
+    def read_mode() -> str:
+        mode = config.TYPED_COLUMNS_READ
+        if mode not in (READ_LEGACY, READ_DUAL, READ_TYPED):
+            logger.warning(f"未知的 TYPED_COLUMNS_READ={mode!r}，按 dual 处理")
+            return READ_DUAL
+        return mode
+
+    @staticmethod
+    def value(obj: Any, typed: str) -> Any:
+        """
+        按读取阶段获取对象的类型化值
+        Args:
+            obj: 模型实例
+            typed: 类型列属性名，如 "BidDeadlineAt"
+        Returns:
+            int/Decimal/datetime，无值或旧值无法解析时为 None
+        """
+        legacy, parse, _ = _typed_lookup[(type(obj), typed)]
+        mode = TypedColumnUtils.read_mode()
+        if mode == READ_LEGACY:
+            return parse(getattr(obj, legacy))
+        result = getattr(obj, typed)
+        if result is None and mode == READ_DUAL:
+            result = parse(getattr(obj, legacy))
+        return result
+
+    @staticmethod
+    def column(model: type, typed: str):
+        """
+        按读取阶段返回用于排序/聚合的 SQL 表达式（仅数值列）
+        typed 阶段直接使用类型列以便走索引，其余阶段对旧列 CAST 回退
+        """
+        legacy, parse, _ = _typed_lookup[(model, typed)]
+        cast_type = _SQL_CAST_TYPES[parse]
+        mode = TypedColumnUtils.read_mode()
+        typed_column = getattr(model, typed)
+        legacy_column = cast(getattr(model, legacy), cast_type)
+        if mode == READ_TYPED:
+            return typed_column
+        if mode == READ_LEGACY:
+            return legacy_column
+        return func.coalesce(typed_column, legacy_column)
+
+    @staticmethod
+    def _pending_condition(model: type, pairs):
+        return or_(
+            *[
+                and_(
+                    getattr(model, typed).is_(None),
+                    getattr(model, legacy).isnot(None),
+                    getattr(model, legacy) != "",
+                )
+                for legacy, typed, _, _ in pairs
+            ]
+        )
+
+    @staticmethod
+    def get_backfill_status(engine: Engine) -> Dict[str, int]:
+        """
+        统计各表仍待回填的记录数（旧列有值但类型列为空，含无法解析的旧值）
+        Returns:
+            Dict[str, int]: 表名 -> 待回填记录数
+        """
+        status = {}
+        with engine.connect() as conn:
+            for model, pairs in TYPED_COLUMNS.items():
+                count = conn.execute(
+                    select(func.count()).select_from(model).where(TypedColumnUtils._pending_condition(model, pairs))
+                ).scalar()
+                status[model.__tablename__] = count or 0
+        return status
+
+    @staticmethod
+    def backfill(
+        engine: Engine,
+        batch_size: Optional[int] = None,
+        pause: float = 0.0,
+        models: Optional[List[type]] = None,
+    ) -> Dict[str, int]:
+        """
+        按主键分批回填类型列，每批单独提交，避免长事务和大范围锁
+        只更新类型列仍为空的行，不会覆盖应用已双写的值
+        Args:
+            engine: 数据库引擎
+            batch_size: 每批行数
+            pause: 每批之间暂停秒数，用于限制对线上库的压力
+            models: 只回填指定模型，默认全部
+        Returns:
+            Dict[str, int]: 表名 -> 回填的字段值数量
+        """
+        batch_size = batch_size or config.TYPED_COLUMNS_BACKFILL_BATCH
+        result = {}
+        for model in models or list(TYPED_COLUMNS):
+            pairs = TYPED_COLUMNS[model]
+            table = model.__table__
+            pk_columns = list(table.primary_key.columns)
+            pk_key = tuple_(*pk_columns) if len(pk_columns) > 1 else pk_columns[0]
+            selected = pk_columns + [table.c[name] for legacy, typed, _, _ in pairs for name in (legacy, typed)]
+
+            filled = 0
+            invalid = 0
+            last_key = None
+            while True:
+                query = (
+                    select(*selected)
+                    .where(TypedColumnUtils._pending_condition(model, pairs))
+                    .order_by(*pk_columns)
+                    .limit(batch_size)
+                )
+                if last_key is not None:
+                    query = query.where(pk_key > (tuple_(*last_key) if len(pk_columns) > 1 else last_key[0]))
+
+                with engine.begin() as conn:
+                    rows = conn.execute(query).mappings().all()
+                    if not rows:
+                        break
+                    for legacy, typed, parse, _ in pairs:
+                        params = []
+                        for row in rows:
+                            if row[typed] is not None:
+                                continue
+                            value = parse(row[legacy])
+                            if value is None:
+                                if row[legacy] not in (None, ""):
+                                    invalid += 1
+                                continue
+                            param = {f"pk_{column.name}": row[column.name] for column in pk_columns}
+                            param["typed_value"] = value
+                            params.append(param)
+                        if not params:
+                            continue
+                        statement = (
+                            table.update()
+                            .where(*[column == bindparam(f"pk_{column.name}") for column in pk_columns])
+                            .where(table.c[typed].is_(None))
+                            .values({typed: bindparam("typed_value")})
+                        )
+                        conn.execute(statement, params)
+                        filled += len(params)
+                last_key = [rows[-1][column.name] for column in pk_columns]
+                if pause:
+                    time.sleep(pause)
+
+            if invalid:
+                logger.warning(f"{table.name} 有 {invalid} 个旧值无法解析，已跳过")
+            logger.info(f"{table.name} 类型列回填完成，共 {filled} 个字段值")
+            result[table.name] = filled
+        return result
@@ -1,12 +1,23 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, desc
-from sqlalchemy import Float, Integer
-from models import User, Reputation, Points, Admin, Client, Staff, Orders
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from models import (
+    User,
+    Reputation,
+    ReputationSummary,
+    Points,
+    Admin,
+    Client,
+    Staff,
+    Orders,
+)
 from decimal import Decimal
 from typing import Optional, Dict, List, Any
 import logging
 from datetime import datetime
 import traceback
+from utils.typed_column_utils import TypedColumnUtils
+from utils.pagination_utils import InvalidCursorError, PaginationUtils
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -167,27 +178,21 @@ class UserUtils:
         """
         获取用户信誉信息
 
+        平均分、评价总数与分数分布按主键读取 ReputationSummary，
+        只有最近10条评价才查询 Reputation 并关联评价者和订单信息。
+
         Args:
             db: 数据库会话
             user_id: 用户ID
 
         Returns:
-            信誉信息字典
+            信誉信息字典，分数分布按分数段统计（键为分数段下限，如 "90" 表示90-100分）
         """
         try:
             logger.info(f"开始获取用户 {user_id} 的信誉信息")
-            
-            # 获取用户所有信誉记录
-            reputations = (
-                db.query(Reputation)
-                .filter(Reputation.UserID == user_id)
-                .order_by(desc(Reputation.ReviewTime))  # 按评价时间倒序排序
-                .all()
-            )
-            
-            logger.info(f"查询到 {len(reputations)} 条信誉记录")
 
-            if not reputations:
+            summary = db.get(ReputationSummary, user_id)
+            if summary is None or not summary.ReviewCount:
                 logger.info(f"用户 {user_id} 没有信誉记录")
                 return {
                     "average_score": 0.0,
@@ -196,60 +201,49 @@ class UserUtils:
                     "recent_reviews": [],
                 }
 
-            # 计算平均分
-            scores = []
             score_distribution = {}
-            recent_reviews = []
+            for bucket in range(10):
+                count = getattr(summary, f"Bucket{bucket}") or 0
+                if count:
+                    score_distribution[str(bucket * 10)] = count
+
+            # 最近10条评价，一次关联查询评价者和订单
+            recent_rows = (
+                db.query(Reputation, User.Username, Orders.OrderID)
+                .outerjoin(User, User.UserID == Reputation.RUserID)
+                .outerjoin(Orders, Orders.OrderID == Reputation.OrderID)
+                .filter(Reputation.UserID == user_id)
+                .order_by(desc(Reputation.ReviewTime))  # 按评价时间倒序排序
+                .limit(10)
+                .all()
+            )
 
-            for rep in reputations:
+            recent_reviews = []
+            for rep, reviewer_name, order_id in recent_rows:
                 try:
                     score = float(rep.Score)
-                    scores.append(score)
-
-                    # 统计分数分布
-                    score_key = str(int(score))
-                    score_distribution[score_key] = (
-                        score_distribution.get(score_key, 0) + 1
-                    )
-
-                    # 获取评价者信息
-                    reviewer = db.query(User).filter(User.UserID == rep.RUserID).first()
-                    reviewer_name = reviewer.Username if reviewer else "匿名用户"
-
-                    # 获取订单信息（如果有）
-                    order_info = ""
-                    if rep.OrderID:
-                        order = db.query(Orders).filter(Orders.OrderID == rep.OrderID).first()
-                        if order:
-                            order_info = f" (订单: {order.OrderID})"
-
-                    recent_reviews.append(
-                        {
-                            "score": score,
-                            "review": rep.Review,
-                            "reviewer": reviewer_name,
-                            "reviewer_id": str(rep.RUserID),
-                            "review_time": rep.ReviewTime,
-                            "order_info": order_info
-                        }
-                    )
                 except (ValueError, TypeError) as e:
                     logger.error(f"处理信誉记录时出错: {str(e)}, 记录ID: {rep.ReputationID}")
                     continue
 
-            # 按评价时间排序
-            recent_reviews.sort(key=lambda x: x.get("review_time", ""), reverse=True)
-            recent_reviews = recent_reviews[:10]  # 只返回最近10条
+                recent_reviews.append(
+                    {
+                        "score": score,
+                        "review": rep.Review,
+                        "reviewer": reviewer_name or "匿名用户",
+                        "reviewer_id": str(rep.RUserID),
+                        "review_time": rep.ReviewTime,
+                        "order_info": f" (订单: {order_id})" if order_id else "",
+                    }
+                )
 
-            average_score = sum(scores) / len(scores) if scores else 0.0
-            
             result = {
-                "average_score": round(average_score, 2),
-                "total_reviews": len(scores),
+                "average_score": round(float(summary.AverageScore), 2),
+                "total_reviews": summary.ReviewCount,
                 "score_distribution": score_distribution,
                 "recent_reviews": recent_reviews,
             }
-            
+
             logger.info(f"用户 {user_id} 的信誉信息: {result}")
             return result
 
@@ -263,6 +257,204 @@ class UserUtils:
                 "recent_reviews": [],
             }
 
+    @staticmethod
+    def get_reputation_scores(
+        db: Session, user_ids: List[Decimal]
+    ) -> Dict[Decimal, float]:
+        """
+        批量获取用户信誉平均分（按主键读取 ReputationSummary）
+
+        Args:
+            db: 数据库会话
+            user_ids: 用户ID列表
+
+        Returns:
+            {用户ID: 平均分}，没有评价的用户为0.0
+        """
+        scores = {user_id: 0.0 for user_id in user_ids}
+        if not user_ids:
+            return scores
+
+        try:
+            rows = (
+                db.query(ReputationSummary.UserID, ReputationSummary.AverageScore)
+                .filter(ReputationSummary.UserID.in_(set(user_ids)))
+                .all()
+            )
+            for user_id, avg_score in rows:
+                scores[user_id] = round(float(avg_score), 2) if avg_score else 0.0
+        except Exception as e:
+            logger.error(f"批量获取信誉分数失败: {str(e)}")
+
+        return scores
+
+    @staticmethod
+    def _reputation_bucket(score: float) -> int:
+        """分数所在的分数段（0-9分为0，……，90-100分为9）"""
+        return min(max(int(score) // 10, 0), 9)
+
+    @staticmethod
+    def _apply_reputation_to_summary(
+        db: Session, user_id: Decimal, score: float
+    ) -> None:
+        """
+        将一条新评价计入信誉汇总（不提交，由调用方在同一事务中提交）
+        使用 upsert 在数据库端原子累加：用户的第一条评价插入汇总记录，并发的首条评价不会因主键冲突失败
+
+        Args:
+            db: 数据库会话
+            user_id: 被评价用户ID
+            score: 评价分数
+        """
+        score = Decimal(str(score))
+        bucket_field = f"Bucket{UserUtils._reputation_bucket(score)}"
+        row = {
+            "UserID": user_id,
+            "ReviewCount": 1,
+            "ScoreSum": score,
+            "AverageScore": score,
+            **{f"Bucket{bucket}": 0 for bucket in range(10)},
+        }
+        row[bucket_field] = 1
+
+        review_count = ReputationSummary.ReviewCount + 1
+        score_sum = ReputationSummary.ScoreSum + score
+        bucket = getattr(ReputationSummary, bucket_field) + 1
+        dialect = db.get_bind().dialect.name
+        if dialect == "mysql":
+            # MySQL 按顺序赋值，AverageScore 使用已更新的 ReviewCount/ScoreSum
+            statement = mysql.insert(ReputationSummary).values(row)
+            statement = statement.on_duplicate_key_update([
+                ("ReviewCount", review_count),
+                ("ScoreSum", score_sum),
+                ("AverageScore", func.round(ReputationSummary.ScoreSum / ReputationSummary.ReviewCount, 2)),
+                (bucket_field, bucket),
+            ])
+        elif dialect in ("sqlite", "postgresql"):
+            module = sqlite if dialect == "sqlite" else postgresql
+            statement = module.insert(ReputationSummary).values(row).on_conflict_do_update(
+                index_elements=[ReputationSummary.UserID],
+                set_={
+                    "ReviewCount": review_count,
+                    "ScoreSum": score_sum,
+                    "AverageScore": func.round(score_sum / review_count, 2),
+                    bucket_field: bucket,
+                },
+            )
+        else:
+            raise ValueError(f"信誉汇总不支持的数据库: {dialect}")
+        db.execute(statement)
+
+    @staticmethod
+    def rebuild_reputation_summary(
+        db: Session, user_ids: Optional[List[Decimal]] = None
+    ) -> int:
+        """
+        根据 Reputation 表重建信誉汇总（用于回填或修复）
+
+        Args:
+            db: 数据库会话
+            user_ids: 需要重建的用户ID列表，为空时重建全部用户
+
+        Returns:
+            int: 重建的汇总记录数
+        """
+        try:
+            score_column = TypedColumnUtils.column(Reputation, "ScoreValue")
+            query = db.query(
+                Reputation.UserID, score_column, func.count(Reputation.ReputationID)
+            )
+            delete_query = db.query(ReputationSummary)
+            if user_ids:
+                query = query.filter(Reputation.UserID.in_(set(user_ids)))
+                delete_query = delete_query.filter(
+                    ReputationSummary.UserID.in_(set(user_ids))
+                )
+            rows = query.group_by(Reputation.UserID, score_column).all()
+
+            summaries = {}
+            for user_id, raw_score, count in rows:
+                try:
+                    score = float(raw_score)
+                except (ValueError, TypeError):
+                    logger.warning(f"用户 {user_id} 存在无效分数 {raw_score!r}，已跳过")
+                    continue
+
+                summary = summaries.get(user_id)
+                if summary is None:
+                    summary = {"UserID": user_id, "ReviewCount": 0, "ScoreSum": Decimal("0")}
+                    for bucket in range(10):
+                        summary[f"Bucket{bucket}"] = 0
+                    summaries[user_id] = summary
+                bucket_field = f"Bucket{UserUtils._reputation_bucket(score)}"
+                summary["ReviewCount"] += count
+                summary["ScoreSum"] += Decimal(str(score)) * count
+                summary[bucket_field] += count
+
+            for summary in summaries.values():
+                summary["AverageScore"] = round(
+                    summary["ScoreSum"] / summary["ReviewCount"], 2
+                )
+
+            delete_query.delete(synchronize_session=False)
+            if summaries:
+                db.bulk_insert_mappings(ReputationSummary, list(summaries.values()))
+            db.commit()
+
+            logger.info(f"信誉汇总重建完成，共 {len(summaries)} 个用户")
+            return len(summaries)
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"重建信誉汇总失败: {str(e)}")
+            raise
+
+    @staticmethod
+    def get_reputation_ranking(db: Session, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        获取信誉排行榜
+
+        Args:
+            db: 数据库会话
+            limit: 返回记录数限制
+
+        Returns:
+            List[Dict]: 信誉排行榜列表, 包含 'rank', 'user_id', 'username', 'average_score', 'total_reviews'
+        """
+        try:
+            ranking_query = (
+                db.query(
+                    ReputationSummary.UserID,
+                    User.Username,
+                    ReputationSummary.AverageScore,
+                    ReputationSummary.ReviewCount,
+                )
+                .join(User, ReputationSummary.UserID == User.UserID)
+                .filter(ReputationSummary.ReviewCount > 0)
+                .order_by(
+                    desc(ReputationSummary.AverageScore),
+                    desc(ReputationSummary.ReviewCount),
+                )
+                .limit(limit)
+            )
+
+            return [
+                {
+                    "rank": idx,
+                    "user_id": str(user_id),
+                    "username": username,
+                    "average_score": float(avg_score),
+                    "total_reviews": review_count,
+                }
+                for idx, (user_id, username, avg_score, review_count) in enumerate(
+                    ranking_query.all(), 1
+                )
+            ]
+
+        except Exception as e:
+            logger.error(f"获取信誉排行榜失败: {str(e)}")
+            return []
+
     @staticmethod
     def get_user_points(db: Session, user_id: Decimal) -> Dict[str, Any]:
         """
@@ -340,38 +532,46 @@ class UserUtils:
 
     @staticmethod
     def get_users_list(
-        db: Session, page: int = 1, per_page: int = 10, role: str = ""
+        db: Session,
+        page: int = 1,
+        per_page: int = 10,
+        role: str = "",
+        cursor: Optional[str] = None,
+        count: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
-        获取用户列表（分页）
+        获取用户列表（分页，按 UserID 排序）
 
         Args:
             db: 数据库会话
             page: 页码
             per_page: 每页数量
             role: 角色筛选
+            cursor: 游标分页，"" 为第一页，其余为上一页的 next_cursor；为 None 时按页码分页
+            count: 总数统计方式 none/exact/approximate
 
         Returns:
             用户列表字典
         """
         try:
-            # 构建查询
-            query = db.query(User)
+            # 构建查询（关联信誉汇总，避免逐个用户统计）
+            query = db.query(User, ReputationSummary).outerjoin(
+                ReputationSummary, ReputationSummary.UserID == User.UserID
+            )
 
             # 角色筛选
             if role and role.strip():
                 query = query.filter(User.Role == role.strip())
 
-            # 获取总数
-            total = query.count()
-
             # 分页查询
-            offset = (page - 1) * per_page
-            users = query.offset(offset).limit(per_page).all()
+            page_data = PaginationUtils.paginate(
+                query, [(User.UserID, False)], page, per_page, cursor, count
+            )
+            users = page_data["items"]
 
             # 构建返回数据
             users_data = []
-            for user in users:
+            for user, summary in users:
                 user_data = {
                     "user_id": str(user.UserID),
                     "username": user.Username,
@@ -381,41 +581,21 @@ class UserUtils:
                     "role": user.Role,
                 }
 
-                # 获取信誉评分
-                avg_score = (
-                    db.query(func.avg(func.cast(Reputation.Score, Float)))
-                    .filter(Reputation.UserID == user.UserID)
-                    .scalar()
-                )
+                # 信誉评分和评价数量
                 user_data["reputation_score"] = (
-                    round(float(avg_score), 2) if avg_score else 0.0
+                    round(float(summary.AverageScore), 2) if summary else 0.0
                 )
-
-                # 获取评价数量
-                review_count = (
-                    db.query(func.count(Reputation.RUserID))
-                    .filter(Reputation.UserID == user.UserID)
-                    .scalar()
-                )
-                user_data["review_count"] = review_count or 0
+                user_data["review_count"] = summary.ReviewCount if summary else 0
 
                 users_data.append(user_data)
 
-            # 计算分页信息
-            total_pages = (total + per_page - 1) // per_page
-
             return {
                 "users": users_data,
-                "pagination": {
-                    "current_page": page,
-                    "per_page": per_page,
-                    "total": total,
-                    "total_pages": total_pages,
-                    "has_next": page < total_pages,
-                    "has_prev": page > 1,
-                },
+                "pagination": page_data["pagination"],
             }
 
+        except InvalidCursorError:
+            raise
         except Exception as e:
             traceback.print_exc()
             logger.error(f"获取用户列表失败: {str(e)}")
@@ -575,6 +755,8 @@ class UserUtils:
                 ReviewTime=datetime.now()
             )
             db.add(rep)
+            # 同一事务内更新信誉汇总
+            UserUtils._apply_reputation_to_summary(db, target_user_id, int(score))
             db.commit()
             return True
         except Exception as e:
@@ -665,36 +847,19 @@ class UserUtils:
                 return {}
 
             # 获取信誉统计
-            reputation_count = (
-                db.query(func.count(Reputation.RUserID))
-                .filter(Reputation.UserID == user_id)
-                .scalar()
-                or 0
-            )
-
-            avg_reputation = (
-                db.query(func.avg(func.cast(Reputation.Score, Float)))
-                .filter(Reputation.UserID == user_id)
-                .scalar()
-                or 0.0
+            summary = (
+                db.query(ReputationSummary)
+                .filter(ReputationSummary.UserID == user_id)
+                .first()
             )
+            reputation_count = summary.ReviewCount if summary else 0
+            avg_reputation = summary.AverageScore if summary else 0.0
 
             # 获取积分统计
             total_points = 0
             try:
                 points_sum = (
-                    db.query(
-                        func.sum(
-                            func.cast(
-                                (
-                                    Points.Points
-                                    if hasattr(Points, "Points")
-                                    else Points.Points
-                                ),
-                                Integer,
-                            )
-                        )
-                    )
+                    db.query(func.sum(TypedColumnUtils.column(Points, "PointsValue")))
                     .filter(Points.UserID == user_id)
                     .scalar()
                 )